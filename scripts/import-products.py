@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Импорт товаров из CSV поставщика в каталог.
+
+Колонки (заголовок без учёта регистра): id, name/название, price/цена,
+category/категория (id или slug категории), status, description/описание,
+images (URL через |), slug, sku/артикул. Разделитель — ',' ';' или
+табуляция, определяется по заголовку. Товары с существующим id
+(строки без id — с тем же sku или slug) дополняются полями из файла,
+остальные добавляются как новые; без статуса в файле — черновиками.
+
+Использование:
+    python3 scripts/import-products.py products.csv
+    python3 scripts/import-products.py products.csv --dry-run     # Только проверка
+    python3 scripts/import-products.py products.csv --workers 4 --batch-size 1000
+"""
+
+import argparse
+import contextlib
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Импорт товаров из CSV')
+    parser.add_argument('csv', type=Path, help='CSV файл поставщика')
+    parser.add_argument('--db', type=Path, default=ROOT / 'data' / 'saysbarbers.db',
+                        help='Путь к БД каталога')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Процессов для проверки строк (по умолчанию — по числу ядер)')
+    parser.add_argument('--batch-size', type=int, default=500, help='Товаров в транзакции')
+    parser.add_argument('--delimiter', help='Разделитель колонок (по умолчанию — по заголовку)')
+    parser.add_argument('--dry-run', action='store_true', help='Проверить файл без записи')
+    args = parser.parse_args()
+    csv_path = args.csv.resolve()
+    db_path = args.db.resolve()
+
+    # Пакет server при импорте открывает data/ относительно текущей директории
+    os.chdir(ROOT)
+    sys.path.insert(0, str(ROOT))
+    from server.csv_import import CSVImportError, decode_lines, import_csv
+    from server.database import Database
+
+    db = Database(db_path=str(db_path))
+    try:
+        with contextlib.ExitStack() as stack:
+            pool = None
+            if args.workers > 1:
+                # spawn: процессы-валидаторы не наследуют потоки и соединения БД
+                pool = stack.enter_context(ProcessPoolExecutor(
+                    max_workers=args.workers, mp_context=multiprocessing.get_context('spawn')))
+            f = stack.enter_context(open(csv_path, 'rb'))
+            report = import_csv(db, decode_lines(f), pool=pool,
+                                batch_size=args.batch_size, dry_run=args.dry_run,
+                                delimiter=args.delimiter)
+    except CSVImportError as e:
+        print(f"Ошибка: {e}")
+        return 1
+    finally:
+        db.close()
+
+    print("=" * 60)
+    print(f"  Строк:          {report['rows']}")
+    print(f"  Импортировано:  {report['imported']}" + ("  (dry run)" if args.dry_run else ""))
+    print(f"  С ошибками:     {report['failed']}")
+    print(f"  Транзакций:     {report['batches']}")
+    print(f"  Время:          {report['seconds']:.2f} с ({report['rows_per_second']} строк/с)")
+    if report['ignored_columns']:
+        print(f"  Пропущенные колонки: {', '.join(report['ignored_columns'])}")
+    print("=" * 60)
+    for error in report['errors']:
+        print(f"  Строка {error['line']}: {error['error']}")
+    if report['failed'] > len(report['errors']):
+        print(f"  ... и ещё {report['failed'] - len(report['errors'])}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -17,6 +17,8 @@ from .handler import (
     login_limiter,
     upload_limiter,
     router,
+    event_hub,
+    backup_job,
     ALLOWED_ORIGINS,
 )
 
@@ -29,8 +31,12 @@ from .auth import (
     UploadRateLimiter,
 )
 
+from .backup import BackupJob, backup_database
+
 from .database import Database
 
+from .events import EventHub
+
 from .validators import (
     is_valid_slug,
     is_valid_id,
@@ -39,6 +45,7 @@ from .validators import (
     contains_html_chars,
     sanitize_html_content,
     SchemaValidator,
+    compile_schema,
     validate_master,
     validate_service,
     validate_article,
@@ -90,6 +97,8 @@ __all__ = [
     'login_limiter',
     'upload_limiter',
     'router',
+    'event_hub',
+    'backup_job',
     'ALLOWED_ORIGINS',
 
     # Auth
@@ -100,9 +109,16 @@ __all__ = [
     'RateLimiter',
     'UploadRateLimiter',
 
+    # Backup
+    'BackupJob',
+    'backup_database',
+
     # Database
     'Database',
 
+    # Events
+    'EventHub',
+
     # Validators
     'is_valid_slug',
     'is_valid_id',
@@ -111,6 +127,7 @@ __all__ = [
     'contains_html_chars',
     'sanitize_html_content',
     'SchemaValidator',
+    'compile_schema',
     'validate_master',
     'validate_service',
     'validate_article',
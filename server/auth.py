@@ -9,6 +9,9 @@ import uuid
 import threading
 from datetime import datetime, timedelta
 
+# Срок жизни одноразового билета (EventSource: токен нельзя передать заголовком)
+TICKET_TTL_SECONDS = 30
+
 
 def generate_token():
     """Генерация криптографически стойкого токена."""
@@ -44,10 +47,12 @@ def verify_password(password, stored_password):
 class SessionManager:
     """Thread-safe управление сессиями."""
 
-    def __init__(self, timeout_hours=24):
+    def __init__(self, timeout_hours=24, ticket_ttl_seconds=TICKET_TTL_SECONDS):
         self._sessions = {}
+        self._tickets = {}  # билет → (токен, срок)
         self._lock = threading.Lock()
         self.timeout_hours = timeout_hours
+        self.ticket_ttl_seconds = ticket_ttl_seconds
 
     def create(self):
         """Создание новой сессии. Возвращает токен."""
@@ -91,8 +96,35 @@ class SessionManager:
                 return True
             return False
 
+    def issue_ticket(self, token):
+        """
+        Одноразовый короткоживущий билет вместо токена в URL (EventSource).
+        Возвращает билет или None, если токен недействителен.
+        """
+        if not self.validate(token):
+            return None
+        ticket = generate_token()
+        expires = datetime.now() + timedelta(seconds=self.ticket_ttl_seconds)
+        with self._lock:
+            self._tickets[ticket] = (token, expires)
+        return ticket
+
+    def redeem_ticket(self, ticket):
+        """
+        Обмен билета на токен сессии. Билет удаляется при первом предъявлении;
+        None — неизвестный или истёкший билет либо закончившаяся сессия.
+        """
+        if not ticket:
+            return None
+        with self._lock:
+            entry = self._tickets.pop(ticket, None)
+        if entry is None or datetime.now() > entry[1]:
+            return None
+        token = entry[0]
+        return token if self.validate(token) else None
+
     def cleanup_expired(self):
-        """Очистка истёкших сессий."""
+        """Очистка истёкших сессий и билетов."""
         now = datetime.now()
         with self._lock:
             expired = [
@@ -101,6 +133,8 @@ class SessionManager:
             ]
             for token in expired:
                 del self._sessions[token]
+            for ticket in [t for t, (_, expires) in self._tickets.items() if now > expires]:
+                del self._tickets[ticket]
             return len(expired)
 
     def get_remaining_time(self, token):
@@ -0,0 +1,222 @@
+"""
+Онлайн-резервные копии SQLite через backup API.
+Копирование идёт порциями страниц с паузами из read-only соединения
+с открытой транзакцией чтения: писатели не блокируются, снимок
+согласован. Файл пишется во временный и переименовывается (os.replace).
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from .connections import connect_reader
+
+logger = logging.getLogger('saysbarbers')
+
+# Страниц за шаг backup и пауза между шагами (секунды)
+BACKUP_PAGES = 256
+BACKUP_SLEEP = 0.005
+# Сколько последних копий каждой БД хранится
+BACKUP_KEEP = 7
+
+
+def _backup_pattern(stem):
+    """Имена копий БД stem: stem-YYYYmmdd-HHMMSS-mmm.db"""
+    return re.compile(r'^%s-\d{8}-\d{6}-\d{3}\.db$' % re.escape(stem))
+
+
+def backup_database(db_path, backup_dir, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP,
+                    keep=BACKUP_KEEP):
+    """
+    Снимок БД в backup_dir с ротацией. Возвращает описание копии:
+    path, size, pages, steps, seconds, removed (удалённые старые копии).
+    """
+    db_path = Path(db_path)
+    backup_dir = Path(backup_dir)
+    backup_dir.mkdir(parents=True, exist_ok=True)
+    now = datetime.now()
+    name = '%s-%s-%03d.db' % (db_path.stem, now.strftime('%Y%m%d-%H%M%S'),
+                              now.microsecond // 1000)
+    target = backup_dir / name
+    tmp = backup_dir / ('.%s.tmp' % name)
+
+    progress = {'steps': 0, 'pages': 0}
+
+    def on_progress(status, remaining, total):
+        progress['steps'] += 1
+        progress['pages'] = total
+
+    start = time.perf_counter()
+    source = connect_reader(db_path)
+    try:
+        # Транзакция чтения фиксирует снимок WAL: без неё любая запись
+        # другим соединением перезапускает backup с первой страницы
+        source.execute('BEGIN')
+        source.execute('SELECT 1 FROM sqlite_master LIMIT 1').fetchone()
+        dest = sqlite3.connect(str(tmp), isolation_level=None)
+        try:
+            source.backup(dest, pages=pages, sleep=sleep, progress=on_progress)
+            # Копия — один самодостаточный файл, без -wal рядом
+            dest.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            dest.close()
+        source.execute('COMMIT')
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    finally:
+        source.close()
+
+    with open(tmp, 'rb+') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, target)
+    _fsync_dir(backup_dir)
+
+    return {
+        'path': str(target),
+        'size': target.stat().st_size,
+        'pages': progress['pages'],
+        'steps': progress['steps'],
+        'seconds': round(time.perf_counter() - start, 3),
+        'removed': rotate_backups(backup_dir, db_path.stem, keep),
+    }
+
+
+def _fsync_dir(path):
+    """Сброс записи каталога на диск: без него переименование может потеряться при сбое."""
+    if os.name == 'nt':
+        # Каталог на Windows так не открыть; NTFS журналирует переименование сам
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def rotate_backups(backup_dir, stem, keep=BACKUP_KEEP):
+    """Удаление копий БД stem сверх keep последних. Возвращает имена удалённых."""
+    pattern = _backup_pattern(stem)
+    names = sorted(p.name for p in Path(backup_dir).iterdir() if pattern.match(p.name))
+    removed = names[:-keep] if keep > 0 else names
+    for name in removed:
+        (Path(backup_dir) / name).unlink(missing_ok=True)
+    return removed
+
+
+def list_backups(backup_dir):
+    """Имеющиеся копии: name, size, created (время изменения файла), новые первыми."""
+    backup_dir = Path(backup_dir)
+    if not backup_dir.is_dir():
+        return []
+    pattern = re.compile(r'^.+-\d{8}-\d{6}-\d{3}\.db$')
+    result = []
+    for path in backup_dir.iterdir():
+        if pattern.match(path.name):
+            stat = path.stat()
+            result.append({'name': path.name, 'size': stat.st_size, 'created': stat.st_mtime})
+    return sorted(result, key=lambda b: b['created'], reverse=True)
+
+
+class BackupJob:
+    """
+    Фоновые резервные копии: по расписанию (interval секунд, None — только
+    по запросу) и по trigger() из админки. Копии делает backup_func
+    в отдельном потоке; одновременно выполняется не больше одной.
+    """
+
+    def __init__(self, backup_func, interval=None, name='db-backup'):
+        self.backup_func = backup_func
+        self.interval = interval
+        self.name = name
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._closed = False
+        self._running = False
+        self._requested = False
+        self.last_result = None
+        self.last_error = None
+        self.last_finished = None
+
+    def _ensure_started(self):
+        """Запуск потока (вызывается под _lock)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def start(self):
+        """Запуск копий по расписанию."""
+        with self._lock:
+            if not self._closed:
+                self._ensure_started()
+
+    def trigger(self):
+        """Внеочередная копия. False — копия уже выполняется или запрошена."""
+        with self._lock:
+            if self._closed or self._running or self._requested:
+                return False
+            self._requested = True
+            self._ensure_started()
+        self._wakeup.set()
+        return True
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            with self._lock:
+                if self._closed:
+                    return
+                self._requested = False
+                self._running = True
+            try:
+                result = self.backup_func()
+                error = None
+                logger.info("Backup finished: %s", result)
+            except Exception as e:
+                result = None
+                error = str(e)
+                logger.exception("Backup failed")
+            with self._lock:
+                self._running = False
+                self.last_finished = time.time()
+                if error is None:
+                    self.last_result = result
+                self.last_error = error
+
+    def status(self):
+        """Состояние задания для админки."""
+        with self._lock:
+            return {
+                'running': self._running or self._requested,
+                'interval': self.interval,
+                'last_finished': self.last_finished,
+                'last_result': self.last_result,
+                'last_error': self.last_error,
+            }
+
+    def wait_idle(self, timeout=None):
+        """Ожидание завершения запрошенной копии (для тестов и остановки)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if not (self._running or self._requested):
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    def close(self, timeout=5):
+        """Остановка потока (текущая копия доделывается)."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        self._wakeup.set()
+        if thread is not None:
+            thread.join(timeout)
@@ -0,0 +1,228 @@
+"""
+Журнал изменений (change feed) для Say's Barbers API.
+Каждая запись ресурса сравнивает ключи, позиции и content_hash строк
+до и после в той же транзакции и отмечает изменённые элементы в таблице
+changes; клиенты забирают дельту по seq, данные элементов читаются
+из их таблиц при выдаче.
+"""
+
+from contextlib import contextmanager
+
+CHANGES_SCHEMA = [
+    # AUTOINCREMENT: seq не переиспользуется даже после очистки старых строк.
+    # Одна строка на элемент: новое изменение заменяет прежнее с новым seq
+    'CREATE TABLE IF NOT EXISTS changes ('
+    'seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+    'resource TEXT NOT NULL, '
+    'field TEXT NOT NULL, '
+    'item_id TEXT NOT NULL, '
+    'op TEXT NOT NULL, '
+    'position INTEGER, '
+    # У move — seq последнего upsert элемента: клиент старше него получит данные
+    'data_seq INTEGER, '
+    'UNIQUE (resource, field, item_id))',
+    # Версия ресурса — seq его последнего изменения (переживает очистку changes)
+    'CREATE TABLE IF NOT EXISTS resource_versions ('
+    'resource TEXT PRIMARY KEY, '
+    'seq INTEGER NOT NULL)',
+    # Наибольший удалённый очисткой seq: since меньше него требует перезагрузки
+    'CREATE TABLE IF NOT EXISTS changes_horizon ('
+    'id INTEGER PRIMARY KEY CHECK (id = 0), '
+    'seq INTEGER NOT NULL)',
+]
+
+# Сколько последних изменённых элементов хранится; более старый since
+# требует полной перезагрузки
+CHANGES_RETENTION = 10000
+
+# Новая строка заменяет прежнюю строку элемента; move запоминает seq
+# предыдущего upsert (или переносит его из предыдущего move)
+_APPEND_SQL = (
+    'INSERT OR REPLACE INTO changes (resource, field, item_id, op, position, data_seq) '
+    'VALUES (:resource, :field, :item_id, :op, :position, '
+    "CASE WHEN :op = 'move' THEN ("
+    "SELECT CASE WHEN op = 'upsert' THEN seq WHEN op = 'move' THEN data_seq END "
+    'FROM changes WHERE resource = :resource AND field = :field AND item_id = :item_id'
+    ') END)'
+)
+
+
+def rebuild_changes(conn):
+    """
+    Миграция журнала со снимков элементов на ключи: остаётся последняя
+    строка каждого элемента, seq и его счётчик сохраняются.
+    """
+    conn.execute('ALTER TABLE changes RENAME TO changes_old')
+    for sql in CHANGES_SCHEMA:
+        conn.execute(sql)
+    conn.execute(
+        "INSERT INTO changes (seq, resource, field, item_id, op, position) "
+        "SELECT MAX(seq), resource, field, COALESCE(item_id, ''), op, position "
+        "FROM changes_old GROUP BY resource, field, item_id"
+    )
+    # Раньше since считался устаревшим, если он меньше MIN(seq) - 1
+    conn.execute(
+        'INSERT INTO changes_horizon (id, seq) '
+        'SELECT 0, MIN(seq) - 1 FROM changes_old HAVING COUNT(*) > 0'
+    )
+    conn.execute("DELETE FROM sqlite_sequence WHERE name = 'changes'")
+    conn.execute("UPDATE sqlite_sequence SET name = 'changes' WHERE name = 'changes_old'")
+    conn.execute('DROP TABLE changes_old')
+
+
+def diff_state(before, after):
+    """
+    Разница двух состояний ресурса {(field, item_id): (position, hash)}.
+    Новый ключ или другой хеш — upsert, та же строка на другой позиции —
+    move, исчезнувший ключ — delete. Возвращает [(field, item_id, op, position)].
+    """
+    changes = []
+    for (field, item_id), (position, item_hash) in after.items():
+        old = before.get((field, item_id))
+        if old is None or item_hash is None or old[1] != item_hash:
+            changes.append((field, item_id, 'upsert', position))
+        elif old[0] != position:
+            changes.append((field, item_id, 'move', position))
+    changes.sort(key=lambda change: (change[0], change[3] is not None, change[3] or 0))
+    changes.extend(
+        (field, item_id, 'delete', None)
+        for field, item_id in sorted(before.keys() - after.keys())
+    )
+    return changes
+
+
+def record_changes(conn, resource, changes):
+    """
+    Запись [(field, item_id, op, position)] и новая версия ресурса.
+    item_id None — поле документа целиком. Возвращает число записанных строк.
+    """
+    if not changes:
+        return 0
+    conn.executemany(_APPEND_SQL, [
+        {'resource': resource, 'field': field, 'item_id': '' if item_id is None else item_id,
+         'op': op, 'position': position}
+        for field, item_id, op, position in changes
+    ])
+    seq = latest_seq(conn)
+    conn.execute(
+        'INSERT INTO resource_versions (resource, seq) VALUES (?, ?) '
+        'ON CONFLICT(resource) DO UPDATE SET seq = excluded.seq',
+        (resource, seq)
+    )
+    _prune(conn)
+    return len(changes)
+
+
+def _prune(conn):
+    """Удаление строк сверх CHANGES_RETENTION элементов и сдвиг горизонта."""
+    row = conn.execute(
+        'SELECT seq FROM changes ORDER BY seq DESC LIMIT 1 OFFSET ?', (CHANGES_RETENTION,)
+    ).fetchone()
+    if row is None:
+        return
+    conn.execute('DELETE FROM changes WHERE seq <= ?', (row[0],))
+    conn.execute(
+        'INSERT INTO changes_horizon (id, seq) VALUES (0, ?) '
+        'ON CONFLICT(id) DO UPDATE SET seq = MAX(seq, excluded.seq)',
+        (row[0],)
+    )
+
+
+def latest_seq(conn):
+    """Последний выданный seq (0, если изменений ещё не было)."""
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+    return row[0] if row else 0
+
+
+@contextmanager
+def _snapshot(conn):
+    """
+    Чтение в одной транзакции: все запросы видят одно состояние БД,
+    запись между ними не попадает в результат частично.
+    """
+    if conn.in_transaction:
+        yield
+        return
+    conn.execute('BEGIN')
+    try:
+        yield
+    finally:
+        conn.execute('COMMIT')
+
+
+def read_changes(conn, since, limit=500, load=None, versions=False):
+    """
+    Изменения после since: по одному (последнему) на элемент, в порядке seq.
+    since=None — только текущий seq (точка отсчёта перед полной загрузкой).
+    reset=True — since старше хранимой истории или из будущего,
+    клиенту нужна полная перезагрузка.
+    load(conn, resource, field, item_ids) → {item_id: значение} — текущие
+    данные элементов для upsert ('' — поле целиком); элемент, которого уже
+    нет, выдаётся как delete.
+    versions=True — в результат добавляются версии ресурсов (read_versions)
+    из того же снимка, что и seq.
+    """
+    with _snapshot(conn):
+        result = _read_changes(conn, since, limit, load)
+        if versions:
+            result['versions'] = read_versions(conn)
+    return result
+
+
+def _read_changes(conn, since, limit, load):
+    latest = latest_seq(conn)
+    if since is None:
+        return {'changes': [], 'seq': latest, 'reset': False, 'more': False}
+    row = conn.execute('SELECT seq FROM changes_horizon WHERE id = 0').fetchone()
+    horizon = row[0] if row else 0
+    if since > latest or since < horizon:
+        return {'changes': [], 'seq': latest, 'reset': True, 'more': False}
+
+    rows = conn.execute(
+        "SELECT seq, resource, field, item_id, "
+        "CASE WHEN op = 'move' AND data_seq > ? THEN 'upsert' ELSE op END, position "
+        'FROM changes WHERE seq > ? ORDER BY seq LIMIT ?',
+        (since, since, limit + 1)
+    ).fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    wanted = {}
+    for r in rows:
+        if r[4] == 'upsert':
+            wanted.setdefault((r[1], r[2]), []).append(r[3])
+    items = {}
+    for (resource, field), ids in wanted.items():
+        loaded = load(conn, resource, field, ids) if load else {}
+        items.update(((resource, field, item_id), value) for item_id, value in loaded.items())
+
+    changes = []
+    for r in rows:
+        change = {
+            'seq': r[0],
+            'resource': r[1],
+            'field': r[2],
+            'id': r[3] or None,
+            'op': r[4],
+        }
+        if r[4] == 'upsert':
+            key = (r[1], r[2], r[3])
+            if key in items:
+                change['position'] = r[5]
+                change['item'] = items[key]
+            else:
+                change['op'] = 'delete'
+        elif r[4] == 'move':
+            change['position'] = r[5]
+        changes.append(change)
+    return {
+        'changes': changes,
+        'seq': rows[-1][0] if more else latest,
+        'reset': False,
+        'more': more,
+    }
+
+
+def read_versions(conn):
+    """Версия каждого ресурса — seq его последнего изменения."""
+    return {r[0]: r[1] for r in conn.execute('SELECT resource, seq FROM resource_versions')}
@@ -0,0 +1,321 @@
+"""
+Соединения с SQLite для Say's Barbers API.
+Единственный поток-писатель с очередью записи (group commit)
+и пул read-only соединений для чтения.
+"""
+
+import sqlite3
+import threading
+import queue
+import time
+import logging
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger('saysbarbers')
+
+
+def connect_writer(db_path, synchronous='FULL'):
+    """
+    Соединение для записи. Транзакциями управляет WriteQueue.
+    По умолчанию synchronous=FULL: подтверждённая запись переживает сбой
+    питания. NORMAL — только для БД, где потеря последних записей допустима.
+    """
+    conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=%s' % synchronous)
+    conn.execute('PRAGMA foreign_keys=ON')
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def connect_reader(db_path):
+    """Read-only соединение (URI mode=ro)."""
+    uri = Path(db_path).resolve().as_uri() + '?mode=ro'
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False, isolation_level=None)
+    conn.execute('PRAGMA query_only=ON')
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+class PoolTimeout(Exception):
+    """Нет свободного соединения в пуле за отведённое время."""
+
+
+class ReadPool:
+    """
+    Ограниченный пул read-only соединений.
+
+    Соединения выдаются через connection() и возвращаются после
+    использования. Простаивающие дольше idle_timeout закрываются,
+    долго не использовавшиеся проверяются запросом перед выдачей.
+    """
+
+    def __init__(self, db_path, max_size=8, idle_timeout=300,
+                 checkout_timeout=5, health_check_after=30):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check_after = health_check_after
+        self._idle = []  # (conn, last_used), последний — самый свежий
+        self._open = 0
+        self._in_use = 0
+        self._cond = threading.Condition(threading.Lock())
+        self._closed = False
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'evicted': 0,
+            'health_failures': 0,
+            'peak_in_use': 0,
+        }
+
+    def _evict_idle(self, now):
+        """Закрытие соединений, простаивающих дольше idle_timeout (под локом)."""
+        keep = []
+        for conn, last_used in self._idle:
+            if now - last_used > self.idle_timeout:
+                conn.close()
+                self._open -= 1
+                self._stats['evicted'] += 1
+            else:
+                keep.append((conn, last_used))
+        self._idle = keep
+
+    def _checkout(self):
+        start = time.monotonic()
+        deadline = start + self.checkout_timeout
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError('ReadPool is closed')
+                now = time.monotonic()
+                self._evict_idle(now)
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._open < self.max_size:
+                    self._open += 1
+                    conn, last_used = None, now
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout('No read connection available')
+                waited = True
+                self._cond.wait(remaining)
+            self._in_use += 1
+            self._stats['checkouts'] += 1
+            self._stats['peak_in_use'] = max(self._stats['peak_in_use'], self._in_use)
+            if waited:
+                self._stats['waits'] += 1
+                self._stats['wait_time_total'] += time.monotonic() - start
+
+        try:
+            if conn is not None and time.monotonic() - last_used > self.health_check_after:
+                conn = self._health_check(conn)
+            if conn is None:
+                conn = connect_reader(self.db_path)
+                with self._cond:
+                    self._stats['created'] += 1
+        except BaseException:
+            self._release(None)
+            raise
+        return conn
+
+    def _health_check(self, conn):
+        """Проверка соединения. Возвращает его же или None, если оно неисправно."""
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return conn
+        except sqlite3.Error:
+            logger.warning("Read connection failed health check, reopening")
+            with self._cond:
+                self._stats['health_failures'] += 1
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            return None
+
+    def _release(self, conn):
+        with self._cond:
+            self._in_use -= 1
+            if conn is None or self._closed:
+                self._open -= 1
+                if conn is not None:
+                    conn.close()
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Выдача соединения из пула с возвратом после использования."""
+        conn = self._checkout()
+        try:
+            yield conn
+        except sqlite3.DatabaseError as e:
+            if not isinstance(e, sqlite3.OperationalError):
+                # Повреждённое соединение в пул не возвращаем
+                conn.close()
+                conn = None
+            raise
+        finally:
+            if conn is not None and conn.in_transaction:
+                conn.rollback()
+            self._release(conn)
+
+    def metrics(self):
+        """Метрики использования пула."""
+        with self._cond:
+            result = dict(self._stats)
+            result.update({
+                'max_size': self.max_size,
+                'open': self._open,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'utilization': round(self._in_use / self.max_size, 3) if self.max_size else 0,
+            })
+        result['wait_time_total'] = round(result['wait_time_total'], 6)
+        return result
+
+    def close(self):
+        """Закрытие всех простаивающих соединений."""
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                conn.close()
+                self._open -= 1
+            self._idle = []
+            self._cond.notify_all()
+
+
+class WriteQueue:
+    """
+    Поток-писатель, владеющий единственным соединением для записи.
+
+    Операции — функции вида fn(conn) -> result. Подряд идущие операции
+    из очереди выполняются в одной транзакции (group commit), каждая —
+    в своём SAVEPOINT, так что ошибка одной не откатывает остальные.
+    """
+
+    MAX_BATCH = 64
+
+    def __init__(self, conn, name='db-writer'):
+        self.conn = conn
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+        self.batches = 0
+        self.operations = 0
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    thread.start()
+                    self._thread = thread
+
+    def submit(self, operation):
+        """Постановка операции в очередь. Возвращает Future."""
+        if self._closed:
+            raise RuntimeError('WriteQueue is closed')
+        future = Future()
+        if threading.current_thread() is self._thread:
+            # Вложенная запись из самой операции — выполняем сразу,
+            # иначе поток-писатель ждал бы сам себя
+            try:
+                future.set_result(operation(self.conn))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        self._ensure_started()
+        self._queue.put((operation, future))
+        return future
+
+    def execute(self, operation):
+        """Синхронное выполнение операции в потоке-писателе."""
+        return self.submit(operation).result()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < self.MAX_BATCH:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._commit_batch(batch)
+                    return
+                batch.append(item)
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch):
+        """Выполнение пачки операций в одной транзакции."""
+        conn = self.conn
+        outcomes = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for operation, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute('SAVEPOINT op')
+                try:
+                    result = operation(conn)
+                except BaseException as e:
+                    conn.execute('ROLLBACK TO op')
+                    conn.execute('RELEASE op')
+                    future.set_exception(e)
+                else:
+                    conn.execute('RELEASE op')
+                    outcomes.append((future, result))
+            conn.execute('COMMIT')
+            self.batches += 1
+            self.operations += len(outcomes)
+        except BaseException as e:
+            logger.exception("Write batch failed")
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result in outcomes:
+            future.set_result(result)
+
+    def metrics(self):
+        """Счётчики потока-писателя."""
+        return {
+            'queue_depth': self._queue.qsize(),
+            'batches': self.batches,
+            'operations': self.operations,
+        }
+
+    def close(self, timeout=5):
+        """Завершение потока после обработки уже поставленных операций."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                # Поток ещё выполняет пачку: закрытое соединение уронило бы его
+                logger.warning("Writer %s did not stop in %ss, connection left open",
+                               self.name, timeout)
+                return
+        self.conn.close()
@@ -0,0 +1,372 @@
+"""
+Импорт товаров из CSV поставщика.
+Колонки сопоставляются с полями PRODUCT_SCHEMA, строки проверяются
+и очищаются порциями (в процессе или в пуле, переданном вызывающим),
+запись — пакетами через Database.import_items (upsert с наложением
+на существующие товары).
+"""
+
+import csv
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+
+from .validators import PRODUCT_SCHEMA, SchemaValidator
+
+logger = logging.getLogger('saysbarbers')
+
+# Заголовок CSV (без регистра и пробелов по краям) → поле товара
+CSV_COLUMNS = {
+    'id': 'id',
+    'name': 'name',
+    'название': 'name',
+    'наименование': 'name',
+    'price': 'price',
+    'цена': 'price',
+    'category': 'categoryId',
+    'categoryid': 'categoryId',
+    'категория': 'categoryId',
+    'status': 'status',
+    'статус': 'status',
+    'description': 'description',
+    'описание': 'description',
+    'images': 'images',
+    'изображения': 'images',
+    'slug': 'slug',
+    'sku': 'sku',
+    'артикул': 'sku',
+}
+
+REQUIRED_COLUMNS = ('name',)
+
+# Строка без id сопоставляется с товаром каталога по этим полям (по порядку):
+# повторный импорт того же файла обновляет товары, а не дублирует их
+MATCH_FIELDS = ('sku', 'slug')
+# Статус нового товара без колонки status: на сайт он попадает после проверки
+NEW_PRODUCT_STATUS = 'draft'
+
+# Строк в порции для процесса-валидатора
+CHUNK_SIZE = 1000
+# Порций в работе у пула: память не растёт с размером файла
+POOL_PENDING = 8
+# В отчёте — первые ошибки, остальные только считаются
+MAX_ERRORS = 100
+
+
+class CSVImportError(ValueError):
+    """Файл нельзя импортировать целиком (нет заголовка или обязательной колонки)."""
+
+
+def detect_delimiter(header):
+    """Разделитель по строке заголовка: ';' (Excel в русской локали), табуляция или ','."""
+    counts = {d: header.count(d) for d in (';', '\t', ',')}
+    delimiter = max(counts, key=counts.get)
+    return delimiter if counts[delimiter] else ','
+
+
+def map_header(header):
+    """
+    Поля товара по колонкам заголовка: (fields, ignored).
+    fields[i] — поле для колонки i или None, ignored — неизвестные колонки.
+    """
+    fields = []
+    ignored = []
+    for column in header:
+        field = CSV_COLUMNS.get(column.strip().lstrip('\ufeff').lower())
+        if field is None and column.strip():
+            ignored.append(column.strip())
+        fields.append(field)
+    for required in REQUIRED_COLUMNS:
+        if required not in fields:
+            raise CSVImportError('Missing column: %s' % required)
+    return fields, ignored
+
+
+def read_header(header_line, delimiter=None):
+    """
+    Разбор строки заголовка: (delimiter, fields, ignored).
+    CSVImportError, если заголовка нет или в нём нет обязательной колонки.
+    """
+    if header_line is None:
+        raise CSVImportError('Line too long')
+    if not header_line.strip():
+        raise CSVImportError('Missing header')
+    header_line = header_line.lstrip('\ufeff')
+    if delimiter is None:
+        delimiter = detect_delimiter(header_line)
+    fields, ignored = map_header(next(csv.reader([header_line], delimiter=delimiter)))
+    return delimiter, fields, ignored
+
+
+def parse_price(value):
+    """'1 500,50' → 1500.5; целые — int. ValueError при мусоре."""
+    value = value.replace('\xa0', '').replace(' ', '').replace(',', '.')
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+
+def row_to_product(fields, row, categories, new_id):
+    """
+    Товар из строки CSV: (product, None) или (None, error).
+    categories — slug категории → id; new_id — id для строки без id.
+    """
+    product = {}
+    for field, value in zip(fields, row):
+        if field is None:
+            continue
+        value = value.strip()
+        if not value:
+            continue
+        if field == 'price':
+            try:
+                value = parse_price(value)
+            except ValueError:
+                return None, 'Invalid price'
+        elif field == 'images':
+            value = [url.strip() for url in value.split('|') if url.strip()]
+        elif field == 'categoryId':
+            value = categories.get(value, value)
+        product[field] = value
+
+    product.setdefault('id', new_id)
+    is_valid, error = SchemaValidator.validate(product, PRODUCT_SCHEMA)
+    if not is_valid:
+        return None, error
+    return product, None
+
+
+def new_product_id(id_prefix, line):
+    """id товара для строки line файла без id."""
+    return '%s_r%d' % (id_prefix, line)
+
+
+def validate_chunk(task):
+    """Проверка порции строк в процессе пула: [(line, product, error)]."""
+    fields, categories, id_prefix, rows = task
+    result = []
+    for line, row in rows:
+        product, error = row_to_product(fields, row, categories, new_product_id(id_prefix, line))
+        result.append((line, product, error))
+    return result
+
+
+class ProductMatcher:
+    """
+    id товаров каталога и их sku/slug. Строке без id достаётся id товара
+    с тем же sku (или slug), в том числе добавленного раньше в этом же
+    файле; новый товар без статуса получает NEW_PRODUCT_STATUS.
+    """
+
+    def __init__(self, products):
+        self.ids = set()
+        self.keys = {}
+        for product in products:
+            self.ids.add(product.get('id'))
+            self._remember(product)
+
+    def _remember(self, product):
+        for field in MATCH_FIELDS:
+            value = product.get(field)
+            if value:
+                self.keys.setdefault((field, value), product.get('id'))
+
+    def resolve(self, product, generated_id):
+        """Товар с id существующего товара (если нашёлся) и статусом нового."""
+        if product['id'] == generated_id:
+            for field in MATCH_FIELDS:
+                match = self.keys.get((field, product.get(field)))
+                if match is not None:
+                    product['id'] = match
+                    break
+        # ids — только товары из базы: повтор нового товара в файле тоже черновик
+        if product['id'] not in self.ids:
+            product.setdefault('status', NEW_PRODUCT_STATUS)
+        self._remember(product)
+        return product
+
+
+def decode_lines(raw_lines):
+    """
+    Строки файла из bytes: UTF-8, при ошибке — cp1251 (выгрузки Excel).
+    None (строка длиннее предела чтения) передаётся как есть.
+    """
+    for raw in raw_lines:
+        if raw is None:
+            yield None
+            continue
+        try:
+            yield raw.decode('utf-8')
+        except UnicodeDecodeError:
+            yield raw.decode('cp1251', errors='replace')
+
+
+def _chunks(reader, size):
+    chunk = []
+    for row in reader:
+        if not any(value.strip() for value in row):
+            continue
+        chunk.append((reader.line_num, row))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def validate_rows(reader, fields, categories, id_prefix, pool=None, chunk_size=CHUNK_SIZE):
+    """
+    (line, product, error) по строкам reader в исходном порядке.
+    pool — concurrent.futures.Executor для проверки порций (пул процессов
+    создаёт и закрывает вызывающий); без него проверка идёт в этом потоке.
+    """
+    tasks = ((fields, categories, id_prefix, chunk) for chunk in _chunks(reader, chunk_size))
+    if pool is None:
+        for task in tasks:
+            yield from validate_chunk(task)
+        return
+
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.submit(validate_chunk, task))
+        if len(pending) >= POOL_PENDING:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+
+def import_csv(storage, lines, pool=None, batch_size=500, dry_run=False,
+               delimiter=None, max_errors=MAX_ERRORS):
+    """
+    Импорт товаров из строк CSV (итерируемое str) в storage.
+    Строки с ошибками пропускаются и попадают в отчёт, остальные пишутся;
+    None в lines — строка длиннее предела чтения, тоже ошибка этой строки.
+    Существующие товары (по id, строки без id — по sku или slug) дополняются
+    полями из CSV, новые встают в конец каталога, без статуса в файле —
+    черновиками. Возвращает отчёт с числом строк и скоростью.
+    """
+    start = time.perf_counter()
+    lines = iter(lines)
+    header_line = next(lines, '')
+    delimiter, fields, ignored = read_header(header_line, delimiter)
+    report = {'rows': 0, 'imported': 0, 'failed': 0, 'errors': [], 'batches': 0,
+              'ignored_columns': ignored}
+
+    def reject(line, error):
+        report['rows'] += 1
+        report['failed'] += 1
+        if len(report['errors']) < max_errors:
+            report['errors'].append({'line': line, 'error': error})
+
+    def file_lines():
+        # Слишком длинная строка — пустая строка для csv: нумерация не сбивается
+        for line_no, line in enumerate(lines, 2):
+            if line is None:
+                reject(line_no, 'Line too long')
+                line = '\n'
+            yield line
+
+    # Заголовок читается тем же reader: line_num — физический номер строки файла
+    reader = csv.reader(itertools.chain([header_line.lstrip('\ufeff')], file_lines()),
+                        delimiter=delimiter)
+    next(reader)
+
+    categories = {
+        c['slug']: c['id']
+        for c in (storage.read('shop-categories.json') or {}).get('categories', [])
+        if c.get('slug') and c.get('id')
+    }
+    matcher = ProductMatcher((storage.read('products.json') or {}).get('products', []))
+
+    def products():
+        id_prefix = 'product_%d' % int(time.time() * 1000)
+        for line, product, error in validate_rows(reader, fields, categories, id_prefix, pool):
+            if error:
+                reject(line, error)
+                continue
+            report['rows'] += 1
+            yield matcher.resolve(product, new_product_id(id_prefix, line))
+
+    if dry_run:
+        report['imported'] = sum(1 for _ in products())
+    else:
+        result = storage.import_items('products.json', products(), batch_size=batch_size, merge=True)
+        report['imported'] = result['imported']
+        report['batches'] = result['batches']
+
+    report['errors'].sort(key=lambda error: error['line'])
+    seconds = time.perf_counter() - start
+    report['seconds'] = round(seconds, 3)
+    report['rows_per_second'] = int(report['rows'] / seconds) if seconds > 0 else report['rows']
+    return report
+
+
+class CSVImportJob:
+    """
+    Импорт в фоновом потоке: HTTP-сервер однопоточный, и проверка файла
+    в потоке запроса остановила бы все остальные запросы. Одновременно
+    выполняется не больше одного импорта, отчёт последнего хранится
+    для админки.
+    """
+
+    def __init__(self, name='csv-import'):
+        self.name = name
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        self.started = None
+        self.finished = None
+        self.report = None
+        self.error = None
+
+    def start(self, task):
+        """
+        Запуск task() → отчёт в отдельном потоке. False — импорт уже идёт.
+        Текст CSVImportError попадает в error, прочие ошибки — общим сообщением.
+        """
+        with self._lock:
+            if self._running:
+                return False
+            self._running = True
+            self.started = time.time()
+            self.finished = self.report = self.error = None
+            self._thread = threading.Thread(target=self._run, args=(task,), name=self.name,
+                                            daemon=True)
+            self._thread.start()
+        return True
+
+    def _run(self, task):
+        report = error = None
+        try:
+            report = task()
+            logger.info("CSV import finished: %d imported, %d failed",
+                        report['imported'], report['failed'])
+        except CSVImportError as e:
+            error = str(e)
+        except Exception:
+            logger.exception("CSV import failed")
+            error = 'Internal server error'
+        with self._lock:
+            self._running = False
+            self.finished = time.time()
+            self.report = report
+            self.error = error
+
+    def wait(self, timeout=None):
+        """Ожидание завершения текущего импорта. True — импорт не выполняется."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return not self.status()['running']
+
+    def status(self):
+        """Состояние для админки: running, started, finished, report, error."""
+        with self._lock:
+            return {
+                'running': self._running,
+                'started': self.started,
+                'finished': self.finished,
+                'report': self.report,
+                'error': self.error,
+            }
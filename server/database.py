@@ -1,16 +1,40 @@
 """
 SQLite storage для Say's Barbers API.
 Замена JSONStorage с тем же интерфейсом: read/write/update.
+
+Запись идёт через единственный поток-писатель (WriteQueue),
+чтение — через пул read-only соединений (ReadPool).
 """
 
-import sqlite3
+import base64
+import binascii
+import contextlib
+import copy
+import hashlib
 import json
+import sqlite3
 import threading
+import time
 import logging
+import zlib
 from pathlib import Path
 
+from .backup import BACKUP_KEEP, backup_database
+from .changes import (
+    CHANGES_SCHEMA, diff_state, read_changes, read_versions, rebuild_changes, record_changes,
+)
+from .connections import connect_writer, ReadPool, WriteQueue
+from .search import (
+    FTS_SCHEMA, HAS_TRIGRAM, HL_START, HL_END, MIN_TRIGRAM_SHARE,
+    build_match_query, build_trigram_query, fuzzy_text, trigrams, trigram_share,
+    render_highlight, index_products, reindex_products, remove_products,
+)
+
 logger = logging.getLogger('saysbarbers')
 
+# Генерируемые колонки (миграция 4) появились в SQLite 3.31
+MIN_SQLITE_VERSION = (3, 31, 0)
+
 SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS masters (
     id TEXT PRIMARY KEY,
@@ -81,6 +105,12 @@ CREATE TABLE IF NOT EXISTS contacts (
     value TEXT NOT NULL DEFAULT ''
 );
 
+CREATE INDEX IF NOT EXISTS idx_shop_categories_slug ON shop_categories(slug);
+"""
+
+# Аналитика живёт в отдельном файле: частые записи маяков не раздувают
+# WAL каталога и не вызывают его checkpoint
+STATS_SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS stats_counters (
     key TEXT PRIMARY KEY,
     value TEXT NOT NULL DEFAULT ''
@@ -101,41 +131,452 @@ CREATE TABLE IF NOT EXISTS stats_sessions (
     session_id TEXT NOT NULL,
     PRIMARY KEY (date, session_id)
 );
-
-CREATE INDEX IF NOT EXISTS idx_legal_slug ON legal(slug);
-CREATE INDEX IF NOT EXISTS idx_legal_active ON legal(active);
-CREATE INDEX IF NOT EXISTS idx_products_category ON products(category_id);
-CREATE INDEX IF NOT EXISTS idx_products_status ON products(status);
-CREATE INDEX IF NOT EXISTS idx_shop_categories_slug ON shop_categories(slug);
 """
 
+STATS_TABLES = ('stats_counters', 'stats_daily', 'stats_sections', 'stats_sessions')
+
+
+
+# Тексты длиннее порога хранятся сжатыми (BLOB), короче — как есть (TEXT)
+COMPRESS_THRESHOLD = 1024
+
+# Таблицы, где content лежит в отдельной колонке, а не в JSON data
+CONTENT_TABLES = ('articles', 'legal')
+
+
+def pack_text(text):
+    """Текст для колонки content: zlib-BLOB, если это заметно сокращает размер."""
+    if text is None:
+        return None
+    raw = text.encode('utf-8')
+    if len(raw) >= COMPRESS_THRESHOLD:
+        packed = zlib.compress(raw, 6)
+        if len(packed) < len(raw) * 0.9:
+            return packed
+    return text
+
+
+def unpack_text(value):
+    """Значение колонки content → текст."""
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode('utf-8')
+    return value
+
+
+def content_hash(text):
+    """Хеш JSON элемента для колонки content_hash."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def item_hash(item):
+    """Хеш элемента списка без поля order (его меняет reorder)."""
+    if 'order' in item:
+        item = {key: value for key, value in item.items() if key != 'order'}
+    return content_hash(json.dumps(item, ensure_ascii=False))
+
+
+def split_content(item):
+    """(JSON метаданных без content, упакованный content)."""
+    meta = {k: v for k, v in item.items() if k != 'content'}
+    return json.dumps(meta, ensure_ascii=False), pack_text(item.get('content'))
+
+
+def load_item(row):
+    """
+    Элемент списка из строки с колонками data и sort_order. Поле order
+    берётся из sort_order: reorder меняет только колонку, JSON не трогает.
+    """
+    item = json.loads(row['data'])
+    if 'order' in item:
+        item['order'] = row['sort_order']
+    return item
+
+
+def _move_content_out_of_data(conn):
+    """Перенос content из JSON data в отдельную колонку."""
+    for table in CONTENT_TABLES:
+        conn.execute('ALTER TABLE %s ADD COLUMN content BLOB' % table)
+        rows = conn.execute('SELECT id, data FROM %s' % table).fetchall()
+        updates = []
+        for r in rows:
+            data, content = split_content(json.loads(r[1]))
+            updates.append((data, content, r[0]))
+        conn.executemany('UPDATE %s SET data = ?, content = ? WHERE id = ?' % table, updates)
+
+
+# Порядок колонок articles/legal: content (тело, обычно в страницах
+# переполнения) — последняя. Колонки до неё читаются без прохода по цепочке
+# переполнения, колонки после — только через неё
+CONTENT_LAST_COLUMNS = {
+    'articles': ('id TEXT PRIMARY KEY', 'sort_order INTEGER DEFAULT 0',
+                 'active INTEGER DEFAULT 1', 'content_hash TEXT',
+                 'data TEXT NOT NULL', 'content BLOB'),
+    'legal': ('id TEXT PRIMARY KEY', "slug TEXT DEFAULT ''", 'active INTEGER DEFAULT 1',
+              'sort_order INTEGER DEFAULT 0', 'content_hash TEXT',
+              'data TEXT NOT NULL', 'content BLOB'),
+}
+
+
+def _move_content_last(conn):
+    """
+    Пересоздание articles и legal с content последней колонкой: ADD COLUMN
+    поставил active и content_hash после тела. rowid и индексы сохраняются.
+    """
+    for table, columns in CONTENT_LAST_COLUMNS.items():
+        existing = {r[1] for r in conn.execute('PRAGMA table_info(%s)' % table)}
+        names = ', '.join(['rowid'] + [column.split()[0] for column in columns
+                                       if column.split()[0] in existing])
+        indexes = [r[0] for r in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? "
+            "AND sql IS NOT NULL", (table,)
+        )]
+        conn.execute('CREATE TABLE %s_new (%s)' % (table, ', '.join(columns)))
+        conn.execute('INSERT INTO %s_new (%s) SELECT %s FROM %s' % (table, names, names, table))
+        conn.execute('DROP TABLE %s' % table)
+        conn.execute('ALTER TABLE %s_new RENAME TO %s' % (table, table))
+        for sql in indexes:
+            conn.execute(sql)
+
+
+def _backfill_content_hashes(conn):
+    """
+    Хеши строк, сохранённых до колонки content_hash. Элемент хешируется
+    в том виде, в каком его отдаёт чтение: неизменённый элемент при
+    следующем сохранении совпадёт по хешу и не будет проверяться заново.
+    """
+    for table in HASHED_TABLES:
+        content = ', content' if table in CONTENT_TABLES else ''
+        rows = conn.execute(
+            'SELECT id, data, sort_order%s FROM %s WHERE content_hash IS NULL' % (content, table)
+        ).fetchall()
+        updates = []
+        for r in rows:
+            item = load_item(r)
+            if content and r['content'] is not None:
+                item['content'] = unpack_text(r['content'])
+            updates.append((item_hash(item), r['id']))
+        conn.executemany('UPDATE %s SET content_hash = ? WHERE id = ?' % table, updates)
+
+
+def _backfill_product_search(conn):
+    """Индексация уже сохранённых товаров при создании FTS-таблиц."""
+    rows = conn.execute('SELECT data FROM products').fetchall()
+    index_products(conn, [json.loads(r['data']) for r in rows])
+
+
+def _reindex_product_search(conn):
+    """Перестройка поискового индекса вместе с таблицей rowid товаров."""
+    rows = conn.execute('SELECT data FROM products').fetchall()
+    reindex_products(conn, [json.loads(r['data']) for r in rows])
+
+
+# Таблицы элементов списков с хешем содержимого (content_hash)
+HASHED_TABLES = ('masters', 'service_categories', 'podology_categories', 'articles',
+                 'products', 'shop_categories', 'faq', 'legal', 'social_links')
+
+
+# Версионные миграции: (версия, описание, шаги). Шаг — одна SQL-инструкция
+# или функция fn(conn). Каждая миграция применяется в своей транзакции,
+# номер последней применённой хранится в PRAGMA user_version.
+MIGRATIONS = [
+    (1, 'composite indexes for filtered product and legal lookups', [
+        'CREATE INDEX IF NOT EXISTS idx_products_status_order '
+        'ON products(status, sort_order)',
+        'CREATE INDEX IF NOT EXISTS idx_products_category_status_order '
+        'ON products(category_id, status, sort_order)',
+        'CREATE INDEX IF NOT EXISTS idx_legal_slug_active ON legal(slug, active)',
+        # Покрываются составными индексами выше
+        'DROP INDEX IF EXISTS idx_products_status',
+        'DROP INDEX IF EXISTS idx_products_category',
+        'DROP INDEX IF EXISTS idx_legal_slug',
+        'DROP INDEX IF EXISTS idx_legal_active',
+    ]),
+    (2, 'sort_order indexes for ordered list reads', [
+        'CREATE INDEX IF NOT EXISTS idx_%s_order ON %s(sort_order)' % (table, table)
+        for table in ('masters', 'service_categories', 'podology_categories', 'articles',
+                      'products', 'shop_categories', 'faq', 'legal', 'social_links')
+    ]),
+    (3, 'full-text search over product name and description',
+     FTS_SCHEMA + [_backfill_product_search]),
+    (4, 'generated price/created_at columns for sorted product pages', [
+        # VIRTUAL: вычисляются из data при чтении, хранятся только в индексах
+        "ALTER TABLE products ADD COLUMN price REAL GENERATED ALWAYS AS "
+        "(COALESCE(json_extract(data, '$.price'), 0)) VIRTUAL",
+        "ALTER TABLE products ADD COLUMN created_at TEXT GENERATED ALWAYS AS "
+        "(COALESCE(json_extract(data, '$.createdAt'), '')) VIRTUAL",
+        'CREATE INDEX IF NOT EXISTS idx_products_status_price ON products(status, price)',
+        'CREATE INDEX IF NOT EXISTS idx_products_status_created ON products(status, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_products_category_status_price '
+        'ON products(category_id, status, price)',
+        'CREATE INDEX IF NOT EXISTS idx_products_category_status_created '
+        'ON products(category_id, status, created_at)',
+    ]),
+    (5, 'covering index for product facets', [
+        # Счётчики и диапазоны цен по категориям читаются одним проходом
+        # по индексу; он же обслуживает страницы категории по цене
+        'CREATE INDEX IF NOT EXISTS idx_products_status_category_price '
+        'ON products(status, category_id, price)',
+        'DROP INDEX IF EXISTS idx_products_category_status_price',
+    ]),
+    (6, 'article and legal bodies in a separate, optionally compressed column',
+     [_move_content_out_of_data]),
+    (7, 'indexed visibility flags for public reads', [
+        'ALTER TABLE %s ADD COLUMN active INTEGER DEFAULT 1' % table
+        for table in ('masters', 'articles', 'shop_categories', 'social_links')
+    ] + [
+        # json_extract возвращает 0 для false; отсутствие флага — видимый элемент
+        "UPDATE %s SET active = (COALESCE(json_extract(data, '$.active'), 1) != 0)" % table
+        for table in ('masters', 'articles', 'shop_categories')
+    ] + [
+        "UPDATE social_links SET active = (COALESCE(json_extract(data, '$.active'), 0) != 0)",
+    ] + [
+        'CREATE INDEX IF NOT EXISTS idx_%s_active_order ON %s(active, sort_order)' % (table, table)
+        for table in ('masters', 'articles', 'shop_categories', 'social_links', 'legal')
+    ]),
+    (8, 'change log for delta sync of the admin panel', CHANGES_SCHEMA),
+    (9, 'product search rowids looked up by product id',
+     FTS_SCHEMA + [_reindex_product_search]),
+    # Хеши уже сохранённых строк заполняет миграция 13
+    (10, 'content hashes for skipping validation of unchanged items', [
+        'ALTER TABLE %s ADD COLUMN content_hash TEXT' % table for table in HASHED_TABLES
+    ]),
+    (11, 'change log keeps keys and positions, item data is read from tables',
+     [rebuild_changes]),
+    (12, 'article and legal bodies moved back to the last column', [_move_content_last]),
+    (13, 'content hashes for rows saved before the hash column', [_backfill_content_hashes]),
+]
+
+STATS_MIGRATIONS = []
+
+# Сортировки страниц товаров: имя → (колонка, направление)
+PRODUCT_SORTS = {
+    'manual': ('sort_order', 'ASC'),
+    'price_asc': ('price', 'ASC'),
+    'price_desc': ('price', 'DESC'),
+    'newest': ('created_at', 'DESC'),
+}
+
+
+def encode_cursor(sort, value, rowid):
+    """Курсор страницы: позиция последнего товара в выбранной сортировке."""
+    raw = json.dumps([sort, value, rowid], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """Разбор курсора. ValueError, если он повреждён или от другой сортировки."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, value, rowid = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if cursor_sort != sort or not isinstance(rowid, int) \
+            or isinstance(value, (list, dict, bool)) or value is None:
+        raise ValueError('Invalid cursor')
+    return value, rowid
+
+
+def apply_migrations(conn, migrations):
+    """
+    Применение ещё не применённых миграций.
+    conn должен быть в autocommit-режиме (isolation_level=None).
+    Возвращает итоговую версию схемы.
+    """
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for target, description, steps in migrations:
+        if target <= version:
+            continue
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute('PRAGMA user_version = %d' % target)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            logger.exception("Migration %d (%s) failed", target, description)
+            raise
+        logger.info("Applied migration %d: %s", target, description)
+        version = target
+    return version
+
+
+class ResourceLock:
+    """Блокировка ресурса с учётом времени ожидания (метрики конкуренции)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def acquire(self, blocking=True, timeout=-1):
+        if self._lock.acquire(blocking=False):
+            waited = 0.0
+        else:
+            if not blocking:
+                return False
+            start = time.monotonic()
+            if not self._lock.acquire(timeout=timeout):
+                return False
+            waited = time.monotonic() - start
+        with self._stats_lock:
+            self.acquisitions += 1
+            if waited:
+                self.contended += 1
+                self.wait_time_total += waited
+                self.wait_time_max = max(self.wait_time_max, waited)
+        return True
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def metrics(self):
+        with self._stats_lock:
+            return {
+                'acquisitions': self.acquisitions,
+                'contended': self.contended,
+                'wait_time_total': round(self.wait_time_total, 6),
+                'wait_time_max': round(self.wait_time_max, 6),
+            }
+
 
 class Database:
     """SQLite storage с интерфейсом, совместимым с JSONStorage."""
 
-    def __init__(self, db_path='data/saysbarbers.db'):
+    # Ресурсы, хранящиеся в БД аналитики
+    STATS_RESOURCES = frozenset({'stats'})
+    # Ресурсы с флагом видимости (active/status): публичное чтение фильтрует их в SQL
+    PUBLIC_RESOURCES = frozenset({
+        'masters', 'articles', 'products', 'shop-categories', 'legal', 'social',
+    })
+
+    def __init__(self, db_path='data/saysbarbers.db', read_pool_size=8, stats_db_path=None):
+        if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+            raise RuntimeError('SQLite %s is too old: %s or newer is required' % (
+                sqlite3.sqlite_version, '.'.join(map(str, MIN_SQLITE_VERSION))))
         self.db_path = str(db_path)
-        self._write_lock = threading.Lock()
-        self._local = threading.local()
+        if stats_db_path is None:
+            path = Path(self.db_path)
+            stats_db_path = path.with_name(path.stem + '-stats' + path.suffix)
+        self.stats_db_path = str(stats_db_path)
+        # Отдельная блокировка на каждый ресурс: запись статистики
+        # не ждёт сохранения каталога и наоборот
+        self._locks = {resource: ResourceLock() for resource in self._WRITERS}
+        self._locks_guard = threading.Lock()
 
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
-        self._init_schema()
-
-    def _get_connection(self):
-        """Thread-local соединение с БД."""
-        if not hasattr(self._local, 'conn') or self._local.conn is None:
-            conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            conn.execute('PRAGMA journal_mode=WAL')
-            conn.execute('PRAGMA foreign_keys=ON')
-            conn.row_factory = sqlite3.Row
-            self._local.conn = conn
-        return self._local.conn
-
-    def _init_schema(self):
-        """Создание таблиц при первом подключении."""
-        conn = self._get_connection()
+        writer_conn = connect_writer(self.db_path)
+        self._init_schema(writer_conn)
+        # synchronous=NORMAL в WAL: при сбое питания могут потеряться
+        # последние маяки, но файл не повреждается
+        stats_conn = connect_writer(self.stats_db_path, synchronous='NORMAL')
+        self._init_stats_schema(stats_conn)
+        self._migrate_stats(writer_conn, stats_conn)
+
+        self._writer = WriteQueue(writer_conn)
+        self._reads = ReadPool(self.db_path, max_size=read_pool_size)
+        self._stats_writer = WriteQueue(stats_conn, name='db-stats-writer')
+        self._stats_reads = ReadPool(self.stats_db_path, max_size=max(2, read_pool_size // 2))
+
+    def _init_schema(self, conn):
+        """Создание таблиц при первом подключении и применение миграций."""
         conn.executescript(SCHEMA_SQL)
-        conn.commit()
+        apply_migrations(conn, MIGRATIONS)
+
+    def _init_stats_schema(self, conn):
+        """Создание таблиц аналитики в отдельной БД."""
+        conn.executescript(STATS_SCHEMA_SQL)
+        apply_migrations(conn, STATS_MIGRATIONS)
+
+    def _migrate_stats(self, conn, stats_conn):
+        """Перенос stats_* таблиц из основной БД в БД аналитики (однократно)."""
+        legacy = [
+            r[0] for r in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN (%s)"
+                % ','.join('?' * len(STATS_TABLES)), STATS_TABLES
+            )
+        ]
+        if not legacy:
+            return
+
+        logger.info("Migrating %s to %s", ', '.join(legacy), self.stats_db_path)
+        stats_conn.execute('ATTACH DATABASE ? AS catalog', (self.db_path,))
+        try:
+            stats_conn.execute('BEGIN IMMEDIATE')
+            for table in legacy:
+                # OR IGNORE: повторный запуск после сбоя не дублирует строки
+                stats_conn.execute(
+                    'INSERT OR IGNORE INTO main.%s SELECT * FROM catalog.%s' % (table, table)
+                )
+            stats_conn.execute('COMMIT')
+            stats_conn.execute('BEGIN IMMEDIATE')
+            for table in legacy:
+                stats_conn.execute('DROP TABLE catalog.%s' % table)
+            stats_conn.execute('COMMIT')
+        except Exception:
+            if stats_conn.in_transaction:
+                stats_conn.execute('ROLLBACK')
+            raise
+        finally:
+            stats_conn.execute('DETACH DATABASE catalog')
+
+    def _writer_for(self, resource):
+        return self._stats_writer if resource in self.STATS_RESOURCES else self._writer
+
+    def _reads_for(self, resource):
+        return self._stats_reads if resource in self.STATS_RESOURCES else self._reads
+
+    def close(self):
+        """Остановка потоков-писателей и закрытие соединений."""
+        self._writer.close()
+        self._reads.close()
+        self._stats_writer.close()
+        self._stats_reads.close()
+
+    @property
+    def backup_dir(self):
+        """Каталог резервных копий: backups рядом с файлом БД."""
+        return Path(self.db_path).parent / 'backups'
+
+    def backup(self, keep=BACKUP_KEEP, **options):
+        """
+        Онлайн-копии основной БД и БД аналитики (см. backup.backup_database).
+        Писатели во время копирования не блокируются.
+        """
+        return {
+            'catalog': backup_database(self.db_path, self.backup_dir, keep=keep, **options),
+            'stats': backup_database(self.stats_db_path, self.backup_dir, keep=keep, **options),
+        }
+
+    def get_metrics(self):
+        """Метрики соединений обеих БД и блокировок ресурсов."""
+        return {
+            'catalog': {
+                'read_pool': self._reads.metrics(),
+                'writer': self._writer.metrics(),
+            },
+            'stats': {
+                'read_pool': self._stats_reads.metrics(),
+                'writer': self._stats_writer.metrics(),
+            },
+            'locks': {name: lock.metrics() for name, lock in list(self._locks.items())},
+        }
 
     @staticmethod
     def _normalize_resource(filename):
@@ -146,47 +587,179 @@ class Database:
         return name
 
     def _get_lock(self, filename):
-        """Совместимость с JSONStorage API."""
-        return self._write_lock
+        """Блокировка ресурса (совместимость с JSONStorage API)."""
+        resource = self._normalize_resource(filename)
+        lock = self._locks.get(resource)
+        if lock is None:
+            with self._locks_guard:
+                lock = self._locks.setdefault(resource, ResourceLock())
+        return lock
+
+    def read(self, filename, default=None, public=False):
+        """
+        Чтение данных в JSON-совместимом формате.
+        public=True — только элементы, видимые на сайте (фильтр в SQL).
+        """
+        resource = self._normalize_resource(filename)
+        return self._read_with(self._READERS.get(resource), resource, default, public)
 
-    def read(self, filename, default=None):
-        """Чтение данных в JSON-совместимом формате."""
+    def read_summary(self, filename, default=None, public=False):
+        """
+        Чтение списка без тяжёлых полей (content) для витрины.
+        Для ресурсов без краткого представления — обычное чтение.
+        """
+        resource = self._normalize_resource(filename)
+        reader = self._SUMMARY_READERS.get(resource)
+        if reader is None:
+            return self.read(filename, default, public)
+        return self._read_with(reader, resource, default, public)
+
+    def _read_with(self, reader, resource, default, public):
         if default is None:
             default = {}
-        resource = self._normalize_resource(filename)
-        reader = self._READERS.get(resource)
-        if reader:
-            try:
-                result = reader(self)
-                return result if result else default
-            except Exception:
-                logger.exception("Database read error for %s", resource)
-                return default
-        return default
+        if not reader:
+            return default
+        try:
+            with self._reads_for(resource).connection() as conn:
+                if public and resource in self.PUBLIC_RESOURCES:
+                    result = reader(self, conn, public=True)
+                else:
+                    result = reader(self, conn)
+            return result if result else default
+        except Exception:
+            logger.exception("Database read error for %s", resource)
+            return default
 
     def write(self, filename, data):
         """Запись данных из JSON-совместимого формата."""
-        with self._write_lock:
+        with self._get_lock(filename):
             return self._write_impl(filename, data)
 
     def _write_impl(self, filename, data):
-        """Внутренняя запись без блокировки."""
+        """Внутренняя запись без блокировки: операция уходит потоку-писателю."""
         resource = self._normalize_resource(filename)
         writer = self._WRITERS.get(resource)
         if writer:
+            if resource in self.STATS_RESOURCES:
+                operation = lambda conn: writer(self, conn, data)
+            else:
+                operation = lambda conn: self._write_logged(conn, resource, writer, data)
             try:
-                writer(self, data)
+                self._writer_for(resource).execute(operation)
                 return True
             except Exception:
                 logger.exception("Database write error for %s", resource)
                 raise
         return False
 
+    def _write_logged(self, conn, resource, writer, data):
+        """
+        Запись с журналом изменений: ключи, позиции и хеши строк до и после
+        в той же транзакции, без чтения JSON. Возвращает число записанных изменений.
+        """
+        before = self._change_state(conn, resource)
+        writer(self, conn, data)
+        after = self._change_state(conn, resource)
+        return record_changes(conn, resource, diff_state(before, after))
+
+    def write_many(self, writes):
+        """
+        Атомарная запись нескольких ресурсов: [(filename, data), ...].
+        Все записи — одна операция потока-писателя (один SAVEPOINT и один
+        commit): ошибка любой откатывает все. Блокировки ресурсов берутся
+        в порядке имён. Возвращает ресурсы, в которых что-то изменилось.
+        """
+        resources = [self._normalize_resource(filename) for filename, _ in writes]
+        for resource in resources:
+            if resource not in self._ROWS:
+                raise ValueError('Resource %s does not support batch write' % resource)
+        if len(set(resources)) != len(resources):
+            raise ValueError('Duplicate resource in batch')
+
+        def operation(conn):
+            return [
+                resource
+                for resource, (_, data) in zip(resources, writes)
+                if self._write_logged(conn, resource, self._WRITERS[resource], data)
+            ]
+
+        with contextlib.ExitStack() as stack:
+            for resource in sorted(resources):
+                stack.enter_context(self._get_lock(resource))
+            return self._writer.execute(operation)
+
+    def patch(self, filename, patch_func):
+        """
+        Частичное обновление ресурса: patch_func(document) → новый документ.
+        Чтение, patch_func и запись выполняются в одной транзакции потока-писателя;
+        сохраняются только изменившиеся строки. Исключение из patch_func
+        откатывает операцию и пробрасывается вызывающему.
+        """
+        resource = self._normalize_resource(filename)
+        if resource not in self._ROWS:
+            raise ValueError('Resource %s does not support patch' % resource)
+        with self._get_lock(filename):
+            return self._writer.execute(lambda conn: self._patch_impl(conn, resource, patch_func))
+
+    def _patch_impl(self, conn, resource, patch_func):
+        rows = self._ROWS[resource]
+        state = self._change_state(conn, resource)
+        before = self._READERS[resource](self, conn)
+        after = patch_func(copy.deepcopy(before))
+        changed = self._update_rows(conn, rows(self, before), rows(self, after))
+        if resource == 'products' and changed['products']:
+            ids = set(changed['products'])
+            remove_products(conn, ids)
+            index_products(conn, [p for p in after.get('products', []) if p.get('id') in ids])
+        record_changes(conn, resource, diff_state(state, self._change_state(conn, resource)))
+        return after
+
+    def reorder(self, filename, ids):
+        """
+        Новый порядок элементов списка по id: меняется только sort_order,
+        data, хеш содержимого и поисковый индекс не трогаются (поле order
+        при чтении берётся из sort_order). Элементы, которых нет в ids,
+        идут следом в прежнем порядке. Возвращает число обновлённых строк.
+        """
+        resource = self._normalize_resource(filename)
+        if resource not in self._LISTS:
+            raise ValueError('Resource %s does not support reorder' % resource)
+        table = self._LISTS[resource][0]
+        ids = [str(item_id) for item_id in ids]
+        if len(set(ids)) != len(ids):
+            raise ValueError('Duplicate id in order')
+        with self._get_lock(filename):
+            return self._writer.execute(
+                lambda conn: self._reorder_impl(conn, resource, table, ids))
+
+    def _reorder_impl(self, conn, resource, table, ids):
+        current = conn.execute(
+            'SELECT id, sort_order FROM %s ORDER BY sort_order, rowid' % table
+        ).fetchall()
+        positions = {row[0]: row[1] for row in current}
+        for item_id in ids:
+            if item_id not in positions:
+                raise ValueError('Unknown id: %s' % item_id)
+        listed = set(ids)
+        order = ids + [row[0] for row in current if row[0] not in listed]
+        updates = [
+            (i, item_id) for i, item_id in enumerate(order)
+            if positions[item_id] != i
+        ]
+        if not updates:
+            return 0
+        conn.executemany('UPDATE %s SET sort_order = ? WHERE id = ?' % table, updates)
+        field = self._LISTS[resource][1]
+        record_changes(conn, resource, [
+            (field, item_id, 'move', position) for position, item_id in updates
+        ])
+        return len(updates)
+
     def update(self, filename, updater_func, default=None):
         """Атомарное чтение-модификация-запись."""
         if default is None:
             default = {}
-        with self._write_lock:
+        with self._get_lock(filename):
             data = self.read(filename, default)
             updated = updater_func(data)
             self._write_impl(filename, updated)
@@ -196,20 +769,19 @@ class Database:
     # Readers
     # =========================================================================
 
-    def _read_masters(self):
-        conn = self._get_connection()
+    def _read_masters(self, conn, public=False):
         rows = conn.execute(
-            'SELECT data FROM masters ORDER BY sort_order, rowid'
+            'SELECT data, sort_order FROM masters' + self._visible(public, 'active = 1') +
+            ' ORDER BY sort_order, rowid'
         ).fetchall()
-        return {'masters': [json.loads(r['data']) for r in rows]}
+        return {'masters': [load_item(r) for r in rows]}
 
-    def _read_services(self):
-        conn = self._get_connection()
+    def _read_services(self, conn):
 
         cat_rows = conn.execute(
-            'SELECT data FROM service_categories ORDER BY sort_order, rowid'
+            'SELECT data, sort_order FROM service_categories ORDER BY sort_order, rowid'
         ).fetchall()
-        categories = [json.loads(r['data']) for r in cat_rows]
+        categories = [load_item(r) for r in cat_rows]
 
         meta_rows = conn.execute(
             'SELECT key, value FROM podology_meta'
@@ -217,9 +789,9 @@ class Database:
         podology = {r['key']: r['value'] for r in meta_rows}
 
         pod_rows = conn.execute(
-            'SELECT data FROM podology_categories ORDER BY sort_order, rowid'
+            'SELECT data, sort_order FROM podology_categories ORDER BY sort_order, rowid'
         ).fetchall()
-        podology['categories'] = [json.loads(r['data']) for r in pod_rows]
+        podology['categories'] = [load_item(r) for r in pod_rows]
 
         result = {'categories': categories}
         has_podology = len(meta_rows) > 0 or len(pod_rows) > 0
@@ -228,48 +800,75 @@ class Database:
 
         return result
 
-    def _read_articles(self):
-        conn = self._get_connection()
+    @staticmethod
+    def _visible(public, condition):
+        """WHERE для публичного чтения: только видимые на сайте элементы."""
+        return ' WHERE ' + condition if public else ''
+
+    @staticmethod
+    def _with_content(row):
+        """Элемент из строки с колонками data, sort_order и content."""
+        item = load_item(row)
+        if row['content'] is not None:
+            item['content'] = unpack_text(row['content'])
+        return item
+
+    def _read_articles(self, conn, public=False):
+        rows = conn.execute(
+            'SELECT data, sort_order, content FROM articles' + self._visible(public, 'active = 1') +
+            ' ORDER BY sort_order, rowid'
+        ).fetchall()
+        return {'articles': [self._with_content(r) for r in rows]}
+
+    def _read_articles_summary(self, conn, public=False):
+        # content — последняя колонка: страницы переполнения с телом не читаются
+        rows = conn.execute(
+            'SELECT data, sort_order FROM articles' + self._visible(public, 'active = 1') +
+            ' ORDER BY sort_order, rowid'
+        ).fetchall()
+        return {'articles': [load_item(r) for r in rows]}
+
+    def _read_products(self, conn, public=False):
         rows = conn.execute(
-            'SELECT data FROM articles ORDER BY sort_order, rowid'
+            'SELECT data, sort_order FROM products' + self._visible(public, "status = 'active'") +
+            ' ORDER BY sort_order, rowid'
         ).fetchall()
-        return {'articles': [json.loads(r['data']) for r in rows]}
+        return {'products': [load_item(r) for r in rows]}
 
-    def _read_products(self):
-        conn = self._get_connection()
+    def _read_shop_categories(self, conn, public=False):
         rows = conn.execute(
-            'SELECT data FROM products ORDER BY sort_order, rowid'
+            'SELECT data, sort_order FROM shop_categories' + self._visible(public, 'active = 1') +
+            ' ORDER BY sort_order, rowid'
         ).fetchall()
-        return {'products': [json.loads(r['data']) for r in rows]}
+        return {'categories': [load_item(r) for r in rows]}
 
-    def _read_shop_categories(self):
-        conn = self._get_connection()
+    def _read_faq(self, conn):
         rows = conn.execute(
-            'SELECT data FROM shop_categories ORDER BY sort_order, rowid'
+            'SELECT data, sort_order FROM faq ORDER BY sort_order, rowid'
         ).fetchall()
-        return {'categories': [json.loads(r['data']) for r in rows]}
+        return {'faq': [load_item(r) for r in rows]}
 
-    def _read_faq(self):
-        conn = self._get_connection()
+    def _read_legal(self, conn, public=False):
         rows = conn.execute(
-            'SELECT data FROM faq ORDER BY sort_order, rowid'
+            'SELECT data, sort_order, content FROM legal' + self._visible(public, 'active = 1') +
+            ' ORDER BY sort_order, rowid'
         ).fetchall()
-        return {'faq': [json.loads(r['data']) for r in rows]}
+        return {'documents': [self._with_content(r) for r in rows]}
 
-    def _read_legal(self):
-        conn = self._get_connection()
+    def _read_legal_summary(self, conn, public=False):
         rows = conn.execute(
-            'SELECT data FROM legal ORDER BY sort_order, rowid'
+            'SELECT data, sort_order FROM legal' + self._visible(public, 'active = 1') +
+            ' ORDER BY sort_order, rowid'
         ).fetchall()
-        return {'documents': [json.loads(r['data']) for r in rows]}
+        return {'documents': [load_item(r) for r in rows]}
 
-    def _read_social(self):
-        conn = self._get_connection()
+    def _read_social(self, conn, public=False):
 
         rows = conn.execute(
-            'SELECT data FROM social_links ORDER BY sort_order, rowid'
+            'SELECT data, sort_order FROM social_links' + self._visible(public, 'active = 1') +
+            ' ORDER BY sort_order, rowid'
         ).fetchall()
-        social = [json.loads(r['data']) for r in rows]
+        social = [load_item(r) for r in rows]
 
         result = {'social': social}
 
@@ -281,8 +880,7 @@ class Database:
 
         return result
 
-    def _read_stats(self):
-        conn = self._get_connection()
+    def _read_stats(self, conn):
         result = {'total_views': 0, 'unique_visitors': 0}
 
         counter_rows = conn.execute(
@@ -325,136 +923,168 @@ class Database:
     # Writers
     # =========================================================================
 
-    def _write_masters(self, data):
-        conn = self._get_connection()
-        masters = data.get('masters', [])
-        conn.execute('DELETE FROM masters')
-        for i, m in enumerate(masters):
-            conn.execute(
-                'INSERT INTO masters (id, sort_order, data) VALUES (?, ?, ?)',
-                (m.get('id', ''), i, json.dumps(m, ensure_ascii=False))
-            )
-        conn.commit()
+    # Каждый ресурс каталога описан строками своих таблиц: полная запись
+    # заменяет таблицы целиком, частичная (patch) — только изменившиеся строки.
+    # Строка — кортеж значений columns, первый столбец — ключ таблицы.
 
-    def _write_services(self, data):
-        conn = self._get_connection()
+    @staticmethod
+    def _dumps(item):
+        return json.dumps(item, ensure_ascii=False)
+
+    def _hashed(self, item):
+        """(data, content_hash) строки элемента."""
+        data = self._dumps(item)
+        if 'order' in item:
+            return data, self.content_hash(item)
+        return data, content_hash(data)
+
+    def _rows_masters(self, data, start=0):
+        return [('masters', ('id', 'active', 'sort_order', 'data', 'content_hash'), [
+            (m.get('id', ''), 1 if m.get('active', True) else 0, i, *self._hashed(m))
+            for i, m in enumerate(data.get('masters', []), start)
+        ])]
+
+    def _rows_services(self, data):
+        podology = data.get('podology') or {}
+        return [
+            ('service_categories', ('id', 'sort_order', 'data', 'content_hash'), [
+                (cat.get('id', str(i)), i, *self._hashed(cat))
+                for i, cat in enumerate(data.get('categories', []))
+            ]),
+            ('podology_meta', ('key', 'value'), [
+                (key, str(podology[key])) for key in ('title', 'description') if key in podology
+            ]),
+            ('podology_categories', ('id', 'sort_order', 'data', 'content_hash'), [
+                (cat.get('id', str(i)), i, *self._hashed(cat))
+                for i, cat in enumerate(podology.get('categories', []))
+            ]),
+        ]
+
+    def _rows_articles(self, data, start=0):
+        rows = []
+        for i, a in enumerate(data.get('articles', []), start):
+            meta, content = split_content(a)
+            rows.append((a.get('id', ''), 1 if a.get('active', True) else 0, i, meta, content,
+                         self._hashed(a)[1]))
+        return [('articles', ('id', 'active', 'sort_order', 'data', 'content', 'content_hash'),
+                 rows)]
+
+    def _rows_products(self, data, start=0):
+        return [('products', ('id', 'category_id', 'status', 'sort_order', 'data', 'content_hash'), [
+            (p.get('id', ''), p.get('categoryId', ''), p.get('status', 'active'),
+             p.get('order', i), *self._hashed(p))
+            for i, p in enumerate(data.get('products', []), start)
+        ])]
+
+    def _rows_shop_categories(self, data, start=0):
+        return [('shop_categories',
+                 ('id', 'slug', 'active', 'sort_order', 'data', 'content_hash'), [
+                     (c.get('id', ''), c.get('slug', ''), 1 if c.get('active', True) else 0,
+                      c.get('order', i), *self._hashed(c))
+                     for i, c in enumerate(data.get('categories', []), start)
+                 ])]
+
+    def _rows_faq(self, data, start=0):
+        return [('faq', ('id', 'sort_order', 'data', 'content_hash'), [
+            (item.get('id', ''), i, *self._hashed(item))
+            for i, item in enumerate(data.get('faq', data.get('items', [])), start)
+        ])]
+
+    def _rows_legal(self, data, start=0):
+        rows = []
+        for i, doc in enumerate(data.get('documents', []), start):
+            meta, content = split_content(doc)
+            rows.append((doc.get('id', ''), doc.get('slug', ''),
+                         1 if doc.get('active', True) else 0, i, meta, content,
+                         self._hashed(doc)[1]))
+        return [('legal',
+                 ('id', 'slug', 'active', 'sort_order', 'data', 'content', 'content_hash'),
+                 rows)]
+
+    def _rows_social(self, data, start=0):
+        return [
+            # Ссылка без явного active на сайте не показывается
+            ('social_links', ('id', 'active', 'sort_order', 'data', 'content_hash'), [
+                (link.get('id', ''), 1 if link.get('active') else 0, i, *self._hashed(link))
+                for i, link in enumerate(data.get('social', []), start)
+            ]),
+            ('contacts', ('key', 'value'), [
+                (key, str(data[key])) for key in ('phone', 'email', 'address') if key in data
+            ]),
+        ]
 
-        categories = data.get('categories', [])
-        conn.execute('DELETE FROM service_categories')
-        for i, cat in enumerate(categories):
-            conn.execute(
-                'INSERT INTO service_categories (id, sort_order, data) VALUES (?, ?, ?)',
-                (cat.get('id', str(i)), i, json.dumps(cat, ensure_ascii=False))
+    @staticmethod
+    def _replace_rows(conn, tables):
+        """Полная замена содержимого таблиц."""
+        for table, columns, rows in tables:
+            conn.execute('DELETE FROM %s' % table)
+            conn.executemany(
+                'INSERT INTO %s (%s) VALUES (%s)'
+                % (table, ', '.join(columns), ', '.join('?' * len(columns))),
+                rows
             )
 
-        podology = data.get('podology', {})
-        conn.execute('DELETE FROM podology_meta')
-        conn.execute('DELETE FROM podology_categories')
-
-        if podology:
-            for key in ('title', 'description'):
-                if key in podology:
-                    conn.execute(
-                        'INSERT INTO podology_meta (key, value) VALUES (?, ?)',
-                        (key, str(podology[key]))
-                    )
-
-            pod_cats = podology.get('categories', [])
-            for i, cat in enumerate(pod_cats):
-                conn.execute(
-                    'INSERT INTO podology_categories (id, sort_order, data) VALUES (?, ?, ?)',
-                    (cat.get('id', str(i)), i, json.dumps(cat, ensure_ascii=False))
+    @staticmethod
+    def _update_rows(conn, before, after):
+        """
+        Запись только изменившихся строк: удаление исчезнувших ключей
+        и upsert новых/изменённых. Возвращает {table: изменённые ключи}.
+        """
+        changed = {}
+        for (table, columns, old_rows), (_, _, new_rows) in zip(before, after):
+            old = {row[0]: row for row in old_rows}
+            new = {row[0]: row for row in new_rows}
+            if len(new) != len(new_rows):
+                raise ValueError('Duplicate %s in %s' % (columns[0], table))
+            removed = [key for key in old if key not in new]
+            upserts = [row for key, row in new.items() if old.get(key) != row]
+            if removed:
+                conn.executemany(
+                    'DELETE FROM %s WHERE %s = ?' % (table, columns[0]),
+                    [(key,) for key in removed]
                 )
+            if upserts:
+                Database._upsert_rows(conn, table, columns, upserts)
+            changed[table] = removed + [row[0] for row in upserts]
+        return changed
 
-        conn.commit()
-
-    def _write_articles(self, data):
-        conn = self._get_connection()
-        articles = data.get('articles', [])
-        conn.execute('DELETE FROM articles')
-        for i, a in enumerate(articles):
-            conn.execute(
-                'INSERT INTO articles (id, sort_order, data) VALUES (?, ?, ?)',
-                (a.get('id', ''), i, json.dumps(a, ensure_ascii=False))
-            )
-        conn.commit()
+    @staticmethod
+    def _upsert_rows(conn, table, columns, rows):
+        """Вставка или обновление строк по ключу (первый столбец)."""
+        # ON CONFLICT DO UPDATE сохраняет rowid (порядок при равном sort_order)
+        conn.executemany(
+            'INSERT INTO %s (%s) VALUES (%s) ON CONFLICT(%s) DO UPDATE SET %s'
+            % (table, ', '.join(columns), ', '.join('?' * len(columns)), columns[0],
+               ', '.join('%s = excluded.%s' % (c, c) for c in columns[1:])),
+            rows
+        )
 
-    def _write_products(self, data):
-        conn = self._get_connection()
-        products = data.get('products', [])
-        conn.execute('DELETE FROM products')
-        for i, p in enumerate(products):
-            conn.execute(
-                'INSERT INTO products (id, category_id, status, sort_order, data) '
-                'VALUES (?, ?, ?, ?, ?)',
-                (p.get('id', ''), p.get('categoryId', ''),
-                 p.get('status', 'active'), p.get('order', i),
-                 json.dumps(p, ensure_ascii=False))
-            )
-        conn.commit()
+    def _write_masters(self, conn, data):
+        self._replace_rows(conn, self._rows_masters(data))
 
-    def _write_shop_categories(self, data):
-        conn = self._get_connection()
-        categories = data.get('categories', [])
-        conn.execute('DELETE FROM shop_categories')
-        for i, c in enumerate(categories):
-            conn.execute(
-                'INSERT INTO shop_categories (id, slug, sort_order, data) '
-                'VALUES (?, ?, ?, ?)',
-                (c.get('id', ''), c.get('slug', ''), c.get('order', i),
-                 json.dumps(c, ensure_ascii=False))
-            )
-        conn.commit()
-
-    def _write_faq(self, data):
-        conn = self._get_connection()
-        items = data.get('faq', data.get('items', []))
-        conn.execute('DELETE FROM faq')
-        for i, item in enumerate(items):
-            conn.execute(
-                'INSERT INTO faq (id, sort_order, data) VALUES (?, ?, ?)',
-                (item.get('id', ''), i, json.dumps(item, ensure_ascii=False))
-            )
-        conn.commit()
+    def _write_services(self, conn, data):
+        self._replace_rows(conn, self._rows_services(data))
 
-    def _write_legal(self, data):
-        conn = self._get_connection()
-        documents = data.get('documents', [])
-        conn.execute('DELETE FROM legal')
-        for i, doc in enumerate(documents):
-            conn.execute(
-                'INSERT INTO legal (id, slug, active, sort_order, data) '
-                'VALUES (?, ?, ?, ?, ?)',
-                (doc.get('id', ''), doc.get('slug', ''),
-                 1 if doc.get('active', True) else 0, i,
-                 json.dumps(doc, ensure_ascii=False))
-            )
-        conn.commit()
+    def _write_articles(self, conn, data):
+        self._replace_rows(conn, self._rows_articles(data))
 
-    def _write_social(self, data):
-        conn = self._get_connection()
+    def _write_products(self, conn, data):
+        self._replace_rows(conn, self._rows_products(data))
+        reindex_products(conn, data.get('products', []))
 
-        social = data.get('social', [])
-        conn.execute('DELETE FROM social_links')
-        for i, link in enumerate(social):
-            conn.execute(
-                'INSERT INTO social_links (id, sort_order, data) VALUES (?, ?, ?)',
-                (link.get('id', ''), i, json.dumps(link, ensure_ascii=False))
-            )
+    def _write_shop_categories(self, conn, data):
+        self._replace_rows(conn, self._rows_shop_categories(data))
 
-        conn.execute('DELETE FROM contacts')
-        for key in ('phone', 'email', 'address'):
-            if key in data:
-                conn.execute(
-                    'INSERT INTO contacts (key, value) VALUES (?, ?)',
-                    (key, str(data[key]))
-                )
+    def _write_faq(self, conn, data):
+        self._replace_rows(conn, self._rows_faq(data))
 
-        conn.commit()
+    def _write_legal(self, conn, data):
+        self._replace_rows(conn, self._rows_legal(data))
 
-    def _write_stats(self, data):
-        conn = self._get_connection()
+    def _write_social(self, conn, data):
+        self._replace_rows(conn, self._rows_social(data))
 
+    def _write_stats(self, conn, data):
         conn.execute('DELETE FROM stats_counters')
         for key in ('total_views', 'unique_visitors', 'created', 'last_visit'):
             if key in data:
@@ -485,62 +1115,448 @@ class Database:
                     (date, str(sid))
                 )
 
-        conn.commit()
-
     # =========================================================================
     # Прямые запросы (оптимизация)
     # =========================================================================
 
     def get_legal_by_slug(self, slug):
         """Получение юридического документа по slug."""
-        conn = self._get_connection()
-        row = conn.execute(
-            'SELECT data FROM legal WHERE slug = ? AND active = 1',
-            (slug,)
-        ).fetchone()
+        with self._reads.connection() as conn:
+            row = conn.execute(
+                'SELECT data, sort_order, content FROM legal WHERE slug = ? AND active = 1',
+                (slug,)
+            ).fetchone()
         if row:
-            return json.loads(row['data'])
+            return self._with_content(row)
         return None
 
-    def get_product_by_id(self, product_id):
-        """Получение товара по ID."""
-        conn = self._get_connection()
-        row = conn.execute(
-            'SELECT data FROM products WHERE id = ?',
-            (product_id,)
-        ).fetchone()
+    def get_article_by_id(self, article_id, public=False):
+        """Получение статьи по ID (с полным текстом). public=True — только активной."""
+        with self._reads.connection() as conn:
+            row = conn.execute(
+                'SELECT data, sort_order, content FROM articles WHERE id = ?' +
+                (' AND active = 1' if public else ''),
+                (article_id,)
+            ).fetchone()
         if row:
-            return json.loads(row['data'])
+            return self._with_content(row)
         return None
 
-    def get_products_filtered(self, category_slug=None, status='active'):
-        """Получение товаров с фильтрацией."""
-        conn = self._get_connection()
-        params = []
+    def get_product_by_id(self, product_id, public=False):
+        """Получение товара по ID. public=True — только активного."""
+        with self._reads.connection() as conn:
+            row = conn.execute(
+                'SELECT data, sort_order FROM products WHERE id = ?' +
+                (" AND status = 'active'" if public else ''),
+                (product_id,)
+            ).fetchone()
+        if row:
+            return load_item(row)
+        return None
 
+    @staticmethod
+    def _product_conditions(category_slug=None, status='active', price_min=None, price_max=None):
+        """
+        Условия WHERE для выборок товаров: (список условий, параметры).
+        category_slug — slug или список slug'ов.
+        """
+        conditions = []
+        params = []
         if category_slug:
-            query = (
-                'SELECT p.data FROM products p '
-                'JOIN shop_categories c ON p.category_id = c.id '
-                'WHERE c.slug = ?'
-            )
-            params.append(category_slug)
-            if status:
-                query += ' AND p.status = ?'
-                params.append(status)
-            query += ' ORDER BY p.sort_order, p.rowid'
+            if isinstance(category_slug, str):
+                # Скалярный подзапрос вместо JOIN: планировщик берёт индекс
+                # (category_id, status, sort_order) и не сортирует результат
+                conditions.append('category_id = (SELECT id FROM shop_categories WHERE slug = ?)')
+                params.append(category_slug)
+            else:
+                slugs = list(category_slug)
+                conditions.append(
+                    'category_id IN (SELECT id FROM shop_categories WHERE slug IN (%s))'
+                    % ', '.join('?' * len(slugs))
+                )
+                params.extend(slugs)
+        if status:
+            conditions.append('status = ?')
+            params.append(status)
+        if price_min is not None:
+            conditions.append('price >= ?')
+            params.append(price_min)
+        if price_max is not None:
+            conditions.append('price <= ?')
+            params.append(price_max)
+        return conditions, params
+
+    def get_products_filtered(self, category_slug=None, status='active',
+                              price_min=None, price_max=None):
+        """
+        Получение товаров с фильтрацией.
+        category_slug — slug или список slug'ов, price_min/price_max — границы цены.
+        """
+        conditions, params = self._product_conditions(category_slug, status, price_min, price_max)
+        query = 'SELECT data, sort_order FROM products'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY sort_order, rowid'
+
+        with self._reads.connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [load_item(r) for r in rows]
+
+    def get_product_facets(self, status='active'):
+        """
+        Фасеты каталога одним агрегатом по индексу (status, category_id, price):
+        {'total': N, 'categories': {slug: N}, 'price': {'min': X, 'max': Y}}.
+        """
+        with self._reads.connection() as conn:
+            rows = conn.execute(
+                'SELECT category_id, COUNT(*) AS count, MIN(price) AS min_price, '
+                'MAX(price) AS max_price FROM products WHERE status = ? '
+                'GROUP BY category_id',
+                (status,)
+            ).fetchall()
+            ids = [r['category_id'] for r in rows]
+            slugs = dict(conn.execute(
+                'SELECT id, slug FROM shop_categories WHERE id IN (%s)' % ', '.join('?' * len(ids)),
+                ids
+            ).fetchall()) if ids else {}
+
+        categories = {}
+        total = 0
+        min_price = max_price = None
+        for r in rows:
+            total += r['count']
+            slug = slugs.get(r['category_id'])
+            if slug:
+                categories[slug] = r['count']
+            min_price = r['min_price'] if min_price is None else min(min_price, r['min_price'])
+            max_price = r['max_price'] if max_price is None else max(max_price, r['max_price'])
+        return {
+            'total': total,
+            'categories': categories,
+            'price': {'min': min_price, 'max': max_price},
+        }
+
+    def get_products_page(self, category_slug=None, status='active', sort='manual',
+                          limit=50, cursor=None, price_min=None, price_max=None):
+        """
+        Страница товаров с keyset-пагинацией (без OFFSET).
+        Возвращает {'products': [...], 'nextCursor': str или None}.
+        """
+        if sort not in PRODUCT_SORTS:
+            raise ValueError('Invalid sort')
+        column, direction = PRODUCT_SORTS[sort]
+
+        conditions, params = self._product_conditions(category_slug, status, price_min, price_max)
+        if cursor:
+            value, rowid = decode_cursor(cursor, sort)
+            # Сравнение пар (значение, rowid) — диапазон по индексу
+            conditions.append('(%s, rowid) %s (?, ?)' % (column, '>' if direction == 'ASC' else '<'))
+            params.extend([value, rowid])
+
+        query = 'SELECT rowid, %s AS sort_value, data, sort_order FROM products' % column
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY {0} {1}, rowid {1} LIMIT ?'.format(column, direction)
+        params.append(limit + 1)
+
+        with self._reads.connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(sort, last['sort_value'], last['rowid'])
+        return {
+            'products': [load_item(r) for r in rows],
+            'nextCursor': next_cursor,
+        }
+
+    def search_products(self, query, category_slug=None, status='active', limit=50,
+                        price_min=None, price_max=None):
+        """
+        Полнотекстовый поиск товаров с ранжированием (bm25) и подсветкой.
+        Если по словам ничего не найдено — нечёткий поиск по триграммам.
+        Возвращает {'products': [...], 'fuzzy': bool}; у каждого товара
+        есть поле highlight с HTML-фрагментами name/description.
+        """
+        match = build_match_query(query)
+        if not match:
+            return {'products': [], 'fuzzy': False}
+
+        conditions, params = self._product_conditions(category_slug, status, price_min, price_max)
+        filters = ''.join(' AND p.' + c for c in conditions)
+
+        with self._reads.connection() as conn:
+            rows = conn.execute(
+                'SELECT p.data, p.sort_order, '
+                "snippet(products_fts, 1, ?, ?, '…', 12) AS name_hl, "
+                "snippet(products_fts, 2, ?, ?, '…', 16) AS description_hl "
+                'FROM products_fts JOIN products p ON p.id = products_fts.product_id '
+                'WHERE products_fts MATCH ?' + filters +
+                ' ORDER BY products_fts.rank LIMIT ?',
+                [HL_START, HL_END, HL_START, HL_END, match] + params + [limit]
+            ).fetchall()
+
+            if rows:
+                products = []
+                for r in rows:
+                    product = load_item(r)
+                    product['highlight'] = {
+                        'name': render_highlight(r['name_hl']),
+                        'description': render_highlight(r['description_hl']),
+                    }
+                    products.append(product)
+                return {'products': products, 'fuzzy': False}
+
+            grams = trigrams(query)
+            if not grams:
+                return {'products': [], 'fuzzy': False}
+            if HAS_TRIGRAM:
+                rows = conn.execute(
+                    'SELECT p.data, p.sort_order, products_trigram.text FROM products_trigram '
+                    'JOIN products p ON p.id = products_trigram.product_id '
+                    'WHERE products_trigram MATCH ?' + filters +
+                    ' ORDER BY products_trigram.rank LIMIT ?',
+                    [build_trigram_query(grams)] + params + [limit * 4]
+                ).fetchall()
+                candidates = [(load_item(r), r['text']) for r in rows]
+            else:
+                # Без токенизатора trigram (SQLite < 3.34): полный проход
+                # товаров под фильтрами, доля триграмм считается здесь
+                rows = conn.execute(
+                    'SELECT p.data, p.sort_order FROM products p WHERE 1' + filters +
+                    ' ORDER BY p.sort_order', params
+                ).fetchall()
+                candidates = [(product, fuzzy_text(product))
+                              for product in map(load_item, rows)]
+
+        scored = []
+        for product, text in candidates:
+            share = trigram_share(grams, text)
+            if share >= MIN_TRIGRAM_SHARE:
+                scored.append((share, product))
+        scored.sort(key=lambda item: -item[0])
+
+        products = []
+        for _, product in scored[:limit]:
+            product['highlight'] = {'name': render_highlight(product.get('name', '')),
+                                    'description': ''}
+            products.append(product)
+        return {'products': products, 'fuzzy': True}
+
+    # =========================================================================
+    # Экспорт и импорт (NDJSON)
+    # =========================================================================
+
+    # Таблицы, где тело элемента лежит в отдельной колонке content
+    _CONTENT_TABLES = frozenset({'articles', 'legal'})
+
+    def export_items(self, filename, batch_size=500):
+        """
+        Элементы списка ресурса строками NDJSON (bytes с переводом строки)
+        страницами по batch_size: в памяти не больше одной страницы.
+        """
+        resource = self._normalize_resource(filename)
+        if resource not in self._LISTS:
+            raise ValueError('Resource %s does not support export' % resource)
+        return self._export_rows(self._LISTS[resource][0], batch_size)
+
+    def _export_rows(self, table, batch_size):
+        # Страницы по ключу (sort_order, rowid): соединение из пула берётся
+        # на одну страницу и возвращается до отправки её клиенту
+        with_content = table in self._CONTENT_TABLES
+        sql = ('SELECT rowid, data, sort_order%s FROM %s %%s ORDER BY sort_order, rowid LIMIT ?'
+               % (', content' if with_content else '', table))
+        where, params = '', ()
+        while True:
+            with self._reads.connection() as conn:
+                rows = conn.execute(sql % where, params + (batch_size,)).fetchall()
+            for row in rows:
+                if with_content:
+                    line = json.dumps(self._with_content(row), ensure_ascii=False)
+                elif '"order"' in row['data']:
+                    line = json.dumps(load_item(row), ensure_ascii=False)
+                else:
+                    # data уже однострочный JSON: без разбора и сериализации
+                    line = row['data']
+                yield line.encode('utf-8') + b'\n'
+            if len(rows) < batch_size:
+                return
+            last = rows[-1]
+            if last['sort_order'] is None:
+                # NULL идут первыми и с числами не сравниваются
+                where = 'WHERE sort_order IS NULL AND rowid > ? OR sort_order IS NOT NULL'
+                params = (last['rowid'],)
+            else:
+                where = 'WHERE (sort_order, rowid) > (?, ?)'
+                params = (last['sort_order'], last['rowid'])
+
+    def import_items(self, filename, items, batch_size=500, merge=False):
+        """
+        Upsert элементов из итератора пакетами по batch_size: каждый пакет —
+        отдельная транзакция потока-писателя, в памяти только текущий пакет.
+        Пакет собирается из итератора (чтение сокета, разбор) без блокировки
+        ресурса, блокировка берётся только на запись пакета.
+        Порядок — порядок во входном потоке; элементы с другими id остаются.
+        merge=True — поля накладываются на сохранённый элемент с тем же id,
+        новые элементы без order встают после существующих.
+        Возвращает {'imported': n, 'batches': b}.
+        """
+        resource = self._normalize_resource(filename)
+        if resource not in self._LISTS:
+            raise ValueError('Resource %s does not support import' % resource)
+        field = self._LISTS[resource][1]
+        result = {'imported': 0, 'batches': 0}
+
+        def flush(batch):
+            start = result['imported']
+            with self._get_lock(filename):
+                self._writer.execute(
+                    lambda conn: self._import_batch(conn, resource, field, batch, start, merge))
+            result['imported'] += len(batch)
+            result['batches'] += 1
+
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+        return result
+
+    def _import_batch(self, conn, resource, field, items, start, merge):
+        table = self._LISTS[resource][0]
+        if merge:
+            items = self._merge_existing(conn, table, items)
+        ids = list({str(item['id']) for item in items})
+        before = self._list_state(conn, table, field, ids)
+        for table_name, columns, rows in self._ROWS[resource](self, {field: items}, start):
+            if rows:
+                self._upsert_rows(conn, table_name, columns, rows)
+        if resource == 'products':
+            remove_products(conn, [p['id'] for p in items])
+            index_products(conn, items)
+        record_changes(conn, resource,
+                       diff_state(before, self._list_state(conn, table, field, ids)))
+
+    def _merge_existing(self, conn, table, items):
+        """Элементы пакета поверх сохранённых с теми же id."""
+        with_content = table in self._CONTENT_TABLES
+        ids = list({str(item['id']) for item in items})
+        rows = conn.execute(
+            'SELECT id, data, sort_order%s FROM %s WHERE id IN (%s)'
+            % (', content' if with_content else '', table, ', '.join('?' * len(ids))),
+            ids
+        ).fetchall()
+        existing = {
+            r['id']: self._with_content(r) if with_content else load_item(r)
+            for r in rows
+        }
+        next_order = conn.execute(
+            'SELECT COALESCE(MAX(sort_order), -1) + 1 FROM %s' % table
+        ).fetchone()[0]
+        merged = []
+        for item in items:
+            old = existing.get(str(item['id']))
+            if old is not None:
+                item = {**old, **item}
+            elif 'order' not in item:
+                item = dict(item, order=next_order)
+                next_order += 1
+            merged.append(item)
+        return merged
+
+    # =========================================================================
+    # Журнал изменений
+    # =========================================================================
+
+    def get_changes(self, since=None, limit=500, versions=False):
+        """Изменения после seq=since (см. changes.read_changes)."""
+        with self._reads.connection() as conn:
+            return read_changes(conn, since, limit, self._load_changed, versions)
+
+    def _load_changed(self, conn, resource, field, ids):
+        """Текущие значения изменённых элементов журнала: {item_id: элемент}."""
+        table = self._CHANGE_LISTS.get((resource, field))
+        if table is None:
+            # Поле целиком (подология, контакты): ресурсы маленькие
+            document = self._READERS[resource](self, conn)
+            return {'': document[field]} if field in document else {}
+        with_content = table in self._CONTENT_TABLES
+        rows = conn.execute(
+            'SELECT id, data, sort_order%s FROM %s WHERE id IN (%s)'
+            % (', content' if with_content else '', table, ', '.join('?' * len(ids))),
+            ids
+        ).fetchall()
+        return {
+            r['id']: self._with_content(r) if with_content else load_item(r)
+            for r in rows
+        }
+
+    def _change_state(self, conn, resource):
+        """
+        Состояние ресурса для журнала без разбора JSON:
+        {(field, item_id): (sort_order, content_hash)} строк списков.
+        Подология и контакты — поля целиком: (field, None) с позицией None.
+        """
+        state = {}
+        for (list_resource, field), table in self._CHANGE_LISTS.items():
+            if list_resource == resource:
+                state.update(self._list_state(conn, table, field))
+        if resource == 'services':
+            parts = conn.execute(
+                "SELECT key, value FROM podology_meta UNION ALL "
+                "SELECT id, COALESCE(content_hash, '') || ':' || sort_order "
+                "FROM podology_categories ORDER BY 1"
+            ).fetchall()
+            if parts:
+                parts = json.dumps([list(r) for r in parts])
+                state[('podology', None)] = (None, content_hash(parts))
+        elif resource == 'social':
+            for key, value in conn.execute('SELECT key, value FROM contacts'):
+                state[(key, None)] = (None, value)
+        return state
+
+    @staticmethod
+    def _list_state(conn, table, field, ids=None):
+        """{(field, id): (sort_order, content_hash)} строк таблицы (или только ids)."""
+        sql = 'SELECT id, sort_order, content_hash FROM %s' % table
+        if ids is not None:
+            sql += ' WHERE id IN (%s)' % ', '.join('?' * len(ids))
+        return {(field, r[0]): (r[1], r[2]) for r in conn.execute(sql, ids or ())}
+
+    def item_hashes(self, filename):
+        """
+        {id: content_hash} сохранённых элементов списка ресурса (у услуг —
+        категорий). Элемент с тем же хешем уже проверен и очищен при записи.
+        """
+        resource = self._normalize_resource(filename)
+        if resource == 'services':
+            table = 'service_categories'
+        elif resource in self._LISTS:
+            table = self._LISTS[resource][0]
         else:
-            query = 'SELECT data FROM products'
-            conditions = []
-            if status:
-                conditions.append('status = ?')
-                params.append(status)
-            if conditions:
-                query += ' WHERE ' + ' AND '.join(conditions)
-            query += ' ORDER BY sort_order, rowid'
-
-        rows = conn.execute(query, params).fetchall()
-        return [json.loads(r['data']) for r in rows]
+            return {}
+        with self._reads.connection() as conn:
+            rows = conn.execute(
+                'SELECT id, content_hash FROM %s WHERE content_hash IS NOT NULL' % table
+            ).fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def content_hash(self, item):
+        """
+        Хеш элемента, сравнимый с item_hashes(). Поле order не входит:
+        его меняет reorder, а проверять при перестановке нечего.
+        """
+        return item_hash(item)
+
+    def get_versions(self):
+        """Версии ресурсов: seq последнего изменения каждого."""
+        with self._reads.connection() as conn:
+            return read_versions(conn)
 
     # =========================================================================
     # Маппинг ресурсов
@@ -558,6 +1574,41 @@ class Database:
         'stats': _read_stats,
     }
 
+    # Краткие представления списков: без полного текста
+    _SUMMARY_READERS = {
+        'articles': _read_articles_summary,
+        'legal': _read_legal_summary,
+    }
+
+    # Ресурсы каталога: строки таблиц для полной и частичной записи
+    _ROWS = {
+        'masters': _rows_masters,
+        'services': _rows_services,
+        'articles': _rows_articles,
+        'products': _rows_products,
+        'shop-categories': _rows_shop_categories,
+        'faq': _rows_faq,
+        'legal': _rows_legal,
+        'social': _rows_social,
+    }
+
+    # Ресурсы-списки: (таблица, ключ списка в документе) для reorder и NDJSON
+    _LISTS = {
+        'masters': ('masters', 'masters'),
+        'articles': ('articles', 'articles'),
+        'products': ('products', 'products'),
+        'shop-categories': ('shop_categories', 'categories'),
+        'faq': ('faq', 'faq'),
+        'legal': ('legal', 'documents'),
+        'social': ('social_links', 'social'),
+    }
+
+    # Журнал изменений: (ресурс, поле) → таблица элементов с content_hash
+    _CHANGE_LISTS = {
+        ('services', 'categories'): 'service_categories',
+        **{(resource, field): table for resource, (table, field) in _LISTS.items()},
+    }
+
     _WRITERS = {
         'masters': _write_masters,
         'services': _write_services,
@@ -0,0 +1,308 @@
+"""
+Server-Sent Events для админ-панели: версии ресурсов и счётчики посещений.
+Все подписчики обслуживаются одним потоком-хабом (selectors): обработчик
+запроса отправляет заголовки, передаёт сокет хабу и освобождается.
+"""
+
+import json
+import logging
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger('saysbarbers')
+
+HEARTBEAT_INTERVAL = 15
+MAX_SUBSCRIBERS = 16
+# Сообщений в очереди подписчика; переполнение — отключение медленного клиента
+MAX_QUEUE = 64
+# Через столько мс EventSource переподключается после обрыва
+RETRY_MS = 5000
+
+HEARTBEAT = b': ping\n\n'
+
+
+def format_event(event, data):
+    """Сообщение SSE: имя события и JSON в одной строке data."""
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return ('event: %s\ndata: %s\n\n' % (event, payload)).encode('utf-8')
+
+
+def format_retry(retry_ms=RETRY_MS):
+    """Интервал переподключения для EventSource."""
+    return ('retry: %d\n\n' % retry_ms).encode('ascii')
+
+
+class _Subscriber:
+    __slots__ = ('sock', 'token', 'queue', 'buffer', 'stalled_since', 'overflow', 'writing')
+
+    def __init__(self, sock, token):
+        self.sock = sock
+        self.token = token
+        self.queue = deque()  # (key, message)
+        self.buffer = b''
+        self.stalled_since = None
+        self.overflow = False
+        self.writing = False
+
+
+class EventHub:
+    """
+    Рассылка событий подписчикам SSE из одного потока.
+
+    publish() кладёт сообщение в очередь каждого подписчика и будит хаб,
+    хаб отправляет данные неблокирующим send. Сообщение с ключом заменяет
+    ещё не отправленное с тем же ключом: частые счётчики не копятся.
+    Подписчик отключается, если очередь переполнена или отправка стоит
+    дольше двух интервалов heartbeat. Раз в heartbeat секунд всем уходит
+    комментарий-пинг, подписчики с истёкшей сессией отключаются.
+    """
+
+    def __init__(self, authorize=None, max_subscribers=MAX_SUBSCRIBERS,
+                 max_queue=MAX_QUEUE, heartbeat=HEARTBEAT_INTERVAL, name='sse-hub'):
+        self.authorize = authorize
+        self.max_subscribers = max_subscribers
+        self.max_queue = max_queue
+        self.heartbeat = heartbeat
+        self.name = name
+        self._lock = threading.Lock()
+        self._subscribers = {}  # fileno → _Subscriber
+        self._pending = []
+        self._reserved = 0
+        self._selector = None
+        self._wake_r = None
+        self._wake_w = None
+        self._thread = None
+        self._closed = False
+        self.published = 0
+        self.dropped = 0
+
+    def _ensure_started(self):
+        """Запуск потока-хаба при первом подписчике (вызывается под _lock)."""
+        if self._thread is not None:
+            return
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def _wake(self):
+        if self._wake_w is None:
+            return
+        try:
+            self._wake_w.send(b'\0')
+        except (BlockingIOError, OSError):
+            # Буфер полон — хаб и так проснётся
+            pass
+
+    # =========================================================================
+    # Подписка
+    # =========================================================================
+
+    def reserve(self):
+        """Место для нового подписчика. False — достигнут лимит."""
+        with self._lock:
+            taken = len(self._subscribers) + len(self._pending) + self._reserved
+            if self._closed or taken >= self.max_subscribers:
+                return False
+            self._reserved += 1
+            return True
+
+    def release(self):
+        """Возврат зарезервированного места (ошибка до attach)."""
+        with self._lock:
+            self._reserved -= 1
+
+    def attach(self, sock, token=None, messages=()):
+        """
+        Передача соединения хабу (занимает зарезервированное место).
+        messages — первые сообщения подписчика (retry, начальное состояние).
+        """
+        sock.setblocking(False)
+        subscriber = _Subscriber(sock, token)
+        subscriber.queue.extend((None, message) for message in messages)
+        with self._lock:
+            self._reserved -= 1
+            if self._closed:
+                sock.close()
+                return
+            self._ensure_started()
+            self._pending.append(subscriber)
+        self._wake()
+
+    def has_subscribers(self):
+        """Есть ли кому отправлять события."""
+        with self._lock:
+            return bool(self._subscribers or self._pending)
+
+    def publish(self, event, data, key=None):
+        """Событие всем подписчикам. Возвращает число получателей."""
+        message = format_event(event, data)
+        with self._lock:
+            targets = list(self._subscribers.values()) + self._pending
+            if not targets:
+                return 0
+            self.published += 1
+            for subscriber in targets:
+                self._enqueue(subscriber, key, message)
+        self._wake()
+        return len(targets)
+
+    def _enqueue(self, subscriber, key, message):
+        """Постановка в очередь подписчика (под _lock)."""
+        if key is not None:
+            for i, (queued_key, _) in enumerate(subscriber.queue):
+                if queued_key == key:
+                    subscriber.queue[i] = (key, message)
+                    return
+        if len(subscriber.queue) >= self.max_queue:
+            subscriber.overflow = True
+            return
+        subscriber.queue.append((key, message))
+
+    # =========================================================================
+    # Поток-хаб
+    # =========================================================================
+
+    def _run(self):
+        next_heartbeat = time.monotonic() + self.heartbeat
+        while True:
+            with self._lock:
+                if self._closed:
+                    break
+                pending, self._pending = self._pending, []
+                for subscriber in pending:
+                    self._subscribers[subscriber.sock.fileno()] = subscriber
+            for subscriber in pending:
+                self._selector.register(subscriber.sock, selectors.EVENT_READ, subscriber)
+
+            for subscriber in list(self._subscribers.values()):
+                if subscriber.overflow:
+                    self._drop(subscriber, 'queue overflow')
+                else:
+                    self._flush(subscriber)
+
+            timeout = max(0.0, next_heartbeat - time.monotonic())
+            for key, mask in self._selector.select(timeout):
+                if key.data is None:
+                    self._drain_wakeups()
+                elif mask & selectors.EVENT_READ:
+                    self._check_closed(key.data)
+
+            now = time.monotonic()
+            if now >= next_heartbeat:
+                self._heartbeat(now)
+                next_heartbeat = now + self.heartbeat
+
+        for subscriber in list(self._subscribers.values()):
+            self._drop(subscriber)
+
+    def _drain_wakeups(self):
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _flush(self, subscriber):
+        """Неблокирующая отправка очереди подписчика."""
+        if subscriber.sock.fileno() not in self._subscribers:
+            return
+        while True:
+            if not subscriber.buffer:
+                with self._lock:
+                    if not subscriber.queue:
+                        break
+                    subscriber.buffer = b''.join(message for _, message in subscriber.queue)
+                    subscriber.queue.clear()
+            try:
+                sent = subscriber.sock.send(subscriber.buffer)
+            except BlockingIOError:
+                break
+            except OSError:
+                self._drop(subscriber)
+                return
+            subscriber.buffer = subscriber.buffer[sent:]
+
+        # Ждём готовности к записи, только пока есть недоотправленное
+        writing = bool(subscriber.buffer)
+        if writing and subscriber.stalled_since is None:
+            subscriber.stalled_since = time.monotonic()
+        elif not writing:
+            subscriber.stalled_since = None
+        if writing != subscriber.writing:
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if writing else 0)
+            self._selector.modify(subscriber.sock, events, subscriber)
+            subscriber.writing = writing
+
+    def _check_closed(self, subscriber):
+        """Клиент SSE ничего не присылает: чтение означает закрытие соединения."""
+        try:
+            data = subscriber.sock.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._drop(subscriber)
+
+    def _heartbeat(self, now):
+        for subscriber in list(self._subscribers.values()):
+            if self.authorize is not None and not self.authorize(subscriber.token):
+                self._drop(subscriber, 'session expired')
+            elif subscriber.stalled_since is not None and \
+                    now - subscriber.stalled_since > 2 * self.heartbeat:
+                self._drop(subscriber, 'slow consumer')
+            else:
+                with self._lock:
+                    self._enqueue(subscriber, 'heartbeat', HEARTBEAT)
+
+    def _drop(self, subscriber, reason=None):
+        """Отключение подписчика. reason — принудительное отключение сервером."""
+        with self._lock:
+            self._subscribers.pop(subscriber.sock.fileno(), None)
+            if reason:
+                self.dropped += 1
+        if reason:
+            logger.info("SSE subscriber dropped: %s", reason)
+        try:
+            self._selector.unregister(subscriber.sock)
+        except (KeyError, ValueError):
+            pass
+        subscriber.sock.close()
+
+    # =========================================================================
+    # Состояние
+    # =========================================================================
+
+    def metrics(self):
+        """Счётчики хаба."""
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers) + len(self._pending),
+                'max_subscribers': self.max_subscribers,
+                'published': self.published,
+                'dropped': self.dropped,
+            }
+
+    def close(self, timeout=5):
+        """Остановка хаба и закрытие соединений подписчиков."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            pending, self._pending = self._pending, []
+        for subscriber in pending:
+            subscriber.sock.close()
+        if thread is not None:
+            self._wake()
+            thread.join(timeout)
+            self._selector.close()
+            self._wake_r.close()
+            self._wake_w.close()
@@ -11,15 +11,19 @@ import os
 import json
 import uuid
 import base64
+import re
 from pathlib import Path
 from urllib.parse import urlparse, parse_qs
 from urllib.request import urlopen, Request
 from urllib.error import URLError
 from datetime import datetime, timedelta
+import socket
 import subprocess
 import sys
 import logging
+import tempfile
 import threading
+import time
 
 logger = logging.getLogger('saysbarbers')
 
@@ -30,8 +34,12 @@ from .validators import (
     MASTER_SCHEMA, SERVICE_SCHEMA, ARTICLE_SCHEMA, FAQ_SCHEMA,
     PRODUCT_SCHEMA, CATEGORY_SCHEMA, sanitize_html_content
 )
+from .backup import BackupJob, list_backups
+from .csv_import import CSVImportError, CSVImportJob, decode_lines, import_csv, read_header
 from .database import Database
 from .auth import SessionManager, RateLimiter, UploadRateLimiter, verify_password
+from .events import EventHub, format_event, format_retry
+from .patch import PatchError, JSON_PATCH_TYPE, apply_json_patch, apply_merge_patch
 from .routes import get_router
 
 
@@ -53,6 +61,15 @@ load_env_file()
 # Настройки сервера
 PORT = int(os.environ.get('SERVER_PORT', 8000))
 HOST = os.environ.get('SERVER_HOST', 'localhost')
+# Резервные копии БД: интервал в часах (0 — только по запросу из админки)
+BACKUP_INTERVAL_HOURS = float(os.environ.get('BACKUP_INTERVAL_HOURS', 24))
+BACKUP_KEEP = int(os.environ.get('BACKUP_KEEP', 7))
+# Потоковый NDJSON: порция записи экспорта, предел строки и отчёта импорта
+EXPORT_CHUNK_SIZE = 64 * 1024
+IMPORT_MAX_LINE = 1024 * 1024
+IMPORT_MAX_ERRORS = 100
+# CSV товаров сохраняется во временный файл до фонового импорта
+CSV_IMPORT_MAX_SIZE = 100 * 1024 * 1024
 FILENAME = "index.html"
 DATA_DIR = Path("data")
 UPLOADS_DIR = Path("uploads")
@@ -128,6 +145,17 @@ login_limiter = RateLimiter(
 upload_limiter = UploadRateLimiter(max_uploads=10, window_seconds=60)
 join_limiter = RateLimiter(max_attempts=1, lockout_minutes=1)
 router = get_router()
+# Подписчики /api/events; сессия проверяется при каждом heartbeat
+event_hub = EventHub(authorize=lambda token: session_manager.validate(token))
+
+# Онлайн-копии БД в фоне; storage берётся в момент копирования
+backup_job = BackupJob(
+    lambda: storage.backup(keep=BACKUP_KEEP),
+    interval=BACKUP_INTERVAL_HOURS * 3600 if BACKUP_INTERVAL_HOURS > 0 else None,
+)
+
+# Импорт CSV товаров: один за раз, в фоновом потоке
+csv_import_job = CSVImportJob()
 
 SESSION_CLEANUP_INTERVAL = 3600  # 1 час
 
@@ -156,6 +184,114 @@ ALLOWED_ORIGINS = {
     'https://www.saysbarbers.ru'
 }
 
+# Локальная разработка: любой порт
+DEV_ORIGIN_PREFIXES = ('http://localhost:', 'http://127.0.0.1:')
+
+CACHE_NO_STORE = 'no-store, no-cache, must-revalidate'
+CACHE_REVALIDATE = 'no-cache, must-revalidate'
+CACHE_IMMUTABLE = f'public, max-age={CACHE_MAX_AGE_WEEK}, immutable'
+CACHE_DEFAULT = 'public, max-age=300, must-revalidate'
+
+CACHEABLE_EXTENSIONS = {'.css', '.js', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.woff', '.woff2', '.ttf', '.eot'}
+
+# Расширение файла → Cache-Control; остальные файлы — CACHE_DEFAULT
+CACHE_BY_EXTENSION = dict.fromkeys(CACHEABLE_EXTENSIONS, CACHE_IMMUTABLE)
+CACHE_BY_EXTENSION.update({'.js': CACHE_REVALIDATE, '.html': CACHE_REVALIDATE})
+
+
+def cache_control(path):
+    """Cache-Control для пути запроса (query string отбрасывается)."""
+    path = path.partition('?')[0]
+    if path.startswith('/api/'):
+        return CACHE_NO_STORE
+    if path in ('/', ''):
+        return CACHE_REVALIDATE
+    name = path[path.rfind('/') + 1:]
+    dot = name.rfind('.')
+    # Как os.path.splitext: точки в начале имени (.htaccess) — не расширение
+    if dot < 0 or not name[:dot].strip('.'):
+        return CACHE_DEFAULT
+    return CACHE_BY_EXTENSION.get(name[dot:].lower(), CACHE_DEFAULT)
+
+
+def _header_lines(*headers):
+    """Готовый блок строк заголовков для буфера BaseHTTPRequestHandler."""
+    return ''.join('%s: %s\r\n' % header for header in headers).encode('latin-1')
+
+
+# Заголовки ответа, одинаковые для многих запросов, собраны заранее:
+# end_headers добавляет в буфер несколько готовых блоков вместо
+# форматирования каждого заголовка в send_header
+_CACHE_LINES = {
+    value: _header_lines(('Cache-Control', value))
+    for value in (CACHE_NO_STORE, CACHE_REVALIDATE, CACHE_IMMUTABLE, CACHE_DEFAULT)
+}
+_CORS_LINES = {
+    origin: _header_lines(('Access-Control-Allow-Origin', origin),
+                          ('Access-Control-Allow-Credentials', 'true'))
+    for origin in ALLOWED_ORIGINS
+}
+_CORS_COMMON_LINES = _header_lines(
+    ('Access-Control-Allow-Methods', 'GET, POST, PUT, PATCH, DELETE, OPTIONS'),
+    ('Access-Control-Allow-Headers', 'Content-Type, Authorization'),
+)
+
+
+def _cors_lines(origin):
+    """
+    Access-Control-Allow-Origin/Credentials для разрешённого origin
+    (см. AdminAPIHandler.get_cors_origin); None — пустой блок.
+    """
+    if origin is None:
+        return b''
+    lines = _CORS_LINES.get(origin)
+    if lines is None:
+        # Порт локальной разработки: блок собирается на запрос
+        lines = _header_lines(('Access-Control-Allow-Origin', origin),
+                              ('Access-Control-Allow-Credentials', 'true'))
+    return lines
+
+
+# Server и Date: (секунда, блок) — Date меняется раз в секунду
+_server_date_lines = (None, b'')
+
+
+# Билет и токен в query (/api/events?ticket=...) не попадают в журнал запросов
+TOKEN_QUERY_RE = re.compile(r'(?:(?<=[?&]token=)|(?<=[?&]ticket=))[^&\s]+')
+
+
+def read_lines(stream, remaining):
+    """
+    Строки (bytes) первых remaining байт потока без чтения его целиком.
+    Строка длиннее IMPORT_MAX_LINE дочитывается и отдаётся как None.
+    """
+    while remaining > 0:
+        line = stream.readline(min(remaining, IMPORT_MAX_LINE + 1))
+        if not line:
+            break
+        remaining -= len(line)
+        if len(line) > IMPORT_MAX_LINE:
+            while not line.endswith(b'\n') and remaining > 0:
+                line = stream.readline(min(remaining, 64 * 1024))
+                if not line:
+                    break
+                remaining -= len(line)
+            yield None
+            continue
+        yield line
+
+
+def _import_products_file(target, path):
+    """Импорт CSV из временного файла (в потоке csv_import_job), файл удаляется."""
+    try:
+        with open(path, 'rb') as f:
+            report = import_csv(target, decode_lines(read_lines(f, os.path.getsize(path))))
+    finally:
+        os.unlink(path)
+    if report['imported']:
+        AdminAPIHandler._publish_version('products.json')
+    return report
+
 
 def build_html():
     """Собирает index.html из секций."""
@@ -174,7 +310,7 @@ class AdminAPIHandler(http.server.SimpleHTTPRequestHandler):
     """HTTP Handler с поддержкой REST API для админ-панели"""
 
     COMPRESSIBLE_TYPES = {'.html', '.css', '.js', '.json', '.svg', '.xml', '.txt'}
-    CACHEABLE_EXTENSIONS = {'.css', '.js', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.woff', '.woff2', '.ttf', '.eot'}
+    CACHEABLE_EXTENSIONS = CACHEABLE_EXTENSIONS
 
     # Маппинг файлов на схемы валидации и ключи массивов
     VALIDATION_MAP = {
@@ -186,38 +322,47 @@ class AdminAPIHandler(http.server.SimpleHTTPRequestHandler):
         'shop-categories.json': ('categories', CATEGORY_SCHEMA),
     }
 
+    # Документы, где элементы схемы лежат внутри категорий: файл → ключ категорий
+    NESTED_VALIDATION = {
+        'services.json': 'categories',
+    }
+
     def get_cache_header(self):
         """Определяет правильный Cache-Control заголовок."""
-        path = self.path.split('?')[0]
-        ext = os.path.splitext(path)[1].lower()
-
-        if path.startswith('/api/'):
-            return 'no-store, no-cache, must-revalidate'
-        if ext == '.js':
-            return 'no-cache, must-revalidate'
-        if ext in self.CACHEABLE_EXTENSIONS:
-            return f'public, max-age={CACHE_MAX_AGE_WEEK}, immutable'
-        if ext == '.html' or path in ('/', ''):
-            return 'no-cache, must-revalidate'
-        return 'public, max-age=300, must-revalidate'
+        return cache_control(self.path)
 
     def get_cors_origin(self):
         """Получение разрешённого CORS origin."""
         origin = self.headers.get('Origin', '')
-        if origin in ALLOWED_ORIGINS:
-            return origin
-        if origin.startswith('http://localhost:') or origin.startswith('http://127.0.0.1:'):
+        if origin in ALLOWED_ORIGINS or origin.startswith(DEV_ORIGIN_PREFIXES):
             return origin
         return None
 
+    def send_response(self, code, message=None):
+        """Строка статуса и заголовки Server/Date (блок обновляется раз в секунду)."""
+        global _server_date_lines
+        self.log_request(code)
+        self.send_response_only(code, message)
+        if self.request_version != 'HTTP/0.9':
+            now = int(time.time())
+            second, lines = _server_date_lines
+            if second != now:
+                lines = _header_lines(('Server', self.version_string()),
+                                      ('Date', self.date_time_string(now)))
+                _server_date_lines = (now, lines)
+            self._headers_buffer.append(lines)
+
     def end_headers(self):
-        self.send_header('Cache-Control', self.get_cache_header())
-        cors_origin = self.get_cors_origin()
-        if cors_origin:
-            self.send_header('Access-Control-Allow-Origin', cors_origin)
-            self.send_header('Access-Control-Allow-Credentials', 'true')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
+        # Cache-Control и CORS — готовыми блоками; буфер заголовков уходит
+        # в сокет одной записью (flush_headers)
+        if self.request_version != 'HTTP/0.9':
+            if not hasattr(self, '_headers_buffer'):
+                self._headers_buffer = []
+            self._headers_buffer.append(
+                _CACHE_LINES[self.get_cache_header()]
+                + _cors_lines(self.get_cors_origin())
+                + _CORS_COMMON_LINES
+            )
         super().end_headers()
 
     def get_auth_token(self):
@@ -231,6 +376,15 @@ class AdminAPIHandler(http.server.SimpleHTTPRequestHandler):
         """Получение IP клиента."""
         return self.client_address[0] if self.client_address else '127.0.0.1'
 
+    def is_authenticated(self):
+        """Есть ли у запроса валидный токен (без ответа 401)."""
+        return session_manager.validate(self.get_auth_token())
+
+    def log_request(self, code='-', size='-'):
+        """Строка журнала запросов без токенов из query string."""
+        self.log_message('"%s" %s %s', TOKEN_QUERY_RE.sub('***', self.requestline),
+                         str(int(code)) if isinstance(code, int) else str(code), str(size))
+
     def require_auth(self):
         """Проверка аутентификации."""
         token = self.get_auth_token()
@@ -246,10 +400,12 @@ class AdminAPIHandler(http.server.SimpleHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
 
-    def send_error_response(self, status, message):
+    def send_error_response(self, status, message, headers=None):
         """Отправка ошибки в JSON формате."""
         self.send_response(status)
         self.send_header('Content-Type', 'application/json; charset=utf-8')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
         self.wfile.write(json.dumps({
             'success': False,
@@ -263,28 +419,24 @@ class AdminAPIHandler(http.server.SimpleHTTPRequestHandler):
 
     def _handle_request(self, method):
         """Единый метод обработки запросов через роутер."""
-        parsed = urlparse(self.path)
-        path = parsed.path
-
-        # Пробуем найти обработчик в роутере
-        handler_name, params, auth_required = router.resolve(path, method)
-
-        if handler_name:
-            # Проверка аутентификации если требуется
-            if auth_required and not self.require_auth():
+        path = urlparse(self.path).path
+
+        route, params = router.lookup(path, method)
+        if route is None:
+            # Путь есть, но с другими методами
+            allowed = router.allowed_methods(path)
+            if allowed:
+                self.send_error_response(405, 'Method Not Allowed',
+                                         headers={'Allow': ', '.join(allowed)})
                 return True
+            # Fallback для статических файлов и страниц
+            return None  # Сигнал для вызова родительского обработчика
 
-            # Вызов обработчика
-            handler = getattr(self, handler_name, None)
-            if handler:
-                if params:
-                    handler(**params)
-                else:
-                    handler()
-                return True
-
-        # Fallback для статических файлов и страниц
-        return None  # Сигнал для вызова родительского обработчика
+        # Проверка аутентификации если требуется
+        if route.auth_required and not self.require_auth():
+            return True
+        route.target(self, **params)
+        return True
 
     def do_GET(self):
         """Обработка GET запросов."""
@@ -325,6 +477,12 @@ class AdminAPIHandler(http.server.SimpleHTTPRequestHandler):
         if result is None:
             self.send_error_response(404, 'Not Found')
 
+    def do_PATCH(self):
+        """Обработка PATCH запросов."""
+        result = self._handle_request('PATCH')
+        if result is None:
+            self.send_error_response(404, 'Not Found')
+
     def do_DELETE(self):
         """Обработка DELETE запросов."""
         result = self._handle_request('DELETE')
@@ -460,9 +618,18 @@ class AdminAPIHandler(http.server.SimpleHTTPRequestHandler):
     # === Data handlers ===
 
     def _handle_get_data(self, filename):
-        """Получение данных из JSON файла."""
+        """Получение данных из JSON файла. ?view=summary — без полного текста."""
         try:
-            data = storage.read(filename, {})
+            view = parse_qs(urlparse(self.path).query).get('view', [None])[0]
+            # Админ видит всё, сайт — только активные элементы
+            public = not self.is_authenticated()
+            if view == 'summary':
+                data = storage.read_summary(filename, {}, public=public)
+            elif view is None:
+                data = storage.read(filename, {}, public=public)
+            else:
+                self.send_error_response(400, 'Invalid view')
+                return
             self.send_json_response(data)
         except Exception as e:
             logger.exception("Server error")
@@ -489,19 +656,13 @@ class AdminAPIHandler(http.server.SimpleHTTPRequestHandler):
                 return
 
             # Валидация элементов если есть схема
-            validation = self.VALIDATION_MAP.get(filename)
-            if validation:
-                list_key, schema = validation
-                items = data.get(list_key, [])
-                if isinstance(items, list):
-                    for item in items:
-                        if isinstance(item, dict):
-                            is_valid, error = SchemaValidator.validate(item, schema)
-                            if not is_valid:
-                                self.send_error_response(400, error)
-                                return
+            error = self._validate_document(filename, data)
+            if error:
+                self.send_error_response(400, error)
+                return
 
             storage.write(filename, data)
+            self._publish_version(filename)
             self.send_json_response({'success': True, 'message': 'Данные сохранены'})
         except json.JSONDecodeError:
             self.send_error_response(400, 'Invalid JSON')
@@ -509,6 +670,367 @@ class AdminAPIHandler(http.server.SimpleHTTPRequestHandler):
             logger.exception("Server error")
             self.send_error_response(500, 'Internal server error')
 
+    def _handle_patch_data(self, filename):
+        """
+        Частичное обновление: JSON Patch (массив операций или
+        Content-Type application/json-patch+json) либо JSON Merge Patch (объект).
+        Результат проверяется по схеме, сохраняются только изменённые строки.
+        """
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            if content_length == 0:
+                self.send_error_response(400, 'Missing request body')
+                return
+            if content_length > 5 * 1024 * 1024:
+                self.send_error_response(413, 'Request too large. Max size is 5MB.')
+                return
+
+            patch = json.loads(self.rfile.read(content_length).decode('utf-8'))
+            content_type = self.headers.get('Content-Type', '').split(';')[0].strip()
+            if isinstance(patch, list) or content_type == JSON_PATCH_TYPE:
+                apply_patch = apply_json_patch
+            elif isinstance(patch, dict):
+                apply_patch = apply_merge_patch
+            else:
+                self.send_error_response(400, 'Expected JSON Patch array or merge patch object')
+                return
+
+            def patch_document(document):
+                updated = apply_patch(document, patch)
+                if not isinstance(updated, dict):
+                    raise PatchError('Expected JSON object')
+                error = self._validate_document(filename, updated)
+                if error:
+                    raise PatchError(error)
+                return updated
+
+            try:
+                storage.patch(filename, patch_document)
+            except ValueError as e:
+                # PatchError, ошибка схемы или повторяющийся id
+                self.send_error_response(400, str(e))
+                return
+            self._publish_version(filename)
+            self.send_json_response({'success': True, 'message': 'Данные сохранены'})
+        except json.JSONDecodeError:
+            self.send_error_response(400, 'Invalid JSON')
+        except Exception as e:
+            logger.exception("Server error")
+            self.send_error_response(500, 'Internal server error')
+
+    def handle_export(self, resource):
+        """
+        Выгрузка элементов ресурса в NDJSON (по элементу на строку) потоком
+        из курсора SQLite: документ целиком в памяти не собирается.
+        """
+        filename = self.RESOURCE_MAP.get(resource)
+        try:
+            lines = storage.export_items(filename) if filename else None
+        except ValueError:
+            lines = None
+        if lines is None:
+            self.send_error_response(404, 'Resource not found')
+            return
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+            self.send_header('Content-Disposition', 'attachment; filename="%s.ndjson"' % resource)
+            self.end_headers()
+            # HTTP/1.0 без Content-Length: конец тела — закрытие соединения
+            self.close_connection = True
+            chunk, size = [], 0
+            for line in lines:
+                chunk.append(line)
+                size += len(line)
+                if size >= EXPORT_CHUNK_SIZE:
+                    self.wfile.write(b''.join(chunk))
+                    chunk, size = [], 0
+            if chunk:
+                self.wfile.write(b''.join(chunk))
+        except (BrokenPipeError, ConnectionResetError):
+            logger.info("Export of %s aborted by client", resource)
+        except Exception:
+            # Заголовки уже отправлены: клиент увидит оборванный поток
+            logger.exception("Export error for %s", resource)
+        finally:
+            lines.close()
+
+    def _body_lines(self, content_length):
+        """Строки тела запроса (bytes) без чтения его целиком (см. read_lines)."""
+        return read_lines(self.rfile, content_length)
+
+    def handle_import(self, resource):
+        """
+        Загрузка элементов из NDJSON: тело читается построчно, каждая строка
+        проверяется схемой ресурса, элементы пишутся пакетами. Некорректные
+        строки пропускаются и попадают в отчёт, остальные сохраняются.
+        """
+        filename = self.RESOURCE_MAP.get(resource)
+        if not filename:
+            self.send_error_response(404, 'Resource not found')
+            return
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            content_length = 0
+        if content_length <= 0:
+            self.send_error_response(400, 'Missing request body')
+            return
+
+        schema = self.VALIDATION_MAP.get(filename, (None, None))[1]
+        report = {'failed': 0, 'errors': []}
+
+        def reject(line_no, error):
+            report['failed'] += 1
+            if len(report['errors']) < IMPORT_MAX_ERRORS:
+                report['errors'].append({'line': line_no, 'error': error})
+
+        def items():
+            for line_no, line in enumerate(self._body_lines(content_length), 1):
+                if line is None:
+                    reject(line_no, 'Line too long')
+                    continue
+                if not line.strip():
+                    continue
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    reject(line_no, 'Invalid JSON')
+                    continue
+                if not isinstance(item, dict) or item.get('id') in (None, ''):
+                    reject(line_no, 'Missing id')
+                    continue
+                # Без схемы (legal, social) id проверяется здесь: иначе
+                # пакет упадёт в SQLite после записи предыдущих
+                if not schema and not isinstance(item['id'], str):
+                    reject(line_no, 'Invalid id')
+                    continue
+                if schema:
+                    is_valid, error = SchemaValidator.validate(item, schema)
+                    if not is_valid:
+                        reject(line_no, error)
+                        continue
+                yield item
+
+        try:
+            result = storage.import_items(filename, items())
+        except ValueError:
+            # Ресурс не список (services): тело не читалось
+            self.close_connection = True
+            self.send_error_response(404, 'Resource not found')
+            return
+        except Exception:
+            logger.exception("Import error for %s", resource)
+            self.close_connection = True
+            self.send_error_response(500, 'Internal server error')
+            return
+        if result['imported']:
+            self._publish_version(filename)
+        result.update(report)
+        self.send_json_response(dict(success=True, **result))
+
+    def handle_import_products_csv(self):
+        """
+        Импорт товаров из CSV поставщика (тело запроса). Тело сохраняется
+        во временный файл, заголовок проверяется сразу, строки проверяются
+        и пишутся в фоне (csv_import_job): сервер однопоточный, и импорт
+        в потоке запроса остановил бы остальные запросы. Ответ — 202,
+        отчёт — GET /api/shop/products/import.
+        """
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            content_length = 0
+        if content_length <= 0:
+            self.send_error_response(400, 'Missing request body')
+            return
+        if content_length > CSV_IMPORT_MAX_SIZE:
+            self.close_connection = True
+            self.send_error_response(413, 'Request too large. Max size is 100MB.')
+            return
+        if csv_import_job.status()['running']:
+            self.close_connection = True
+            self.send_error_response(409, 'Import already in progress')
+            return
+
+        fd, path = tempfile.mkstemp(prefix='products-import-', suffix='.csv')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                remaining = content_length
+                while remaining > 0:
+                    chunk = self.rfile.read(min(remaining, EXPORT_CHUNK_SIZE))
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    remaining -= len(chunk)
+            with open(path, 'rb') as f:
+                read_header(next(decode_lines(read_lines(f, content_length)), ''))
+        except CSVImportError as e:
+            os.unlink(path)
+            self.close_connection = True
+            self.send_error_response(400, str(e))
+            return
+        except Exception:
+            os.unlink(path)
+            logger.exception("CSV import error")
+            self.close_connection = True
+            self.send_error_response(500, 'Internal server error')
+            return
+
+        target = storage
+        if not csv_import_job.start(lambda: _import_products_file(target, path)):
+            os.unlink(path)
+            self.send_error_response(409, 'Import already in progress')
+            return
+        self.send_json_response({'success': True, 'job': csv_import_job.status()}, 202)
+
+    def handle_get_products_import(self):
+        """Состояние фонового импорта CSV и отчёт последнего."""
+        self.send_json_response({'job': csv_import_job.status()})
+
+    def handle_batch(self):
+        """
+        Атомарное сохранение нескольких ресурсов одним запросом:
+        {"writes": [{"resource": "shop-categories", "data": {...}}, ...]}.
+        Каждый документ проверяется как в POST, запись — одна транзакция.
+        """
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            if content_length == 0:
+                self.send_error_response(400, 'Missing request body')
+                return
+            if content_length > 10 * 1024 * 1024:
+                self.send_error_response(413, 'Request too large. Max size is 10MB.')
+                return
+
+            body = json.loads(self.rfile.read(content_length).decode('utf-8'))
+            writes = body.get('writes') if isinstance(body, dict) else None
+            if not isinstance(writes, list) or not writes:
+                self.send_error_response(400, 'Expected {"writes": [...]}')
+                return
+
+            files = []
+            for write in writes:
+                if not isinstance(write, dict):
+                    self.send_error_response(400, 'Invalid batch write')
+                    return
+                resource = write.get('resource')
+                filename = self.RESOURCE_MAP.get(resource) if isinstance(resource, str) else None
+                if not filename:
+                    self.send_error_response(400, 'Unknown resource: %s' % resource)
+                    return
+                data = write.get('data')
+                if not isinstance(data, dict):
+                    self.send_error_response(400, '%s: Expected JSON object' % resource)
+                    return
+                error = self._validate_document(filename, data)
+                if error:
+                    self.send_error_response(400, '%s: %s' % (resource, error))
+                    return
+                files.append((filename, data))
+
+            try:
+                changed = storage.write_many(files)
+            except ValueError as e:
+                # Повторяющийся ресурс
+                self.send_error_response(400, str(e))
+                return
+            self._publish_version(*changed)
+            self.send_json_response({
+                'success': True,
+                'message': 'Данные сохранены',
+                'changed': [w['resource'] for w, (filename, _) in zip(writes, files)
+                            if Path(filename).stem in changed],
+            })
+        except json.JSONDecodeError:
+            self.send_error_response(400, 'Invalid JSON')
+        except Exception as e:
+            logger.exception("Server error")
+            self.send_error_response(500, 'Internal server error')
+
+    def _handle_reorder(self, filename):
+        """
+        Новый порядок элементов: {"ids": [...]} вместо всей коллекции.
+        Меняется только sort_order, элементы не валидируются и не пересохраняются.
+        """
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            if content_length == 0:
+                self.send_error_response(400, 'Missing request body')
+                return
+            if content_length > 1024 * 1024:
+                self.send_error_response(413, 'Request too large. Max size is 1MB.')
+                return
+
+            body = json.loads(self.rfile.read(content_length).decode('utf-8'))
+            ids = body.get('ids') if isinstance(body, dict) else None
+            if not isinstance(ids, list) or not all(
+                    isinstance(i, (str, int)) and not isinstance(i, bool) for i in ids):
+                self.send_error_response(400, 'Expected {"ids": [...]}')
+                return
+
+            try:
+                updated = storage.reorder(filename, ids)
+            except ValueError as e:
+                # Неизвестный или повторяющийся id
+                self.send_error_response(400, str(e))
+                return
+            if updated:
+                self._publish_version(filename)
+            self.send_json_response({'success': True, 'updated': updated})
+        except json.JSONDecodeError:
+            self.send_error_response(400, 'Invalid JSON')
+        except Exception as e:
+            logger.exception("Server error")
+            self.send_error_response(500, 'Internal server error')
+
+    def _validate_document(self, filename, data):
+        """
+        Проверка элементов документа по схеме. Возвращает текст ошибки или None.
+        Элементы с тем же хешем содержимого, что у сохранённой строки, уже
+        проверены и очищены при записи — проверяются только новые и изменённые.
+        """
+        validation = self.VALIDATION_MAP.get(filename)
+        if not validation:
+            return None
+        list_key, schema = validation
+        stored = storage.item_hashes(filename)
+
+        def changed(items, hashes):
+            # Хеш считается до проверки: sanitize меняет элемент на месте
+            for item in items:
+                if isinstance(item, dict) and (
+                        not hashes or hashes.get(str(item.get('id'))) != storage.content_hash(item)):
+                    yield item
+
+        groups = [data]
+        # Элементы, вложенные в категории (услуги внутри категорий): хеш
+        # хранится у категории, неизменённая пропускается вместе с услугами
+        nested_key = self.NESTED_VALIDATION.get(filename)
+        if nested_key and isinstance(data.get(nested_key), list):
+            groups.extend(changed(data[nested_key], stored))
+            stored = {}
+        for group in groups:
+            items = group.get(list_key, [])
+            if isinstance(items, list):
+                invalid = SchemaValidator.validate_many(changed(items, stored), schema)
+                for _, error in invalid:
+                    return error
+        return None
+
+    @staticmethod
+    def _publish_version(*filenames):
+        """События о новых версиях ресурсов для подписчиков /api/events."""
+        if not filenames or not event_hub.has_subscribers():
+            return
+        versions = storage.get_versions()
+        for filename in filenames:
+            resource = Path(filename).stem
+            event_hub.publish('version', {
+                'resource': resource,
+                'seq': versions.get(resource, 0),
+            }, key='version:' + resource)
+
     # Маппинг ресурсов на файлы JSON
     RESOURCE_MAP = {
         'masters': 'masters.json',
@@ -537,6 +1059,35 @@ class AdminAPIHandler(http.server.SimpleHTTPRequestHandler):
         else:
             self.send_error_response(404, 'Resource not found')
 
+    def handle_generic_patch(self, resource):
+        """Generic PATCH handler для ресурсов из RESOURCE_MAP."""
+        filename = self.RESOURCE_MAP.get(resource)
+        if filename:
+            self._handle_patch_data(filename)
+        else:
+            self.send_error_response(404, 'Resource not found')
+
+    def handle_generic_reorder(self, resource):
+        """Generic POST /reorder handler для ресурсов из RESOURCE_MAP."""
+        filename = self.RESOURCE_MAP.get(resource)
+        if filename:
+            self._handle_reorder(filename)
+        else:
+            self.send_error_response(404, 'Resource not found')
+
+    def handle_get_article(self, id):
+        """Получение статьи по ID с полным текстом."""
+        try:
+            article = storage.get_article_by_id(id, public=not self.is_authenticated())
+
+            if article:
+                self.send_json_response(article)
+            else:
+                self.send_error_response(404, 'Article not found')
+        except Exception as e:
+            logger.exception("Server error")
+            self.send_error_response(500, 'Internal server error')
+
     def handle_get_legal_document(self, slug):
         """Получение юридического документа по slug."""
         try:
@@ -554,29 +1105,85 @@ class AdminAPIHandler(http.server.SimpleHTTPRequestHandler):
             logger.exception("Server error")
             self.send_error_response(500, 'Internal server error')
 
+    @staticmethod
+    def _parse_product_filters(query, public=True):
+        """
+        Фильтры товаров из query string: category (slug или несколько через
+        запятую, 'all' — без фильтра), price_min, price_max.
+        Публичный запрос видит только активные товары, админ — все.
+        ValueError при нечисловой цене.
+        """
+        slugs = [slug for value in query.get('category', [])
+                 for slug in value.split(',') if slug and slug != 'all']
+        filters = {
+            'category_slug': slugs[0] if len(slugs) == 1 else (slugs or None),
+            'status': 'active' if public else None,
+        }
+        for key in ('price_min', 'price_max'):
+            if key in query:
+                try:
+                    filters[key] = float(query[key][0])
+                except ValueError:
+                    raise ValueError('Invalid %s' % key)
+        return filters
+
     def handle_get_products(self):
         """Получение товаров с фильтрацией."""
         try:
             parsed = urlparse(self.path)
             query = parse_qs(parsed.query)
-            category_slug = query.get('category', [None])[0]
 
-            if category_slug == 'all':
-                category_slug = None
+            try:
+                filters = self._parse_product_filters(query, public=not self.is_authenticated())
+            except ValueError as e:
+                self.send_error_response(400, str(e))
+                return
+            try:
+                limit = min(max(int(query.get('limit', ['50'])[0]), 1), 100)
+            except ValueError:
+                self.send_error_response(400, 'Invalid limit')
+                return
 
-            products = storage.get_products_filtered(
-                category_slug=category_slug,
-                status='active'
-            )
+            search = query.get('q', [''])[0].strip()
+            if search:
+                result = storage.search_products(search, limit=limit, **filters)
+                result['query'] = search
+                self.send_json_response(result)
+                return
+
+            if any(key in query for key in ('limit', 'cursor', 'sort')):
+                try:
+                    page = storage.get_products_page(
+                        sort=query.get('sort', ['manual'])[0],
+                        limit=limit,
+                        cursor=query.get('cursor', [None])[0],
+                        **filters
+                    )
+                except ValueError as e:
+                    # Неизвестная сортировка или повреждённый курсор
+                    self.send_error_response(400, str(e))
+                    return
+                self.send_json_response(page)
+                return
+
+            products = storage.get_products_filtered(**filters)
             self.send_json_response({'products': products})
         except Exception as e:
             logger.exception("Server error")
             self.send_error_response(500, 'Internal server error')
 
+    def handle_get_facets(self):
+        """Фасеты каталога: количество товаров по категориям и диапазон цен."""
+        try:
+            self.send_json_response(storage.get_product_facets())
+        except Exception as e:
+            logger.exception("Server error")
+            self.send_error_response(500, 'Internal server error')
+
     def handle_get_product(self, id):
         """Получение товара по ID."""
         try:
-            product = storage.get_product_by_id(id)
+            product = storage.get_product_by_id(id, public=not self.is_authenticated())
 
             if product:
                 self.send_json_response(product)
@@ -592,14 +1199,7 @@ class AdminAPIHandler(http.server.SimpleHTTPRequestHandler):
         """Получение статистики посещений."""
         try:
             stats = storage.read('stats.json', self._init_stats())
-            today = datetime.now().strftime('%Y-%m-%d')
-            stats['today_views'] = stats.get('daily', {}).get(today, 0)
-
-            week_views = 0
-            for i in range(7):
-                day = (datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d')
-                week_views += stats.get('daily', {}).get(day, 0)
-            stats['week_views'] = week_views
+            stats.update(self._visit_counters(stats))
 
             month_views = 0
             for i in range(30):
@@ -668,12 +1268,139 @@ class AdminAPIHandler(http.server.SimpleHTTPRequestHandler):
 
                 return stats
 
-            storage.update('stats.json', update_stats, self._init_stats())
+            stats = storage.update('stats.json', update_stats, self._init_stats())
+            if event_hub.has_subscribers():
+                event_hub.publish('visits', self._visit_counters(stats), key='visits')
             self.send_json_response({'success': True})
         except Exception as e:
             logger.exception("Server error")
             self.send_error_response(500, 'Internal server error')
 
+    @staticmethod
+    def _visit_counters(stats):
+        """Счётчики посещений для живого обновления панели статистики."""
+        daily = stats.get('daily', {})
+        week_views = 0
+        for i in range(7):
+            day = (datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d')
+            week_views += daily.get(day, 0)
+        return {
+            'total_views': stats.get('total_views', 0),
+            'unique_visitors': stats.get('unique_visitors', 0),
+            'today_views': daily.get(datetime.now().strftime('%Y-%m-%d'), 0),
+            'week_views': week_views,
+        }
+
+    def handle_events_ticket(self):
+        """
+        Одноразовый билет для подписки на /api/events: EventSource не передаёт
+        заголовки, а долгоживущий токен в URL оседает в журналах и истории.
+        """
+        ticket = session_manager.issue_ticket(self.get_auth_token())
+        if ticket is None:
+            self.send_error_response(401, 'Unauthorized: Invalid or expired token')
+            return
+        self.send_json_response({
+            'ticket': ticket,
+            'expires_in': session_manager.ticket_ttl_seconds,
+        })
+
+    def handle_events(self):
+        """
+        Поток Server-Sent Events для админки: версии ресурсов и посещения.
+        Авторизация — заголовок Authorization или одноразовый ?ticket=
+        (POST /api/events/ticket); токен в query не принимается.
+        Соединение передаётся хабу событий и не занимает поток сервера.
+        """
+        token = self.get_auth_token()
+        if not token:
+            token = session_manager.redeem_ticket(
+                parse_qs(urlparse(self.path).query).get('ticket', [None])[0])
+        if not session_manager.validate(token):
+            self.send_error_response(401, 'Unauthorized: Invalid or expired token')
+            return
+        if not event_hub.reserve():
+            self.send_error_response(503, 'Too many event subscribers')
+            return
+
+        try:
+            # seq и версии из одного снимка БД
+            start = storage.get_changes(versions=True)
+            hello = format_event('hello', {'seq': start['seq'], 'versions': start['versions']})
+        except Exception:
+            event_hub.release()
+            logger.exception("Server error")
+            self.send_error_response(500, 'Internal server error')
+            return
+
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+            # Прокси (nginx) не должен буферизовать поток
+            self.send_header('X-Accel-Buffering', 'no')
+            self.end_headers()
+            self.close_connection = True
+            # Сокет уходит хабу; сервер закроет только отсоединённый объект
+            sock = socket.socket(fileno=self.connection.detach())
+        except Exception:
+            event_hub.release()
+            logger.exception("Server error")
+            return
+        event_hub.attach(sock, token, [format_retry(), hello])
+
+    def handle_get_metrics(self):
+        """Метрики хранилища: пул соединений, поток-писатель."""
+        try:
+            metrics = storage.get_metrics()
+            metrics['events'] = event_hub.metrics()
+            self.send_json_response(metrics)
+        except Exception as e:
+            logger.exception("Server error")
+            self.send_error_response(500, 'Internal server error')
+
+    def handle_get_backups(self):
+        """Список резервных копий и состояние фонового задания."""
+        try:
+            self.send_json_response({
+                'backups': list_backups(storage.backup_dir),
+                'job': backup_job.status(),
+            })
+        except Exception as e:
+            logger.exception("Server error")
+            self.send_error_response(500, 'Internal server error')
+
+    def handle_create_backup(self):
+        """Внеочередная копия: выполняется в фоне, ответ сразу."""
+        if backup_job.trigger():
+            self.send_json_response({'success': True, 'message': 'Резервное копирование запущено'}, 202)
+        else:
+            self.send_error_response(409, 'Backup already in progress')
+
+    def handle_get_changes(self):
+        """Журнал изменений после seq=since: админка догружает дельту вместо коллекций."""
+        try:
+            query = parse_qs(urlparse(self.path).query)
+            # Без since — только текущий seq: с него клиент начинает синхронизацию
+            since = None
+            try:
+                if 'since' in query:
+                    since = int(query['since'][0])
+                    if since < 0:
+                        raise ValueError
+            except ValueError:
+                self.send_error_response(400, 'Invalid since')
+                return
+            try:
+                limit = min(max(int(query.get('limit', ['500'])[0]), 1), 1000)
+            except ValueError:
+                self.send_error_response(400, 'Invalid limit')
+                return
+
+            self.send_json_response(storage.get_changes(since, limit))
+        except Exception as e:
+            logger.exception("Server error")
+            self.send_error_response(500, 'Internal server error')
+
     def _init_stats(self):
         """Инициализация пустой статистики."""
         return {
@@ -759,6 +1486,10 @@ class AdminAPIHandler(http.server.SimpleHTTPRequestHandler):
             self.send_error_response(500, 'Internal server error')
 
 
+# Обработчики маршрутов — методы AdminAPIHandler, связываются один раз
+router.bind(AdminAPIHandler)
+
+
 def main():
     build_html()
 
@@ -770,6 +1501,10 @@ def main():
     # Запуск периодической очистки сессий
     _schedule_session_cleanup()
 
+    # Резервные копии по расписанию
+    if backup_job.interval:
+        backup_job.start()
+
     socketserver.TCPServer.allow_reuse_address = True
     with socketserver.TCPServer((HOST, PORT), AdminAPIHandler) as httpd:
         url = f"http://{HOST}:{PORT}"
@@ -0,0 +1,160 @@
+"""
+Частичное обновление документов: JSON Patch (RFC 6902) и JSON Merge Patch (RFC 7396).
+Патч применяется к копии документа; при ошибке бросается PatchError.
+"""
+
+import copy
+
+JSON_PATCH_TYPE = 'application/json-patch+json'
+MERGE_PATCH_TYPE = 'application/merge-patch+json'
+
+_MISSING = object()
+
+
+class PatchError(ValueError):
+    """Некорректный патч или путь, неприменимый к документу."""
+
+
+def _parse_pointer(pointer):
+    """JSON Pointer (RFC 6901) → список токенов."""
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith('/')):
+        raise PatchError('Invalid path: %r' % (pointer,))
+    if not pointer:
+        return []
+    return [t.replace('~1', '/').replace('~0', '~') for t in pointer[1:].split('/')]
+
+
+def _list_index(container, token, for_insert=False):
+    if token == '-' and for_insert:
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token[0] == '0'):
+        raise PatchError('Invalid array index: %s' % token)
+    index = int(token)
+    limit = len(container) + (1 if for_insert else 0)
+    if index >= limit:
+        raise PatchError('Array index out of range: %s' % token)
+    return index
+
+
+def _resolve(doc, tokens, path):
+    """Значение по токенам пути."""
+    for token in tokens:
+        if isinstance(doc, dict):
+            if token not in doc:
+                raise PatchError('Path not found: %s' % path)
+            doc = doc[token]
+        elif isinstance(doc, list):
+            doc = doc[_list_index(doc, token)]
+        else:
+            raise PatchError('Path not found: %s' % path)
+    return doc
+
+
+def _get(doc, path):
+    return _resolve(doc, _parse_pointer(path), path)
+
+
+def _add(doc, path, value):
+    tokens = _parse_pointer(path)
+    if not tokens:
+        return value
+    parent = _resolve(doc, tokens[:-1], path)
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent.insert(_list_index(parent, key, for_insert=True), value)
+    else:
+        raise PatchError('Path not found: %s' % path)
+    return doc
+
+
+def _remove(doc, path):
+    tokens = _parse_pointer(path)
+    if not tokens:
+        raise PatchError('Cannot remove the document root')
+    parent = _resolve(doc, tokens[:-1], path)
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise PatchError('Path not found: %s' % path)
+        return parent.pop(key)
+    if isinstance(parent, list):
+        return parent.pop(_list_index(parent, key))
+    raise PatchError('Path not found: %s' % path)
+
+
+def _replace(doc, path, value):
+    tokens = _parse_pointer(path)
+    if not tokens:
+        return value
+    parent = _resolve(doc, tokens[:-1], path)
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise PatchError('Path not found: %s' % path)
+        # На месте: порядок ключей объекта сохраняется
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent[_list_index(parent, key)] = value
+    else:
+        raise PatchError('Path not found: %s' % path)
+    return doc
+
+
+def apply_json_patch(doc, operations):
+    """
+    Применение JSON Patch (RFC 6902): add, remove, replace, move, copy, test.
+    Возвращает новый документ, исходный не изменяется.
+    """
+    if not isinstance(operations, list):
+        raise PatchError('JSON Patch must be an array of operations')
+    doc = copy.deepcopy(doc)
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise PatchError('Invalid patch operation')
+        op = operation.get('op')
+        path = operation.get('path')
+        value = operation.get('value', _MISSING)
+        _parse_pointer(path)
+        if op in ('add', 'replace', 'test') and value is _MISSING:
+            raise PatchError('Missing value for %s' % op)
+
+        if op == 'add':
+            doc = _add(doc, path, copy.deepcopy(value))
+        elif op == 'remove':
+            _remove(doc, path)
+        elif op == 'replace':
+            doc = _replace(doc, path, copy.deepcopy(value))
+        elif op in ('move', 'copy'):
+            source = operation.get('from')
+            _parse_pointer(source)
+            if op == 'move':
+                if path != source and path.startswith(source + '/'):
+                    raise PatchError('Cannot move a value into itself')
+                moved = _remove(doc, source)
+            else:
+                moved = copy.deepcopy(_get(doc, source))
+            doc = _add(doc, path, moved)
+        elif op == 'test':
+            if _get(doc, path) != value:
+                raise PatchError('Test failed: %s' % path)
+        else:
+            raise PatchError('Unknown patch operation: %r' % (op,))
+    return doc
+
+
+def apply_merge_patch(doc, patch):
+    """
+    Применение JSON Merge Patch (RFC 7396): объекты сливаются рекурсивно,
+    null удаляет ключ, остальные значения (включая массивы) заменяются целиком.
+    """
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = copy.deepcopy(doc) if isinstance(doc, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
@@ -1,10 +1,16 @@
 """
 Модуль маршрутизации для Say's Barbers API.
 Декларативное определение маршрутов с поддержкой параметров.
+
+Маршруты без параметров ищутся в словаре по (метод, путь), с параметрами —
+в дереве сегментов пути; ни один запрос не перебирает список маршрутов.
+Точный путь приоритетнее параметра, среди равных — первый добавленный.
 """
 
 import re
 
+_PARAM_RE = re.compile(r'\{(\w+)\}')
+
 
 class Route:
     """Маршрут с поддержкой параметров {id}, {slug}."""
@@ -15,25 +21,38 @@ class Route:
         self.methods = methods if methods else ['GET']
         self.auth_required = auth_required
         self.context = context or {}
-        self._regex = self._compile_pattern(pattern)
+        # Сегменты пути; параметр — None, его имя в params по порядку
+        self.segments = []
+        self.params = []
+        for segment in pattern.split('/'):
+            param = _PARAM_RE.fullmatch(segment)
+            if param:
+                self.segments.append(None)
+                self.params.append(param.group(1))
+            elif '{' in segment:
+                raise ValueError('Parameter must be a whole path segment: %s' % pattern)
+            else:
+                self.segments.append(segment)
+        # Метод обработчика, связывается Router.bind при старте
+        self.target = None
 
-    def _compile_pattern(self, pattern):
-        """Компилирует паттерн в regex."""
-        # Заменяем {param} на именованные группы
-        regex_pattern = re.sub(r'\{(\w+)\}', r'(?P<\1>[^/]+)', pattern)
-        return re.compile('^' + regex_pattern + '$')
+    def build_params(self, values):
+        """Параметры вызова обработчика по значениям сегментов-параметров."""
+        params = dict(zip(self.params, values))
+        if self.context:
+            params.update(self.context)
+        return params
 
-    def match(self, path, method):
-        """Проверка соответствия пути и метода."""
-        if method not in self.methods:
-            return None
-        match = self._regex.match(path)
-        if match:
-            params = match.groupdict()
-            if self.context:
-                params.update(self.context)
-            return params
-        return None
+
+class _Node:
+    """Узел дерева сегментов: точные сегменты и общий узел для параметра."""
+
+    __slots__ = ('children', 'param', 'routes')
+
+    def __init__(self):
+        self.children = {}
+        self.param = None
+        self.routes = []
 
 
 class Router:
@@ -41,11 +60,30 @@ class Router:
 
     def __init__(self):
         self._routes = []
+        # (метод, путь) → маршрут без параметров
+        self._static = {}
+        # путь → методы маршрутов без параметров (для 405)
+        self._static_methods = {}
+        self._tree = _Node()
 
     def add(self, pattern, handler, methods=None, auth_required=False, context=None):
         """Добавление маршрута."""
         route = Route(pattern, handler, methods, auth_required, context)
         self._routes.append(route)
+        if route.params:
+            node = self._tree
+            for segment in route.segments:
+                if segment is None:
+                    if node.param is None:
+                        node.param = _Node()
+                    node = node.param
+                else:
+                    node = node.children.setdefault(segment, _Node())
+            node.routes.append(route)
+        else:
+            for method in route.methods:
+                self._static.setdefault((method, pattern), route)
+            self._static_methods.setdefault(pattern, set()).update(route.methods)
         return self
 
     def get(self, pattern, handler, auth_required=False, context=None):
@@ -60,20 +98,77 @@ class Router:
         """Shortcut для PUT маршрута."""
         return self.add(pattern, handler, ['PUT'], auth_required, context)
 
+    def patch(self, pattern, handler, auth_required=False, context=None):
+        """Shortcut для PATCH маршрута."""
+        return self.add(pattern, handler, ['PATCH'], auth_required, context)
+
     def delete(self, pattern, handler, auth_required=False, context=None):
         """Shortcut для DELETE маршрута."""
         return self.add(pattern, handler, ['DELETE'], auth_required, context)
 
+    def bind(self, handler_class):
+        """
+        Связывание маршрутов с методами handler_class (один раз при старте):
+        запрос вызывает route.target без поиска метода по имени.
+        Отсутствующий метод — AttributeError сразу, а не 404 на запросе.
+        """
+        for route in self._routes:
+            route.target = getattr(handler_class, route.handler)
+        return self
+
+    def lookup(self, path, method):
+        """Маршрут и параметры для пути и метода: (route, params) или (None, None)."""
+        route = self._static.get((method, path))
+        if route is not None:
+            return route, dict(route.context)
+        found = self._search(self._tree, path.split('/'), 0, method, [])
+        if found is None:
+            return None, None
+        route, values = found
+        return route, route.build_params(values)
+
+    def _search(self, node, parts, i, method, values):
+        """Обход дерева: точный сегмент, затем параметр (непустой сегмент)."""
+        if i == len(parts):
+            for route in node.routes:
+                if method in route.methods:
+                    return route, values
+            return None
+        child = node.children.get(parts[i])
+        if child is not None:
+            found = self._search(child, parts, i + 1, method, values)
+            if found is not None:
+                return found
+        if node.param is not None and parts[i]:
+            return self._search(node.param, parts, i + 1, method, values + [parts[i]])
+        return None
+
+    def allowed_methods(self, path):
+        """Методы, для которых путь найдётся (для 405 и заголовка Allow)."""
+        methods = set(self._static_methods.get(path, ()))
+        self._collect_methods(self._tree, path.split('/'), 0, methods)
+        return sorted(methods)
+
+    def _collect_methods(self, node, parts, i, methods):
+        if i == len(parts):
+            for route in node.routes:
+                methods.update(route.methods)
+            return
+        child = node.children.get(parts[i])
+        if child is not None:
+            self._collect_methods(child, parts, i + 1, methods)
+        if node.param is not None and parts[i]:
+            self._collect_methods(node.param, parts, i + 1, methods)
+
     def resolve(self, path, method):
         """
         Поиск обработчика для пути и метода.
         Возвращает (handler, params, auth_required) или (None, None, None).
         """
-        for route in self._routes:
-            params = route.match(path, method)
-            if params is not None:
-                return route.handler, params, route.auth_required
-        return None, None, None
+        route, params = self.lookup(path, method)
+        if route is None:
+            return None, None, None
+        return route.handler, params, route.auth_required
 
 
 def create_api_router():
@@ -95,6 +190,28 @@ def create_api_router():
     router.get('/api/stats', 'handle_get_stats')
     router.post('/api/stats/visit', 'handle_record_visit')
 
+    # Метрики хранилища (для админа)
+    router.get('/api/metrics', 'handle_get_metrics', auth_required=True)
+
+    # Журнал изменений (для синхронизации админки)
+    router.get('/api/changes', 'handle_get_changes', auth_required=True)
+
+    # Server-Sent Events: EventSource не шлёт заголовки, поэтому подписка
+    # по одноразовому билету из POST /api/events/ticket (проверяет handler)
+    router.get('/api/events', 'handle_events')
+    router.post('/api/events/ticket', 'handle_events_ticket', auth_required=True)
+
+    # Резервные копии БД
+    router.get('/api/backups', 'handle_get_backups', auth_required=True)
+    router.post('/api/backups', 'handle_create_backup', auth_required=True)
+
+    # Потоковый NDJSON экспорт/импорт списков (resource — имя из RESOURCE_MAP)
+    router.get('/api/export/{resource}', 'handle_export', auth_required=True)
+    router.post('/api/import/{resource}', 'handle_import', auth_required=True)
+
+    # Атомарная запись нескольких ресурсов
+    router.post('/api/batch', 'handle_batch', auth_required=True)
+
     # Generic CRUD ресурсы (маппинг в handler.py RESOURCE_MAP)
     generic_resources = [
         ('masters', '/api/masters'),
@@ -110,16 +227,26 @@ def create_api_router():
         router.get(path, 'handle_generic_get', context=ctx)
         router.post(path, 'handle_generic_save', auth_required=True, context=ctx)
         router.put(path, 'handle_generic_save', auth_required=True, context=ctx)
+        router.patch(path, 'handle_generic_patch', auth_required=True, context=ctx)
+        # Порядок услуг вложен в категории — для них PATCH
+        if resource != 'services':
+            router.post(path + '/reorder', 'handle_generic_reorder', auth_required=True, context=ctx)
 
     # Кастомные endpoints
     router.get('/api/legal/{slug}', 'handle_get_legal_document')
+    router.get('/api/articles/{id}', 'handle_get_article')
 
     # Shop products — кастомный GET (фильтрация), generic SAVE
     router.get('/api/shop/products', 'handle_get_products')
+    router.get('/api/shop/facets', 'handle_get_facets')
     router.get('/api/shop/products/{id}', 'handle_get_product')
     ctx_products = {'resource': 'shop-products'}
     router.post('/api/shop/products', 'handle_generic_save', auth_required=True, context=ctx_products)
     router.put('/api/shop/products', 'handle_generic_save', auth_required=True, context=ctx_products)
+    router.patch('/api/shop/products', 'handle_generic_patch', auth_required=True, context=ctx_products)
+    router.post('/api/shop/products/reorder', 'handle_generic_reorder', auth_required=True, context=ctx_products)
+    router.post('/api/shop/products/import', 'handle_import_products_csv', auth_required=True)
+    router.get('/api/shop/products/import', 'handle_get_products_import', auth_required=True)
 
     # Upload
     router.post('/api/upload', 'handle_upload', auth_required=True)
@@ -0,0 +1,200 @@
+"""
+Очистка HTML статей и описаний по белому списку.
+Один проход токенизатора слева направо: теги и атрибуты вне списка
+отбрасываются, содержимое опасных контейнеров (script, svg, …)
+пропускается целиком. Каждый символ просматривается ограниченное число
+раз, поэтому время линейно по длине текста — и у каскада регулярных
+выражений с .*?, и у html.parser на незакрытых тегах оно квадратичное.
+Белый список — как у DOMPurify на сайте (src/js/site/sanitizer.js)
+плюс font из редактора админки.
+"""
+
+import html
+import re
+
+ALLOWED_TAGS = frozenset({
+    'p', 'br', 'strong', 'b', 'em', 'i', 'u', 's', 'strike',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'li', 'blockquote', 'pre', 'code',
+    'a', 'img', 'div', 'span', 'font', 'table', 'thead', 'tbody', 'tr', 'th', 'td',
+})
+
+ALLOWED_ATTRS = frozenset({
+    'href', 'src', 'alt', 'title', 'target', 'rel', 'class', 'id', 'style',
+    'width', 'height', 'color',
+})
+
+# Теги, которые удаляются вместе с содержимым
+DROP_CONTENT_TAGS = frozenset({
+    'script', 'style', 'iframe', 'object', 'embed', 'svg', 'math', 'template',
+    'noscript', 'noembed', 'noframes', 'frameset', 'frame', 'applet', 'textarea',
+    'select', 'title', 'head', 'xmp',
+})
+
+# Содержимое этих тегов браузер не разбирает как разметку — до </tag
+RAW_TEXT_TAGS = frozenset({
+    'script', 'style', 'iframe', 'noembed', 'noframes', 'textarea', 'title', 'xmp',
+})
+
+VOID_TAGS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'frame', 'hr', 'img', 'input', 'link',
+    'meta', 'param', 'source', 'track', 'wbr',
+})
+
+URL_ATTRS = frozenset({'href', 'src'})
+SAFE_URL_SCHEMES = frozenset({'http', 'https', 'mailto', 'tel'})
+
+_TAG_NAME_RE = re.compile(r'[a-zA-Z][^\s/>]*')
+# Пробелы и '/' между атрибутами; атрибут: имя, затем необязательное
+# значение. Незакрытая кавычка дочитывает значение до конца текста.
+_ATTR_GAP_RE = re.compile(r'[\s/]*')
+_ATTR_RE = re.compile(
+    r'''([^\s/>][^\s/>=]*)(?:\s*=\s*("[^"]*"?|'[^']*'?|[^\s>]*))?'''
+)
+_RAW_TEXT_END_RE = {tag: re.compile(r'</%s' % tag, re.IGNORECASE) for tag in RAW_TEXT_TAGS}
+
+# Браузер игнорирует пробелы и управляющие символы внутри схемы: "java\tscript:"
+_URL_IGNORED_RE = re.compile(r'[\x00-\x20\x7f]+')
+_URL_SCHEME_RE = re.compile(r'([a-z][a-z0-9+.\-]*):', re.IGNORECASE)
+_UNSAFE_STYLE_RE = re.compile(r'expression|javascript:|vbscript:|url\s*\(|@import|behavior',
+                              re.IGNORECASE)
+
+
+def is_safe_url(value):
+    """Ссылка без схемы (относительная) или со схемой из SAFE_URL_SCHEMES."""
+    match = _URL_SCHEME_RE.match(_URL_IGNORED_RE.sub('', value))
+    return match is None or match.group(1).lower() in SAFE_URL_SCHEMES
+
+
+def _escape_text(text):
+    """Текст между тегами: сущности раскрываются и экранируются заново."""
+    return html.escape(html.unescape(text), quote=False)
+
+
+def _safe_attr(name, raw):
+    """' name="value"' для разрешённого атрибута или '' для отброшенного."""
+    if name not in ALLOWED_ATTRS:
+        return ''
+    if raw is None:
+        return ' ' + name
+    if raw[:1] in ('"', "'"):
+        raw = raw[1:-1] if len(raw) > 1 and raw[-1] == raw[0] else raw[1:]
+    value = html.unescape(raw)
+    if name in URL_ATTRS and not is_safe_url(value):
+        return ''
+    if name == 'style' and _UNSAFE_STYLE_RE.search(value):
+        return ''
+    return ' %s="%s"' % (name, html.escape(value, quote=True))
+
+
+def _scan_tag(text, pos):
+    """
+    Разбор открывающего тега с '<' в позиции pos.
+    Возвращает (имя, атрибуты, самозакрывающийся, позиция после '>')
+    или None, если тег не закрыт до конца текста.
+    """
+    name_match = _TAG_NAME_RE.match(text, pos + 1)
+    tag = name_match.group().lower()
+    attrs = []
+    i = name_match.end()
+    end = len(text)
+    while True:
+        i = _ATTR_GAP_RE.match(text, i).end()
+        if i >= end:
+            return None
+        if text[i] == '>':
+            return tag, attrs, text[i - 1] == '/', i + 1
+        attr = _ATTR_RE.match(text, i)
+        attrs.append((attr.group(1).lower(), attr.group(2)))
+        i = attr.end()
+
+
+def sanitize_html(text):
+    """
+    HTML только из разрешённых тегов и атрибутов. Текст переэкранируется:
+    именованные сущности вроде &nbsp; становятся символами.
+    Незакрытые тег или комментарий в конце текста отбрасываются.
+    """
+    if '<' not in text and '&' not in text and '>' not in text:
+        return text
+    out = []
+    # Открытый тег из DROP_CONTENT_TAGS и глубина вложенных одноимённых
+    skip_tag = None
+    skip_depth = 0
+    pos = 0
+    end = len(text)
+
+    while pos < end:
+        lt = text.find('<', pos)
+        if lt < 0:
+            lt = end
+        if lt > pos and skip_tag is None:
+            out.append(_escape_text(text[pos:lt]))
+        if lt >= end:
+            break
+        nxt = text[lt + 1:lt + 2]
+
+        if text.startswith('<!--', lt):
+            close = text.find('-->', lt + 4)
+            pos = end if close < 0 else close + 3
+            continue
+
+        if nxt in ('!', '?'):
+            # <!DOCTYPE>, <![CDATA[...]]>, <?...?>
+            close = text.find('>', lt)
+            pos = end if close < 0 else close + 1
+            continue
+
+        if nxt == '/' and _TAG_NAME_RE.match(text, lt + 2):
+            close = text.find('>', lt)
+            if close < 0:
+                break
+            tag = _TAG_NAME_RE.match(text, lt + 2).group().lower()
+            pos = close + 1
+            if skip_tag is not None:
+                if tag == skip_tag:
+                    skip_depth -= 1
+                    if not skip_depth:
+                        skip_tag = None
+            elif tag in ALLOWED_TAGS and tag not in VOID_TAGS:
+                out.append('</%s>' % tag)
+            continue
+
+        if not nxt.isascii() or not nxt.isalpha():
+            # Одиночный '<' — это текст
+            if skip_tag is None:
+                out.append('&lt;')
+            pos = lt + 1
+            continue
+
+        scanned = _scan_tag(text, lt)
+        if scanned is None:
+            break
+        tag, attrs, self_closing, pos = scanned
+
+        if skip_tag is not None:
+            if tag == skip_tag and not self_closing:
+                skip_depth += 1
+            continue
+
+        if tag in RAW_TEXT_TAGS:
+            if not self_closing:
+                close = _RAW_TEXT_END_RE[tag].search(text, pos)
+                if close is None:
+                    break
+                gt = text.find('>', close.end())
+                pos = end if gt < 0 else gt + 1
+            continue
+
+        if tag in DROP_CONTENT_TAGS:
+            if not self_closing and tag not in VOID_TAGS:
+                skip_tag = tag
+                skip_depth = 1
+            continue
+
+        if tag in ALLOWED_TAGS:
+            out.append('<%s%s%s>' % (
+                tag, ''.join(_safe_attr(name, raw) for name, raw in attrs),
+                ' /' if self_closing else '',
+            ))
+
+    return ''.join(out)
@@ -0,0 +1,184 @@
+"""
+Полнотекстовый поиск товаров (SQLite FTS5).
+Нормализация текста, построение FTS-запросов и нечёткий поиск по триграммам.
+"""
+
+import html
+import json
+import re
+import sqlite3
+
+# rowid строк товара в обеих FTS-таблицах. product_id там UNINDEXED:
+# поиск по нему — полный проход таблицы, по этой таблице — индекс
+SEARCH_IDS_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS products_search_ids ("
+    "fts_rowid INTEGER PRIMARY KEY, product_id TEXT NOT NULL UNIQUE)"
+)
+
+# Токенизатор trigram появился в SQLite 3.34. На более старой версии
+# триграммной таблицы нет, нечёткий поиск идёт полным проходом товаров
+HAS_TRIGRAM = sqlite3.sqlite_version_info >= (3, 34, 0)
+
+
+def create_trigram_table(conn):
+    """Триграммная таблица, если SQLite её поддерживает."""
+    if HAS_TRIGRAM:
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS products_trigram USING fts5("
+            "product_id UNINDEXED, text, tokenize = 'trigram')"
+        )
+
+
+# Две FTS5-таблицы: словная (ранжирование bm25, префиксы, сниппеты)
+# и триграммная (запасной вариант для запросов с опечатками)
+FTS_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+    "product_id UNINDEXED, name, description, "
+    "tokenize = 'unicode61 remove_diacritics 2')",
+    # Вес названия в 10 раз выше описания
+    "INSERT INTO products_fts(products_fts, rank) VALUES ('rank', 'bm25(0.0, 10.0, 1.0)')",
+    create_trigram_table,
+    SEARCH_IDS_SCHEMA,
+]
+
+# Маркеры подсветки: не встречаются в тексте, заменяются на <mark> после экранирования
+HL_START = '\x02'
+HL_END = '\x03'
+
+MIN_TRIGRAM_SHARE = 0.5
+
+_TAG_RE = re.compile(r'<[^>]*>')
+_SPACE_RE = re.compile(r'\s+')
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def normalize_text(text):
+    """Текст для индекса: без HTML-тегов и сущностей, ё → е."""
+    if not text:
+        return ''
+    text = html.unescape(_TAG_RE.sub(' ', str(text)))
+    text = text.replace('ё', 'е').replace('Ё', 'Е')
+    text = text.replace(HL_START, '').replace(HL_END, '')
+    return _SPACE_RE.sub(' ', text).strip()
+
+
+def query_terms(query):
+    """Слова запроса в нижнем регистре (ё → е)."""
+    return _WORD_RE.findall(normalize_text(query).lower())
+
+
+def build_match_query(query):
+    """
+    FTS5-выражение: все слова обязательны, последнее — префиксом.
+    Каждое слово в кавычках, поэтому синтаксис FTS5 из ввода не исполняется.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return None
+    parts = ['"%s"' % t for t in terms[:-1]]
+    parts.append('"%s"*' % terms[-1])
+    return ' '.join(parts)
+
+
+def trigrams(query):
+    """Уникальные триграммы слов запроса (слова короче 3 символов пропускаются)."""
+    grams = []
+    for term in query_terms(query):
+        for i in range(len(term) - 2):
+            gram = term[i:i + 3]
+            if gram not in grams:
+                grams.append(gram)
+    return grams
+
+
+def build_trigram_query(grams):
+    """FTS5-выражение для триграммной таблицы: любая из триграмм."""
+    return ' OR '.join('"%s"' % g for g in grams)
+
+
+def trigram_share(grams, text):
+    """Доля триграмм запроса, встречающихся в тексте."""
+    if not grams:
+        return 0.0
+    text = text.lower()
+    return sum(1 for g in grams if g in text) / len(grams)
+
+
+def render_highlight(snippet):
+    """Сниппет FTS5 → безопасный HTML с <mark>."""
+    if not snippet:
+        return ''
+    return html.escape(snippet).replace(HL_START, '<mark>').replace(HL_END, '</mark>')
+
+
+def fuzzy_text(product):
+    """Текст товара для нечёткого поиска: название и описание."""
+    return (normalize_text(product.get('name', '')) + ' '
+            + normalize_text(product.get('description', '')))
+
+
+def index_rows(product, rowid):
+    """Строки для products_fts и products_trigram."""
+    product_id = product.get('id', '')
+    name = normalize_text(product.get('name', ''))
+    description = normalize_text(product.get('description', ''))
+    return (rowid, product_id, name, description), (rowid, product_id, name + ' ' + description)
+
+
+def reindex_products(conn, products):
+    """Полная перестройка поискового индекса."""
+    conn.execute('DELETE FROM products_fts')
+    if HAS_TRIGRAM:
+        conn.execute('DELETE FROM products_trigram')
+    conn.execute('DELETE FROM products_search_ids')
+    index_products(conn, products)
+
+
+def index_products(conn, products):
+    """
+    Добавление товаров в поисковый индекс (товаров, которых в нём нет).
+    rowid выдаются по возрастанию: FTS5 пишет такие вставки без сброса
+    буфера на каждой строке.
+    """
+    # Повтор id в списке — индексируется последняя версия
+    products = list({str(p.get('id', '')): p for p in products}.items())
+    if not products:
+        return
+    start = conn.execute(
+        'SELECT COALESCE(MAX(fts_rowid), 0) + 1 FROM products_search_ids'
+    ).fetchone()[0]
+    fts_rows = []
+    trigram_rows = []
+    for rowid, (_, product) in enumerate(products, start):
+        fts_row, trigram_row = index_rows(product, rowid)
+        fts_rows.append(fts_row)
+        trigram_rows.append(trigram_row)
+    conn.executemany(
+        'INSERT INTO products_search_ids (fts_rowid, product_id) VALUES (?, ?)',
+        [(rowid, product_id) for rowid, (product_id, _) in enumerate(products, start)]
+    )
+    conn.executemany(
+        'INSERT INTO products_fts (rowid, product_id, name, description) VALUES (?, ?, ?, ?)',
+        fts_rows
+    )
+    if HAS_TRIGRAM:
+        conn.executemany(
+            'INSERT INTO products_trigram (rowid, product_id, text) VALUES (?, ?, ?)',
+            trigram_rows
+        )
+
+
+def remove_products(conn, product_ids):
+    """Удаление товаров из поискового индекса."""
+    # SELECT и DELETE, а не DELETE ... RETURNING: RETURNING есть только с SQLite 3.35
+    ids = json.dumps([str(product_id) for product_id in product_ids])
+    where = 'WHERE product_id IN (SELECT value FROM json_each(?))'
+    rowids = [(r[0],) for r in conn.execute(
+        'SELECT fts_rowid FROM products_search_ids ' + where, (ids,)
+    )]
+    if not rowids:
+        return
+    conn.execute('DELETE FROM products_search_ids ' + where, (ids,))
+    conn.executemany('DELETE FROM products_fts WHERE rowid = ?', rowids)
+    if HAS_TRIGRAM:
+        conn.executemany('DELETE FROM products_trigram WHERE rowid = ?', rowids)
@@ -3,8 +3,11 @@
 Содержит схемы валидации и вспомогательные функции.
 """
 
+import math
 import re
 
+from .sanitizer import sanitize_html
+
 
 # ID prefixes for different entity types
 ID_PREFIXES = {
@@ -17,14 +20,16 @@ ID_PREFIXES = {
     'service': ''  # Services use numeric IDs
 }
 
+_SLUG_RE = re.compile(r'^[a-z0-9]+(?:-[a-z0-9]+)*$')
+_ID_RE = re.compile(r'^[a-z]+_[0-9]+(_[a-z0-9]+)?$')
+_HTML_CHARS_RE = re.compile(r'<|>|&lt;|&gt;|javascript:|data:|vbscript:')
+
 
 def contains_html_chars(text):
     """Проверка наличия HTML символов в тексте."""
     if not isinstance(text, str):
         return True
-    dangerous_patterns = ['<', '>', '&lt;', '&gt;', 'javascript:', 'data:', 'vbscript:']
-    text_lower = text.lower()
-    return any(pattern in text_lower for pattern in dangerous_patterns)
+    return _HTML_CHARS_RE.search(text.lower()) is not None
 
 
 def is_valid_slug(slug):
@@ -33,7 +38,7 @@ def is_valid_slug(slug):
         return False
     if len(slug) > 100:
         return False
-    return bool(re.match(r'^[a-z0-9]+(?:-[a-z0-9]+)*$', slug))
+    return bool(_SLUG_RE.match(slug))
 
 
 def is_valid_id(id_value, entity_type):
@@ -59,7 +64,7 @@ def is_valid_id(id_value, entity_type):
         return False
 
     # Check format: only alphanumeric and underscores allowed
-    if not re.match(r'^[a-z]+_[0-9]+(_[a-z0-9]+)?$', id_value):
+    if not _ID_RE.match(id_value):
         return False
 
     return True
@@ -106,115 +111,165 @@ def validate_image_bytes(image_bytes):
 
 def sanitize_html_content(text):
     """
-    Простая санитизация HTML контента.
-    Удаляет опасные теги и атрибуты.
+    Санитизация HTML контента: разрешённые теги и атрибуты
+    (см. sanitizer.sanitize_html), за один проход по тексту.
     """
     if not text:
         return text
+    return sanitize_html(text)
 
-    # Удаляем script теги
-    text = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.IGNORECASE | re.DOTALL)
-    # Удаляем style теги
-    text = re.sub(r'<style[^>]*>.*?</style>', '', text, flags=re.IGNORECASE | re.DOTALL)
-    # Удаляем iframe
-    text = re.sub(r'<iframe[^>]*>.*?</iframe>', '', text, flags=re.IGNORECASE | re.DOTALL)
-    # Удаляем object/embed
-    text = re.sub(r'<object[^>]*>.*?</object>', '', text, flags=re.IGNORECASE | re.DOTALL)
-    text = re.sub(r'<embed[^>]*/?>', '', text, flags=re.IGNORECASE)
-    # Удаляем svg теги
-    text = re.sub(r'<svg[^>]*>.*?</svg>', '', text, flags=re.IGNORECASE | re.DOTALL)
-    # Удаляем math теги
-    text = re.sub(r'<math[^>]*>.*?</math>', '', text, flags=re.IGNORECASE | re.DOTALL)
-    # Удаляем base теги
-    text = re.sub(r'<base[^>]*/?>', '', text, flags=re.IGNORECASE)
-    # Удаляем опасные атрибуты
-    text = re.sub(r'\s+on\w+\s*=\s*["\'][^"\']*["\']', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'\s+on\w+\s*=\s*\S+', '', text, flags=re.IGNORECASE)
-    # Удаляем javascript: в href/src
-    text = re.sub(r'(href|src)\s*=\s*["\']?\s*javascript:[^"\'>\s]*', r'\1=""', text, flags=re.IGNORECASE)
-    text = re.sub(r'(href|src)\s*=\s*["\']?\s*data:[^"\'>\s]*', r'\1=""', text, flags=re.IGNORECASE)
-
-    return text
+
+# type схемы → (допустимые типы, шаблон ошибки)
+_FIELD_TYPES = {
+    'string': (str, "Invalid {} type"),
+    'number': ((int, float), "Invalid {}"),
+    'list': (list, "Invalid {} type"),
+}
+
+
+def _field_source(n, field, rules, namespace):
+    """
+    Строки кода проверок поля n — только по заданным правилам и в порядке
+    прежнего интерпретатора схем. Значения правил кладутся в namespace.
+    """
+    lines = []
+
+    def fail(condition, error, indent=''):
+        lines.append('%sif %s:' % (indent, condition))
+        lines.append('%s    return False, %r' % (indent, error))
+
+    field_type = rules.get('type')
+    # Для type='string' проверки isinstance(value, str) ниже лишние
+    is_string = field_type == 'string'
+    if field_type in _FIELD_TYPES:
+        types, template = _FIELD_TYPES[field_type]
+        namespace['types_%d' % n] = types
+        fail('not isinstance(value, types_%d)' % n, template.format(field))
+
+    max_length = rules.get('max_length')
+    if max_length:
+        fail('%slen(value) > %d' % ('' if is_string else 'isinstance(value, str) and ', max_length),
+             f"{field.capitalize()} too long")
+
+    # Строки и списки прошли проверку типа — числом значение быть не может
+    if field_type not in ('string', 'list'):
+        indent = ''
+        if field_type != 'number':
+            lines.append('if isinstance(value, (int, float)):')
+            indent = '    '
+        for rule, operator in (('min', '<'), ('max', '>')):
+            if rules.get(rule) is not None:
+                namespace['%s_%d' % (rule, n)] = rules[rule]
+                fail('value %s %s_%d' % (operator, rule, n), f"Invalid {field}", indent)
+        # Infinity и NaN
+        fail('isinstance(value, float) and not isfinite(value)', f"Invalid {field} value", indent)
+
+    allowed = rules.get('allowed')
+    if allowed:
+        namespace['allowed_%d' % n] = allowed
+        fail('value not in allowed_%d' % n,
+             f"Invalid {field}. Must be one of: {', '.join(map(str, allowed))}")
+
+    if rules.get('no_html', False):
+        fail('%scontains_html_chars(value)' % ('' if is_string else 'isinstance(value, str) and '),
+             f"Invalid characters in {field}")
+
+    if rules.get('sanitize', False):
+        if not is_string:
+            lines.append('if isinstance(value, str):')
+        lines.append('%sdata[field_%d] = sanitize_html_content(value)' % ('' if is_string else '    ', n))
+
+    id_type = rules.get('id_type')
+    if id_type == 'service':
+        namespace['id_type_%d' % n] = id_type
+        fail('not is_valid_id(value, id_type_%d)' % n, "Invalid ID format")
+    elif id_type:
+        # is_valid_id без поиска префикса по словарю
+        namespace['id_prefix_%d' % n] = ID_PREFIXES.get(id_type, '')
+        fail('not (isinstance(value, str) and value.startswith(id_prefix_%d) '
+             'and id_match(value))' % n, "Invalid ID format")
+
+    if rules.get('slug', False):
+        fail('not is_valid_slug(value)', "Invalid slug format")
+
+    return lines
+
+
+def compile_schema(schema):
+    """
+    Функция validate(data) → (is_valid, error) для схемы. Правила полей
+    разбираются один раз и превращаются в код, где есть только заданные
+    проверки; результат и тексты ошибок — как у прежнего разбора схемы
+    на каждом элементе.
+    """
+    namespace = {
+        'contains_html_chars': contains_html_chars,
+        'sanitize_html_content': sanitize_html_content,
+        'is_valid_id': is_valid_id,
+        'is_valid_slug': is_valid_slug,
+        'isfinite': math.isfinite,
+        'id_match': _ID_RE.match,
+    }
+    lines = [
+        'def validate(data):',
+        '    if not isinstance(data, dict):',
+        '        return False, "Invalid data format"',
+        '    get = data.get',
+    ]
+    for n, (field, rules) in enumerate(schema.items()):
+        namespace['field_%d' % n] = field
+        checks = _field_source(n, field, rules, namespace)
+        lines.append('    value = get(field_%d)' % n)
+        if rules.get('required', False):
+            lines.append('    if not value:')
+            lines.append('        return False, %r' % f"Invalid or missing {field}")
+            lines.extend('    ' + line for line in checks)
+        elif checks:
+            # Пустое необязательное поле не проверяется
+            lines.append('    if value:')
+            lines.extend('        ' + line for line in checks)
+    lines.append('    return True, None')
+    exec(compile('\n'.join(lines), '<schema>', 'exec'), namespace)
+    return namespace['validate']
 
 
 class SchemaValidator:
     """Декларативный валидатор на основе схем."""
 
-    @staticmethod
-    def validate(data, schema):
+    # id(schema) → (schema, validate); схема не меняется после первой проверки
+    _compiled = {}
+    _MAX_COMPILED = 64
+
+    @classmethod
+    def compiled(cls, schema):
+        """Скомпилированная проверка схемы (compile_schema), с кэшем."""
+        entry = cls._compiled.get(id(schema))
+        if entry is None or entry[0] is not schema:
+            if len(cls._compiled) >= cls._MAX_COMPILED:
+                cls._compiled.clear()
+            entry = (schema, compile_schema(schema))
+            cls._compiled[id(schema)] = entry
+        return entry[1]
+
+    @classmethod
+    def validate(cls, data, schema):
         """
         Валидирует данные по схеме.
         Возвращает (is_valid, error_message или None).
         """
-        if not isinstance(data, dict):
-            return False, "Invalid data format"
-
-        for field, rules in schema.items():
-            value = data.get(field)
-            required = rules.get('required', False)
-            field_type = rules.get('type')
-            max_length = rules.get('max_length')
-            min_value = rules.get('min')
-            max_value = rules.get('max')
-            allowed = rules.get('allowed')
-            no_html = rules.get('no_html', False)
-            sanitize = rules.get('sanitize', False)
-            id_type = rules.get('id_type')
-            slug = rules.get('slug', False)
-
-            # Required check
-            if required and not value:
-                return False, f"Invalid or missing {field}"
-
-            # Skip further validation if value is empty and not required
-            if not value:
-                continue
-
-            # Type check
-            if field_type:
-                if field_type == 'string' and not isinstance(value, str):
-                    return False, f"Invalid {field} type"
-                elif field_type == 'number' and not isinstance(value, (int, float)):
-                    return False, f"Invalid {field}"
-                elif field_type == 'list' and not isinstance(value, list):
-                    return False, f"Invalid {field} type"
-
-            # Max length check
-            if max_length and isinstance(value, str) and len(value) > max_length:
-                return False, f"{field.capitalize()} too long"
-
-            # Number range check
-            if isinstance(value, (int, float)):
-                if min_value is not None and value < min_value:
-                    return False, f"Invalid {field}"
-                if max_value is not None and value > max_value:
-                    return False, f"Invalid {field}"
-                # Check for Infinity and NaN
-                if isinstance(value, float):
-                    if value != value or value == float('inf') or value == float('-inf'):
-                        return False, f"Invalid {field} value"
-
-            # Allowed values check
-            if allowed and value not in allowed:
-                return False, f"Invalid {field}. Must be one of: {', '.join(map(str, allowed))}"
-
-            # HTML check
-            if no_html and isinstance(value, str) and contains_html_chars(value):
-                return False, f"Invalid characters in {field}"
-
-            # Sanitize HTML
-            if sanitize and isinstance(value, str):
-                data[field] = sanitize_html_content(value)
-
-            # ID validation
-            if id_type and not is_valid_id(value, id_type):
-                return False, "Invalid ID format"
-
-            # Slug validation
-            if slug and not is_valid_slug(value):
-                return False, "Invalid slug format"
-
-        return True, None
+        return cls.compiled(schema)(data)
+
+    @classmethod
+    def validate_many(cls, items, schema):
+        """
+        Проверка списка элементов одним вызовом: (индекс, ошибка) для каждого
+        некорректного элемента, лениво — next() даёт первую ошибку.
+        """
+        validate = cls.compiled(schema)
+        for index, item in enumerate(items):
+            is_valid, error = validate(item)
+            if not is_valid:
+                yield index, error
 
 
 # Схемы валидации для каждого типа сущности
@@ -251,7 +306,9 @@ PRODUCT_SCHEMA = {
     'status': {'allowed': ['active', 'inactive', 'draft']},
     'price': {'type': 'number', 'min': 0, 'max': 10000000},
     'categoryId': {'id_type': 'category'},
-    'description': {'type': 'string', 'max_length': 10000, 'sanitize': True}
+    'description': {'type': 'string', 'max_length': 10000, 'sanitize': True},
+    'slug': {'slug': True},
+    'sku': {'type': 'string', 'max_length': 64, 'no_html': True}
 }
 
 CATEGORY_SCHEMA = {
@@ -781,13 +781,13 @@ var AdminAPI = (function () {
     // =================================================================
 
     /**
-     * GET запрос
+     * GET запрос. С токеном сервер отдаёт и неактивные элементы/черновики
      * @param {string} endpoint - API эндпоинт
      * @returns {Promise<Object|null>} Данные или null при ошибке
      */
     async function get(endpoint) {
         try {
-            var response = await fetch('/api/' + endpoint);
+            var response = await fetch('/api/' + endpoint, { headers: getAuthHeaders() });
             if (!response.ok) throw new Error('HTTP ' + response.status);
             return response.json();
         } catch (error) {
@@ -821,6 +821,57 @@ var AdminAPI = (function () {
         }
     }
 
+    /**
+     * PATCH запрос (требует авторизации): JSON Patch — только изменённые строки
+     * @param {string} endpoint - API эндпоинт
+     * @param {Array} operations - Операции RFC 6902
+     * @returns {Promise<Object>} Ответ сервера
+     * @throws {Error} При ошибке запроса
+     */
+    async function patch(endpoint, operations) {
+        try {
+            var headers = getAuthHeaders();
+            headers['Content-Type'] = 'application/json-patch+json';
+            var response = await fetch('/api/' + endpoint, {
+                method: 'PATCH',
+                headers: headers,
+                body: JSON.stringify(operations)
+            });
+
+            checkUnauthorized(response);
+            await handleHttpError(response);
+
+            return response.json();
+        } catch (error) {
+            console.error('API PATCH ' + endpoint + ' error:', error);
+            throw error;
+        }
+    }
+
+    /**
+     * Новый порядок элементов списка: только id, без самих элементов
+     * @param {string} endpoint - API эндпоинт ресурса (masters, faq, shop/products...)
+     * @param {Array} ids - ID элементов в новом порядке
+     * @returns {Promise<Object>} Ответ сервера
+     * @throws {Error} При ошибке запроса
+     */
+    function reorder(endpoint, ids) {
+        return save(endpoint + '/reorder', { ids: ids });
+    }
+
+    /**
+     * Атомарное сохранение нескольких ресурсов одним запросом (одна транзакция)
+     * @param {Object} documents - Данные по ресурсам: { 'shop-categories': {...}, 'shop-products': {...} }
+     * @returns {Promise<Object>} Ответ сервера (changed — изменившиеся ресурсы)
+     * @throws {Error} При ошибке запроса
+     */
+    function batch(documents) {
+        var writes = Object.keys(documents).map(function (resource) {
+            return { resource: resource, data: documents[resource] };
+        });
+        return save('batch', { writes: writes });
+    }
+
     /**
      * Загрузка изображения (base64)
      * @param {string} imageData - Base64 данные изображения
@@ -969,6 +1020,35 @@ var AdminAPI = (function () {
         };
     }
 
+    /**
+     * Журнал изменений после seq (без since — только текущий seq)
+     * @param {number} [since] - Последний применённый seq
+     * @returns {Promise<Object|null>} {changes, seq, reset, more} или null при ошибке
+     */
+    function getChanges(since) {
+        return get(typeof since === 'number' ? 'changes?since=' + since : 'changes');
+    }
+
+    /**
+     * Одноразовый билет для подписки на /api/events
+     * @returns {Promise<string|null>} Билет или null при ошибке
+     */
+    async function getEventsTicket() {
+        try {
+            var response = await fetch('/api/events/ticket', {
+                method: 'POST',
+                headers: getAuthHeaders()
+            });
+            checkUnauthorized(response);
+            await handleHttpError(response);
+            var data = await response.json();
+            return data.ticket;
+        } catch (error) {
+            console.error('API events ticket error:', error);
+            return null;
+        }
+    }
+
     // Публичный API
     return {
         // Token management
@@ -978,6 +1058,9 @@ var AdminAPI = (function () {
         // HTTP methods
         get: get,
         save: save,
+        patch: patch,
+        reorder: reorder,
+        batch: batch,
         upload: upload,
         deleteFile: deleteFile,
 
@@ -987,7 +1070,9 @@ var AdminAPI = (function () {
         checkAuth: checkAuth,
 
         // Data
-        loadAllData: loadAllData
+        loadAllData: loadAllData,
+        getChanges: getChanges,
+        getEventsTicket: getEventsTicket
     };
 })();
 
@@ -4348,11 +4433,12 @@ var BaseRenderer = (function () {
             item.order = index;
         });
 
-        // Формируем данные для API
-        var data = {};
-        data[entityName] = reordered;
+        // На сервер уходят только id в новом порядке
+        var ids = reordered.map(function (item) {
+            return item.id;
+        });
 
-        return AdminAPI.save(entityName, data)
+        return AdminAPI.reorder(entityName, ids)
             .then(function () {
                 setItems(reordered);
                 if (window.showToast) {
@@ -4539,6 +4625,27 @@ var AdminStatsRenderer = (function () {
         }
     }
 
+    /**
+     * Обновление счётчиков из события visits (без графика и секций)
+     * @param {Object} counters - total_views, today_views, week_views, unique_visitors
+     */
+    function renderCounters(counters) {
+        if (!counters) return;
+
+        var fields = {
+            totalViews: 'total_views',
+            todayViews: 'today_views',
+            weekViews: 'week_views',
+            uniqueVisitors: 'unique_visitors'
+        };
+        Object.keys(fields).forEach(function (name) {
+            var value = counters[fields[name]];
+            if (elements[name] && typeof value === 'number') {
+                elements[name].textContent = formatNumber(value);
+            }
+        });
+    }
+
     /**
      * Рендеринг топ секций
      */
@@ -4773,7 +4880,8 @@ var AdminStatsRenderer = (function () {
     // Публичный API
     return {
         init: init,
-        render: render
+        render: render,
+        renderCounters: renderCounters
     };
 })();
 
@@ -4836,7 +4944,9 @@ var AdminMastersRenderer = (function () {
         });
 
         // Сохраняем
-        AdminAPI.save('masters', { masters: reordered })
+        AdminAPI.reorder('masters', reordered.map(function (master) {
+            return master.id;
+        }))
             .then(function () {
                 AdminState.setMasters(reordered);
                 if (window.showToast) {
@@ -5037,7 +5147,12 @@ var AdminServicesRenderer = (function () {
 
         services.categories[categoryIndex].services = reordered;
 
-        AdminAPI.save('services', services)
+        // Только список услуг категории, а не весь документ
+        var path = '/categories/' + categoryIndex;
+        AdminAPI.patch('services', [
+            { op: 'test', path: path + '/id', value: currentCategory },
+            { op: 'replace', path: path + '/services', value: reordered }
+        ])
             .then(function () {
                 AdminState.setServices(services);
                 if (window.showToast) {
@@ -5061,9 +5176,10 @@ var AdminServicesRenderer = (function () {
 
         if (!services.podology || !services.podology.categories) return;
 
-        var category = services.podology.categories.find(function (c) {
+        var categoryIndex = services.podology.categories.findIndex(function (c) {
             return c.id === currentCategory;
         });
+        var category = services.podology.categories[categoryIndex];
 
         if (!category || !category.services) return;
 
@@ -5077,7 +5193,11 @@ var AdminServicesRenderer = (function () {
 
         category.services = reordered;
 
-        AdminAPI.save('services', services)
+        var path = '/podology/categories/' + categoryIndex;
+        AdminAPI.patch('services', [
+            { op: 'test', path: path + '/id', value: currentCategory },
+            { op: 'replace', path: path + '/services', value: reordered }
+        ])
             .then(function () {
                 AdminState.setServices(services);
                 if (window.showToast) {
@@ -5378,7 +5498,9 @@ var AdminArticlesRenderer = (function () {
             article.order = index;
         });
 
-        AdminAPI.save('articles', { articles: reordered })
+        AdminAPI.reorder('articles', reordered.map(function (article) {
+            return article.id;
+        }))
             .then(function () {
                 AdminState.setArticles(reordered);
                 if (window.showToast) {
@@ -5541,7 +5663,9 @@ var AdminFaqRenderer = (function () {
             item.order = index;
         });
 
-        AdminAPI.save('faq', { faq: reordered })
+        AdminAPI.reorder('faq', reordered.map(function (item) {
+            return item.id;
+        }))
             .then(function () {
                 AdminState.setFaq(reordered);
                 if (window.showToast) {
@@ -6694,6 +6818,8 @@ var AdminServiceForm = (function () {
         var category = services.categories.find(function (c) {
             return c.id === categoryId;
         });
+        var isEdit = index !== null && index !== undefined;
+        var canPatch = isEdit && !!category && !!category.services;
 
         if (!category) {
             category = {
@@ -6708,14 +6834,33 @@ var AdminServiceForm = (function () {
             category.services = [];
         }
 
-        if (index !== null && index !== undefined) {
+        if (isEdit) {
             category.services[index] = serviceData;
         } else {
             category.services.push(serviceData);
         }
 
         try {
-            await AdminAPI.save('services', services);
+            if (canPatch) {
+                // Правка одной услуги: сервер перезаписывает только строку её категории
+                var path = '/categories/' + services.categories.indexOf(category);
+                var operations = [{ op: 'test', path: path + '/id', value: categoryId }];
+                if (editing.service && editing.service.id !== undefined) {
+                    operations.push({
+                        op: 'test',
+                        path: path + '/services/' + index + '/id',
+                        value: editing.service.id
+                    });
+                }
+                operations.push({
+                    op: 'replace',
+                    path: path + '/services/' + index,
+                    value: serviceData
+                });
+                await AdminAPI.patch('services', operations);
+            } else {
+                await AdminAPI.save('services', services);
+            }
             AdminState.setServices(services);
             showToast('Услуга сохранена', 'success');
             AdminModals.close('modal');
@@ -8257,11 +8402,38 @@ var AdminPanel = (function () {
         };
     }
 
+    // Последний применённый seq журнала изменений (null — неизвестен)
+    var changeSeq = null;
+
+    // Списки, которые обновляются из журнала поэлементно: resource → поле ответа и состояние
+    var CHANGE_LISTS = {
+        masters: { field: 'masters', state: 'masters', setter: 'setMasters' },
+        articles: { field: 'articles', state: 'articles', setter: 'setArticles' },
+        faq: { field: 'faq', state: 'faq', setter: 'setFaq' },
+        'shop-categories': {
+            field: 'categories',
+            state: 'shopCategories',
+            setter: 'setShopCategories'
+        },
+        products: { field: 'products', state: 'products', setter: 'setProducts' },
+        legal: { field: 'documents', state: 'legalDocuments', setter: 'setLegalDocuments' }
+    };
+
+    // Вложенные ресурсы перечитываются целиком: resource → эндпоинт и setter
+    var CHANGE_RELOADS = {
+        services: { endpoint: 'services', setter: 'setServices' },
+        social: { endpoint: 'social', setter: 'setSocial' }
+    };
+
     /**
      * Загрузка всех данных
      */
     async function loadData() {
         try {
+            // seq берётся до загрузки: изменения во время неё придут повторно, а не потеряются
+            var head = await AdminAPI.getChanges();
+            changeSeq = head ? head.seq : null;
+
             var data = await AdminAPI.loadAllData();
 
             // Обновляем состояние (с проверкой на null от API)
@@ -8291,6 +8463,127 @@ var AdminPanel = (function () {
         }
     }
 
+    /**
+     * Применить изменения журнала к состоянию
+     * @param {Array} changes - Изменения ({resource, field, id, op, position, item})
+     * @returns {Promise<void>}
+     */
+    async function applyChanges(changes) {
+        var lists = {};
+        var reloads = {};
+
+        for (var i = 0; i < changes.length; i++) {
+            var change = changes[i];
+            var target = CHANGE_LISTS[change.resource];
+            if (!target || change.field !== target.field || !change.id) {
+                reloads[change.resource] = true;
+                continue;
+            }
+            var items = lists[change.resource] || AdminState[target.state].slice();
+            if (change.op === 'move') {
+                // Перемещение приходит без данных: меняется только order
+                items = items.map(function (item) {
+                    return item.id === change.id && typeof item.order === 'number'
+                        ? Object.assign({}, item, { order: change.position })
+                        : item;
+                });
+            } else {
+                items = items.filter(function (item) {
+                    return item.id !== change.id;
+                });
+                if (change.op === 'upsert') {
+                    items.push(change.item);
+                }
+            }
+            lists[change.resource] = items;
+        }
+
+        Object.keys(lists).forEach(function (resource) {
+            // Setter восстанавливает порядок по полю order
+            AdminState[CHANGE_LISTS[resource].setter](lists[resource]);
+        });
+
+        var names = Object.keys(reloads);
+        for (var j = 0; j < names.length; j++) {
+            var reload = CHANGE_RELOADS[names[j]];
+            if (!reload) {
+                continue;
+            }
+            var data = await AdminAPI.get(reload.endpoint);
+            if (data) {
+                AdminState[reload.setter](data);
+            }
+        }
+    }
+
+    // Текущая синхронизация и запрос ещё одной после неё
+    var syncing = null;
+    var syncAgain = false;
+
+    // Поток событий сервера (/api/events)
+    var eventSource = null;
+    var eventsRetry = null;
+
+    // Пауза перед новой подпиской после обрыва потока
+    var EVENTS_RETRY_MS = 5000;
+
+    /**
+     * Подписка на события сервера: версии ресурсов и счётчики посещений.
+     * EventSource не умеет заголовки — подписка по одноразовому билету
+     * @returns {Promise<void>}
+     */
+    async function startEvents() {
+        if (!window.EventSource || eventSource || !AdminAPI.getToken()) {
+            return;
+        }
+        var ticket = await AdminAPI.getEventsTicket();
+        if (!ticket || eventSource || !AdminAPI.getToken()) {
+            return;
+        }
+        eventSource = new EventSource('/api/events?ticket=' + encodeURIComponent(ticket));
+        eventSource.addEventListener('version', function (event) {
+            var data = JSON.parse(event.data);
+            if (changeSeq !== null && data.seq > changeSeq) {
+                syncChanges();
+            }
+        });
+        eventSource.addEventListener('visits', function (event) {
+            AdminStatsRenderer.renderCounters(JSON.parse(event.data));
+        });
+        eventSource.addEventListener('error', function () {
+            // Сам EventSource переподключится с тем же (уже использованным)
+            // билетом — закрываем поток и подписываемся заново с новым
+            stopEvents();
+            eventsRetry = setTimeout(function () {
+                eventsRetry = null;
+                startEvents();
+            }, EVENTS_RETRY_MS);
+        });
+    }
+
+    /**
+     * Закрыть поток событий
+     */
+    function stopEvents() {
+        if (eventsRetry) {
+            clearTimeout(eventsRetry);
+            eventsRetry = null;
+        }
+        if (eventSource) {
+            eventSource.close();
+            eventSource = null;
+        }
+    }
+
+    /**
+     * Синхронизация при возврате на вкладку
+     */
+    function handleVisibilityChange() {
+        if (document.visibilityState === 'visible') {
+            syncChanges();
+        }
+    }
+
     // =================================================================
     // CRUD HELPERS (для совместимости с публичным API)
     // =================================================================
@@ -8377,6 +8670,12 @@ var AdminPanel = (function () {
         AdminEventHandlers.initEventListeners();
         AdminEventHandlers.initEventDelegation();
 
+        // Синхронизация изменений, сделанных в других вкладках
+        document.addEventListener('visibilitychange', handleVisibilityChange);
+
+        // Живые обновления: изменения из других вкладок и посещения
+        startEvents();
+
         // Загрузка данных и переход на статистику
         loadData();
         AdminRouter.switchSection('stats');
@@ -8406,6 +8705,9 @@ var AdminPanel = (function () {
     function destroy() {
         // Очищаем обработчики событий
         AdminEventHandlers.destroy();
+        document.removeEventListener('visibilitychange', handleVisibilityChange);
+        stopEvents();
+        changeSeq = null;
 
         // Уничтожаем drag-drop если доступен
         if (window.AdminDragDrop && AdminDragDrop.destroy) {
@@ -8528,6 +8830,7 @@ var AdminPanel = (function () {
 
         // Reload
         loadData: loadData,
+        syncChanges: syncChanges,
 
         // Cleanup
         destroy: destroy
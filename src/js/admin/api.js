@@ -90,13 +90,13 @@ var AdminAPI = (function () {
     // =================================================================
 
     /**
-     * GET запрос
+     * GET запрос. С токеном сервер отдаёт и неактивные элементы/черновики
      * @param {string} endpoint - API эндпоинт
      * @returns {Promise<Object|null>} Данные или null при ошибке
      */
     async function get(endpoint) {
         try {
-            var response = await fetch('/api/' + endpoint);
+            var response = await fetch('/api/' + endpoint, { headers: getAuthHeaders() });
             if (!response.ok) throw new Error('HTTP ' + response.status);
             return response.json();
         } catch (error) {
@@ -130,6 +130,57 @@ var AdminAPI = (function () {
         }
     }
 
+    /**
+     * PATCH запрос (требует авторизации): JSON Patch — только изменённые строки
+     * @param {string} endpoint - API эндпоинт
+     * @param {Array} operations - Операции RFC 6902
+     * @returns {Promise<Object>} Ответ сервера
+     * @throws {Error} При ошибке запроса
+     */
+    async function patch(endpoint, operations) {
+        try {
+            var headers = getAuthHeaders();
+            headers['Content-Type'] = 'application/json-patch+json';
+            var response = await fetch('/api/' + endpoint, {
+                method: 'PATCH',
+                headers: headers,
+                body: JSON.stringify(operations)
+            });
+
+            checkUnauthorized(response);
+            await handleHttpError(response);
+
+            return response.json();
+        } catch (error) {
+            console.error('API PATCH ' + endpoint + ' error:', error);
+            throw error;
+        }
+    }
+
+    /**
+     * Новый порядок элементов списка: только id, без самих элементов
+     * @param {string} endpoint - API эндпоинт ресурса (masters, faq, shop/products...)
+     * @param {Array} ids - ID элементов в новом порядке
+     * @returns {Promise<Object>} Ответ сервера
+     * @throws {Error} При ошибке запроса
+     */
+    function reorder(endpoint, ids) {
+        return save(endpoint + '/reorder', { ids: ids });
+    }
+
+    /**
+     * Атомарное сохранение нескольких ресурсов одним запросом (одна транзакция)
+     * @param {Object} documents - Данные по ресурсам: { 'shop-categories': {...}, 'shop-products': {...} }
+     * @returns {Promise<Object>} Ответ сервера (changed — изменившиеся ресурсы)
+     * @throws {Error} При ошибке запроса
+     */
+    function batch(documents) {
+        var writes = Object.keys(documents).map(function (resource) {
+            return { resource: resource, data: documents[resource] };
+        });
+        return save('batch', { writes: writes });
+    }
+
     /**
      * Загрузка изображения (base64)
      * @param {string} imageData - Base64 данные изображения
@@ -278,6 +329,35 @@ var AdminAPI = (function () {
         };
     }
 
+    /**
+     * Журнал изменений после seq (без since — только текущий seq)
+     * @param {number} [since] - Последний применённый seq
+     * @returns {Promise<Object|null>} {changes, seq, reset, more} или null при ошибке
+     */
+    function getChanges(since) {
+        return get(typeof since === 'number' ? 'changes?since=' + since : 'changes');
+    }
+
+    /**
+     * Одноразовый билет для подписки на /api/events
+     * @returns {Promise<string|null>} Билет или null при ошибке
+     */
+    async function getEventsTicket() {
+        try {
+            var response = await fetch('/api/events/ticket', {
+                method: 'POST',
+                headers: getAuthHeaders()
+            });
+            checkUnauthorized(response);
+            await handleHttpError(response);
+            var data = await response.json();
+            return data.ticket;
+        } catch (error) {
+            console.error('API events ticket error:', error);
+            return null;
+        }
+    }
+
     // Публичный API
     return {
         // Token management
@@ -287,6 +367,9 @@ var AdminAPI = (function () {
         // HTTP methods
         get: get,
         save: save,
+        patch: patch,
+        reorder: reorder,
+        batch: batch,
         upload: upload,
         deleteFile: deleteFile,
 
@@ -296,7 +379,9 @@ var AdminAPI = (function () {
         checkAuth: checkAuth,
 
         // Data
-        loadAllData: loadAllData
+        loadAllData: loadAllData,
+        getChanges: getChanges,
+        getEventsTicket: getEventsTicket
     };
 })();
 
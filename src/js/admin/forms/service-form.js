@@ -210,6 +210,8 @@ var AdminServiceForm = (function () {
         var category = services.categories.find(function (c) {
             return c.id === categoryId;
         });
+        var isEdit = index !== null && index !== undefined;
+        var canPatch = isEdit && !!category && !!category.services;
 
         if (!category) {
             category = {
@@ -224,14 +226,33 @@ var AdminServiceForm = (function () {
             category.services = [];
         }
 
-        if (index !== null && index !== undefined) {
+        if (isEdit) {
             category.services[index] = serviceData;
         } else {
             category.services.push(serviceData);
         }
 
         try {
-            await AdminAPI.save('services', services);
+            if (canPatch) {
+                // Правка одной услуги: сервер перезаписывает только строку её категории
+                var path = '/categories/' + services.categories.indexOf(category);
+                var operations = [{ op: 'test', path: path + '/id', value: categoryId }];
+                if (editing.service && editing.service.id !== undefined) {
+                    operations.push({
+                        op: 'test',
+                        path: path + '/services/' + index + '/id',
+                        value: editing.service.id
+                    });
+                }
+                operations.push({
+                    op: 'replace',
+                    path: path + '/services/' + index,
+                    value: serviceData
+                });
+                await AdminAPI.patch('services', operations);
+            } else {
+                await AdminAPI.save('services', services);
+            }
             AdminState.setServices(services);
             showToast('Услуга сохранена', 'success');
             AdminModals.close('modal');
@@ -48,11 +48,38 @@ var AdminPanel = (function () {
         };
     }
 
+    // Последний применённый seq журнала изменений (null — неизвестен)
+    var changeSeq = null;
+
+    // Списки, которые обновляются из журнала поэлементно: resource → поле ответа и состояние
+    var CHANGE_LISTS = {
+        masters: { field: 'masters', state: 'masters', setter: 'setMasters' },
+        articles: { field: 'articles', state: 'articles', setter: 'setArticles' },
+        faq: { field: 'faq', state: 'faq', setter: 'setFaq' },
+        'shop-categories': {
+            field: 'categories',
+            state: 'shopCategories',
+            setter: 'setShopCategories'
+        },
+        products: { field: 'products', state: 'products', setter: 'setProducts' },
+        legal: { field: 'documents', state: 'legalDocuments', setter: 'setLegalDocuments' }
+    };
+
+    // Вложенные ресурсы перечитываются целиком: resource → эндпоинт и setter
+    var CHANGE_RELOADS = {
+        services: { endpoint: 'services', setter: 'setServices' },
+        social: { endpoint: 'social', setter: 'setSocial' }
+    };
+
     /**
      * Загрузка всех данных
      */
     async function loadData() {
         try {
+            // seq берётся до загрузки: изменения во время неё придут повторно, а не потеряются
+            var head = await AdminAPI.getChanges();
+            changeSeq = head ? head.seq : null;
+
             var data = await AdminAPI.loadAllData();
 
             // Обновляем состояние (с проверкой на null от API)
@@ -82,6 +109,127 @@ var AdminPanel = (function () {
         }
     }
 
+    /**
+     * Применить изменения журнала к состоянию
+     * @param {Array} changes - Изменения ({resource, field, id, op, position, item})
+     * @returns {Promise<void>}
+     */
+    async function applyChanges(changes) {
+        var lists = {};
+        var reloads = {};
+
+        for (var i = 0; i < changes.length; i++) {
+            var change = changes[i];
+            var target = CHANGE_LISTS[change.resource];
+            if (!target || change.field !== target.field || !change.id) {
+                reloads[change.resource] = true;
+                continue;
+            }
+            var items = lists[change.resource] || AdminState[target.state].slice();
+            if (change.op === 'move') {
+                // Перемещение приходит без данных: меняется только order
+                items = items.map(function (item) {
+                    return item.id === change.id && typeof item.order === 'number'
+                        ? Object.assign({}, item, { order: change.position })
+                        : item;
+                });
+            } else {
+                items = items.filter(function (item) {
+                    return item.id !== change.id;
+                });
+                if (change.op === 'upsert') {
+                    items.push(change.item);
+                }
+            }
+            lists[change.resource] = items;
+        }
+
+        Object.keys(lists).forEach(function (resource) {
+            // Setter восстанавливает порядок по полю order
+            AdminState[CHANGE_LISTS[resource].setter](lists[resource]);
+        });
+
+        var names = Object.keys(reloads);
+        for (var j = 0; j < names.length; j++) {
+            var reload = CHANGE_RELOADS[names[j]];
+            if (!reload) {
+                continue;
+            }
+            var data = await AdminAPI.get(reload.endpoint);
+            if (data) {
+                AdminState[reload.setter](data);
+            }
+        }
+    }
+
+    // Текущая синхронизация и запрос ещё одной после неё
+    var syncing = null;
+    var syncAgain = false;
+
+    // Поток событий сервера (/api/events)
+    var eventSource = null;
+    var eventsRetry = null;
+
+    // Пауза перед новой подпиской после обрыва потока
+    var EVENTS_RETRY_MS = 5000;
+
+    /**
+     * Подписка на события сервера: версии ресурсов и счётчики посещений.
+     * EventSource не умеет заголовки — подписка по одноразовому билету
+     * @returns {Promise<void>}
+     */
+    async function startEvents() {
+        if (!window.EventSource || eventSource || !AdminAPI.getToken()) {
+            return;
+        }
+        var ticket = await AdminAPI.getEventsTicket();
+        if (!ticket || eventSource || !AdminAPI.getToken()) {
+            return;
+        }
+        eventSource = new EventSource('/api/events?ticket=' + encodeURIComponent(ticket));
+        eventSource.addEventListener('version', function (event) {
+            var data = JSON.parse(event.data);
+            if (changeSeq !== null && data.seq > changeSeq) {
+                syncChanges();
+            }
+        });
+        eventSource.addEventListener('visits', function (event) {
+            AdminStatsRenderer.renderCounters(JSON.parse(event.data));
+        });
+        eventSource.addEventListener('error', function () {
+            // Сам EventSource переподключится с тем же (уже использованным)
+            // билетом — закрываем поток и подписываемся заново с новым
+            stopEvents();
+            eventsRetry = setTimeout(function () {
+                eventsRetry = null;
+                startEvents();
+            }, EVENTS_RETRY_MS);
+        });
+    }
+
+    /**
+     * Закрыть поток событий
+     */
+    function stopEvents() {
+        if (eventsRetry) {
+            clearTimeout(eventsRetry);
+            eventsRetry = null;
+        }
+        if (eventSource) {
+            eventSource.close();
+            eventSource = null;
+        }
+    }
+
+    /**
+     * Синхронизация при возврате на вкладку
+     */
+    function handleVisibilityChange() {
+        if (document.visibilityState === 'visible') {
+            syncChanges();
+        }
+    }
+
     // =================================================================
     // CRUD HELPERS (для совместимости с публичным API)
     // =================================================================
@@ -168,6 +316,12 @@ var AdminPanel = (function () {
         AdminEventHandlers.initEventListeners();
         AdminEventHandlers.initEventDelegation();
 
+        // Синхронизация изменений, сделанных в других вкладках
+        document.addEventListener('visibilitychange', handleVisibilityChange);
+
+        // Живые обновления: изменения из других вкладок и посещения
+        startEvents();
+
         // Загрузка данных и переход на статистику
         loadData();
         AdminRouter.switchSection('stats');
@@ -197,6 +351,9 @@ var AdminPanel = (function () {
     function destroy() {
         // Очищаем обработчики событий
         AdminEventHandlers.destroy();
+        document.removeEventListener('visibilitychange', handleVisibilityChange);
+        stopEvents();
+        changeSeq = null;
 
         // Уничтожаем drag-drop если доступен
         if (window.AdminDragDrop && AdminDragDrop.destroy) {
@@ -319,6 +476,7 @@ var AdminPanel = (function () {
 
         // Reload
         loadData: loadData,
+        syncChanges: syncChanges,
 
         // Cleanup
         destroy: destroy
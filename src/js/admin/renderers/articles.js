@@ -48,7 +48,9 @@ var AdminArticlesRenderer = (function () {
             article.order = index;
         });
 
-        AdminAPI.save('articles', { articles: reordered })
+        AdminAPI.reorder('articles', reordered.map(function (article) {
+            return article.id;
+        }))
             .then(function () {
                 AdminState.setArticles(reordered);
                 if (window.showToast) {
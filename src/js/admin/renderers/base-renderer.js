@@ -32,11 +32,12 @@ var BaseRenderer = (function () {
             item.order = index;
         });
 
-        // Формируем данные для API
-        var data = {};
-        data[entityName] = reordered;
+        // На сервер уходят только id в новом порядке
+        var ids = reordered.map(function (item) {
+            return item.id;
+        });
 
-        return AdminAPI.save(entityName, data)
+        return AdminAPI.reorder(entityName, ids)
             .then(function () {
                 setItems(reordered);
                 if (window.showToast) {
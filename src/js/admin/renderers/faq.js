@@ -48,7 +48,9 @@ var AdminFaqRenderer = (function () {
             item.order = index;
         });
 
-        AdminAPI.save('faq', { faq: reordered })
+        AdminAPI.reorder('faq', reordered.map(function (item) {
+            return item.id;
+        }))
             .then(function () {
                 AdminState.setFaq(reordered);
                 if (window.showToast) {
@@ -51,7 +51,9 @@ var AdminMastersRenderer = (function () {
         });
 
         // Сохраняем
-        AdminAPI.save('masters', { masters: reordered })
+        AdminAPI.reorder('masters', reordered.map(function (master) {
+            return master.id;
+        }))
             .then(function () {
                 AdminState.setMasters(reordered);
                 if (window.showToast) {
@@ -66,7 +66,12 @@ var AdminServicesRenderer = (function () {
 
         services.categories[categoryIndex].services = reordered;
 
-        AdminAPI.save('services', services)
+        // Только список услуг категории, а не весь документ
+        var path = '/categories/' + categoryIndex;
+        AdminAPI.patch('services', [
+            { op: 'test', path: path + '/id', value: currentCategory },
+            { op: 'replace', path: path + '/services', value: reordered }
+        ])
             .then(function () {
                 AdminState.setServices(services);
                 if (window.showToast) {
@@ -90,9 +95,10 @@ var AdminServicesRenderer = (function () {
 
         if (!services.podology || !services.podology.categories) return;
 
-        var category = services.podology.categories.find(function (c) {
+        var categoryIndex = services.podology.categories.findIndex(function (c) {
             return c.id === currentCategory;
         });
+        var category = services.podology.categories[categoryIndex];
 
         if (!category || !category.services) return;
 
@@ -106,7 +112,11 @@ var AdminServicesRenderer = (function () {
 
         category.services = reordered;
 
-        AdminAPI.save('services', services)
+        var path = '/podology/categories/' + categoryIndex;
+        AdminAPI.patch('services', [
+            { op: 'test', path: path + '/id', value: currentCategory },
+            { op: 'replace', path: path + '/services', value: reordered }
+        ])
             .then(function () {
                 AdminState.setServices(services);
                 if (window.showToast) {
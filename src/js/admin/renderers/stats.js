@@ -53,6 +53,27 @@ var AdminStatsRenderer = (function () {
         }
     }
 
+    /**
+     * Обновление счётчиков из события visits (без графика и секций)
+     * @param {Object} counters - total_views, today_views, week_views, unique_visitors
+     */
+    function renderCounters(counters) {
+        if (!counters) return;
+
+        var fields = {
+            totalViews: 'total_views',
+            todayViews: 'today_views',
+            weekViews: 'week_views',
+            uniqueVisitors: 'unique_visitors'
+        };
+        Object.keys(fields).forEach(function (name) {
+            var value = counters[fields[name]];
+            if (elements[name] && typeof value === 'number') {
+                elements[name].textContent = formatNumber(value);
+            }
+        });
+    }
+
     /**
      * Рендеринг топ секций
      */
@@ -287,7 +308,8 @@ var AdminStatsRenderer = (function () {
     // Публичный API
     return {
         init: init,
-        render: render
+        render: render,
+        renderCounters: renderCounters
     };
 })();
 
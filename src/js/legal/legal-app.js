@@ -73,7 +73,7 @@
         }
 
         try {
-            var response = await fetch('/api/legal');
+            var response = await fetch('/api/legal?view=summary');
             var data = await response.json();
             var documents = (data.documents || []).filter(function (d) {
                 return d.active !== false;
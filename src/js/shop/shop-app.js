@@ -8,6 +8,9 @@ var ShopApp = (function () {
 
     var debounce = window.SharedHelpers ? SharedHelpers.debounce : window.debounce;
 
+    // Товаров в первой странице: остальные догружаются после рендера
+    var PAGE_SIZE = 48;
+
     // =================================================================
     // INITIALIZATION
     // =================================================================
@@ -43,7 +46,9 @@ var ShopApp = (function () {
                 'input',
                 debounce(
                     function (e) {
-                        ShopState.setSearchQuery(e.target.value.toLowerCase().trim());
+                        var query = e.target.value.toLowerCase().trim();
+                        ShopState.setSearchQuery(query);
+                        ShopFilters.searchProducts(query);
                         ShopFilters.updateSearchClearButton();
                         ShopFilters.renderProducts();
                     },
@@ -58,6 +63,7 @@ var ShopApp = (function () {
                 if (elements.searchInput) {
                     elements.searchInput.value = '';
                     ShopState.setSearchQuery('');
+                    ShopState.setSearchResults(null);
                     ShopFilters.updateSearchClearButton();
                     ShopFilters.renderProducts();
                     elements.searchInput.focus();
@@ -190,6 +196,45 @@ var ShopApp = (function () {
     // DATA LOADING
     // =================================================================
 
+    /**
+     * Страница товаров (keyset-пагинация на сервере)
+     * @param {string|null} cursor - Курсор из предыдущего ответа
+     * @returns {Promise<Object>} { products, nextCursor }
+     */
+    function fetchProductsPage(cursor) {
+        var url =
+            ShopState.API_BASE +
+            '/products?sort=manual&limit=' +
+            PAGE_SIZE +
+            (cursor ? '&cursor=' + encodeURIComponent(cursor) : '');
+        return fetch(url).then(function (r) {
+            if (!r.ok) {
+                throw new Error('HTTP ' + r.status);
+            }
+            return r.json();
+        });
+    }
+
+    /**
+     * Догрузка остальных страниц после первого рендера
+     * @param {string|null} cursor - Курсор следующей страницы
+     */
+    function loadRemainingProducts(cursor) {
+        if (!cursor) {
+            return;
+        }
+        fetchProductsPage(cursor)
+            .then(function (page) {
+                ShopState.setProducts(ShopState.getProducts().concat(page.products || []));
+                ShopFilters.renderCategories();
+                ShopFilters.renderProducts();
+                loadRemainingProducts(page.nextCursor);
+            })
+            .catch(function (error) {
+                console.error('Error loading products page:', error);
+            });
+    }
+
     function loadData() {
         var elements = ShopState.getElements();
 
@@ -201,17 +246,25 @@ var ShopApp = (function () {
             fetch(ShopState.API_BASE + '/categories').then(function (r) {
                 return r.json();
             }),
-            fetch(ShopState.API_BASE + '/products').then(function (r) {
-                return r.json();
-            })
+            fetchProductsPage(null),
+            fetch(ShopState.API_BASE + '/facets')
+                .then(function (r) {
+                    return r.ok ? r.json() : null;
+                })
+                .catch(function () {
+                    // Без фасетов счётчики считаются по загруженным товарам
+                    return null;
+                })
         ])
             .then(function (results) {
                 ShopState.setCategories(results[0].categories || []);
                 ShopState.setProducts(results[1].products || []);
+                ShopState.setFacets(results[2]);
 
                 ShopFilters.renderCategories();
                 ShopFilters.renderProducts();
                 hideProgress();
+                loadRemainingProducts(results[1].nextCursor);
             })
             .catch(function (error) {
                 console.error('Error loading shop data:', error);
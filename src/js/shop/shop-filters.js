@@ -16,17 +16,23 @@ var ShopFilters = (function () {
         var categories = ShopState.getCategories();
         var products = ShopState.getProducts();
         var currentCategory = ShopState.getCurrentCategory();
+        // Счётчики с сервера учитывают ещё не догруженные страницы
+        var facets = ShopState.getFacets();
 
         // Update "All" count
-        var activeProducts = [];
-        for (var i = 0; i < products.length; i++) {
-            if (products[i].status === 'active') {
-                activeProducts.push(products[i]);
+        var activeCount = 0;
+        if (facets) {
+            activeCount = facets.total;
+        } else {
+            for (var i = 0; i < products.length; i++) {
+                if (products[i].status === 'active') {
+                    activeCount++;
+                }
             }
         }
 
         if (elements.allCount) {
-            elements.allCount.textContent = activeProducts.length;
+            elements.allCount.textContent = activeCount;
         }
 
         // Filter active categories and sort
@@ -44,7 +50,7 @@ var ShopFilters = (function () {
         var html = '';
         for (var k = 0; k < activeCategories.length; k++) {
             var cat = activeCategories[k];
-            var count = getProductCount(cat.id);
+            var count = facets ? facets.categories[cat.slug] || 0 : getProductCount(cat.id);
             var icon = ShopRenderer.getCategoryIcon(cat.slug).replace('category-icon', 'chip-icon');
             var isActive = currentCategory === cat.slug ? ' active' : '';
             html +=
@@ -100,8 +106,23 @@ var ShopFilters = (function () {
             }
         }
 
-        // Filter by search
-        if (searchQuery) {
+        // Filter by search: ранжированный ответ сервера, иначе — локально
+        var searchResults = ShopState.getSearchResults();
+        var ranked = false;
+        if (searchQuery && searchResults && searchResults.query === searchQuery) {
+            var byId = {};
+            for (var r = 0; r < filtered.length; r++) {
+                byId[filtered[r].id] = filtered[r];
+            }
+            var found = [];
+            for (var s = 0; s < searchResults.ids.length; s++) {
+                if (byId[searchResults.ids[s]]) {
+                    found.push(byId[searchResults.ids[s]]);
+                }
+            }
+            filtered = found;
+            ranked = true;
+        } else if (searchQuery) {
             var searchFiltered = [];
             for (var m = 0; m < filtered.length; m++) {
                 var p = filtered[m];
@@ -115,8 +136,10 @@ var ShopFilters = (function () {
             filtered = searchFiltered;
         }
 
-        // Sort products
-        filtered = sortProducts(filtered, currentSort);
+        // Sort products (результаты поиска по умолчанию — в порядке релевантности)
+        if (!ranked || currentSort !== 'order') {
+            filtered = sortProducts(filtered, currentSort);
+        }
 
         if (filtered.length === 0) {
             var emptyText = searchQuery
@@ -137,6 +160,40 @@ var ShopFilters = (function () {
         elements.productsGrid.innerHTML = html;
     }
 
+    /**
+     * Серверный поиск (FTS): находит словоформы и опечатки,
+     * до ответа показываются результаты локального фильтра
+     * @param {string} query - Поисковый запрос
+     */
+    function searchProducts(query) {
+        ShopState.setSearchResults(null);
+        if (!query) {
+            return;
+        }
+        fetch(ShopState.API_BASE + '/products?q=' + encodeURIComponent(query) + '&limit=100')
+            .then(function (r) {
+                if (!r.ok) {
+                    throw new Error('HTTP ' + r.status);
+                }
+                return r.json();
+            })
+            .then(function (data) {
+                // Пока шёл запрос, пользователь мог изменить ввод
+                if (ShopState.getSearchQuery() !== query) {
+                    return;
+                }
+                var ids = [];
+                for (var i = 0; i < data.products.length; i++) {
+                    ids.push(data.products[i].id);
+                }
+                ShopState.setSearchResults({ query: query, ids: ids });
+                renderProducts();
+            })
+            .catch(function (error) {
+                console.error('Error searching products:', error);
+            });
+    }
+
     /**
      * Сортировка товаров
      * @param {Array} items - Массив товаров
@@ -193,6 +250,7 @@ var ShopFilters = (function () {
         var elements = ShopState.getElements();
 
         ShopState.setSearchQuery('');
+        ShopState.setSearchResults(null);
         ShopState.setCurrentCategory('all');
 
         if (elements.searchInput) {
@@ -248,6 +306,7 @@ var ShopFilters = (function () {
     return {
         renderCategories: renderCategories,
         renderProducts: renderProducts,
+        searchProducts: searchProducts,
         sortProducts: sortProducts,
         setActiveCategory: setActiveCategory,
         resetFilters: resetFilters,
@@ -27,8 +27,10 @@ var ShopState = (function () {
     // State
     var categories = [];
     var products = [];
+    var facets = null; // { total, categories: { slug: count }, price: { min, max } }
     var currentCategory = 'all';
     var searchQuery = '';
+    var searchResults = null; // { query, ids } — ответ серверного поиска
     var currentSort = safeGetItem('shopSort') || 'order';
     var lightboxImages = [];
     var lightboxIndex = 0;
@@ -77,8 +79,10 @@ var ShopState = (function () {
     function reset() {
         categories = [];
         products = [];
+        facets = null;
         currentCategory = 'all';
         searchQuery = '';
+        searchResults = null;
         lightboxImages = [];
         lightboxIndex = 0;
         elements = {};
@@ -103,6 +107,13 @@ var ShopState = (function () {
             products = val;
         },
 
+        getFacets: function () {
+            return facets;
+        },
+        setFacets: function (val) {
+            facets = val;
+        },
+
         getCurrentCategory: function () {
             return currentCategory;
         },
@@ -117,6 +128,13 @@ var ShopState = (function () {
             searchQuery = val;
         },
 
+        getSearchResults: function () {
+            return searchResults;
+        },
+        setSearchResults: function (val) {
+            searchResults = val;
+        },
+
         getCurrentSort: function () {
             return currentSort;
         },
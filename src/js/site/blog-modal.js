@@ -144,6 +144,36 @@ var BlogModal = (function () {
         removeEscapeHandler = SaysApp.onEscape(close);
     }
 
+    /**
+     * Загрузка полного текста статьи (список приходит без content)
+     * @param {Object} article - Статья из списка
+     * @returns {Promise<Object>} Статья с content
+     */
+    function loadFullArticle(article) {
+        if (article.content !== undefined) {
+            return Promise.resolve(article);
+        }
+        return fetch('/api/articles/' + encodeURIComponent(article.id))
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error('HTTP ' + response.status);
+                }
+                return response.json();
+            })
+            .then(function (full) {
+                // Кэшируем, чтобы повторное открытие не ходило в сеть
+                article.content = full.content || '';
+                return article;
+            })
+            .catch(function (error) {
+                if (typeof console !== 'undefined' && console.warn) {
+                    console.warn('[BlogModal] Ошибка загрузки статьи:', error.message || error);
+                }
+                // Показываем хотя бы анонс
+                return article;
+            });
+    }
+
     /**
      * Открыть модальное окно блога
      * @param {string} articleId - ID статьи
@@ -155,7 +185,7 @@ var BlogModal = (function () {
                 return a.id === articleId;
             });
             if (article) {
-                showDynamicArticleModal(article);
+                loadFullArticle(article).then(showDynamicArticleModal);
                 return;
             }
         }
@@ -215,6 +245,7 @@ var BlogModal = (function () {
         open: open,
         close: close,
         showDynamicArticleModal: showDynamicArticleModal,
+        loadFullArticle: loadFullArticle,
         cleanup: cleanup
     };
 })();
@@ -141,7 +141,8 @@
 
     async function loadArticles() {
         try {
-            var response = await fetch(API_BASE + '/articles');
+            // Без полного текста: он подгружается при открытии статьи
+            var response = await fetch(API_BASE + '/articles?view=summary');
             if (!response.ok) return;
 
             var data = await response.json();
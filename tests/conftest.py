@@ -22,6 +22,25 @@ PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
 
+# =============================================================================
+# BENCHMARKS (opt-in: BENCHMARK=1)
+# =============================================================================
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers', 'benchmark: timing benchmark, runs only with BENCHMARK=1'
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if os.environ.get('BENCHMARK'):
+        return
+    skip = pytest.mark.skip(reason='set BENCHMARK=1 to run benchmarks')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip)
+
+
 # =============================================================================
 # BASIC DATA FIXTURES
 # =============================================================================
@@ -61,7 +61,9 @@ describe('AdminAPI', function() {
       });
 
       return AdminAPI.get('masters').then(function(result) {
-        expect(fetch).toHaveBeenCalledWith('/api/masters');
+        expect(fetch).toHaveBeenCalledWith('/api/masters', expect.objectContaining({
+          headers: expect.any(Object)
+        }));
         expect(result).toEqual(responseData);
       });
     });
@@ -310,6 +312,138 @@ describe('AdminAPI', function() {
     });
   });
 
+  // =========================================================================
+  // patch
+  // =========================================================================
+
+  describe('patch', function() {
+    test('should send JSON Patch operations', function() {
+      fetch.mockResolvedValue({
+        ok: true,
+        status: 200,
+        json: function() { return Promise.resolve({ success: true }); }
+      });
+      var operations = [{ op: 'replace', path: '/categories/0/name', value: 'x' }];
+
+      return AdminAPI.patch('services', operations).then(function(result) {
+        var options = fetch.mock.calls[0][1];
+        expect(fetch.mock.calls[0][0]).toBe('/api/services');
+        expect(options.method).toBe('PATCH');
+        expect(options.headers['Content-Type']).toBe('application/json-patch+json');
+        expect(JSON.parse(options.body)).toEqual(operations);
+        expect(result.success).toBe(true);
+      });
+    });
+  });
+
+  // =========================================================================
+  // reorder
+  // =========================================================================
+
+  describe('reorder', function() {
+    test('should post only the ordered ids', function() {
+      fetch.mockResolvedValue({
+        ok: true,
+        status: 200,
+        json: function() { return Promise.resolve({ success: true, updated: 2 }); }
+      });
+
+      return AdminAPI.reorder('shop/products', ['p2', 'p1']).then(function(result) {
+        var options = fetch.mock.calls[0][1];
+        expect(fetch.mock.calls[0][0]).toBe('/api/shop/products/reorder');
+        expect(options.method).toBe('POST');
+        expect(JSON.parse(options.body)).toEqual({ ids: ['p2', 'p1'] });
+        expect(result.updated).toBe(2);
+      });
+    });
+  });
+
+  // =========================================================================
+  // batch
+  // =========================================================================
+
+  describe('batch', function() {
+    test('should send all documents in one request', function() {
+      fetch.mockResolvedValue({
+        ok: true,
+        status: 200,
+        json: function() { return Promise.resolve({ success: true, changed: ['faq'] }); }
+      });
+
+      return AdminAPI.batch({ faq: { faq: [] }, masters: { masters: [] } }).then(function(result) {
+        expect(fetch).toHaveBeenCalledTimes(1);
+        expect(fetch.mock.calls[0][0]).toBe('/api/batch');
+        expect(JSON.parse(fetch.mock.calls[0][1].body)).toEqual({ writes: [
+          { resource: 'faq', data: { faq: [] } },
+          { resource: 'masters', data: { masters: [] } }
+        ] });
+        expect(result.changed).toEqual(['faq']);
+      });
+    });
+  });
+
+  // =========================================================================
+  // getChanges
+  // =========================================================================
+
+  describe('getChanges', function() {
+    test('should request changes since seq', function() {
+      fetch.mockResolvedValue({
+        ok: true,
+        json: function() { return Promise.resolve({ changes: [], seq: 7 }); }
+      });
+
+      return AdminAPI.getChanges(5).then(function(result) {
+        expect(fetch).toHaveBeenCalledWith('/api/changes?since=5', expect.any(Object));
+        expect(result.seq).toBe(7);
+      });
+    });
+
+    test('should request current seq without since', function() {
+      fetch.mockResolvedValue({
+        ok: true,
+        json: function() { return Promise.resolve({ changes: [], seq: 0 }); }
+      });
+
+      return AdminAPI.getChanges().then(function() {
+        expect(fetch).toHaveBeenCalledWith('/api/changes', expect.any(Object));
+      });
+    });
+  });
+
+  // =========================================================================
+  // getEventsTicket
+  // =========================================================================
+
+  describe('getEventsTicket', function() {
+    test('should post for a one-time ticket', function() {
+      fetch.mockResolvedValue({
+        ok: true,
+        status: 200,
+        json: function() { return Promise.resolve({ ticket: 'abc', expires_in: 30 }); }
+      });
+
+      return AdminAPI.getEventsTicket().then(function(ticket) {
+        expect(fetch).toHaveBeenCalledWith('/api/events/ticket', expect.objectContaining({
+          method: 'POST'
+        }));
+        expect(ticket).toBe('abc');
+      });
+    });
+
+    test('should return null on error', function() {
+      fetch.mockResolvedValue({
+        ok: false,
+        status: 500,
+        json: function() { return Promise.resolve({ error: 'fail' }); }
+      });
+
+      return AdminAPI.getEventsTicket().then(function(ticket) {
+        expect(ticket).toBeNull();
+      });
+    });
+  });
+
   // =========================================================================
   // Global export
   // =========================================================================
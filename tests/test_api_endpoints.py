@@ -254,6 +254,23 @@ class TestGetMasters:
 
         assert response['status'] == 200
 
+    def test_public_hides_inactive_admin_sees_all(self, test_server_url, mock_data_dir, auth_token):
+        """Should filter inactive masters publicly but not for an admin"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        mock_data_dir.write('masters.json', {'masters': [
+            {'id': 'master_1', 'name': 'Active'},
+            {'id': 'master_2', 'name': 'Hidden', 'active': False}
+        ]})
+
+        public = make_request(f'{test_server_url}/api/masters')
+        admin = make_request(f'{test_server_url}/api/masters',
+                             headers={'Authorization': f'Bearer {auth_token}'})
+
+        assert [m['id'] for m in public['data']['masters']] == ['master_1']
+        assert [m['id'] for m in admin['data']['masters']] == ['master_1', 'master_2']
+
     def test_get_masters_empty(self, test_server_url, mock_data_dir):
         """Should return empty object when file doesn't exist"""
         if not SERVER_IMPORTS_OK:
@@ -297,6 +314,45 @@ class TestGetArticles:
 
         assert response['status'] == 200
 
+    def test_get_articles_summary(self, test_server_url, mock_data_dir):
+        """Should omit content with ?view=summary"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        mock_data_dir.write('articles.json', {'articles': [
+            {'id': 'article_1', 'title': 'Test', 'excerpt': 'Short', 'content': 'x' * 5000}
+        ]})
+
+        response = make_request(f'{test_server_url}/api/articles?view=summary')
+
+        assert response['status'] == 200
+        assert response['data']['articles'] == [{'id': 'article_1', 'title': 'Test', 'excerpt': 'Short'}]
+
+    def test_get_articles_invalid_view(self, test_server_url, mock_data_dir):
+        """Should reject an unknown view"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        response = make_request(f'{test_server_url}/api/articles?view=everything')
+
+        assert response['status'] == 400
+
+    def test_get_article_by_id(self, test_server_url, mock_data_dir):
+        """Should return the full article and 404 for unknown ID"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        mock_data_dir.write('articles.json', {'articles': [
+            {'id': 'article_1', 'title': 'Test', 'content': '<p>Body</p>'}
+        ]})
+
+        response = make_request(f'{test_server_url}/api/articles/article_1')
+        assert response['status'] == 200
+        assert response['data']['content'] == '<p>Body</p>'
+
+        response = make_request(f'{test_server_url}/api/articles/article_2')
+        assert response['status'] == 404
+
 
 class TestGetFaq:
     """Tests for GET /api/faq"""
@@ -399,6 +455,26 @@ class TestGetProducts:
         # Should only return active products
         assert len(response['data'].get('products', [])) == 1
 
+    def test_admin_gets_drafts(self, test_server_url, mock_data_dir, auth_token):
+        """Should return draft products and items to an authenticated admin"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        mock_data_dir.write('products.json', {
+            'products': [
+                {'id': 'prod_1', 'status': 'active'},
+                {'id': 'prod_2', 'status': 'draft'}
+            ]
+        })
+        headers = {'Authorization': f'Bearer {auth_token}'}
+
+        response = make_request(f'{test_server_url}/api/shop/products', headers=headers)
+        assert [p['id'] for p in response['data']['products']] == ['prod_1', 'prod_2']
+
+        assert make_request(f'{test_server_url}/api/shop/products/prod_2')['status'] == 404
+        response = make_request(f'{test_server_url}/api/shop/products/prod_2', headers=headers)
+        assert response['status'] == 200
+
     def test_get_products_by_category(self, test_server_url, mock_data_dir):
         """Should filter products by category"""
         if not SERVER_IMPORTS_OK:
@@ -416,6 +492,113 @@ class TestGetProducts:
 
         assert response['status'] == 200
 
+    def test_products_page(self, test_server_url, mock_data_dir):
+        """Should page through products with limit and cursor"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        mock_data_dir.write('products.json', {
+            'products': [
+                {'id': 'prod_%d' % i, 'price': 100 - i, 'status': 'active'} for i in range(5)
+            ]
+        })
+
+        first = make_request(f'{test_server_url}/api/shop/products?sort=price_asc&limit=3')
+        assert first['status'] == 200
+        assert [p['id'] for p in first['data']['products']] == ['prod_4', 'prod_3', 'prod_2']
+
+        cursor = first['data']['nextCursor']
+        second = make_request(
+            f'{test_server_url}/api/shop/products?sort=price_asc&limit=3&cursor={cursor}')
+        assert [p['id'] for p in second['data']['products']] == ['prod_1', 'prod_0']
+        assert second['data']['nextCursor'] is None
+
+    def test_products_page_invalid_params(self, test_server_url, mock_data_dir):
+        """Should reject unknown sort, broken cursor and bad limit"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        for params in ('sort=random', 'cursor=broken', 'limit=abc'):
+            response = make_request(f'{test_server_url}/api/shop/products?{params}')
+            assert response['status'] == 400
+
+    def test_products_filters(self, test_server_url, mock_data_dir):
+        """Should filter by several categories and a price range"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        mock_data_dir.write('shop-categories.json', {'categories': [
+            {'id': 'cat_1', 'slug': 'hair'}, {'id': 'cat_2', 'slug': 'beard'}
+        ]})
+        mock_data_dir.write('products.json', {
+            'products': [
+                {'id': 'prod_1', 'categoryId': 'cat_1', 'price': 100, 'status': 'active'},
+                {'id': 'prod_2', 'categoryId': 'cat_2', 'price': 200, 'status': 'active'},
+                {'id': 'prod_3', 'categoryId': 'cat_2', 'price': 900, 'status': 'active'}
+            ]
+        })
+
+        response = make_request(
+            f'{test_server_url}/api/shop/products?category=hair,beard&price_max=500')
+        assert response['status'] == 200
+        assert [p['id'] for p in response['data']['products']] == ['prod_1', 'prod_2']
+
+        response = make_request(f'{test_server_url}/api/shop/products?price_min=abc')
+        assert response['status'] == 400
+
+    def test_search_products(self, test_server_url, mock_data_dir):
+        """Should search active products by ?q= and return highlights"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        mock_data_dir.write('products.json', {
+            'products': [
+                {'id': 'prod_1', 'name': 'Шампунь', 'status': 'active'},
+                {'id': 'prod_2', 'name': 'Шампунь draft', 'status': 'draft'},
+                {'id': 'prod_3', 'name': 'Масло', 'status': 'active'}
+            ]
+        })
+
+        response = make_request(f'{test_server_url}/api/shop/products?q=%D1%88%D0%B0%D0%BC%D0%BF')
+
+        assert response['status'] == 200
+        products = response['data']['products']
+        assert [p['id'] for p in products] == ['prod_1']
+        assert products[0]['highlight']['name'] == '<mark>Шампунь</mark>'
+
+    def test_search_invalid_limit(self, test_server_url, mock_data_dir):
+        """Should reject a non-numeric limit"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        response = make_request(f'{test_server_url}/api/shop/products?q=x&limit=abc')
+
+        assert response['status'] == 400
+
+
+class TestGetFacets:
+    """Tests for GET /api/shop/facets"""
+
+    def test_get_facets(self, test_server_url, mock_data_dir):
+        """Should return category counts and price bounds"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        mock_data_dir.write('shop-categories.json', {'categories': [{'id': 'cat_1', 'slug': 'hair'}]})
+        mock_data_dir.write('products.json', {
+            'products': [
+                {'id': 'prod_1', 'categoryId': 'cat_1', 'price': 100, 'status': 'active'},
+                {'id': 'prod_2', 'categoryId': 'cat_1', 'price': 300, 'status': 'active'},
+                {'id': 'prod_3', 'categoryId': 'cat_1', 'price': 900, 'status': 'draft'}
+            ]
+        })
+
+        response = make_request(f'{test_server_url}/api/shop/facets')
+
+        assert response['status'] == 200
+        assert response['data']['categories'] == {'hair': 2}
+        assert response['data']['price'] == {'min': 100, 'max': 300}
+
 
 class TestGetProductById:
     """Tests for GET /api/shop/products/{id}"""
@@ -448,6 +631,470 @@ class TestGetProductById:
         assert response['status'] == 404
 
 
+# =============================================================================
+# PATCH ENDPOINTS
+# =============================================================================
+
+class TestPatchEndpoints:
+    """Tests for PATCH on generic resources"""
+
+    SERVICES = {
+        'categories': [
+            {'id': 'main', 'name': 'Основные',
+             'services': [{'id': 1, 'name': 'Стрижка', 'priceGreen': 1000}]}
+        ]
+    }
+
+    @staticmethod
+    def patch(url, body, token, content_type='application/json'):
+        req = urllib.request.Request(
+            url, data=json.dumps(body).encode('utf-8'), method='PATCH',
+            headers={'Content-Type': content_type, 'Authorization': f'Bearer {token}'}
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=5) as response:
+                return response.status, json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read().decode('utf-8'))
+
+    def test_requires_auth(self, test_server_url, mock_data_dir):
+        """Should reject anonymous patches"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        status, _ = self.patch(f'{test_server_url}/api/services', [], 'invalid')
+        assert status == 401
+
+    def test_json_patch(self, test_server_url, mock_data_dir, auth_token):
+        """Should apply a JSON Patch to the nested services document"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        mock_data_dir.write('services.json', self.SERVICES)
+        status, data = self.patch(
+            f'{test_server_url}/api/services',
+            [{'op': 'replace', 'path': '/categories/0/services/0/priceGreen', 'value': 1200}],
+            auth_token, 'application/json-patch+json'
+        )
+
+        assert status == 200
+        assert data['success'] is True
+        result = mock_data_dir.read('services.json')
+        assert result['categories'][0]['services'][0]['priceGreen'] == 1200
+
+    def test_merge_patch(self, test_server_url, mock_data_dir, auth_token):
+        """Should apply a merge patch object"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        mock_data_dir.write('social.json', {'social': [], 'phone': '+7 000'})
+        status, _ = self.patch(
+            f'{test_server_url}/api/social', {'phone': '+7 111'},
+            auth_token, 'application/merge-patch+json'
+        )
+
+        assert status == 200
+        assert mock_data_dir.read('social.json')['phone'] == '+7 111'
+
+    def test_schema_violation(self, test_server_url, mock_data_dir, auth_token):
+        """Should validate the patched document and keep the data on error"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        mock_data_dir.write('services.json', self.SERVICES)
+        status, data = self.patch(
+            f'{test_server_url}/api/services',
+            [{'op': 'replace', 'path': '/categories/0/services/0/priceGreen', 'value': 'дорого'}],
+            auth_token
+        )
+
+        assert status == 400
+        assert data['error'] == 'Invalid priceGreen'
+        result = mock_data_dir.read('services.json')
+        assert result['categories'][0]['services'][0]['priceGreen'] == 1000
+
+    def test_invalid_path(self, test_server_url, mock_data_dir, auth_token):
+        """Should return 400 for a path missing from the document"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        mock_data_dir.write('services.json', self.SERVICES)
+        status, data = self.patch(
+            f'{test_server_url}/api/services',
+            [{'op': 'replace', 'path': '/categories/3/name', 'value': 'x'}],
+            auth_token
+        )
+
+        assert status == 400
+        assert 'out of range' in data['error']
+
+
+# =============================================================================
+# REORDER ENDPOINTS
+# =============================================================================
+
+class TestReorderEndpoints:
+    """Tests for POST /api/<resource>/reorder"""
+
+    FAQ = {'faq': [
+        {'id': 'q1', 'question': 'Первый?', 'answer': 'Да'},
+        {'id': 'q2', 'question': 'Второй?', 'answer': 'Да'},
+    ]}
+
+    @staticmethod
+    def reorder(url, body, token):
+        req = urllib.request.Request(
+            url, data=json.dumps(body).encode('utf-8'), method='POST',
+            headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {token}'}
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=5) as response:
+                return response.status, json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read().decode('utf-8'))
+
+    def test_requires_auth(self, test_server_url, mock_data_dir):
+        """Should reject anonymous reorders"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        status, _ = self.reorder(f'{test_server_url}/api/faq/reorder', {'ids': []}, 'invalid')
+        assert status == 401
+
+    def test_reorder(self, test_server_url, mock_data_dir, auth_token):
+        """Should apply the new order"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        mock_data_dir.write('faq.json', self.FAQ)
+        status, data = self.reorder(
+            f'{test_server_url}/api/faq/reorder', {'ids': ['q2', 'q1']}, auth_token
+        )
+
+        assert status == 200
+        assert data == {'success': True, 'updated': 2}
+        assert [q['id'] for q in mock_data_dir.read('faq.json')['faq']] == ['q2', 'q1']
+
+    @pytest.mark.parametrize('body', [
+        ['q2', 'q1'],
+        {'ids': 'q2'},
+        {'ids': [{'id': 'q2'}]},
+        {'ids': ['q2', 'q2']},
+        {'ids': ['q9']},
+    ])
+    def test_invalid_body(self, test_server_url, mock_data_dir, auth_token, body):
+        """Should return 400 and keep the order"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        mock_data_dir.write('faq.json', self.FAQ)
+        status, _ = self.reorder(f'{test_server_url}/api/faq/reorder', body, auth_token)
+
+        assert status == 400
+        assert [q['id'] for q in mock_data_dir.read('faq.json')['faq']] == ['q1', 'q2']
+
+
+# =============================================================================
+# BACKUP ENDPOINTS
+# =============================================================================
+
+class TestBackupEndpoints:
+    """Tests for GET/POST /api/backups"""
+
+    def test_requires_auth(self, test_server_url, mock_data_dir):
+        """Should reject anonymous backup requests"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        req = urllib.request.Request(f'{test_server_url}/api/backups', data=b'{}', method='POST')
+        with pytest.raises(urllib.error.HTTPError) as exc_info:
+            urllib.request.urlopen(req, timeout=5)
+        assert exc_info.value.code == 401
+
+    def test_trigger_and_list(self, test_server_url, mock_data_dir, auth_token):
+        """Should start a background backup and list the result"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+        import server.handler as handler_module
+
+        mock_data_dir.write('faq.json', {'faq': [{'id': 'q1', 'question': 'Да?'}]})
+        headers = {'Authorization': f'Bearer {auth_token}'}
+        req = urllib.request.Request(
+            f'{test_server_url}/api/backups', data=b'{}', method='POST', headers=headers
+        )
+        with urllib.request.urlopen(req, timeout=5) as response:
+            assert response.status == 202
+        assert handler_module.backup_job.wait_idle(5)
+
+        req = urllib.request.Request(f'{test_server_url}/api/backups', headers=headers)
+        with urllib.request.urlopen(req, timeout=5) as response:
+            data = json.loads(response.read().decode('utf-8'))
+
+        names = [b['name'] for b in data['backups']]
+        assert any(name.startswith('test-2') for name in names)
+        assert any(name.startswith('test-stats-') for name in names)
+        assert data['job']['running'] is False
+        assert data['job']['last_error'] is None
+
+
+# =============================================================================
+# NDJSON EXPORT / IMPORT
+# =============================================================================
+
+class TestExportImportEndpoints:
+    """Tests for /api/export/<resource> and /api/import/<resource>"""
+
+    @staticmethod
+    def request(url, token, data=None):
+        req = urllib.request.Request(
+            url, data=data, method='POST' if data is not None else 'GET',
+            headers={'Content-Type': 'application/x-ndjson', 'Authorization': f'Bearer {token}'}
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=5) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+
+    def test_export_requires_auth(self, test_server_url, mock_data_dir):
+        """Should reject anonymous exports"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        status, _, _ = self.request(f'{test_server_url}/api/export/faq', 'invalid')
+        assert status == 401
+
+    def test_export(self, test_server_url, mock_data_dir, auth_token):
+        """Should stream one item per line"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        mock_data_dir.write('products.json', {'products': [
+            {'id': 'product_%d' % i, 'name': 'Товар %d' % i} for i in range(300)
+        ]})
+        status, headers, body = self.request(
+            f'{test_server_url}/api/export/shop-products', auth_token
+        )
+
+        assert status == 200
+        assert headers['Content-Type'].startswith('application/x-ndjson')
+        assert 'Content-Length' not in headers
+        lines = body.decode('utf-8').splitlines()
+        assert len(lines) == 300
+        assert json.loads(lines[299])['id'] == 'product_299'
+
+    def test_export_unknown_resource(self, test_server_url, mock_data_dir, auth_token):
+        """Should return 404 for resources without an item list"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        status, _, _ = self.request(f'{test_server_url}/api/export/services', auth_token)
+        assert status == 404
+
+    def test_import_reports_bad_lines(self, test_server_url, mock_data_dir, auth_token):
+        """Should import valid lines and report the rest with line numbers"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        body = '\n'.join([
+            json.dumps({'id': 'faq_1', 'question': 'Первый?'}),
+            '{broken',
+            '',
+            json.dumps({'question': 'Без id?'}),
+            json.dumps({'id': 'faq_2', 'question': '<b>html</b>'}),
+            json.dumps({'id': 'faq_3', 'question': 'Третий?'}),
+        ]).encode('utf-8')
+        status, _, raw = self.request(f'{test_server_url}/api/import/faq', auth_token, body)
+
+        data = json.loads(raw)
+        assert status == 200
+        assert data['imported'] == 2
+        assert data['failed'] == 3
+        assert data['errors'] == [
+            {'line': 2, 'error': 'Invalid JSON'},
+            {'line': 4, 'error': 'Missing id'},
+            {'line': 5, 'error': 'Invalid characters in question'},
+        ]
+        assert [q['id'] for q in mock_data_dir.read('faq.json')['faq']] == ['faq_1', 'faq_3']
+
+    def test_import_rejects_non_string_id_without_schema(self, test_server_url, mock_data_dir,
+                                                         auth_token):
+        """Should report non-string ids of schemaless resources per line"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        body = '\n'.join([
+            json.dumps({'id': 'legal_1', 'slug': 'privacy'}),
+            json.dumps({'id': {'x': 1}, 'slug': 'bad'}),
+            json.dumps({'id': 7, 'slug': 'number'}),
+        ]).encode('utf-8')
+        status, _, raw = self.request(f'{test_server_url}/api/import/legal', auth_token, body)
+
+        data = json.loads(raw)
+        assert status == 200
+        assert data['imported'] == 1
+        assert data['errors'] == [
+            {'line': 2, 'error': 'Invalid id'},
+            {'line': 3, 'error': 'Invalid id'},
+        ]
+
+    def test_import_round_trip(self, test_server_url, mock_data_dir, auth_token):
+        """Should accept its own export"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        masters = {'masters': [
+            {'id': 'master_1', 'name': 'Анна'}, {'id': 'master_2', 'name': 'Борис'},
+        ]}
+        mock_data_dir.write('masters.json', masters)
+        _, _, exported = self.request(f'{test_server_url}/api/export/masters', auth_token)
+        mock_data_dir.write('masters.json', {'masters': []})
+
+        status, _, raw = self.request(f'{test_server_url}/api/import/masters', auth_token, exported)
+
+        assert status == 200
+        assert json.loads(raw)['imported'] == 2
+        assert mock_data_dir.read('masters.json') == masters
+
+    def import_products(self, base_url, token, body):
+        """POST the CSV, wait for the background import and return (status, job)."""
+        status, _, raw = self.request(f'{base_url}/api/shop/products/import', token, body)
+        if status != 202:
+            return status, json.loads(raw)
+        from server.handler import csv_import_job
+        assert csv_import_job.wait(10)
+        _, _, raw = self.request(f'{base_url}/api/shop/products/import', token)
+        return status, json.loads(raw)['job']
+
+    def test_import_products_csv(self, test_server_url, mock_data_dir, auth_token):
+        """Should import products from CSV in the background and report bad rows"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        body = 'Название;Цена;ID\nШампунь;1 200;product_1\nВоск;дорого;product_2\n'.encode('utf-8')
+        status, job = self.import_products(test_server_url, auth_token, body)
+
+        assert status == 202
+        assert job['running'] is False and job['error'] is None
+        assert job['report']['imported'] == 1
+        assert job['report']['errors'] == [{'line': 3, 'error': 'Invalid price'}]
+        product = mock_data_dir.read('products.json')['products'][0]
+        assert product['price'] == 1200
+        assert product['status'] == 'draft'
+
+    def test_import_products_csv_twice(self, test_server_url, mock_data_dir, auth_token):
+        """Should update products matched by sku instead of duplicating them"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        body = 'name;sku;price\nШампунь;SH-1;100\n'.encode('utf-8')
+        self.import_products(test_server_url, auth_token, body)
+        body = 'name;sku;price\nШампунь;SH-1;150\n'.encode('utf-8')
+        self.import_products(test_server_url, auth_token, body)
+
+        products = mock_data_dir.read('products.json')['products']
+        assert [(p['sku'], p['price']) for p in products] == [('SH-1', 150)]
+
+    def test_import_products_csv_long_line(self, test_server_url, mock_data_dir, auth_token):
+        """Should report an overlong CSV line as a row error and keep importing"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        body = ('name;ID\n' + 'x' * (2 * 1024 * 1024) + '\nВоск;product_2\n').encode('utf-8')
+        status, job = self.import_products(test_server_url, auth_token, body)
+
+        assert status == 202
+        assert job['report']['imported'] == 1
+        assert job['report']['errors'] == [{'line': 2, 'error': 'Line too long'}]
+
+    def test_import_products_csv_missing_column(self, test_server_url, mock_data_dir, auth_token):
+        """Should reject a file without the name column"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        status, _, raw = self.request(
+            f'{test_server_url}/api/shop/products/import', auth_token, b'id,price\nproduct_1,10\n'
+        )
+
+        assert status == 400
+        assert 'Missing column: name' in raw.decode('utf-8')
+
+
+# =============================================================================
+# BATCH ENDPOINT
+# =============================================================================
+
+class TestBatchEndpoint:
+    """Tests for POST /api/batch"""
+
+    @staticmethod
+    def batch(url, body, token):
+        req = urllib.request.Request(
+            f'{url}/api/batch', data=json.dumps(body).encode('utf-8'), method='POST',
+            headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {token}'}
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=5) as response:
+                return response.status, json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read().decode('utf-8'))
+
+    def test_requires_auth(self, test_server_url, mock_data_dir):
+        """Should reject anonymous batches"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        status, _ = self.batch(test_server_url, {'writes': []}, 'invalid')
+        assert status == 401
+
+    def test_saves_all_resources(self, test_server_url, mock_data_dir, auth_token):
+        """Should save several resources at once"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        status, data = self.batch(test_server_url, {'writes': [
+            {'resource': 'shop-categories', 'data': {'categories': [
+                {'id': 'category_1', 'name': 'Уход', 'slug': 'care'}]}},
+            {'resource': 'shop-products', 'data': {'products': [
+                {'id': 'product_1', 'name': 'Воск', 'categoryId': 'category_1'}]}},
+        ]}, auth_token)
+
+        assert status == 200
+        assert data['changed'] == ['shop-categories', 'shop-products']
+        assert mock_data_dir.read('shop-categories.json')['categories'][0]['id'] == 'category_1'
+        assert mock_data_dir.read('products.json')['products'][0]['id'] == 'product_1'
+
+    def test_validation_error_saves_nothing(self, test_server_url, mock_data_dir, auth_token):
+        """Should validate every document before writing any"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        status, data = self.batch(test_server_url, {'writes': [
+            {'resource': 'faq', 'data': {'faq': [{'id': 'q1'}]}},
+            {'resource': 'services', 'data': {'categories': [
+                {'id': 'main', 'services': [{'id': 1, 'name': 'Стрижка', 'priceGreen': 'дорого'}]}
+            ]}},
+        ]}, auth_token)
+
+        assert status == 400
+        assert data['error'] == 'services: Invalid priceGreen'
+        assert mock_data_dir.read('faq.json')['faq'] == []
+
+    @pytest.mark.parametrize('body', [
+        {'writes': []},
+        {'writes': [{'resource': 'stats', 'data': {}}]},
+        {'writes': [{'resource': 'faq', 'data': []}]},
+        {'writes': [{'resource': 'faq', 'data': {}}, {'resource': 'faq', 'data': {}}]},
+    ])
+    def test_invalid_body(self, test_server_url, mock_data_dir, auth_token, body):
+        """Should return 400 for malformed batches"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        status, _ = self.batch(test_server_url, body, auth_token)
+        assert status == 400
+
+
 # =============================================================================
 # PROTECTED ENDPOINTS (POST)
 # =============================================================================
@@ -658,6 +1305,183 @@ class TestStatsEndpoints:
         assert response['data'].get('success') is True
 
 
+# =============================================================================
+# METRICS ENDPOINT
+# =============================================================================
+
+class TestMetricsEndpoint:
+    """Tests for GET /api/metrics"""
+
+    def test_requires_auth(self, test_server_url):
+        """Should reject anonymous requests"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        response = make_request(f'{test_server_url}/api/metrics')
+        assert response['status'] == 401
+
+    def test_returns_pool_metrics(self, test_server_url, mock_data_dir, auth_token):
+        """Should return read pool and writer metrics"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        mock_data_dir.read('masters.json')
+        response = make_request(
+            f'{test_server_url}/api/metrics',
+            headers={'Authorization': f'Bearer {auth_token}'}
+        )
+
+        assert response['status'] == 200
+        assert response['data']['catalog']['read_pool']['checkouts'] >= 1
+        assert 'utilization' in response['data']['catalog']['read_pool']
+        assert 'queue_depth' in response['data']['catalog']['writer']
+        assert 'writer' in response['data']['stats']
+
+
+# =============================================================================
+# CHANGES ENDPOINT
+# =============================================================================
+
+class TestChangesEndpoint:
+    """Tests for GET /api/changes"""
+
+    def test_requires_auth(self, test_server_url):
+        """Should reject anonymous requests"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        response = make_request(f'{test_server_url}/api/changes')
+        assert response['status'] == 401
+
+    def test_returns_changes_since(self, test_server_url, mock_data_dir, auth_token):
+        """Should return only items changed after since"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        mock_data_dir.write('masters.json', {'masters': [{'id': 'master_1', 'name': 'A'}]})
+        since = mock_data_dir.get_changes()['seq']
+        mock_data_dir.write('masters.json', {'masters': [
+            {'id': 'master_1', 'name': 'A'}, {'id': 'master_2', 'name': 'B'}
+        ]})
+
+        response = make_request(
+            f'{test_server_url}/api/changes?since={since}',
+            headers={'Authorization': f'Bearer {auth_token}'}
+        )
+
+        assert response['status'] == 200
+        assert [c['id'] for c in response['data']['changes']] == ['master_2']
+        assert response['data']['seq'] > since
+        assert response['data']['reset'] is False
+
+    def test_invalid_since(self, test_server_url, mock_data_dir, auth_token):
+        """Should return 400 for a non-numeric since"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        response = make_request(
+            f'{test_server_url}/api/changes?since=abc',
+            headers={'Authorization': f'Bearer {auth_token}'}
+        )
+        assert response['status'] == 400
+
+
+# =============================================================================
+# EVENTS ENDPOINT
+# =============================================================================
+
+class TestEventsEndpoint:
+    """Tests for GET /api/events (Server-Sent Events)"""
+
+    @staticmethod
+    def open_stream(url, path):
+        """Open a raw SSE connection and return the socket and the first bytes."""
+        import socket
+        from urllib.parse import urlparse
+
+        parsed = urlparse(url)
+        sock = socket.create_connection((parsed.hostname, parsed.port), timeout=5)
+        sock.sendall(('GET %s HTTP/1.1\r\nHost: localhost\r\n\r\n' % path).encode())
+        data = b''
+        while b'event: hello' not in data and b'\r\n\r\n{' not in data:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            data += chunk
+        return sock, data
+
+    def test_requires_auth(self, test_server_url):
+        """Should reject anonymous subscribers"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        response = make_request(f'{test_server_url}/api/events')
+        assert response['status'] == 401
+
+    @staticmethod
+    def ticket(url, token):
+        response = make_request(f'{url}/api/events/ticket', method='POST',
+                                headers={'Authorization': f'Bearer {token}'})
+        assert response['status'] == 200
+        return response['data']['ticket']
+
+    def test_token_in_query_rejected(self, test_server_url, auth_token):
+        """Should not accept the long-lived bearer token in the URL"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        response = make_request(f'{test_server_url}/api/events?token={auth_token}')
+        assert response['status'] == 401
+
+    def test_ticket_requires_auth(self, test_server_url):
+        """Should issue tickets only to authenticated clients"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        response = make_request(f'{test_server_url}/api/events/ticket', method='POST')
+        assert response['status'] == 401
+
+    def test_ticket_single_use(self, test_server_url, auth_token):
+        """Should accept a ticket once"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        ticket = self.ticket(test_server_url, auth_token)
+        sock, data = self.open_stream(test_server_url, f'/api/events?ticket={ticket}')
+        sock.close()
+
+        assert b'event: hello' in data
+        response = make_request(f'{test_server_url}/api/events?ticket={ticket}')
+        assert response['status'] == 401
+
+    def test_streams_version_events(self, test_server_url, mock_data_dir, auth_token):
+        """Should send hello, keep serving other requests and push version bumps"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        ticket = self.ticket(test_server_url, auth_token)
+        sock, data = self.open_stream(test_server_url, f'/api/events?ticket={ticket}')
+        try:
+            assert b'text/event-stream' in data
+            assert b'event: hello' in data
+
+            # Однопоточный тестовый сервер продолжает отвечать: поток не занят подписчиком
+            response = make_request(
+                f'{test_server_url}/api/faq',
+                method='POST',
+                data={'items': [{'id': 'faq_1', 'question': 'Q?', 'answer': 'A.'}]},
+                headers={'Authorization': f'Bearer {auth_token}'}
+            )
+            assert response['status'] == 200
+
+            data = b''
+            while b'event: version' not in data:
+                data += sock.recv(4096)
+            assert b'"resource":"faq"' in data
+        finally:
+            sock.close()
+
+
 # =============================================================================
 # CORS
 # =============================================================================
@@ -746,6 +1570,27 @@ class TestErrorHandling:
         )
         assert response['status'] == 400
 
+    def test_wrong_method_returns_405(self, test_server_url):
+        """Should answer 405 with Allow for a known path and another method"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        response = make_request(f'{test_server_url}/api/auth/login')
+        assert response['status'] == 405
+        assert response['headers']['Allow'] == 'POST'
+
+        response = make_request(f'{test_server_url}/api/legal/privacy', method='DELETE')
+        assert response['status'] == 405
+        assert response['headers']['Allow'] == 'GET'
+
+    def test_unknown_path_returns_404(self, test_server_url):
+        """Should keep 404 for paths without any route"""
+        if not SERVER_IMPORTS_OK:
+            pytest.skip("Server imports failed")
+
+        response = make_request(f'{test_server_url}/api/nonexistent', method='POST', data={})
+        assert response['status'] == 404
+
 
 # =============================================================================
 # SOCIAL ENDPOINTS
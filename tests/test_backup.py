@@ -0,0 +1,207 @@
+"""
+Tests for server/backup.py — online SQLite backups
+"""
+
+import os
+import sqlite3
+import stat
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from server.backup import BackupJob, backup_database, list_backups, rotate_backups
+from server.database import Database
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(db_path=str(tmp_path / 'site.db'))
+    yield database
+    database.close()
+
+
+def seed_products(db, n):
+    db.write('products.json', {'products': [
+        {'id': 'p%d' % i, 'name': 'Товар %d' % i, 'description': 'x' * 200, 'status': 'active'}
+        for i in range(n)
+    ]})
+
+
+def count_products(path):
+    conn = sqlite3.connect(str(path))
+    try:
+        assert conn.execute('PRAGMA integrity_check').fetchone()[0] == 'ok'
+        return conn.execute('SELECT COUNT(*) FROM products').fetchone()[0]
+    finally:
+        conn.close()
+
+
+class TestBackupDatabase:
+
+    def test_creates_standalone_copy(self, db, tmp_path):
+        """Should write a complete single-file copy and no temp files."""
+        seed_products(db, 50)
+
+        result = backup_database(db.db_path, tmp_path / 'backups')
+
+        path = Path(result['path'])
+        assert path.name.startswith('site-') and path.suffix == '.db'
+        assert count_products(path) == 50
+        assert result['pages'] > 0 and result['steps'] >= 1
+        conn = sqlite3.connect(str(path))
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+        conn.close()
+        assert sorted(p.name for p in path.parent.iterdir()) == [path.name]
+
+    @pytest.mark.skipif(os.name == 'nt', reason='directories cannot be fsynced on Windows')
+    def test_directory_synced_after_rename(self, db, tmp_path, monkeypatch):
+        """Should fsync the backup directory once the copy has its final name."""
+        synced = []
+        original = os.fsync
+
+        def fsync(fd):
+            mode = os.fstat(fd).st_mode
+            synced.append(('dir' if stat.S_ISDIR(mode) else 'file',
+                           sorted(p.name for p in (tmp_path / 'backups').iterdir())))
+            original(fd)
+
+        monkeypatch.setattr(os, 'fsync', fsync)
+        result = backup_database(db.db_path, tmp_path / 'backups')
+
+        assert synced[-1] == ('dir', [Path(result['path']).name])
+
+    def test_consistent_under_writes(self, db, tmp_path):
+        """Should finish with a consistent snapshot while a writer keeps committing."""
+        seed_products(db, 2000)
+        stop = threading.Event()
+        writes = []
+
+        def writer():
+            i = 0
+            while not stop.is_set():
+                db.write('faq.json', {'faq': [{'id': 'q1', 'question': 'v%d' % i}]})
+                writes.append(i)
+                i += 1
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            result = backup_database(db.db_path, tmp_path / 'backups', pages=8, sleep=0.001)
+        finally:
+            stop.set()
+            thread.join()
+
+        assert writes
+        assert count_products(result['path']) == 2000
+
+    def test_rotation(self, tmp_path):
+        """Should keep only the newest copies of the given database."""
+        for name in ('site-20260101-000000-000.db', 'site-20260102-000000-000.db',
+                     'site-20260103-000000-000.db', 'site-stats-20260101-000000-000.db'):
+            (tmp_path / name).write_bytes(b'')
+
+        removed = rotate_backups(tmp_path, 'site', keep=2)
+
+        assert removed == ['site-20260101-000000-000.db']
+        assert len(list_backups(tmp_path)) == 3
+
+    def test_database_backup_both_files(self, db):
+        """Should back up the catalog and the analytics database."""
+        result = db.backup(keep=3)
+
+        names = [b['name'] for b in list_backups(db.backup_dir)]
+        assert Path(result['catalog']['path']).name in names
+        assert Path(result['stats']['path']).name.startswith('site-stats-')
+
+
+class TestBackupJob:
+
+    def test_trigger_runs_in_background(self):
+        """Should run the backup on its own thread and keep the result."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def backup():
+            started.set()
+            release.wait(2)
+            return {'ok': True}
+
+        job = BackupJob(backup)
+        try:
+            assert job.trigger() is True
+            assert started.wait(2)
+            assert job.trigger() is False
+            assert job.status()['running'] is True
+            release.set()
+            assert job.wait_idle(2)
+            assert job.status()['last_result'] == {'ok': True}
+        finally:
+            job.close()
+
+    def test_error_recorded(self):
+        """Should keep the last error and stay usable."""
+        def backup():
+            raise OSError('disk full')
+
+        job = BackupJob(backup)
+        try:
+            job.trigger()
+            assert job.wait_idle(2)
+            assert job.status()['last_error'] == 'disk full'
+            assert job.trigger() is True
+        finally:
+            job.close()
+
+    def test_interval(self):
+        """Should run by schedule without being triggered."""
+        runs = []
+        job = BackupJob(lambda: runs.append(1), interval=0.05)
+        try:
+            job.start()
+            deadline = time.time() + 2
+            while len(runs) < 2 and time.time() < deadline:
+                time.sleep(0.01)
+            assert len(runs) >= 2
+        finally:
+            job.close()
+
+
+@pytest.mark.benchmark
+def test_backup_timings(tmp_path):
+    """Backup duration and writer latency on a large catalog."""
+    db = Database(db_path=str(tmp_path / 'bench.db'))
+    seed_products(db, 100000)
+    size = Path(db.db_path).stat().st_size
+
+    for pages, sleep in ((-1, 0), (1024, 0.001), (256, 0.005)):
+        latencies = []
+        stop = threading.Event()
+
+        def writer():
+            i = 0
+            while not stop.is_set():
+                start = time.perf_counter()
+                db.write('faq.json', {'faq': [{'id': 'q1', 'question': 'v%d' % i}]})
+                latencies.append(time.perf_counter() - start)
+                i += 1
+                time.sleep(0.005)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            result = backup_database(db.db_path, tmp_path / 'backups', pages=pages, sleep=sleep)
+        finally:
+            stop.set()
+            thread.join()
+        print('\n%.1f MB pages=%-5d sleep=%.3f: %.3fs, %d steps, '
+              'writes %d, writer p50 %.2fms max %.2fms' % (
+                  size / 1e6, pages, sleep, result['seconds'], result['steps'],
+                  len(latencies), statistics.median(latencies) * 1000,
+                  max(latencies) * 1000))
+    db.close()
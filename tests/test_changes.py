@@ -0,0 +1,208 @@
+"""
+Tests for server/changes.py — row state diffs and change log reads
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from server import changes
+from server.changes import CHANGES_SCHEMA, diff_state, read_changes, record_changes
+
+
+@pytest.fixture
+def conn():
+    """In-memory connection with the change log schema."""
+    conn = sqlite3.connect(':memory:')
+    for sql in CHANGES_SCHEMA:
+        conn.execute(sql)
+    return conn
+
+
+def load_items(conn, resource, field, ids):
+    """Stand-in loader: every logged item still exists."""
+    return {item_id: {'id': item_id} for item_id in ids}
+
+
+class TestDiff:
+
+    def test_item_update_and_delete(self):
+        """Should report changed hashes by id and removed rows as deletes."""
+        before = {('masters', 'a'): (0, 'h1'), ('masters', 'b'): (1, 'h2')}
+        after = {('masters', 'a'): (0, 'h3')}
+        assert diff_state(before, after) == [
+            ('masters', 'a', 'upsert', 0),
+            ('masters', 'b', 'delete', None),
+        ]
+
+    def test_position_change_is_move(self):
+        """Should report rows with the same hash at a new position as moves."""
+        before = {('faq', 'a'): (0, 'ha'), ('faq', 'b'): (1, 'hb')}
+        after = {('faq', 'a'): (1, 'ha'), ('faq', 'b'): (0, 'hb')}
+        assert diff_state(before, after) == [
+            ('faq', 'b', 'move', 0),
+            ('faq', 'a', 'move', 1),
+        ]
+
+    def test_insert_does_not_touch_neighbours(self):
+        """Should log only the new row when the others keep their positions."""
+        before = {('faq', 'a'): (0, 'ha')}
+        after = {('faq', 'a'): (0, 'ha'), ('faq', 'b'): (1, 'hb')}
+        assert diff_state(before, after) == [('faq', 'b', 'upsert', 1)]
+
+    def test_unchanged(self):
+        """Should return nothing for identical states."""
+        state = {('masters', 'a'): (0, 'h'), ('podology', None): (None, 'x')}
+        assert diff_state(state, state) == []
+
+    def test_missing_hash_is_upsert(self):
+        """Should treat rows without a stored hash as changed."""
+        state = {('masters', 'a'): (0, None)}
+        assert diff_state(state, state) == [('masters', 'a', 'upsert', 0)]
+
+
+class TestReadChanges:
+
+    def test_coalesces_per_item(self, conn):
+        """Should keep one row per item and load its current data."""
+        record_changes(conn, 'masters', [('masters', 'a', 'upsert', 0)])
+        record_changes(conn, 'masters', [('masters', 'a', 'upsert', 0)])
+
+        result = read_changes(conn, 0, load=load_items)
+
+        assert result['seq'] == 2
+        assert result['reset'] is False
+        assert result['changes'] == [{
+            'seq': 2, 'resource': 'masters', 'field': 'masters', 'id': 'a',
+            'op': 'upsert', 'position': 0, 'item': {'id': 'a'},
+        }]
+        assert conn.execute('SELECT COUNT(*) FROM changes').fetchone()[0] == 1
+
+    def test_stores_no_item_data(self, conn):
+        """Should keep only keys and positions in the log."""
+        columns = [r[1] for r in conn.execute('PRAGMA table_info(changes)')]
+        assert columns == ['seq', 'resource', 'field', 'item_id', 'op', 'position', 'data_seq']
+
+    def test_move_without_payload(self, conn):
+        """Should return moves with a position and no item."""
+        record_changes(conn, 'faq', [('faq', 'a', 'move', 3)])
+
+        change = read_changes(conn, 0, load=load_items)['changes'][0]
+
+        assert change['op'] == 'move'
+        assert change['position'] == 3
+        assert 'item' not in change
+
+    def test_move_after_upsert(self, conn):
+        """Should return the data only to clients that missed the upsert."""
+        record_changes(conn, 'faq', [('faq', 'a', 'upsert', 0)])
+        record_changes(conn, 'faq', [('faq', 'b', 'upsert', 1)])
+        record_changes(conn, 'faq', [('faq', 'a', 'move', 2)])
+        record_changes(conn, 'faq', [('faq', 'a', 'move', 3)])
+
+        old_client = read_changes(conn, 0, load=load_items)['changes']
+        new_client = read_changes(conn, 1, load=load_items)['changes']
+
+        assert [(c['id'], c['op'], c['position']) for c in old_client] == [
+            ('b', 'upsert', 1), ('a', 'upsert', 3),
+        ]
+        assert [(c['id'], c['op'], c['position']) for c in new_client] == [
+            ('b', 'upsert', 1), ('a', 'move', 3),
+        ]
+
+    def test_since_filters(self, conn):
+        """Should skip changes up to since."""
+        record_changes(conn, 'faq', [('faq', 'a', 'upsert', 0)])
+        record_changes(conn, 'faq', [('faq', 'b', 'upsert', 1)])
+        record_changes(conn, 'faq', [('faq', 'a', 'delete', None)])
+
+        result = read_changes(conn, 2, load=load_items)
+
+        assert [(c['id'], c['op']) for c in result['changes']] == [('a', 'delete')]
+        assert 'item' not in result['changes'][0]
+
+    def test_vanished_item_is_delete(self, conn):
+        """Should report an upsert whose row is gone as a delete."""
+        record_changes(conn, 'faq', [('faq', 'a', 'upsert', 0)])
+
+        result = read_changes(conn, 0, load=lambda *args: {})
+
+        assert [(c['id'], c['op']) for c in result['changes']] == [('a', 'delete')]
+
+    def test_whole_field(self, conn):
+        """Should log fields without item ids under an empty key."""
+        record_changes(conn, 'services', [('podology', None, 'upsert', None)])
+
+        result = read_changes(conn, 0, load=lambda conn, resource, field, ids: {'': {'title': 'x'}})
+
+        assert result['changes'][0]['id'] is None
+        assert result['changes'][0]['item'] == {'title': 'x'}
+
+    def test_limit_sets_more(self, conn):
+        """Should page by seq and report more."""
+        record_changes(conn, 'faq', [('faq', item_id, 'upsert', i)
+                                     for i, item_id in enumerate('abc')])
+
+        first = read_changes(conn, 0, limit=2, load=load_items)
+        rest = read_changes(conn, first['seq'], limit=2, load=load_items)
+
+        assert first['more'] is True
+        assert [c['id'] for c in first['changes']] == ['a', 'b']
+        assert rest['more'] is False
+        assert [c['id'] for c in rest['changes']] == ['c']
+
+    def test_reset_after_pruning(self, conn, monkeypatch):
+        """Should ask for a full reload when since is older than the kept history."""
+        monkeypatch.setattr(changes, 'CHANGES_RETENTION', 2)
+        for i in range(4):
+            record_changes(conn, 'faq', [('faq', str(i), 'upsert', i)])
+
+        assert read_changes(conn, 0)['reset'] is True
+        assert read_changes(conn, 2)['reset'] is False
+
+    def test_retention_counts_items(self, conn, monkeypatch):
+        """Should not prune history when the same items change repeatedly."""
+        monkeypatch.setattr(changes, 'CHANGES_RETENTION', 2)
+        record_changes(conn, 'faq', [('faq', 'a', 'upsert', 0), ('faq', 'b', 'upsert', 1)])
+        for i in range(10):
+            record_changes(conn, 'faq', [('faq', 'a', 'move', i), ('faq', 'b', 'move', i + 1)])
+
+        result = read_changes(conn, 0, load=load_items)
+
+        assert result['reset'] is False
+        assert [(c['id'], c['op']) for c in result['changes']] == [('a', 'upsert'), ('b', 'upsert')]
+
+    def test_head_without_since(self, conn):
+        """Should return only the current sequence when since is omitted."""
+        record_changes(conn, 'faq', [('faq', 'a', 'upsert', 0)])
+        assert read_changes(conn, None) == {'changes': [], 'seq': 1, 'reset': False, 'more': False}
+
+    def test_reset_for_future_since(self, conn):
+        """Should ask for a full reload when since is ahead of the log."""
+        assert read_changes(conn, 5) == {'changes': [], 'seq': 0, 'reset': True, 'more': False}
+
+    def test_reads_one_snapshot(self, tmp_path):
+        """Should not mix in a write that lands while the feed is being read."""
+        path = str(tmp_path / 'changes.db')
+        writer = sqlite3.connect(path, isolation_level=None)
+        writer.execute('PRAGMA journal_mode=WAL')
+        for sql in CHANGES_SCHEMA:
+            writer.execute(sql)
+        record_changes(writer, 'faq', [('faq', 'a', 'upsert', 0)])
+        reader = sqlite3.connect(path, isolation_level=None)
+
+        def load_during_write(conn, resource, field, ids):
+            record_changes(writer, 'faq', [('faq', 'b', 'upsert', 1)])
+            return load_items(conn, resource, field, ids)
+
+        result = read_changes(reader, 0, load=load_during_write, versions=True)
+        assert result['seq'] == 1
+        assert result['versions'] == {'faq': 1}
+        assert not reader.in_transaction
+        assert read_changes(reader, 1, versions=True)['versions'] == {'faq': 2}
+        reader.close()
+        writer.close()
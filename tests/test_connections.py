@@ -0,0 +1,235 @@
+"""
+Tests for server/connections.py — WriteQueue and ReadPool
+"""
+
+import pytest
+import sqlite3
+import threading
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from server.connections import connect_writer, ReadPool, WriteQueue, PoolTimeout
+
+
+@pytest.fixture
+def writer(tmp_path):
+    """WriteQueue over a fresh database with one table."""
+    conn = connect_writer(str(tmp_path / 'test.db'))
+    conn.execute('CREATE TABLE items (id TEXT PRIMARY KEY, value TEXT)')
+    queue = WriteQueue(conn)
+    yield queue
+    queue.close()
+
+
+@pytest.fixture
+def pool(writer, tmp_path):
+    """ReadPool over the same database."""
+    pool = ReadPool(str(tmp_path / 'test.db'))
+    yield pool
+    pool.close()
+
+
+def insert(item_id, value='v'):
+    def operation(conn):
+        conn.execute('INSERT INTO items (id, value) VALUES (?, ?)', (item_id, value))
+        return item_id
+    return operation
+
+
+# =============================================================================
+# WriteQueue
+# =============================================================================
+
+class TestWriteQueue:
+
+    def test_execute_returns_result(self, writer, pool):
+        """Should run operation in writer thread and return its result."""
+        assert writer.execute(insert('a')) == 'a'
+        with pool.connection() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 1
+
+    def test_group_commit(self, writer):
+        """Should coalesce queued operations into one transaction."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocker(conn):
+            started.set()
+            release.wait(5)
+
+        first = writer.submit(blocker)
+        started.wait(5)
+        futures = [writer.submit(insert('item_%d' % i)) for i in range(10)]
+        release.set()
+
+        first.result(5)
+        assert [f.result(5) for f in futures] == ['item_%d' % i for i in range(10)]
+        assert writer.metrics()['batches'] == 2
+        assert writer.metrics()['operations'] == 11
+
+    def test_failed_operation_isolated(self, writer, pool):
+        """Should roll back only the failing operation of a batch."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocker(conn):
+            started.set()
+            release.wait(5)
+
+        writer.submit(blocker)
+        started.wait(5)
+        ok_before = writer.submit(insert('a'))
+        duplicate = writer.submit(insert('a'))
+        ok_after = writer.submit(insert('b'))
+        release.set()
+
+        assert ok_before.result(5) == 'a'
+        with pytest.raises(sqlite3.IntegrityError):
+            duplicate.result(5)
+        assert ok_after.result(5) == 'b'
+        with pool.connection() as conn:
+            ids = [r[0] for r in conn.execute('SELECT id FROM items ORDER BY id')]
+        assert ids == ['a', 'b']
+
+    def test_nested_submit_runs_inline(self, writer):
+        """Should not deadlock when an operation submits another one."""
+        def outer(conn):
+            return writer.execute(insert('inner'))
+
+        assert writer.execute(outer) == 'inner'
+
+    def test_concurrent_submitters(self, writer, pool):
+        """Should accept writes from many threads."""
+        threads = [threading.Thread(target=writer.execute, args=(insert('t_%d' % i),))
+                   for i in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=10)
+
+        with pool.connection() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 20
+
+    def test_closed_rejects_writes(self, writer):
+        """Should refuse new operations after close."""
+        writer.close()
+        with pytest.raises(RuntimeError):
+            writer.submit(insert('late'))
+
+    def test_close_waits_for_running_batch(self, writer, pool):
+        """Should keep the connection open while the writer is mid-batch."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow(conn):
+            started.set()
+            release.wait(5)
+            return insert('slow')(conn)
+
+        future = writer.submit(slow)
+        assert started.wait(5)
+        writer.close(timeout=0.05)
+        release.set()
+        assert future.result(timeout=5) == 'slow'
+        with pool.connection() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 1
+
+    def test_full_sync_by_default(self, writer):
+        """Should keep synchronous=FULL unless the caller relaxes it."""
+        assert writer.conn.execute('PRAGMA synchronous').fetchone()[0] == 2
+
+
+# =============================================================================
+# ReadPool
+# =============================================================================
+
+class TestReadPool:
+
+    def test_connection_is_read_only(self, pool):
+        """Should not allow writes through pooled connections."""
+        with pool.connection() as conn:
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("INSERT INTO items (id, value) VALUES ('x', 'y')")
+
+    def test_connection_reused(self, pool):
+        """Should return the same idle connection on next checkout."""
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+        assert first is second
+
+    def test_sees_committed_writes(self, writer, pool):
+        """Should see data committed by the writer thread."""
+        with pool.connection() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 0
+        writer.execute(insert('a'))
+        with pool.connection() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 1
+
+    def test_bounded_size(self, tmp_path, writer):
+        """Should time out instead of opening more than max_size connections."""
+        pool = ReadPool(str(tmp_path / 'test.db'), max_size=1, checkout_timeout=0.05)
+        with pool.connection():
+            with pytest.raises(PoolTimeout):
+                with pool.connection():
+                    pass
+        assert pool.metrics()['timeouts'] == 1
+        assert pool.metrics()['open'] == 1
+        pool.close()
+
+    def test_waiter_gets_returned_connection(self, tmp_path, writer):
+        """Should hand a returned connection to a waiting thread."""
+        pool = ReadPool(str(tmp_path / 'test.db'), max_size=1, checkout_timeout=5)
+        got = []
+
+        def reader():
+            with pool.connection() as conn:
+                got.append(conn)
+
+        with pool.connection() as first:
+            t = threading.Thread(target=reader)
+            t.start()
+            t.join(0.1)
+            assert not got
+        t.join(5)
+
+        assert got == [first]
+        assert pool.metrics()['waits'] == 1
+        pool.close()
+
+    def test_idle_eviction(self, tmp_path, writer):
+        """Should close connections idle longer than idle_timeout."""
+        pool = ReadPool(str(tmp_path / 'test.db'), idle_timeout=0)
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+        assert first is not second
+        assert pool.metrics()['evicted'] == 1
+        pool.close()
+
+    def test_health_check_replaces_broken(self, tmp_path, writer):
+        """Should reopen a pooled connection that fails the health check."""
+        pool = ReadPool(str(tmp_path / 'test.db'), health_check_after=0)
+        with pool.connection() as first:
+            pass
+        first.close()
+        with pool.connection() as second:
+            assert second.execute('SELECT 1').fetchone()[0] == 1
+        assert second is not first
+        assert pool.metrics()['health_failures'] == 1
+        pool.close()
+
+    def test_metrics_utilization(self, pool):
+        """Should report in-use connections and utilization."""
+        with pool.connection():
+            metrics = pool.metrics()
+            assert metrics['in_use'] == 1
+            assert metrics['utilization'] == round(1 / pool.max_size, 3)
+        metrics = pool.metrics()
+        assert metrics['in_use'] == 0
+        assert metrics['idle'] == 1
+        assert metrics['checkouts'] == 1
@@ -0,0 +1,278 @@
+"""
+Tests for server/csv_import.py — CSV product import
+"""
+
+import csv
+import io
+import multiprocessing
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from server.csv_import import (
+    CSVImportError, CSVImportJob, decode_lines, detect_delimiter, import_csv, map_header, parse_price,
+)
+from server.database import Database
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(db_path=str(tmp_path / 'site.db'))
+    yield database
+    database.close()
+
+
+def spawn_pool(workers):
+    """Process pool as the import script creates it."""
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def make_csv(rows, delimiter=','):
+    out = io.StringIO()
+    csv.writer(out, delimiter=delimiter, lineterminator='\n').writerows(rows)
+    return out.getvalue().splitlines(keepends=True)
+
+
+class TestParsing:
+
+    def test_header_mapping(self):
+        """Should map English and Russian headers and list unknown columns."""
+        fields, ignored = map_header(['﻿ID', ' Название ', 'Цена', 'Склад', ''])
+        assert fields == ['id', 'name', 'price', None, None]
+        assert ignored == ['Склад']
+
+    def test_missing_name_column(self):
+        with pytest.raises(CSVImportError, match='Missing column: name'):
+            map_header(['id', 'price'])
+
+    def test_parse_price(self):
+        assert parse_price('1 500,50') == 1500.5
+        assert parse_price('1\xa0200') == 1200
+        with pytest.raises(ValueError):
+            parse_price('дорого')
+
+    def test_detect_delimiter(self):
+        assert detect_delimiter('id;name;price\n') == ';'
+        assert detect_delimiter('id\tname\n') == '\t'
+        assert detect_delimiter('name\n') == ','
+
+    def test_decode_lines_falls_back_to_cp1251(self):
+        lines = ['name\n'.encode('utf-8'), 'Шампунь\n'.encode('cp1251')]
+        assert list(decode_lines(lines)) == ['name\n', 'Шампунь\n']
+
+
+class TestImportCSV:
+
+    def test_imports_and_reports_bad_rows(self, db):
+        """Should import valid rows and report the rest by physical line."""
+        lines = make_csv([
+            ['id', 'name', 'price', 'description'],
+            ['product_1', 'Шампунь', '1 200,50', 'Строка 1\nстрока 2'],
+            ['product_2', 'Воск', 'дорого', ''],
+            [],
+            ['bad id', 'Гель', '100', ''],
+            ['product_3', '', '100', ''],
+            ['product_4', 'Масло', '300', '<p>ok</p><script>x</script>'],
+        ])
+
+        report = import_csv(db, lines)
+
+        assert report['rows'] == 5
+        assert report['imported'] == 2
+        assert report['errors'] == [
+            {'line': 4, 'error': 'Invalid price'},
+            {'line': 6, 'error': 'Invalid ID format'},
+            {'line': 7, 'error': 'Invalid or missing name'},
+        ]
+        products = {p['id']: p for p in db.read('products.json')['products']}
+        assert products['product_1']['price'] == 1200.5
+        assert products['product_1']['description'] == 'Строка 1\nстрока 2'
+        assert '<script>' not in products['product_4']['description']
+
+    def test_merges_existing_products(self, db):
+        """Should keep fields missing from the CSV and append new products."""
+        db.write('products.json', {'products': [
+            {'id': 'product_1', 'name': 'Старое', 'images': ['/a.jpg'], 'order': 0},
+            {'id': 'product_2', 'name': 'Второй', 'order': 1},
+        ]})
+        lines = make_csv([
+            ['Название', 'Цена', 'ID'],
+            ['Новое', '500', 'product_1'],
+            ['Без id', '100', ''],
+        ], delimiter=';')
+
+        report = import_csv(db, lines)
+
+        assert report['imported'] == 2
+        products = db.read('products.json')['products']
+        assert [p['name'] for p in products] == ['Новое', 'Второй', 'Без id']
+        assert products[0]['images'] == ['/a.jpg']
+        assert products[0]['price'] == 500
+        assert products[2]['id'].startswith('product_') and products[2]['order'] == 2
+
+    def test_matches_rows_without_id_by_sku_or_slug(self, db):
+        """Should update products found by sku or slug instead of adding duplicates."""
+        db.write('products.json', {'products': [
+            {'id': 'product_1', 'name': 'Шампунь', 'sku': 'SH-1', 'status': 'active', 'order': 0},
+            {'id': 'product_2', 'name': 'Воск', 'slug': 'wax', 'status': 'inactive', 'order': 1},
+        ]})
+        lines = make_csv([
+            ['name', 'sku', 'slug', 'price'],
+            ['Шампунь', 'SH-1', '', '150'],
+            ['Воск', '', 'wax', '300'],
+            ['Гель', 'GL-1', '', '200'],
+            ['Гель', 'GL-1', '', '250'],
+        ])
+
+        report = import_csv(db, lines)
+
+        assert report['imported'] == 4
+        products = db.read('products.json')['products']
+        assert [(p['name'], p['price']) for p in products] == [
+            ('Шампунь', 150), ('Воск', 300), ('Гель', 250),
+        ]
+        assert [p['status'] for p in products] == ['active', 'inactive', 'draft']
+
+    def test_new_products_are_drafts(self, db):
+        """Should keep the status from the file and default new products to draft."""
+        lines = make_csv([['name', 'status'], ['Шампунь', ''], ['Воск', 'active']])
+
+        import_csv(db, lines)
+
+        products = db.read('products.json')['products']
+        assert [p['status'] for p in products] == ['draft', 'active']
+
+    def test_invalid_slug_and_sku(self, db):
+        """Should reject rows with a malformed slug or an HTML sku."""
+        lines = make_csv([
+            ['name', 'slug', 'sku'],
+            ['Шампунь', 'Не slug!', ''],
+            ['Воск', '', '<b>W</b>'],
+            ['Гель', 'gel', 'GL-1'],
+        ])
+
+        report = import_csv(db, lines)
+
+        assert report['imported'] == 1
+        assert [e['line'] for e in report['errors']] == [2, 3]
+
+    def test_category_slug(self, db):
+        """Should accept a category slug in place of its id."""
+        db.write('shop-categories.json', {'categories': [
+            {'id': 'category_1', 'name': 'Уход', 'slug': 'care'},
+        ]})
+        lines = make_csv([['name', 'category', 'images'], ['Шампунь', 'care', '/a.jpg | /b.jpg']])
+
+        import_csv(db, lines)
+
+        product = db.read('products.json')['products'][0]
+        assert product['categoryId'] == 'category_1'
+        assert product['images'] == ['/a.jpg', '/b.jpg']
+
+    def test_pool_matches_inline(self, db, tmp_path):
+        """Should produce the same catalog and report with a process pool."""
+        rows = [['id', 'name', 'price']]
+        rows += [['product_%d' % i, 'Товар %d' % i, str(i) if i % 7 else 'x'] for i in range(1, 301)]
+        inline = import_csv(db, make_csv(rows))
+
+        other = Database(db_path=str(tmp_path / 'other.db'))
+        try:
+            with spawn_pool(2) as pool:
+                pooled = import_csv(other, make_csv(rows), pool=pool, batch_size=50)
+            assert pooled['errors'] == inline['errors']
+            assert pooled['batches'] == 6
+            assert other.read('products.json') == db.read('products.json')
+        finally:
+            other.close()
+
+    def test_long_line_reported_per_row(self, db):
+        """Should report a line over the read limit and import the rest."""
+        lines = make_csv([['id', 'name'], ['product_1', 'Шампунь']])
+        lines += [None] + make_csv([['product_2', 'Воск']])
+
+        report = import_csv(db, lines)
+
+        assert report['imported'] == 2
+        assert report['rows'] == 3
+        assert report['errors'] == [{'line': 3, 'error': 'Line too long'}]
+
+    def test_long_header(self, db):
+        with pytest.raises(CSVImportError, match='Line too long'):
+            import_csv(db, [None, 'Шампунь\n'])
+
+    def test_dry_run(self, db):
+        report = import_csv(db, make_csv([['name'], ['Шампунь']]), dry_run=True)
+        assert report['imported'] == 1
+        assert db.read('products.json') in (None, {'products': []})
+
+    def test_missing_header(self, db):
+        with pytest.raises(CSVImportError, match='Missing header'):
+            import_csv(db, [])
+
+
+@pytest.mark.benchmark
+def test_import_throughput(tmp_path):
+    """Rows per second for a 50k-row file, inline and with a process pool."""
+    rows = [['id', 'name', 'price', 'category', 'description']]
+    rows += [['product_%d' % i, 'Товар %d' % i, '1 %03d,50' % (i % 1000), 'category_1',
+              '<p>Описание <b>товара</b> %d</p>' % i] for i in range(1, 50001)]
+    lines = make_csv(rows, delimiter=';')
+
+    for workers in (1, 2, 4):
+        db = Database(db_path=str(tmp_path / ('bench-%d.db' % workers)))
+        pool = spawn_pool(workers) if workers > 1 else None
+        try:
+            report = import_csv(db, lines, pool=pool)
+            reimport = import_csv(db, lines, pool=pool)
+        finally:
+            if pool:
+                pool.shutdown()
+            db.close()
+        assert report['imported'] == 50000
+        print('\nworkers=%d: import %.2fs (%d rows/s), re-import %.2fs (%d rows/s)' % (
+            workers, report['seconds'], report['rows_per_second'],
+            reimport['seconds'], reimport['rows_per_second']))
+
+
+class TestCSVImportJob:
+
+    def test_records_report(self, db):
+        job = CSVImportJob()
+
+        assert job.start(lambda: import_csv(db, make_csv([['name'], ['Шампунь']])))
+        assert job.wait(5)
+
+        status = job.status()
+        assert status['report']['imported'] == 1
+        assert status['error'] is None
+        assert status['finished'] >= status['started']
+
+    def test_records_error(self):
+        job = CSVImportJob()
+
+        def fail():
+            raise CSVImportError('Missing header')
+
+        job.start(fail)
+        assert job.wait(5)
+        assert job.status()['error'] == 'Missing header'
+        assert job.status()['report'] is None
+
+    def test_one_import_at_a_time(self):
+        """Should refuse a second import while the first one runs."""
+        job = CSVImportJob()
+        release = threading.Event()
+
+        assert job.start(lambda: release.wait(5) and {'imported': 0, 'failed': 0})
+        assert job.start(lambda: None) is False
+        assert job.status()['running'] is True
+
+        release.set()
+        assert job.wait(5)
+        assert job.start(lambda: {'imported': 0, 'failed': 0})
+        assert job.wait(5)
@@ -4,13 +4,16 @@ Tests for server/database.py — SQLite storage
 
 import pytest
 import json
+import sqlite3
 import threading
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from server.database import Database
+from server.database import (
+    Database, MIGRATIONS, apply_migrations, encode_cursor, pack_text, unpack_text,
+)
 
 
 @pytest.fixture
@@ -138,6 +141,61 @@ class TestArticles:
         assert result['articles'][0]['title'] == 'Статья'
         assert result['articles'][0]['content'] == '<p>Текст</p>'
 
+    def test_summary_omits_content(self, db):
+        """Should drop content from the summary projection only."""
+        db.write('articles.json', {'articles': [
+            {'id': 'article_1', 'title': 'Статья', 'excerpt': 'Анонс', 'content': '<p>Текст</p>'}
+        ]})
+        summary = db.read_summary('articles.json')
+        assert summary['articles'] == [{'id': 'article_1', 'title': 'Статья', 'excerpt': 'Анонс'}]
+        assert db.read('articles.json')['articles'][0]['content'] == '<p>Текст</p>'
+
+    def test_get_by_id(self, db):
+        """Should return the full article by ID."""
+        db.write('articles.json', {'articles': [
+            {'id': 'article_1', 'title': 'Статья', 'content': '<p>Текст</p>'}
+        ]})
+        assert db.get_article_by_id('article_1')['content'] == '<p>Текст</p>'
+        assert db.get_article_by_id('missing') is None
+
+
+class TestContentColumn:
+
+    def test_pack_short_text_as_is(self):
+        """Should keep short text uncompressed."""
+        assert pack_text('<p>Коротко</p>') == '<p>Коротко</p>'
+        assert pack_text(None) is None
+
+    def test_pack_long_text_compressed(self):
+        """Should compress long text and restore it exactly."""
+        text = '<p>Длинный текст статьи.</p>' * 200
+        packed = pack_text(text)
+        assert isinstance(packed, bytes)
+        assert len(packed) < len(text.encode('utf-8'))
+        assert unpack_text(packed) == text
+
+    def test_content_stored_outside_data(self, db, tmp_path):
+        """Should keep data small and the body in its own column."""
+        body = '<p>Текст</p>' * 500
+        db.write('articles.json', {'articles': [{'id': 'article_1', 'title': 'T', 'content': body}]})
+        db.write('legal.json', {'documents': [{'id': 'legal_1', 'slug': 'a', 'content': 'Short'}]})
+
+        conn = sqlite3.connect(str(tmp_path / 'test.db'))
+        data, content = conn.execute("SELECT data, content FROM articles").fetchone()
+        assert 'content' not in json.loads(data)
+        assert isinstance(content, bytes)
+        assert conn.execute("SELECT content FROM legal").fetchone()[0] == 'Short'
+        conn.close()
+
+        assert db.read('articles.json')['articles'][0]['content'] == body
+        assert db.get_article_by_id('article_1')['content'] == body
+        assert db.get_legal_by_slug('a')['content'] == 'Short'
+
+    def test_missing_content_stays_missing(self, db):
+        """Should not invent a content key for items without one."""
+        db.write('articles.json', {'articles': [{'id': 'article_1', 'title': 'T'}]})
+        assert 'content' not in db.read('articles.json')['articles'][0]
+
 
 # =============================================================================
 # FAQ
@@ -184,6 +242,20 @@ class TestLegal:
         result = db.read('legal.json')
         assert len(result['documents']) == 2
 
+    def test_summary_omits_content(self, db):
+        """Should list documents without their text."""
+        db.write('legal.json', {'documents': [
+            {'id': 'legal_1', 'slug': 'privacy', 'title': 'Privacy', 'content': '<p>Text</p>'}
+        ]})
+        doc = db.read_summary('legal.json')['documents'][0]
+        assert 'content' not in doc
+        assert doc['slug'] == 'privacy'
+
+    def test_summary_falls_back_to_full_read(self, db):
+        """Should read resources without a summary projection in full."""
+        db.write('faq.json', {'faq': [{'id': 'faq_1', 'question': 'Q?', 'answer': 'A'}]})
+        assert db.read_summary('faq.json') == db.read('faq.json')
+
     def test_get_by_slug(self, db):
         """Should find document by slug."""
         data = {'documents': [
@@ -339,6 +411,804 @@ class TestProducts:
         assert len(all_products) == 2
 
 
+class TestProductFacets:
+
+    @pytest.fixture
+    def catalog(self, db):
+        db.write('shop-categories.json', {'categories': [
+            {'id': 'cat_1', 'slug': 'hair', 'name': 'Hair'},
+            {'id': 'cat_2', 'slug': 'beard', 'name': 'Beard'},
+            {'id': 'cat_3', 'slug': 'empty', 'name': 'Empty'}
+        ]})
+        db.write('products.json', {'products': [
+            {'id': 'p1', 'price': 500, 'categoryId': 'cat_1', 'status': 'active'},
+            {'id': 'p2', 'price': 1500, 'categoryId': 'cat_1', 'status': 'active'},
+            {'id': 'p3', 'price': 900, 'categoryId': 'cat_2', 'status': 'active'},
+            {'id': 'p4', 'price': 50, 'categoryId': 'cat_2', 'status': 'draft'},
+            {'id': 'p5', 'price': 3000, 'categoryId': '', 'status': 'active'}
+        ]})
+        return db
+
+    def ids(self, products):
+        return [p['id'] for p in products]
+
+    def test_facets(self, catalog):
+        """Should count active products per category and bound prices."""
+        assert catalog.get_product_facets() == {
+            'total': 4,
+            'categories': {'hair': 2, 'beard': 1},
+            'price': {'min': 500, 'max': 3000},
+        }
+
+    def test_facets_empty(self, db):
+        """Should return zero counts and no price bounds for an empty catalog."""
+        assert db.get_product_facets() == {
+            'total': 0, 'categories': {}, 'price': {'min': None, 'max': None}
+        }
+
+    def test_filter_multiple_categories(self, catalog):
+        """Should accept a list of category slugs."""
+        assert self.ids(catalog.get_products_filtered(category_slug=['hair', 'beard'])) \
+            == ['p1', 'p2', 'p3']
+
+    def test_filter_price_range(self, catalog):
+        """Should filter by inclusive price bounds."""
+        assert self.ids(catalog.get_products_filtered(price_min=900, price_max=1500)) \
+            == ['p2', 'p3']
+        assert self.ids(catalog.get_products_filtered(category_slug='hair', price_max=500)) \
+            == ['p1']
+
+    def test_page_with_filters(self, catalog):
+        """Should apply the same filters to pages."""
+        page = catalog.get_products_page(category_slug=['hair', 'beard'], sort='price_desc',
+                                         price_min=600)
+        assert self.ids(page['products']) == ['p2', 'p3']
+
+
+class TestProductPages:
+
+    @pytest.fixture
+    def catalog(self, db):
+        db.write('shop-categories.json', {'categories': [
+            {'id': 'cat_1', 'slug': 'hair', 'name': 'Hair'}
+        ]})
+        db.write('products.json', {'products': [
+            {'id': 'p%d' % i, 'name': 'P%d' % i, 'price': (i * 7) % 10,
+             'createdAt': '2024-01-%02d' % (i + 1), 'status': 'active' if i % 4 else 'draft',
+             'categoryId': 'cat_1' if i % 2 else ''}
+            for i in range(20)
+        ]})
+        return db
+
+    def all_pages(self, db, **kwargs):
+        ids, cursor = [], None
+        while True:
+            page = db.get_products_page(cursor=cursor, **kwargs)
+            ids += [p['id'] for p in page['products']]
+            cursor = page['nextCursor']
+            if not cursor:
+                return ids
+
+    def test_pages_cover_filtered_list(self, catalog):
+        """Should return every active product exactly once across pages."""
+        ids = self.all_pages(catalog, limit=3)
+        assert ids == [p['id'] for p in catalog.get_products_filtered(status='active')]
+
+    def test_limit_and_last_page(self, catalog):
+        """Should return nextCursor only while more rows remain."""
+        first = catalog.get_products_page(limit=10)
+        assert len(first['products']) == 10
+        assert first['nextCursor']
+        last = catalog.get_products_page(limit=10, cursor=first['nextCursor'])
+        assert len(last['products']) == 5
+        assert last['nextCursor'] is None
+
+    @pytest.mark.parametrize('sort,key,reverse', [
+        ('price_asc', 'price', False),
+        ('price_desc', 'price', True),
+        ('newest', 'createdAt', True),
+    ])
+    def test_sorted_pages(self, catalog, sort, key, reverse):
+        """Should page through products in the requested order without gaps."""
+        ids = self.all_pages(catalog, sort=sort, limit=4)
+        products = {p['id']: p for p in catalog.get_products_filtered(status='active')}
+        assert sorted(ids) == sorted(products)
+        values = [products[i][key] for i in ids]
+        assert values == sorted(values, reverse=reverse)
+
+    def test_category_filter(self, catalog):
+        """Should page within a category."""
+        ids = self.all_pages(catalog, category_slug='hair', sort='price_asc', limit=2)
+        assert ids and all(int(i[1:]) % 2 for i in ids)
+
+    def test_missing_price_sorted_first(self, db):
+        """Should treat a missing price as zero."""
+        db.write('products.json', {'products': [
+            {'id': 'p1', 'price': 5, 'status': 'active'},
+            {'id': 'p2', 'status': 'active'}
+        ]})
+        page = db.get_products_page(sort='price_asc')
+        assert [p['id'] for p in page['products']] == ['p2', 'p1']
+
+    def test_invalid_sort_and_cursor(self, catalog):
+        """Should reject unknown sorts and foreign or broken cursors."""
+        with pytest.raises(ValueError):
+            catalog.get_products_page(sort='random')
+        with pytest.raises(ValueError):
+            catalog.get_products_page(cursor='not-a-cursor')
+        with pytest.raises(ValueError):
+            catalog.get_products_page(sort='newest', cursor=encode_cursor('price_asc', 1, 1))
+
+
+class TestProductSearch:
+
+    @pytest.fixture
+    def catalog(self, db):
+        return self.fill(db)
+
+    def fill(self, db):
+        db.write('shop-categories.json', {'categories': [
+            {'id': 'cat_1', 'slug': 'hair', 'name': 'Hair'},
+            {'id': 'cat_2', 'slug': 'beard', 'name': 'Beard'}
+        ]})
+        db.write('products.json', {'products': [
+            {'id': 'p1', 'name': 'Шампунь для бороды', 'categoryId': 'cat_2', 'status': 'active',
+             'description': '<p>Мягкий шампунь с ёлочным ароматом</p>'},
+            {'id': 'p2', 'name': 'Масло для бороды', 'categoryId': 'cat_2', 'status': 'active',
+             'description': 'Питает кожу'},
+            {'id': 'p3', 'name': 'Шампунь черновик', 'categoryId': 'cat_1', 'status': 'draft'},
+            {'id': 'p4', 'name': 'Глина', 'categoryId': 'cat_1', 'status': 'active',
+             'description': 'Подходит после шампуня'}
+        ]})
+        return db
+
+    def ids(self, result):
+        return [p['id'] for p in result['products']]
+
+    def test_prefix_and_case(self, catalog):
+        """Should match word prefixes regardless of case."""
+        assert set(self.ids(catalog.search_products('БОРОД'))) == {'p1', 'p2'}
+        assert self.ids(catalog.search_products('масло бор')) == ['p2']
+
+    def test_name_ranked_above_description(self, catalog):
+        """Should rank name matches above description-only matches."""
+        assert self.ids(catalog.search_products('шампун')) == ['p1', 'p4']
+
+    def test_yo_folded(self, catalog):
+        """Should treat ё and е as the same letter."""
+        assert self.ids(catalog.search_products('елочным')) == ['p1']
+        assert self.ids(catalog.search_products('ёлочным')) == ['p1']
+
+    def test_filters(self, catalog):
+        """Should apply status and category filters."""
+        assert 'p3' not in self.ids(catalog.search_products('шампунь'))
+        assert self.ids(catalog.search_products('шампунь', status=None, category_slug='hair')) \
+            == ['p3']
+
+    def test_fuzzy_fallback(self, catalog):
+        """Should find misspelled queries through trigrams."""
+        result = catalog.search_products('шампнь')
+        assert result['fuzzy'] is True
+        assert self.ids(result)[0] == 'p1'
+        assert catalog.search_products('совсем другое')['products'] == []
+
+    def test_fuzzy_without_trigram_tokenizer(self, tmp_path, monkeypatch):
+        """Should fall back to a full scan when SQLite has no trigram tokenizer."""
+        monkeypatch.setattr('server.search.HAS_TRIGRAM', False)
+        monkeypatch.setattr('server.database.HAS_TRIGRAM', False)
+        catalog = self.fill(Database(db_path=str(tmp_path / 'old.db')))
+        with catalog._reads.connection() as conn:
+            assert conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'products_trigram'"
+            ).fetchone() is None
+        result = catalog.search_products('шампнь')
+        assert result['fuzzy'] is True
+        assert self.ids(result)[0] == 'p1'
+        assert 'p3' not in self.ids(result)
+        catalog.write('products.json', {'products': [
+            {'id': 'p9', 'name': 'Помада', 'status': 'active'}
+        ]})
+        assert self.ids(catalog.search_products('пмада')) == ['p9']
+
+    def test_old_sqlite_rejected(self, tmp_path, monkeypatch):
+        """Should refuse to start on SQLite without generated columns."""
+        monkeypatch.setattr(sqlite3, 'sqlite_version_info', (3, 30, 1))
+        with pytest.raises(RuntimeError, match='3.31.0 or newer'):
+            Database(db_path=str(tmp_path / 'old.db'))
+
+    def test_highlight_escaped(self, db):
+        """Should wrap matches in <mark> and escape the rest."""
+        db.write('products.json', {'products': [
+            {'id': 'p1', 'name': 'Воск "Gold" & Co', 'status': 'active'}
+        ]})
+        product = db.search_products('воск')['products'][0]
+        assert product['highlight']['name'] == '<mark>Воск</mark> &quot;Gold&quot; &amp; Co'
+
+    def test_fts_syntax_not_executed(self, catalog):
+        """Should treat FTS5 operators in the query as plain words."""
+        assert catalog.search_products('" OR NEAR(')['products'] == []
+        assert catalog.search_products('***')['products'] == []
+
+    def test_index_follows_writes(self, catalog):
+        """Should reindex on every products write."""
+        catalog.write('products.json', {'products': [
+            {'id': 'p9', 'name': 'Помада', 'status': 'active'}
+        ]})
+        assert catalog.search_products('шампунь')['products'] == []
+        assert self.ids(catalog.search_products('помада')) == ['p9']
+
+
+# =============================================================================
+# Partial updates
+# =============================================================================
+
+SERVICES = {
+    'categories': [
+        {'id': 'main', 'name': 'Основные', 'services': [{'id': 1, 'name': 'Стрижка', 'priceGreen': 1000}]},
+        {'id': 'beard', 'name': 'Борода', 'services': [{'id': 2, 'name': 'Бритьё', 'priceGreen': 800}]},
+    ],
+    'podology': {
+        'title': 'Подология',
+        'categories': [{'id': 'pod1', 'name': 'Базовые', 'services': []}],
+    },
+}
+
+
+class TestPatch:
+
+    @staticmethod
+    def trace_writes(db):
+        """Collect statements run by the catalog writer connection."""
+        statements = []
+        db._writer.conn.set_trace_callback(statements.append)
+        return statements
+
+    def test_persists_only_changed_rows(self, db):
+        """Should upsert the changed category and leave other tables alone."""
+        db.write('services.json', SERVICES)
+        statements = self.trace_writes(db)
+
+        def set_price(doc):
+            doc['categories'][1]['services'][0]['priceGreen'] = 900
+            return doc
+
+        db.patch('services.json', set_price)
+
+        writes = [s for s in statements if s.startswith(('INSERT', 'DELETE', 'UPDATE'))
+                  and 'changes' not in s and 'resource_versions' not in s]
+        assert len(writes) == 1
+        assert 'service_categories' in writes[0] and "'beard'" in writes[0]
+        result = db.read('services.json')
+        assert result['categories'][1]['services'][0]['priceGreen'] == 900
+        assert result['podology']['categories'][0]['id'] == 'pod1'
+
+    def test_removes_deleted_rows(self, db):
+        """Should delete rows whose items were removed."""
+        db.write('services.json', SERVICES)
+
+        def drop_first(doc):
+            del doc['categories'][0]
+            return doc
+
+        db.patch('services.json', drop_first)
+
+        assert [c['id'] for c in db.read('services.json')['categories']] == ['beard']
+
+    def test_error_rolls_back(self, db):
+        """Should leave data unchanged when the patch function raises."""
+        db.write('services.json', SERVICES)
+
+        def invalid(doc):
+            doc['categories'] = []
+            raise ValueError('invalid')
+
+        with pytest.raises(ValueError):
+            db.patch('services.json', invalid)
+        assert len(db.read('services.json')['categories']) == 2
+
+    def test_duplicate_ids_rejected(self, db):
+        """Should reject a patched document with repeated ids."""
+        db.write('faq.json', {'faq': [{'id': 'q1'}, {'id': 'q2'}]})
+
+        def duplicate(doc):
+            doc['faq'][1]['id'] = 'q1'
+            return doc
+
+        with pytest.raises(ValueError, match='Duplicate'):
+            db.patch('faq.json', duplicate)
+
+    def test_products_reindexed(self, db):
+        """Should update the search index for patched products only."""
+        db.write('products.json', {'products': [
+            {'id': 'p1', 'name': 'Шампунь', 'status': 'active'},
+            {'id': 'p2', 'name': 'Воск', 'status': 'active'},
+        ]})
+
+        def rename(doc):
+            doc['products'][0]['name'] = 'Кондиционер'
+            return doc
+
+        db.patch('products.json', rename)
+
+        assert db.search_products('шампунь')['products'] == []
+        assert [p['id'] for p in db.search_products('кондиционер')['products']] == ['p1']
+        assert [p['id'] for p in db.search_products('воск')['products']] == ['p2']
+
+    def test_logged_in_change_feed(self, db):
+        """Should record the patched item in the change log."""
+        db.write('services.json', SERVICES)
+        start = db.get_changes()['seq']
+
+        def rename(doc):
+            doc['categories'][0]['name'] = 'Стрижки'
+            return doc
+
+        db.patch('services.json', rename)
+
+        assert [(c['field'], c['id']) for c in db.get_changes(start)['changes']] == [
+            ('categories', 'main'),
+        ]
+
+    def test_stats_not_supported(self, db):
+        """Should refuse resources without row mapping."""
+        with pytest.raises(ValueError):
+            db.patch('stats.json', lambda doc: doc)
+
+
+# =============================================================================
+# Reorder
+# =============================================================================
+
+class TestReorder:
+
+    MASTERS = {'masters': [
+        {'id': 'm1', 'name': 'Анна', 'order': 0},
+        {'id': 'm2', 'name': 'Борис', 'order': 1},
+        {'id': 'm3', 'name': 'Вера', 'order': 2},
+    ]}
+
+    def test_updates_only_moved_rows(self, db):
+        """Should update sort_order of moved rows in a single executemany."""
+        db.write('masters.json', self.MASTERS)
+        statements = []
+        db._writer.conn.set_trace_callback(statements.append)
+
+        updated = db.reorder('masters.json', ['m2', 'm1', 'm3'])
+
+        writes = [s for s in statements if s.startswith(('INSERT', 'DELETE', 'UPDATE'))
+                  and 'changes' not in s and 'resource_versions' not in s]
+        assert updated == 2
+        assert len(writes) == 2
+        assert all(s.startswith('UPDATE masters SET sort_order') for s in writes)
+        result = db.read('masters.json')['masters']
+        assert [(m['id'], m['order']) for m in result] == [('m2', 0), ('m1', 1), ('m3', 2)]
+        assert result[0]['name'] == 'Борис'
+
+    def test_data_untouched(self, db, tmp_path):
+        """Should change only sort_order and derive order from it on read."""
+        db.write('masters.json', self.MASTERS)
+        conn = sqlite3.connect(str(tmp_path / 'test.db'))
+        before = conn.execute('SELECT id, data, content_hash FROM masters ORDER BY id').fetchall()
+
+        db.reorder('masters.json', ['m3', 'm1', 'm2'])
+
+        assert conn.execute(
+            'SELECT id, data, content_hash FROM masters ORDER BY id').fetchall() == before
+        conn.close()
+        assert [(m['id'], m['order']) for m in db.read('masters.json')['masters']] == [
+            ('m3', 0), ('m1', 1), ('m2', 2)]
+        export = b''.join(db.export_items('masters.json')).decode().splitlines()
+        assert [json.loads(line)['order'] for line in export] == [0, 1, 2]
+
+    def test_unlisted_items_follow(self, db):
+        """Should keep items missing from the list after the listed ones."""
+        db.write('masters.json', self.MASTERS)
+
+        db.reorder('masters.json', ['m3'])
+
+        assert [m['id'] for m in db.read('masters.json')['masters']] == ['m3', 'm1', 'm2']
+
+    def test_same_order_is_noop(self, db):
+        """Should not write or bump the version when nothing moved."""
+        db.write('masters.json', self.MASTERS)
+        versions = db.get_versions()
+
+        assert db.reorder('masters.json', ['m1', 'm2', 'm3']) == 0
+        assert db.get_versions() == versions
+
+    def test_bumps_version(self, db):
+        """Should log moved items and advance the resource version."""
+        db.write('masters.json', self.MASTERS)
+        start = db.get_changes()['seq']
+
+        db.reorder('masters.json', ['m2', 'm1'])
+
+        changes = db.get_changes(start)['changes']
+        assert [(c['id'], c['position']) for c in changes] == [('m2', 0), ('m1', 1)]
+        assert db.get_versions()['masters'] == changes[-1]['seq']
+
+    def test_keeps_article_content(self, db):
+        """Should leave the separate content column intact."""
+        db.write('articles.json', {'articles': [
+            {'id': 'a1', 'title': 'Первая', 'content': '<p>Текст</p>'},
+            {'id': 'a2', 'title': 'Вторая', 'content': '<p>Ещё</p>'},
+        ]})
+
+        db.reorder('articles.json', ['a2', 'a1'])
+
+        result = db.read('articles.json')['articles']
+        assert [a['id'] for a in result] == ['a2', 'a1']
+        assert result[1]['content'] == '<p>Текст</p>'
+
+    def test_products_order_field(self, db):
+        """Should reorder products that carry an explicit order."""
+        db.write('products.json', {'products': [
+            {'id': 'p1', 'name': 'Шампунь', 'order': 5},
+            {'id': 'p2', 'name': 'Воск', 'order': 7},
+        ]})
+
+        db.reorder('products.json', ['p2', 'p1'])
+
+        assert [p['id'] for p in db.get_products_filtered()] == ['p2', 'p1']
+        assert [p['id'] for p in db.search_products('воск')['products']] == ['p2']
+
+    @pytest.mark.parametrize('ids, error', [
+        (['m1', 'm1'], 'Duplicate'),
+        (['m9'], 'Unknown id'),
+    ])
+    def test_invalid_ids(self, db, ids, error):
+        """Should reject duplicate and unknown ids without changes."""
+        db.write('masters.json', self.MASTERS)
+
+        with pytest.raises(ValueError, match=error):
+            db.reorder('masters.json', ids)
+        assert [m['id'] for m in db.read('masters.json')['masters']] == ['m1', 'm2', 'm3']
+
+    def test_services_not_supported(self, db):
+        """Should refuse resources without a single ordered list."""
+        with pytest.raises(ValueError):
+            db.reorder('services.json', [])
+
+
+# =============================================================================
+# Content hashes
+# =============================================================================
+
+class TestContentHash:
+
+    PRODUCTS = {'products': [
+        {'id': 'p1', 'name': 'Воск', 'price': 500},
+        {'id': 'p2', 'name': 'Гель', 'price': 700},
+    ]}
+
+    def test_stored_on_write(self, db):
+        """Should store the hash of every written item."""
+        db.write('products.json', self.PRODUCTS)
+
+        hashes = db.item_hashes('products.json')
+        assert hashes == {p['id']: db.content_hash(p) for p in self.PRODUCTS['products']}
+        assert hashes['p1'] != hashes['p2']
+
+    def test_changes_with_item(self, db):
+        """Should update the hash of patched rows only."""
+        db.write('products.json', self.PRODUCTS)
+        before = db.item_hashes('products.json')
+
+        def patch(doc):
+            doc['products'][1]['price'] = 800
+            return doc
+        db.patch('products.json', patch)
+
+        after = db.item_hashes('products.json')
+        assert after['p1'] == before['p1']
+        assert after['p2'] != before['p2']
+        assert after['p2'] == db.content_hash(db.read('products.json')['products'][1])
+
+    def test_content_tables_hash_full_item(self, db):
+        """Should include the separately stored content in the hash."""
+        article = {'id': 'a1', 'title': 'Статья', 'content': '<p>Текст</p>'}
+        db.write('articles.json', {'articles': [article]})
+        first = db.item_hashes('articles.json')['a1']
+
+        db.write('articles.json', {'articles': [dict(article, content='<p>Другой</p>')]})
+
+        assert first == db.content_hash(article)
+        assert db.item_hashes('articles.json')['a1'] != first
+
+    def test_reorder_keeps_hash(self, db):
+        """Should keep hashes on reorder: order is not part of the hash."""
+        products = [dict(p, order=i) for i, p in enumerate(self.PRODUCTS['products'])]
+        db.write('products.json', {'products': products})
+        before = db.item_hashes('products.json')
+
+        db.reorder('products.json', ['p2', 'p1'])
+
+        assert db.item_hashes('products.json') == before
+        for product in db.read('products.json')['products']:
+            assert before[product['id']] == db.content_hash(product)
+
+    def test_services_hash_categories(self, db):
+        """Should key service hashes by category id."""
+        category = {'id': 'main', 'services': [{'id': 1, 'name': 'Стрижка'}]}
+        db.write('services.json', {'categories': [category]})
+
+        assert db.item_hashes('services.json') == {'main': db.content_hash(category)}
+
+    def test_unsupported_resource(self, db):
+        assert db.item_hashes('stats.json') == {}
+
+
+# =============================================================================
+# Batch write
+# =============================================================================
+
+class TestWriteMany:
+
+    def test_writes_all_in_one_operation(self, db):
+        """Should apply every resource inside a single savepoint."""
+        statements = []
+        db._writer.conn.set_trace_callback(statements.append)
+
+        changed = db.write_many([
+            ('shop-categories.json', {'categories': [{'id': 'c1', 'slug': 'care'}]}),
+            ('products.json', {'products': [{'id': 'p1', 'name': 'Воск', 'categoryId': 'c1'}]}),
+        ])
+
+        assert changed == ['shop-categories', 'products']
+        assert len([s for s in statements if s.startswith('SAVEPOINT')]) == 1
+        assert db.read('shop-categories.json')['categories'][0]['slug'] == 'care'
+        assert [p['id'] for p in db.search_products('воск')['products']] == ['p1']
+
+    def test_failure_rolls_back_all(self, db):
+        """Should leave every resource unchanged when one write fails."""
+        db.write('masters.json', {'masters': [{'id': 'm1', 'name': 'Анна'}]})
+
+        with pytest.raises(sqlite3.IntegrityError):
+            db.write_many([
+                ('masters.json', {'masters': [{'id': 'm2', 'name': 'Борис'}]}),
+                ('faq.json', {'faq': [{'id': 'q1'}, {'id': 'q1'}]}),
+            ])
+
+        assert [m['id'] for m in db.read('masters.json')['masters']] == ['m1']
+        assert db.read('faq.json')['faq'] == []
+
+    def test_unchanged_resources_not_reported(self, db):
+        """Should report only resources whose items changed."""
+        faq = {'faq': [{'id': 'q1', 'question': 'Да?'}]}
+        db.write('faq.json', faq)
+
+        changed = db.write_many([
+            ('faq.json', faq),
+            ('masters.json', {'masters': [{'id': 'm1'}]}),
+        ])
+
+        assert changed == ['masters']
+
+    @pytest.mark.parametrize('writes', [
+        [('stats.json', {}), ('faq.json', {'faq': []})],
+        [('faq.json', {'faq': []}), ('faq.json', {'faq': []})],
+    ])
+    def test_invalid_batch(self, db, writes):
+        """Should reject stats and repeated resources."""
+        with pytest.raises(ValueError):
+            db.write_many(writes)
+
+
+# =============================================================================
+# NDJSON export / import
+# =============================================================================
+
+class TestExportImport:
+
+    def test_export_lines(self, db):
+        """Should yield one JSON line per item in list order."""
+        db.write('faq.json', {'faq': [{'id': 'q2', 'question': 'Б?'}, {'id': 'q1', 'question': 'А?'}]})
+
+        lines = list(db.export_items('faq.json'))
+
+        assert all(line.endswith(b'\n') and line.count(b'\n') == 1 for line in lines)
+        assert [json.loads(line)['id'] for line in lines] == ['q2', 'q1']
+
+    def test_export_includes_content(self, db):
+        """Should put article bodies back into exported items."""
+        db.write('articles.json', {'articles': [{'id': 'a1', 'title': 'T', 'content': 'Строка 1\nСтрока 2'}]})
+
+        lines = list(db.export_items('articles.json'))
+
+        assert len(lines) == 1
+        assert json.loads(lines[0])['content'] == 'Строка 1\nСтрока 2'
+
+    def test_export_releases_connection_between_pages(self, db):
+        """Should hold a read connection only while fetching a page."""
+        db.write('products.json', {'products': [
+            {'id': 'p%d' % i, 'name': 'Товар', 'order': i // 2} for i in range(5)
+        ]})
+
+        lines = db.export_items('products.json', batch_size=2)
+        first = next(lines)
+        in_use = db.get_metrics()['catalog']['read_pool']['in_use']
+        rest = list(lines)
+
+        assert in_use == 0
+        assert [json.loads(line)['id'] for line in [first] + rest] == ['p0', 'p1', 'p2', 'p3', 'p4']
+
+    def test_export_null_order(self, db):
+        """Should page past items whose order is null."""
+        db.write('products.json', {'products': [
+            {'id': 'p1', 'order': None}, {'id': 'p2', 'order': None}, {'id': 'p3', 'order': 0},
+        ]})
+
+        lines = list(db.export_items('products.json', batch_size=1))
+
+        assert [json.loads(line)['id'] for line in lines] == ['p1', 'p2', 'p3']
+
+    def test_export_not_supported(self, db):
+        """Should refuse resources that are not a single list."""
+        with pytest.raises(ValueError):
+            db.export_items('services.json')
+
+    def test_import_in_batches(self, db):
+        """Should upsert items in batches and keep unrelated items."""
+        db.write('products.json', {'products': [
+            {'id': 'p0', 'name': 'Старый'}, {'id': 'p1', 'name': 'Шампунь'},
+        ]})
+        items = ({'id': 'p%d' % i, 'name': 'Воск %d' % i} for i in range(1, 6))
+
+        result = db.import_items('products.json', items, batch_size=2)
+
+        assert result == {'imported': 5, 'batches': 3}
+        products = db.read('products.json')['products']
+        assert sorted(p['id'] for p in products) == ['p0', 'p1', 'p2', 'p3', 'p4', 'p5']
+        assert next(p for p in products if p['id'] == 'p1')['name'] == 'Воск 1'
+        assert db.search_products('шампунь')['products'] == []
+        assert len(db.search_products('воск')['products']) == 5
+
+    def test_import_reads_stream_unlocked(self, db):
+        """Should not hold the resource lock while the next batch is read."""
+        held = []
+
+        def check_lock():
+            lock = db._get_lock('faq.json')
+            if lock.acquire(timeout=1):
+                lock.release()
+                held.append(False)
+            else:
+                held.append(True)
+
+        def items():
+            for i in range(4):
+                checker = threading.Thread(target=check_lock)
+                checker.start()
+                checker.join()
+                yield {'id': 'q%d' % i}
+
+        db.import_items('faq.json', items(), batch_size=2)
+
+        assert held == [False] * 4
+
+    def test_import_keeps_stream_order(self, db):
+        """Should order imported items as they came in the stream."""
+        items = [{'id': 'm%d' % i} for i in (3, 1, 2)]
+
+        db.import_items('masters.json', iter(items), batch_size=2)
+
+        assert [m['id'] for m in db.read('masters.json')['masters']] == ['m3', 'm1', 'm2']
+
+    def test_import_logged(self, db):
+        """Should record imported items in the change log."""
+        start = db.get_changes()['seq']
+
+        db.import_items('faq.json', iter([{'id': 'q1'}, {'id': 'q2'}]), batch_size=1)
+
+        changes = db.get_changes(start)['changes']
+        assert [(c['id'], c['position']) for c in changes] == [('q1', 0), ('q2', 1)]
+        assert db.get_versions()['faq'] == changes[-1]['seq']
+
+    def test_round_trip(self, db):
+        """Should import an export of the same resource unchanged."""
+        docs = {'documents': [
+            {'id': 'legal_1', 'slug': 'privacy', 'title': 'Политика', 'content': '<p>Текст</p>'},
+            {'id': 'legal_2', 'slug': 'terms', 'title': 'Условия', 'content': '<p>Ещё</p>'},
+        ]}
+        db.write('legal.json', docs)
+        lines = list(db.export_items('legal.json'))
+        db.write('legal.json', {'documents': []})
+
+        db.import_items('legal.json', (json.loads(line) for line in lines))
+
+        assert db.read('legal.json') == docs
+
+
+# =============================================================================
+# Change log
+# =============================================================================
+
+class TestChangeLog:
+
+    def test_records_item_changes(self, db):
+        """Should log only the items a write actually changed."""
+        db.write('faq.json', {'faq': [{'id': 'q1', 'question': 'A'}, {'id': 'q2', 'question': 'B'}]})
+        start = db.get_changes()['seq']
+        db.write('faq.json', {'faq': [{'id': 'q1', 'question': 'A2'}, {'id': 'q2', 'question': 'B'}]})
+
+        result = db.get_changes(start)
+
+        assert [(c['resource'], c['id'], c['op']) for c in result['changes']] == [
+            ('faq', 'q1', 'upsert'),
+        ]
+        assert result['changes'][0]['item']['question'] == 'A2'
+
+    def test_records_deletes(self, db):
+        """Should log removed items as deletes."""
+        db.write('masters.json', {'masters': [{'id': 'm1'}, {'id': 'm2'}]})
+        start = db.get_changes()['seq']
+        db.write('masters.json', {'masters': [{'id': 'm2'}]})
+
+        changes = db.get_changes(start)['changes']
+
+        assert ('m1', 'delete') in [(c['id'], c['op']) for c in changes]
+
+    def test_unchanged_write_not_logged(self, db):
+        """Should not bump the sequence for a no-op save."""
+        data = {'faq': [{'id': 'q1', 'question': 'A'}]}
+        db.write('faq.json', data)
+        seq = db.get_changes()['seq']
+        db.write('faq.json', data)
+        assert db.get_changes()['seq'] == seq
+
+    def test_rolled_back_with_write(self, db):
+        """Should not log changes of a failed write (same transaction)."""
+        db.write('faq.json', {'faq': [{'id': 'q1'}]})
+        seq = db.get_changes()['seq']
+        with pytest.raises(Exception):
+            db.write('faq.json', {'faq': [{'id': 'q2'}, {'id': 'q2'}]})
+        assert db.get_changes()['seq'] == seq
+        assert db.read('faq.json') == {'faq': [{'id': 'q1'}]}
+
+    def test_shifted_items_logged_as_moves(self, db):
+        """Should log items pushed down by an insert as moves without data."""
+        db.write('masters.json', {'masters': [{'id': 'm1'}, {'id': 'm2'}]})
+        start = db.get_changes()['seq']
+        db.write('masters.json', {'masters': [{'id': 'm0'}, {'id': 'm1'}, {'id': 'm2'}]})
+
+        changes = db.get_changes(start)['changes']
+
+        assert [(c['id'], c['op'], c['position']) for c in changes] == [
+            ('m0', 'upsert', 0), ('m1', 'move', 1), ('m2', 'move', 2),
+        ]
+        assert changes[0]['item'] == {'id': 'm0'}
+        assert 'item' not in changes[1]
+
+    def test_whole_fields_logged(self, db):
+        """Should log contacts and podology as whole fields read on demand."""
+        db.write('social.json', {'social': [], 'phone': '1'})
+        db.write('services.json', {'categories': [], 'podology': {'title': 'A', 'categories': []}})
+        start = db.get_changes()['seq']
+        db.write('social.json', {'social': [], 'phone': '2'})
+        db.write('services.json', {'categories': [], 'podology': {'title': 'B', 'categories': []}})
+
+        changes = db.get_changes(start)['changes']
+
+        assert [(c['field'], c['id'], c['item']) for c in changes] == [
+            ('phone', None, '2'),
+            ('podology', None, {'title': 'B', 'categories': []}),
+        ]
+
+    def test_stats_not_logged(self, db):
+        """Should keep analytics writes out of the change log."""
+        db.write('stats.json', {'total_views': 1, 'daily': {}, 'sections': {}, 'sessions': {}})
+        assert db.get_changes()['seq'] == 0
+
+    def test_versions(self, db):
+        """Should expose the last sequence number per resource."""
+        db.write('faq.json', {'faq': [{'id': 'q1'}]})
+        db.write('masters.json', {'masters': [{'id': 'm1'}]})
+
+        versions = db.get_versions()
+
+        assert versions['masters'] > versions['faq'] > 0
+
+
 # =============================================================================
 # Stats
 # =============================================================================
@@ -394,6 +1264,364 @@ class TestStats:
         assert result['total_views'] == 11
 
 
+# =============================================================================
+# Separate analytics database
+# =============================================================================
+
+class TestStatsDatabase:
+
+    def test_stats_in_separate_file(self, tmp_path):
+        """Should keep stats tables out of the catalog database."""
+        db = Database(db_path=str(tmp_path / 'site.db'))
+        db.write('stats.json', {'total_views': 5})
+        db.close()
+
+        assert (tmp_path / 'site-stats.db').exists()
+        conn = sqlite3.connect(str(tmp_path / 'site.db'))
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        conn.close()
+        assert not any(t.startswith('stats_') for t in tables)
+
+    def test_stats_relaxed_sync(self, db):
+        """Should relax fsync for stats only, keeping the catalog on FULL."""
+        assert db._writer.conn.execute('PRAGMA synchronous').fetchone()[0] == 2
+        assert db._stats_writer.conn.execute('PRAGMA synchronous').fetchone()[0] == 1
+
+    def test_migrates_legacy_stats(self, tmp_path):
+        """Should move stats from an old single-file database on first start."""
+        path = tmp_path / 'legacy.db'
+        conn = sqlite3.connect(str(path))
+        conn.executescript("""
+            CREATE TABLE stats_counters (key TEXT PRIMARY KEY, value TEXT NOT NULL DEFAULT '');
+            CREATE TABLE stats_daily (date TEXT PRIMARY KEY, count INTEGER DEFAULT 0);
+            INSERT INTO stats_counters VALUES ('total_views', '42');
+            INSERT INTO stats_daily VALUES ('2024-06-15', 7);
+        """)
+        conn.commit()
+        conn.close()
+
+        db = Database(db_path=str(path))
+        stats = db.read('stats.json')
+        assert stats['total_views'] == 42
+        assert stats['daily'] == {'2024-06-15': 7}
+        db.close()
+
+        conn = sqlite3.connect(str(path))
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        conn.close()
+        assert 'stats_counters' not in tables
+        assert 'stats_daily' not in tables
+
+        # Повторный старт не дублирует и не теряет данные
+        db = Database(db_path=str(path))
+        assert db.read('stats.json')['total_views'] == 42
+        db.close()
+
+    def test_stats_write_not_blocked_by_catalog_writer(self, db):
+        """Should commit stats while the catalog writer is busy."""
+        release = threading.Event()
+        db._writer.submit(lambda conn: release.wait(5))
+        try:
+            db.update('stats.json', lambda s: dict(s, total_views=3))
+            assert db.read('stats.json')['total_views'] == 3
+        finally:
+            release.set()
+
+
+# =============================================================================
+# Migrations
+# =============================================================================
+
+def index_names(path):
+    conn = sqlite3.connect(str(path))
+    names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    return names
+
+
+class TestMigrations:
+
+    def test_versions_increasing(self):
+        """Should declare migrations with strictly increasing versions."""
+        versions = [m[0] for m in MIGRATIONS]
+        assert versions == sorted(set(versions))
+        assert versions[0] >= 1
+
+    def test_fresh_database_at_latest_version(self, tmp_path):
+        """Should apply all migrations to a new database."""
+        db = Database(db_path=str(tmp_path / 'fresh.db'))
+        db.close()
+
+        conn = sqlite3.connect(str(tmp_path / 'fresh.db'))
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == MIGRATIONS[-1][0]
+        conn.close()
+        indexes = index_names(tmp_path / 'fresh.db')
+        assert 'idx_products_status_order' in indexes
+        assert 'idx_legal_slug_active' in indexes
+        assert 'idx_products_status' not in indexes
+
+    def test_upgrades_existing_database(self, tmp_path):
+        """Should replace legacy single-column indexes and keep data."""
+        path = tmp_path / 'old.db'
+        conn = sqlite3.connect(str(path))
+        conn.executescript("""
+            CREATE TABLE products (id TEXT PRIMARY KEY, category_id TEXT DEFAULT '',
+                status TEXT DEFAULT 'active', sort_order INTEGER DEFAULT 0, data TEXT NOT NULL);
+            CREATE TABLE legal (id TEXT PRIMARY KEY, slug TEXT DEFAULT '',
+                active INTEGER DEFAULT 1, sort_order INTEGER DEFAULT 0, data TEXT NOT NULL);
+            CREATE INDEX idx_products_status ON products(status);
+            CREATE INDEX idx_legal_slug ON legal(slug);
+            INSERT INTO products (id, data) VALUES ('p1', '{"id": "p1", "name": "Old"}');
+        """)
+        conn.commit()
+        conn.close()
+
+        db = Database(db_path=str(path))
+        assert db.get_product_by_id('p1')['name'] == 'Old'
+        db.close()
+
+        indexes = index_names(path)
+        assert 'idx_products_status' not in indexes
+        assert 'idx_legal_slug' not in indexes
+        assert 'idx_products_status_order' in indexes
+
+    def test_backfills_search_index(self, tmp_path):
+        """Should index products saved before the search migration."""
+        path = tmp_path / 'old.db'
+        conn = sqlite3.connect(str(path))
+        conn.executescript("""
+            CREATE TABLE products (id TEXT PRIMARY KEY, category_id TEXT DEFAULT '',
+                status TEXT DEFAULT 'active', sort_order INTEGER DEFAULT 0, data TEXT NOT NULL);
+            INSERT INTO products (id, data) VALUES ('p1', '{"id": "p1", "name": "Помада"}');
+            PRAGMA user_version = 2;
+        """)
+        conn.close()
+
+        db = Database(db_path=str(path))
+        assert [p['id'] for p in db.search_products('помад')['products']] == ['p1']
+        db.close()
+
+    def test_moves_content_to_column(self, tmp_path):
+        """Should move inline content out of data for existing rows."""
+        path = tmp_path / 'old.db'
+        body = '<p>Старый текст</p>' * 300
+        conn = sqlite3.connect(str(path))
+        conn.executescript("""
+            CREATE TABLE articles (id TEXT PRIMARY KEY, sort_order INTEGER DEFAULT 0,
+                data TEXT NOT NULL);
+            CREATE TABLE legal (id TEXT PRIMARY KEY, slug TEXT DEFAULT '',
+                active INTEGER DEFAULT 1, sort_order INTEGER DEFAULT 0, data TEXT NOT NULL);
+            PRAGMA user_version = 5;
+        """)
+        conn.execute('INSERT INTO articles (id, data) VALUES (?, ?)', (
+            'article_1', json.dumps({'id': 'article_1', 'title': 'Old', 'content': body})))
+        conn.execute('INSERT INTO legal (id, slug, data) VALUES (?, ?, ?)', (
+            'legal_1', 'privacy', json.dumps({'id': 'legal_1', 'slug': 'privacy', 'content': 'L'})))
+        conn.commit()
+        conn.close()
+
+        db = Database(db_path=str(path))
+        assert db.get_article_by_id('article_1') == {'id': 'article_1', 'title': 'Old', 'content': body}
+        assert db.read_summary('articles.json')['articles'] == [{'id': 'article_1', 'title': 'Old'}]
+        assert db.get_legal_by_slug('privacy')['content'] == 'L'
+        db.close()
+
+    def test_rebuilds_change_log(self, tmp_path):
+        """Should keep the last row of each item and the sequence of the old log."""
+        path = tmp_path / 'old.db'
+        db = Database(db_path=str(path))
+        db.write('faq.json', {'faq': [{'id': 'q1', 'question': 'A'}]})
+        db.close()
+        conn = sqlite3.connect(str(path))
+        conn.executescript("""
+            DROP TABLE changes;
+            DROP TABLE changes_horizon;
+            CREATE TABLE changes (seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                resource TEXT NOT NULL, field TEXT NOT NULL, item_id TEXT,
+                op TEXT NOT NULL, position INTEGER, data TEXT, created_at REAL NOT NULL);
+            INSERT INTO changes VALUES
+                (4, 'faq', 'faq', 'q1', 'upsert', 0, '{"id": "q1"}', 0),
+                (5, 'faq', 'faq', 'q1', 'upsert', 0, '{"id": "q1", "question": "A"}', 0),
+                (6, 'faq', 'faq', 'q2', 'delete', NULL, NULL, 0);
+            PRAGMA user_version = 10;
+        """)
+        conn.close()
+
+        db = Database(db_path=str(path))
+        changes = db.get_changes(3)['changes']
+        db.write('faq.json', {'faq': []})
+
+        assert db.get_changes(0)['reset'] is True
+        assert [(c['seq'], c['id'], c['op']) for c in changes] == [
+            (5, 'q1', 'upsert'), (6, 'q2', 'delete'),
+        ]
+        assert changes[0]['item'] == {'id': 'q1', 'question': 'A'}
+        assert db.get_changes()['seq'] == 7
+        db.close()
+
+    def test_content_is_last_column(self, tmp_path):
+        """Should rebuild articles and legal with the body after the narrow columns."""
+        path = tmp_path / 'old.db'
+        body = '<p>Текст</p>' * 3000
+        db = Database(db_path=str(path))
+        db.write('articles.json', {'articles': [
+            {'id': 'a1', 'title': 'T', 'content': body, 'active': False},
+            {'id': 'a2', 'title': 'U', 'content': 'short'},
+        ]})
+        db.write('legal.json', {'documents': [{'id': 'l1', 'slug': 'privacy', 'content': body}]})
+        hashes = db.item_hashes('articles.json')
+        db.close()
+        conn = sqlite3.connect(str(path))
+        conn.execute('PRAGMA user_version = 11')
+        conn.close()
+
+        db = Database(db_path=str(path))
+        assert db.get_article_by_id('a1')['content'] == body
+        assert [a['id'] for a in db.read('articles.json', public=True)['articles']] == ['a2']
+        assert db.get_legal_by_slug('privacy')['content'] == body
+        assert db.item_hashes('articles.json') == hashes
+        db.close()
+
+        conn = sqlite3.connect(str(path))
+        for table in ('articles', 'legal'):
+            columns = [r[1] for r in conn.execute('PRAGMA table_info(%s)' % table)]
+            assert columns[-1] == 'content'
+        conn.close()
+        indexes = index_names(path)
+        assert {'idx_articles_active_order', 'idx_legal_slug_active', 'idx_legal_order'} <= indexes
+
+    def test_backfills_content_hashes(self, tmp_path):
+        """Should hash rows saved before the hash column so unchanged items skip validation."""
+        path = tmp_path / 'old.db'
+        db = Database(db_path=str(path))
+        db.write('articles.json', {'articles': [{'id': 'a1', 'title': 'T', 'content': '<p>x</p>'}]})
+        db.write('products.json', {'products': [{'id': 'p1', 'name': 'P', 'order': 3}]})
+        db.write('services.json', {'categories': [{'id': 'c1', 'services': []}]})
+        expected = {name: db.item_hashes(name)
+                    for name in ('articles.json', 'products.json', 'services.json')}
+        db.close()
+        conn = sqlite3.connect(str(path))
+        for table in ('articles', 'products', 'service_categories'):
+            conn.execute('UPDATE %s SET content_hash = NULL' % table)
+        conn.execute('PRAGMA user_version = 12')
+        conn.commit()
+        conn.close()
+
+        db = Database(db_path=str(path))
+        for name, hashes in expected.items():
+            assert db.item_hashes(name) == hashes
+        db.close()
+
+    def test_backfills_visibility_flags(self, tmp_path):
+        """Should derive the active column from existing JSON data."""
+        path = tmp_path / 'old.db'
+        conn = sqlite3.connect(str(path))
+        conn.executescript("""
+            CREATE TABLE masters (id TEXT PRIMARY KEY, sort_order INTEGER DEFAULT 0,
+                data TEXT NOT NULL);
+            INSERT INTO masters (id, sort_order, data) VALUES
+                ('m1', 0, '{"id": "m1"}'),
+                ('m2', 1, '{"id": "m2", "active": false}'),
+                ('m3', 2, '{"id": "m3", "active": true}');
+            PRAGMA user_version = 6;
+        """)
+        conn.close()
+
+        db = Database(db_path=str(path))
+        assert [m['id'] for m in db.read('masters.json', public=True)['masters']] == ['m1', 'm3']
+        db.close()
+
+    def test_skips_applied(self, tmp_path):
+        """Should not re-run migrations at or below user_version."""
+        conn = sqlite3.connect(str(tmp_path / 'm.db'), isolation_level=None)
+        conn.execute('PRAGMA user_version = 2')
+        ran = []
+        version = apply_migrations(conn, [
+            (1, 'old', [lambda c: ran.append(1)]),
+            (2, 'old', [lambda c: ran.append(2)]),
+            (3, 'new', [lambda c: ran.append(3)]),
+        ])
+        assert ran == [3]
+        assert version == 3
+        conn.close()
+
+    def test_failed_migration_rolled_back(self, tmp_path):
+        """Should roll back a failing migration and keep the previous version."""
+        conn = sqlite3.connect(str(tmp_path / 'm.db'), isolation_level=None)
+        conn.execute('CREATE TABLE t (x INTEGER)')
+        with pytest.raises(sqlite3.OperationalError):
+            apply_migrations(conn, [
+                (1, 'ok', ['CREATE INDEX idx_t_x ON t(x)']),
+                (2, 'broken', ['CREATE INDEX idx_t_y ON t(x)', 'SELECT * FROM missing']),
+            ])
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == 1
+        names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert names == {'idx_t_x'}
+        conn.close()
+
+
+class TestPublicReads:
+
+    @pytest.fixture
+    def content(self, db):
+        db.write('masters.json', {'masters': [
+            {'id': 'master_1', 'name': 'A'},
+            {'id': 'master_2', 'name': 'B', 'active': False}
+        ]})
+        db.write('articles.json', {'articles': [
+            {'id': 'article_1', 'title': 'A', 'active': True, 'content': 'x'},
+            {'id': 'article_2', 'title': 'B', 'active': False, 'content': 'y'}
+        ]})
+        db.write('products.json', {'products': [
+            {'id': 'p1', 'status': 'active'}, {'id': 'p2', 'status': 'draft'}
+        ]})
+        db.write('shop-categories.json', {'categories': [
+            {'id': 'c1', 'slug': 'a', 'active': True}, {'id': 'c2', 'slug': 'b', 'active': False}
+        ]})
+        db.write('legal.json', {'documents': [
+            {'id': 'legal_1', 'slug': 'a'}, {'id': 'legal_2', 'slug': 'b', 'active': False}
+        ]})
+        db.write('social.json', {'social': [
+            {'id': 's1', 'active': True}, {'id': 's2', 'active': False}, {'id': 's3'}
+        ], 'phone': '123'})
+        return db
+
+    @pytest.mark.parametrize('filename,key,visible', [
+        ('masters.json', 'masters', ['master_1']),
+        ('articles.json', 'articles', ['article_1']),
+        ('products.json', 'products', ['p1']),
+        ('shop-categories.json', 'categories', ['c1']),
+        ('legal.json', 'documents', ['legal_1']),
+        ('social.json', 'social', ['s1']),
+    ])
+    def test_public_read_hides_inactive(self, content, filename, key, visible):
+        """Should return only visible items publicly and everything otherwise."""
+        assert [i['id'] for i in content.read(filename, public=True)[key]] == visible
+        assert len(content.read(filename)[key]) > len(visible)
+
+    def test_public_summary(self, content):
+        """Should combine the summary projection with the visibility filter."""
+        assert content.read_summary('articles.json', public=True)['articles'] == [
+            {'id': 'article_1', 'title': 'A', 'active': True}
+        ]
+
+    def test_public_keeps_contacts(self, content):
+        """Should still return contacts with filtered social links."""
+        assert content.read('social.json', public=True)['phone'] == '123'
+
+    def test_resources_without_flags_unfiltered(self, db):
+        """Should ignore public for resources without a visibility flag."""
+        db.write('faq.json', {'faq': [{'id': 'faq_1', 'question': 'Q?', 'active': False}]})
+        assert len(db.read('faq.json', public=True)['faq']) == 1
+
+    def test_public_item_reads(self, content):
+        """Should hide inactive items from public item reads."""
+        assert content.get_article_by_id('article_2', public=True) is None
+        assert content.get_article_by_id('article_2')['title'] == 'B'
+        assert content.get_product_by_id('p2', public=True) is None
+        assert content.get_product_by_id('p2')['id'] == 'p2'
+
+
 # =============================================================================
 # Normalize resource
 # =============================================================================
@@ -527,4 +1755,52 @@ class TestCompat:
     def test_get_lock(self, db):
         """Should return a lock for backward compatibility."""
         lock = db._get_lock('masters.json')
-        assert lock is db._write_lock
+        assert lock is db._get_lock('masters')
+        with lock:
+            assert lock.locked()
+
+
+# =============================================================================
+# Per-resource locks
+# =============================================================================
+
+class TestResourceLocks:
+
+    def test_locks_are_per_resource(self, db):
+        """Should use independent locks for different resources."""
+        assert db._get_lock('stats.json') is not db._get_lock('products.json')
+
+    def test_other_resource_not_blocked(self, db):
+        """Should let stats update while products lock is held."""
+        done = threading.Event()
+
+        def record_visit():
+            db.update('stats.json', lambda s: dict(s, total_views=1))
+            done.set()
+
+        with db._get_lock('products.json'):
+            t = threading.Thread(target=record_visit)
+            t.start()
+            assert done.wait(5)
+        t.join(5)
+        assert db.read('stats.json')['total_views'] == 1
+
+    def test_contention_metrics(self, db):
+        """Should record wait time when a resource lock is contended."""
+        lock = db._get_lock('faq.json')
+        acquired = threading.Event()
+
+        def writer():
+            db.write('faq.json', {'faq': []})
+            acquired.set()
+
+        with lock:
+            t = threading.Thread(target=writer)
+            t.start()
+            assert not acquired.wait(0.05)
+        t.join(5)
+
+        metrics = db.get_metrics()['locks']['faq']
+        assert metrics['contended'] == 1
+        assert metrics['wait_time_max'] > 0
+        assert db.get_metrics()['locks']['masters']['contended'] == 0
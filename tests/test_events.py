@@ -0,0 +1,141 @@
+"""
+Tests for server/events.py — SSE hub
+"""
+
+import socket
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from server.events import EventHub, _Subscriber, format_event
+
+
+def read_until(sock, marker, timeout=2):
+    """Read from a client socket until marker appears."""
+    sock.settimeout(timeout)
+    data = b''
+    while marker not in data:
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+@pytest.fixture
+def hub():
+    """Hub with a short heartbeat."""
+    hub = EventHub(heartbeat=0.2, max_subscribers=2)
+    yield hub
+    hub.close()
+
+
+def subscribe(hub, token=None, messages=()):
+    """Attach the server end of a socket pair, return the client end."""
+    assert hub.reserve()
+    server_end, client_end = socket.socketpair()
+    hub.attach(server_end, token, messages)
+    return client_end
+
+
+class TestFormat:
+
+    def test_event(self):
+        """Should emit an event name and a single-line JSON payload."""
+        assert format_event('version', {'resource': 'faq', 'seq': 3}) == \
+            b'event: version\ndata: {"resource":"faq","seq":3}\n\n'
+
+
+class TestEventHub:
+
+    def test_delivers_initial_and_published(self, hub):
+        """Should send initial messages, then published events."""
+        client = subscribe(hub, messages=[format_event('hello', {})])
+        assert b'event: hello' in read_until(client, b'hello')
+
+        hub.publish('version', {'resource': 'faq', 'seq': 1})
+
+        assert b'"resource":"faq"' in read_until(client, b'faq')
+        client.close()
+
+    def test_subscriber_cap(self, hub):
+        """Should refuse subscribers over the limit."""
+        clients = [subscribe(hub), subscribe(hub)]
+        assert hub.reserve() is False
+        for client in clients:
+            client.close()
+
+    def test_release_frees_slot(self, hub):
+        """Should give back a reserved slot."""
+        assert hub.reserve()
+        assert hub.reserve()
+        hub.release()
+        assert hub.reserve()
+
+    def test_heartbeat(self, hub):
+        """Should send comment pings to idle subscribers."""
+        client = subscribe(hub)
+        assert b': ping' in read_until(client, b'ping')
+        client.close()
+
+    def test_disconnect_frees_slot(self, hub):
+        """Should drop subscribers that closed the connection."""
+        client = subscribe(hub)
+        hub.publish('visits', {})
+        client.close()
+        deadline = time.time() + 2
+        while hub.metrics()['subscribers'] and time.time() < deadline:
+            time.sleep(0.02)
+        assert hub.metrics()['subscribers'] == 0
+
+    def test_coalesces_keyed_events(self):
+        """Should replace a pending event with the same key."""
+        hub = EventHub()
+        subscriber = _Subscriber(None, None)
+        hub._enqueue(subscriber, 'visits', b'first')
+        hub._enqueue(subscriber, None, b'other')
+        hub._enqueue(subscriber, 'visits', b'second')
+
+        assert list(subscriber.queue) == [('visits', b'second'), (None, b'other')]
+
+    def test_drops_slow_consumer(self):
+        """Should disconnect a subscriber whose queue overflows."""
+        hub = EventHub(max_queue=3, heartbeat=0.2)
+        try:
+            client = subscribe(hub)
+            # Клиент не читает: буфер сокета заполняется, очередь переполняется
+            payload = {'blob': 'x' * 65536}
+            for _ in range(200):
+                hub.publish('version', payload)
+            deadline = time.time() + 3
+            while not hub.metrics()['dropped'] and time.time() < deadline:
+                hub.publish('version', payload)
+                time.sleep(0.02)
+            assert hub.metrics()['dropped'] == 1
+            assert hub.metrics()['subscribers'] == 0
+            client.close()
+        finally:
+            hub.close()
+
+    def test_drops_expired_session(self):
+        """Should disconnect subscribers whose session is no longer valid."""
+        valid = {'token_1'}
+        hub = EventHub(authorize=lambda token: token in valid, heartbeat=0.1)
+        try:
+            client = subscribe(hub, token='token_1')
+            valid.clear()
+            client.settimeout(2)
+            data = b''
+            while True:
+                chunk = client.recv(4096)
+                if not chunk:
+                    break
+                data += chunk
+            assert hub.metrics()['dropped'] == 1
+            client.close()
+        finally:
+            hub.close()
@@ -3,14 +3,23 @@ Tests for server/handler.py — unit tests without starting server
 Tests for get_cache_header, get_cors_origin, RESOURCE_MAP, VALIDATION_MAP
 """
 
+import copy
+import email.message
+import http.server
+import io
+import json
+import os
 import pytest
 import sys
+import time
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from server.handler import AdminAPIHandler, ALLOWED_ORIGINS
+from server.handler import (
+    AdminAPIHandler, ALLOWED_ORIGINS, CACHE_DEFAULT, CACHE_MAX_AGE_WEEK, cache_control,
+)
 
 
 def make_mock_handler(path='/', origin=None):
@@ -78,6 +87,31 @@ class TestGetCacheHeader:
         assert 'no-store' in result
 
 
+def reference_cache_header(path):
+    """The former get_cache_header: splitext over the path without query."""
+    path = path.split('?')[0]
+    ext = os.path.splitext(path)[1].lower()
+    if path.startswith('/api/'):
+        return 'no-store, no-cache, must-revalidate'
+    if ext == '.js':
+        return 'no-cache, must-revalidate'
+    if ext in AdminAPIHandler.CACHEABLE_EXTENSIONS:
+        return f'public, max-age={CACHE_MAX_AGE_WEEK}, immutable'
+    if ext == '.html' or path in ('/', ''):
+        return 'no-cache, must-revalidate'
+    return 'public, max-age=300, must-revalidate'
+
+
+@pytest.mark.parametrize('path', [
+    '/', '', '/index.html', '/INDEX.HTML', '/src/js/main.js', '/src/css/style.css?v=2',
+    '/uploads/photo.JPG', '/fonts/a.woff2', '/robots.txt', '/shop', '/shop/care',
+    '/.htaccess', '/..x', '/a..css', '/dir.d/file', '/dir.css/', '/api/shop/products?q=a.css',
+    '/apiary/x.css', '/public/sitemap.xml',
+])
+def test_cache_control_matches_reference(path):
+    assert cache_control(path) == reference_cache_header(path)
+
+
 # =============================================================================
 # get_cors_origin
 # =============================================================================
@@ -174,6 +208,220 @@ class TestValidationMap:
         assert 'legal.json' not in AdminAPIHandler.VALIDATION_MAP
 
 
+# =============================================================================
+# Response headers
+# =============================================================================
+
+def make_response_handler(path, origin=None):
+    """Handler instance that writes the response into a BytesIO."""
+    handler = AdminAPIHandler.__new__(AdminAPIHandler)
+    handler.request_version = 'HTTP/1.1'
+    handler.requestline = 'GET %s HTTP/1.1' % path
+    handler.command = 'GET'
+    handler.path = path
+    handler.client_address = ('127.0.0.1', 0)
+    handler.headers = email.message.Message()
+    if origin:
+        handler.headers['Origin'] = origin
+    handler.wfile = io.BytesIO()
+    handler.log_message = lambda *args: None
+    return handler
+
+
+def response_headers(handler):
+    head = handler.wfile.getvalue().decode('latin-1').split('\r\n\r\n')[0]
+    status, *lines = head.split('\r\n')
+    return status, [tuple(line.split(': ', 1)) for line in lines]
+
+
+class TestResponseHeaders:
+
+    def test_api_response_with_allowed_origin(self):
+        """Should emit the same headers as separate send_header calls."""
+        handler = make_response_handler('/api/masters?x=1', 'https://saysbarbers.ru')
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'application/json')
+        handler.end_headers()
+
+        status, headers = response_headers(handler)
+        assert status == 'HTTP/1.0 200 OK'
+        assert [name for name, _ in headers] == [
+            'Server', 'Date', 'Content-Type', 'Cache-Control',
+            'Access-Control-Allow-Origin', 'Access-Control-Allow-Credentials',
+            'Access-Control-Allow-Methods', 'Access-Control-Allow-Headers',
+        ]
+        values = dict(headers)
+        assert values['Server'] == handler.version_string()
+        assert values['Cache-Control'] == 'no-store, no-cache, must-revalidate'
+        assert values['Access-Control-Allow-Origin'] == 'https://saysbarbers.ru'
+        assert values['Access-Control-Allow-Headers'] == 'Content-Type, Authorization'
+
+    @pytest.mark.parametrize('origin, expected', [
+        ('http://localhost:3000', 'http://localhost:3000'),
+        ('https://evil.com', None),
+        (None, None),
+    ])
+    def test_cors_origin(self, origin, expected):
+        handler = make_response_handler('/src/css/style.css', origin)
+        handler.send_response(200)
+        handler.end_headers()
+
+        values = dict(response_headers(handler)[1])
+        assert values.get('Access-Control-Allow-Origin') == expected
+        assert values['Cache-Control'] == cache_control('/src/css/style.css')
+
+    def test_blocks_follow_handler_methods(self):
+        """Should take Cache-Control and the CORS origin from the handler methods."""
+        handler = make_response_handler('/api/masters', 'https://saysbarbers.ru')
+        with patch.object(AdminAPIHandler, 'get_cors_origin', return_value=None), \
+                patch.object(AdminAPIHandler, 'get_cache_header', return_value=CACHE_DEFAULT):
+            handler.send_response(200)
+            handler.end_headers()
+
+        values = dict(response_headers(handler)[1])
+        assert 'Access-Control-Allow-Origin' not in values
+        assert values['Cache-Control'] == CACHE_DEFAULT
+
+    def test_date_refreshed_each_second(self):
+        """Should reuse the Date line within a second and rebuild it after."""
+        handler = make_response_handler('/')
+        with patch('server.handler.time.time', return_value=1000000000.2):
+            handler.send_response(200)
+            handler.end_headers()
+        with patch('server.handler.time.time', return_value=1000000001.7):
+            handler.send_response(200)
+            handler.end_headers()
+
+        dates = [line for line in handler.wfile.getvalue().decode().split('\r\n')
+                 if line.startswith('Date: ')]
+        assert dates == ['Date: Sun, 09 Sep 2001 01:46:40 GMT',
+                         'Date: Sun, 09 Sep 2001 01:46:41 GMT']
+
+
+@pytest.mark.benchmark
+def test_response_header_speed():
+    """Time to send status, one header and end_headers: stdlib path vs prebuilt blocks."""
+    class Reference(AdminAPIHandler):
+        send_response = http.server.BaseHTTPRequestHandler.send_response
+
+        def end_headers(self):
+            self.send_header('Cache-Control', reference_cache_header(self.path))
+            origin = self.get_cors_origin()
+            if origin:
+                self.send_header('Access-Control-Allow-Origin', origin)
+                self.send_header('Access-Control-Allow-Credentials', 'true')
+            self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, PATCH, DELETE, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
+            http.server.BaseHTTPRequestHandler.end_headers(self)
+
+    rounds = 20000
+    for path, origin in (('/api/masters', 'https://saysbarbers.ru'), ('/src/css/style.css', None)):
+        timings = []
+        for handler in (make_response_handler(path, origin), make_response_handler(path, origin)):
+            if not timings:
+                handler.__class__ = Reference
+            start = time.perf_counter()
+            for _ in range(rounds):
+                handler.send_response(200)
+                handler.send_header('Content-Type', 'text/css')
+                handler.end_headers()
+            timings.append((time.perf_counter() - start) / rounds * 1e6)
+        print('\n%-20s reference %5.2f us, prebuilt %5.2f us' % (path, *timings), end='')
+
+
+# =============================================================================
+# Incremental validation
+# =============================================================================
+
+def validate_document(filename, data):
+    return AdminAPIHandler._validate_document(MagicMock(spec=AdminAPIHandler,
+        VALIDATION_MAP=AdminAPIHandler.VALIDATION_MAP,
+        NESTED_VALIDATION=AdminAPIHandler.NESTED_VALIDATION), filename, data)
+
+
+class TestIncrementalValidation:
+
+    # Записан в обход проверки: такой элемент отклонила бы схема
+    STORED = {'id': 'product_1', 'name': 'Воск', 'price': 'дорого'}
+
+    def test_skips_unchanged_items(self, mock_data_dir):
+        """Should not re-validate an item identical to the stored row."""
+        mock_data_dir.write('products.json', {'products': [self.STORED]})
+
+        assert validate_document('products.json', {'products': [dict(self.STORED)]}) is None
+
+    def test_validates_changed_items(self, mock_data_dir):
+        """Should validate edited and new items."""
+        mock_data_dir.write('products.json', {'products': [self.STORED]})
+
+        edited = dict(self.STORED, name='Воск для укладки')
+        assert validate_document('products.json', {'products': [edited]}) == 'Invalid price'
+        new = {'id': 'product_2', 'name': 'Гель', 'price': -1}
+        assert validate_document('products.json', {'products': [self.STORED, new]}) \
+            == 'Invalid price'
+
+    def test_sanitizes_changed_items(self, mock_data_dir):
+        """Should sanitize changed items and leave unchanged ones as sent."""
+        stored = {'id': 'product_1', 'name': 'Воск', 'description': '<p>ok</p>'}
+        mock_data_dir.write('products.json', {'products': [stored]})
+        data = {'products': [
+            dict(stored),
+            {'id': 'product_2', 'name': 'Гель', 'description': '<p>x</p><script>1</script>'},
+        ]}
+
+        assert validate_document('products.json', data) is None
+        assert data['products'][0] == stored
+        assert data['products'][1]['description'] == '<p>x</p>'
+
+    def test_skips_unchanged_service_categories(self, mock_data_dir):
+        """Should validate services only inside changed categories."""
+        stored = {'id': 'main', 'services': [{'id': 1, 'name': 'Стрижка', 'priceGreen': 'x'}]}
+        mock_data_dir.write('services.json', {'categories': [stored]})
+
+        assert validate_document('services.json', {'categories': [copy.deepcopy(stored)]}) is None
+        edited = copy.deepcopy(stored)
+        edited['name'] = 'Основные'
+        assert validate_document('services.json', {'categories': [edited]}) \
+            == 'Invalid priceGreen'
+
+    def test_validates_items_without_hash(self, mock_data_dir):
+        """Should validate rows stored before hashes existed."""
+        mock_data_dir.write('products.json', {'products': [self.STORED]})
+        mock_data_dir._writer.execute(
+            lambda conn: conn.execute('UPDATE products SET content_hash = NULL'))
+
+        assert validate_document('products.json', {'products': [dict(self.STORED)]}) \
+            == 'Invalid price'
+
+
+@pytest.mark.benchmark
+def test_incremental_validation_latency(mock_data_dir):
+    """Validation time of a one-item edit vs a full catalog, 10k products."""
+    products = [{
+        'id': 'product_%d' % i,
+        'name': 'Товар %d' % i,
+        'price': i * 10.5,
+        'categoryId': 'category_%d' % (i % 20),
+        'description': '<p>Описание <b>товара</b> %d</p>' % i * 20,
+    } for i in range(10000)]
+    mock_data_dir.write('products.json', {'products': products})
+    body = json.dumps({'products': products}, ensure_ascii=False)
+
+    def measure():
+        data = json.loads(body)
+        data['products'][5000]['price'] = 1
+        start = time.perf_counter()
+        assert validate_document('products.json', data) is None
+        return time.perf_counter() - start
+
+    incremental = measure()
+    mock_data_dir._writer.execute(
+        lambda conn: conn.execute('UPDATE products SET content_hash = NULL'))
+    full = measure()
+    print('\n10k products, one edited: incremental %.1f ms, full %.1f ms (%.1fx)' % (
+        incremental * 1000, full * 1000, full / incremental))
+
+
 # =============================================================================
 # ALLOWED_ORIGINS
 # =============================================================================
@@ -185,3 +433,25 @@ class TestAllowedOrigins:
 
     def test_contains_production(self):
         assert 'https://saysbarbers.ru' in ALLOWED_ORIGINS
+
+
+# =============================================================================
+# log_request
+# =============================================================================
+
+class TestLogRequest:
+
+    def test_token_redacted(self):
+        handler = MagicMock(spec=AdminAPIHandler)
+        handler.requestline = 'GET /api/events?token=secret&x=1 HTTP/1.1'
+        AdminAPIHandler.log_request(handler, 200)
+        args = handler.log_message.call_args[0]
+        assert 'secret' not in args[1]
+        assert args[1] == 'GET /api/events?token=***&x=1 HTTP/1.1'
+        assert args[2] == '200'
+
+    def test_ticket_redacted(self):
+        handler = MagicMock(spec=AdminAPIHandler)
+        handler.requestline = 'GET /api/events?ticket=secret HTTP/1.1'
+        AdminAPIHandler.log_request(handler, 200)
+        assert handler.log_message.call_args[0][1] == 'GET /api/events?ticket=*** HTTP/1.1'
@@ -0,0 +1,92 @@
+"""
+Tests for server/patch.py — JSON Patch and JSON Merge Patch
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from server.patch import PatchError, apply_json_patch, apply_merge_patch
+
+
+DOC = {'categories': [{'id': 'main', 'services': [{'name': 'A', 'priceGreen': 100}]}]}
+
+
+class TestJsonPatch:
+
+    def test_replace_nested(self):
+        """Should replace a value deep inside lists and objects."""
+        result = apply_json_patch(DOC, [
+            {'op': 'replace', 'path': '/categories/0/services/0/priceGreen', 'value': 150}
+        ])
+        assert result['categories'][0]['services'][0] == {'name': 'A', 'priceGreen': 150}
+        assert DOC['categories'][0]['services'][0]['priceGreen'] == 100
+
+    def test_add_append_and_remove(self):
+        """Should append with '-' and remove by index."""
+        result = apply_json_patch(DOC, [
+            {'op': 'add', 'path': '/categories/0/services/-', 'value': {'name': 'B'}},
+            {'op': 'remove', 'path': '/categories/0/services/0'},
+        ])
+        assert result['categories'][0]['services'] == [{'name': 'B'}]
+
+    def test_move_and_copy(self):
+        """Should move and copy values between paths."""
+        doc = {'a': [1, 2], 'b': {}}
+        result = apply_json_patch(doc, [
+            {'op': 'copy', 'from': '/a/0', 'path': '/b/x'},
+            {'op': 'move', 'from': '/a/1', 'path': '/a/0'},
+        ])
+        assert result == {'a': [2, 1], 'b': {'x': 1}}
+
+    def test_escaped_pointer(self):
+        """Should decode ~0 and ~1 in path tokens."""
+        result = apply_json_patch({'a/b': {'c~d': 1}}, [
+            {'op': 'replace', 'path': '/a~1b/c~0d', 'value': 2}
+        ])
+        assert result == {'a/b': {'c~d': 2}}
+
+    def test_replace_keeps_key_order(self):
+        """Should replace object members in place."""
+        result = apply_json_patch({'a': 1, 'b': 2}, [{'op': 'replace', 'path': '/a', 'value': 3}])
+        assert list(result) == ['a', 'b']
+
+    def test_failed_test_op(self):
+        """Should abort on a failed test operation."""
+        with pytest.raises(PatchError, match='Test failed'):
+            apply_json_patch(DOC, [{'op': 'test', 'path': '/categories/0/id', 'value': 'x'}])
+
+    @pytest.mark.parametrize('operation', [
+        {'op': 'replace', 'path': '/missing', 'value': 1},
+        {'op': 'remove', 'path': '/categories/5'},
+        {'op': 'add', 'path': 'categories', 'value': 1},
+        {'op': 'add', 'path': '/categories/01', 'value': 1},
+        {'op': 'replace', 'path': '/categories'},
+        {'op': 'move', 'from': '/categories', 'path': '/categories/0'},
+        {'op': 'frobnicate', 'path': '/categories'},
+    ])
+    def test_invalid_operations(self, operation):
+        """Should reject operations that do not apply to the document."""
+        with pytest.raises(PatchError):
+            apply_json_patch(DOC, [operation])
+
+    def test_not_a_list(self):
+        """Should require an array of operations."""
+        with pytest.raises(PatchError):
+            apply_json_patch(DOC, {'op': 'add'})
+
+
+class TestMergePatch:
+
+    def test_merges_objects(self):
+        """Should merge nested objects and remove keys set to null."""
+        doc = {'title': 'a', 'podology': {'title': 'x', 'description': 'y'}}
+        result = apply_merge_patch(doc, {'podology': {'description': None, 'title': 'z'}})
+        assert result == {'title': 'a', 'podology': {'title': 'z'}}
+
+    def test_replaces_arrays(self):
+        """Should replace arrays as a whole."""
+        assert apply_merge_patch({'a': [1, 2]}, {'a': [3]}) == {'a': [3]}
@@ -0,0 +1,275 @@
+"""
+Query-plan regression suite for hot SQL in server/database.py
+
+Every hot read is executed through the real Database methods; the SQL they
+send to SQLite is captured with a trace callback and checked with
+EXPLAIN QUERY PLAN. A full table scan or a temp B-tree sort where an index
+is expected fails the test.
+
+Timings at 1k/10k/100k rows: BENCHMARK=1 python3 -m pytest tests/test_query_plans.py -s
+"""
+
+import pytest
+import re
+import sqlite3
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import server.connections as connections
+from server.database import Database
+from server.search import HAS_TRIGRAM
+
+
+# Таблицы "ключ-значение", которые читаются целиком и без сортировки
+FULL_SCAN_OK = {'podology_meta', 'contacts', 'stats_counters', 'stats_daily', 'stats_sections',
+                'sqlite_sequence', 'resource_versions'}
+
+# (название, вызов, ожидаемый индекс или None)
+HOT_READS = [
+    ('masters list', lambda db: db.read('masters.json'), 'idx_masters_order'),
+    ('services list', lambda db: db.read('services.json'), 'idx_service_categories_order'),
+    ('articles list', lambda db: db.read('articles.json'), 'idx_articles_order'),
+    ('products list', lambda db: db.read('products.json'), 'idx_products_order'),
+    ('shop categories list', lambda db: db.read('shop-categories.json'), 'idx_shop_categories_order'),
+    ('faq list', lambda db: db.read('faq.json'), 'idx_faq_order'),
+    ('legal list', lambda db: db.read('legal.json'), 'idx_legal_order'),
+    ('articles summary', lambda db: db.read_summary('articles.json'), 'idx_articles_order'),
+    ('legal summary', lambda db: db.read_summary('legal.json'), 'idx_legal_order'),
+    ('article by id', lambda db: db.get_article_by_id('article_5'), None),
+    ('social list', lambda db: db.read('social.json'), 'idx_social_links_order'),
+    ('public masters', lambda db: db.read('masters.json', public=True), 'idx_masters_active_order'),
+    ('public articles summary', lambda db: db.read_summary('articles.json', public=True),
+     'idx_articles_active_order'),
+    ('public products', lambda db: db.read('products.json', public=True),
+     'idx_products_status_order'),
+    ('public shop categories', lambda db: db.read('shop-categories.json', public=True),
+     'idx_shop_categories_active_order'),
+    ('public legal summary', lambda db: db.read_summary('legal.json', public=True),
+     'idx_legal_active_order'),
+    ('public social', lambda db: db.read('social.json', public=True), 'idx_social_links_active_order'),
+    ('stats', lambda db: db.read('stats.json'), None),
+    ('legal by slug', lambda db: db.get_legal_by_slug('doc-5'), 'idx_legal_slug_active'),
+    ('product by id', lambda db: db.get_product_by_id('product_5'), None),
+    ('products by status', lambda db: db.get_products_filtered(status='active'),
+     'idx_products_status_order'),
+    ('products by category', lambda db: db.get_products_filtered(category_slug='cat-3'),
+     'idx_products_category_status_order'),
+    ('products unfiltered', lambda db: db.get_products_filtered(status=None), 'idx_products_order'),
+    ('products page', lambda db: db.get_products_page(cursor=db.get_products_page()['nextCursor']),
+     'idx_products_status_order'),
+    ('products page by price', lambda db: db.get_products_page(sort='price_desc'),
+     'idx_products_status_price'),
+    ('products page newest in category',
+     lambda db: db.get_products_page(category_slug='cat-3', sort='newest'),
+     'idx_products_category_status_created'),
+    ('product facets', lambda db: db.get_product_facets(), 'idx_products_status_category_price'),
+    ('product search', lambda db: db.search_products('товар 12'), 'products_fts'),
+    # Без токенизатора trigram (SQLite < 3.34) — проход активных товаров по индексу
+    ('product search fuzzy', lambda db: db.search_products('тавар'),
+     'products_trigram' if HAS_TRIGRAM else 'idx_products_status_order'),
+    ('products export pages', lambda db: list(db.export_items('products.json', batch_size=100)),
+     'idx_products_order'),
+]
+
+
+# Фильтры, отбирающие подмножество по индексу: сортировка результата
+# во временном B-дереве допустима, полный просмотр — нет
+FILTERED_READS = [
+    ('products by categories', lambda db: db.get_products_filtered(
+        category_slug=['cat-1', 'cat-2']), 'idx_products_status_category_price'),
+    ('products by price range', lambda db: db.get_products_filtered(
+        price_min=100, price_max=200), 'idx_products_status_price'),
+    ('products by category and price', lambda db: db.get_products_filtered(
+        category_slug='cat-1', price_min=100, price_max=200), 'idx_products_status_category_price'),
+    # Строки журнала после since — диапазон по seq (одна строка на элемент)
+    ('changes since', lambda db: db.get_changes(1), 'INTEGER PRIMARY KEY'),
+]
+
+
+def seed(db, n):
+    """Fill every resource; products get n rows, other lists n // 10."""
+    m = max(10, n // 10)
+    db.write('shop-categories.json', {'categories': [
+        {'id': 'category_%d' % i, 'slug': 'cat-%d' % i, 'name': 'Cat %d' % i}
+        for i in range(20)
+    ]})
+    db.write('products.json', {'products': [
+        {'id': 'product_%d' % i, 'name': 'Товар %d' % i, 'price': i % 5000,
+         'createdAt': '2024-%02d-%02dT10:00:00' % (i % 12 + 1, i % 28 + 1),
+         'categoryId': 'category_%d' % (i % 20),
+         'status': ('active', 'draft', 'inactive')[i % 3], 'order': i}
+        for i in range(n)
+    ]})
+    db.write('masters.json', {'masters': [
+        {'id': 'master_%d' % i, 'name': 'M', 'active': i % 4 != 0} for i in range(m)
+    ]})
+    db.write('articles.json', {'articles': [
+        {'id': 'article_%d' % i, 'title': 'T', 'content': '<p>text</p>' * 20, 'active': i % 4 != 0}
+        for i in range(m)
+    ]})
+    db.write('faq.json', {'faq': [{'id': 'faq_%d' % i, 'question': 'Q?'} for i in range(m)]})
+    db.write('legal.json', {'documents': [
+        {'id': 'legal_%d' % i, 'slug': 'doc-%d' % i, 'active': i % 2 == 1} for i in range(m)
+    ]})
+    db.write('social.json', {'social': [{'id': 's%d' % i, 'active': i % 2 == 0} for i in range(10)],
+                             'phone': '1'})
+    db.write('services.json', {
+        'categories': [{'id': 'c%d' % i, 'services': []} for i in range(m)],
+        'podology': {'title': 'P', 'categories': [{'id': 'p%d' % i} for i in range(10)]},
+    })
+    db.write('stats.json', {
+        'total_views': n,
+        'daily': {'2024-01-%02d' % (i + 1): i for i in range(28)},
+        'sessions': {'2024-01-01': ['s%d' % i for i in range(m)]},
+        'sections': {'hero': 1},
+    })
+
+
+@pytest.fixture
+def traced(monkeypatch):
+    """Capture (db_path, sql) for every statement run on read connections."""
+    statements = []
+    original = connections.connect_reader
+
+    def connect_traced(db_path):
+        conn = original(db_path)
+        conn.set_trace_callback(lambda sql: statements.append((db_path, sql)))
+        return conn
+
+    monkeypatch.setattr(connections, 'connect_reader', connect_traced)
+    return statements
+
+
+@pytest.fixture(scope='module')
+def seeded_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp('plans') / 'plans.db'
+    db = Database(db_path=str(path))
+    seed(db, 3000)
+    db.close()
+    return path
+
+
+def explain(db_path, sql):
+    """Plan detail lines for a statement."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+    finally:
+        conn.close()
+
+
+def plan_problems(plan):
+    """Full scans of non key-value tables and temp B-tree sorts."""
+    problems = []
+    for detail in plan:
+        if detail.startswith('USE TEMP B-TREE'):
+            problems.append(detail)
+        match = re.match(r'SCAN (\w+)$', detail)
+        if match and match.group(1) not in FULL_SCAN_OK:
+            problems.append(detail)
+    return problems
+
+
+def captured_plans(statements):
+    plans = []
+    for db_path, sql in statements:
+        # '-- ...' — внутренние запросы FTS5 к своим теневым таблицам
+        if sql.startswith(('PRAGMA', '--')) or sql == 'SELECT 1':
+            continue
+        plans.append((sql, explain(db_path, sql)))
+    return plans
+
+
+# =============================================================================
+# Plans
+# =============================================================================
+
+@pytest.mark.parametrize('name,call,expected_index', HOT_READS, ids=[r[0] for r in HOT_READS])
+def test_hot_read_uses_index(name, call, expected_index, traced, seeded_path):
+    """Should not full-scan or temp-sort where an index is expected."""
+    db = Database(db_path=str(seeded_path))
+    try:
+        call(db)
+    finally:
+        db.close()
+
+    plans = captured_plans(traced)
+    assert plans, "%s ran no SQL" % name
+
+    for sql, plan in plans:
+        assert not plan_problems(plan), "%s: %s\n%s" % (name, sql, '\n'.join(plan))
+
+    if expected_index:
+        details = ' '.join(detail for _, plan in plans for detail in plan)
+        assert expected_index in details, "%s does not use %s:\n%s" % (
+            name, expected_index, '\n'.join(p for _, plan in plans for p in plan))
+
+
+@pytest.mark.parametrize('name,call,expected_index', FILTERED_READS,
+                         ids=[r[0] for r in FILTERED_READS])
+def test_filtered_read_uses_index(name, call, expected_index, traced, seeded_path):
+    """Should narrow the rows by index instead of scanning the table."""
+    db = Database(db_path=str(seeded_path))
+    try:
+        call(db)
+    finally:
+        db.close()
+
+    plans = captured_plans(traced)
+    for sql, plan in plans:
+        problems = [p for p in plan_problems(plan) if not p.startswith('USE TEMP B-TREE')]
+        assert not problems, "%s: %s\n%s" % (name, sql, '\n'.join(plan))
+    details = ' '.join(detail for _, plan in plans for detail in plan)
+    assert expected_index in details, "%s does not use %s" % (name, expected_index)
+
+
+def test_fuzzy_fallback_uses_index(traced, seeded_path, monkeypatch):
+    """Should read fuzzy candidates by the status index when trigram is unavailable."""
+    monkeypatch.setattr('server.database.HAS_TRIGRAM', False)
+    test_hot_read_uses_index('product search fuzzy fallback',
+                             lambda db: db.search_products('тавар'),
+                             'idx_products_status_order', traced, seeded_path)
+
+
+def test_detects_full_scan(seeded_path):
+    """Should flag an unindexed filter (self-check of the suite)."""
+    plan = explain(str(seeded_path), "SELECT data FROM products WHERE data LIKE '%x%'")
+    assert plan_problems(plan)
+
+
+def test_detects_temp_sort(seeded_path):
+    """Should flag ORDER BY without a matching index (self-check of the suite)."""
+    plan = explain(str(seeded_path), 'SELECT data FROM products ORDER BY data')
+    assert any('TEMP B-TREE' in p for p in plan_problems(plan))
+
+
+# =============================================================================
+# Timings
+# =============================================================================
+
+@pytest.mark.benchmark
+def test_hot_read_timings(tmp_path):
+    """Median time of each hot read at 1k/10k/100k products."""
+    sizes = (1000, 10000, 100000)
+    results = {}
+    for n in sizes:
+        db = Database(db_path=str(tmp_path / ('bench_%d.db' % n)))
+        seed(db, n)
+        for name, call, _ in HOT_READS:
+            call(db)  # прогрев кэша страниц
+            runs = []
+            for _ in range(5):
+                start = time.perf_counter()
+                call(db)
+                runs.append(time.perf_counter() - start)
+            results.setdefault(name, {})[n] = statistics.median(runs) * 1000
+        db.close()
+
+    print()
+    print('%-24s' % 'query' + ''.join('%12s' % ('%d rows' % n) for n in sizes))
+    for name, by_size in results.items():
+        print('%-24s' % name + ''.join('%10.3fms' % by_size[n] for n in sizes))
@@ -3,7 +3,9 @@ Tests for server/routes.py — Route, Router, create_api_router
 """
 
 import pytest
+import re
 import sys
+import time
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -15,69 +17,60 @@ from server.routes import Route, Router, create_api_router
 # Route
 # =============================================================================
 
-class TestRouteCompile:
-    """Route._compile_pattern tests"""
+class TestRouteSegments:
+    """Route pattern parsing tests"""
 
-    def test_compile_simple_path(self):
+    def test_simple_path(self):
         route = Route('/api/masters', 'handler')
-        assert route._regex.match('/api/masters')
-        assert not route._regex.match('/api/masters/')
-        assert not route._regex.match('/api/services')
+        assert route.segments == ['', 'api', 'masters']
+        assert route.params == []
 
-    def test_compile_path_with_param(self):
+    def test_path_with_param(self):
         route = Route('/api/legal/{slug}', 'handler')
-        m = route._regex.match('/api/legal/privacy')
-        assert m is not None
-        assert m.group('slug') == 'privacy'
+        assert route.segments == ['', 'api', 'legal', None]
+        assert route.params == ['slug']
 
-    def test_compile_multiple_params(self):
+    def test_multiple_params(self):
         route = Route('/api/{type}/{id}', 'handler')
-        m = route._regex.match('/api/masters/123')
-        assert m is not None
-        assert m.group('type') == 'masters'
-        assert m.group('id') == '123'
+        assert route.segments == ['', 'api', None, None]
+        assert route.params == ['type', 'id']
 
 
-class TestRouteMatch:
-    """Route.match tests"""
+class TestRouterLookup:
+    """Router.lookup tests"""
+
+    def lookup(self, pattern, path, method, methods=None, context=None):
+        router = Router().add(pattern, 'handler', methods, context=context)
+        return router.lookup(path, method)[1]
 
     def test_match_correct_method(self):
-        route = Route('/api/masters', 'handler', methods=['GET'])
-        result = route.match('/api/masters', 'GET')
-        assert result == {}
+        assert self.lookup('/api/masters', '/api/masters', 'GET', ['GET']) == {}
 
     def test_match_wrong_method(self):
-        route = Route('/api/masters', 'handler', methods=['GET'])
-        result = route.match('/api/masters', 'POST')
-        assert result is None
+        assert self.lookup('/api/masters', '/api/masters', 'POST', ['GET']) is None
 
     def test_match_param_extraction(self):
-        route = Route('/api/legal/{slug}', 'handler', methods=['GET'])
-        result = route.match('/api/legal/privacy', 'GET')
-        assert result == {'slug': 'privacy'}
+        assert self.lookup('/api/legal/{slug}', '/api/legal/privacy', 'GET') == {'slug': 'privacy'}
 
     def test_match_no_match(self):
-        route = Route('/api/masters', 'handler', methods=['GET'])
-        result = route.match('/api/unknown', 'GET')
-        assert result is None
+        assert self.lookup('/api/masters', '/api/unknown', 'GET') is None
+        assert self.lookup('/api/masters', '/api/masters/', 'GET') is None
 
     def test_match_with_context(self):
-        route = Route('/api/masters', 'handler', methods=['GET'],
-                       context={'resource': 'masters'})
-        result = route.match('/api/masters', 'GET')
-        assert result == {'resource': 'masters'}
+        params = self.lookup('/api/masters', '/api/masters', 'GET',
+                             context={'resource': 'masters'})
+        assert params == {'resource': 'masters'}
 
     def test_match_context_merged_with_params(self):
-        route = Route('/api/{type}/{id}', 'handler', methods=['GET'],
-                       context={'extra': 'value'})
-        result = route.match('/api/masters/123', 'GET')
-        assert result == {'type': 'masters', 'id': '123', 'extra': 'value'}
+        params = self.lookup('/api/{type}/{id}', '/api/masters/123', 'GET',
+                             context={'extra': 'value'})
+        assert params == {'type': 'masters', 'id': '123', 'extra': 'value'}
 
     def test_match_multiple_methods(self):
-        route = Route('/api/masters', 'handler', methods=['GET', 'POST'])
-        assert route.match('/api/masters', 'GET') is not None
-        assert route.match('/api/masters', 'POST') is not None
-        assert route.match('/api/masters', 'DELETE') is None
+        router = Router().add('/api/masters', 'handler', ['GET', 'POST'])
+        assert router.lookup('/api/masters', 'GET')[0] is not None
+        assert router.lookup('/api/masters', 'POST')[0] is not None
+        assert router.lookup('/api/masters', 'DELETE') == (None, None)
 
 
 # =============================================================================
@@ -154,6 +147,65 @@ class TestRouter:
         handler, _, _ = router.resolve('/api/masters', 'GET')
         assert handler == 'first_handler'
 
+    def test_exact_segment_beats_param(self):
+        router = Router()
+        router.get('/api/{type}/list', 'handle_param')
+        router.get('/api/masters/{id}', 'handle_masters')
+        router.get('/api/masters/list', 'handle_list')
+        assert router.resolve('/api/masters/list', 'GET')[0] == 'handle_list'
+        assert router.resolve('/api/masters/m1', 'GET') == ('handle_masters', {'id': 'm1'}, False)
+        assert router.resolve('/api/faq/list', 'GET') == ('handle_param', {'type': 'faq'}, False)
+
+    def test_backtracks_to_param_branch(self):
+        router = Router()
+        router.get('/api/masters/{id}/photo', 'handle_photo')
+        router.get('/api/{type}/{id}', 'handle_any')
+        assert router.resolve('/api/masters/m1/photo', 'GET')[0] == 'handle_photo'
+        assert router.resolve('/api/masters/m1', 'GET')[0] == 'handle_any'
+
+    def test_param_requires_non_empty_segment(self):
+        router = Router()
+        router.get('/api/legal/{slug}', 'handler')
+        assert router.resolve('/api/legal/', 'GET')[0] is None
+        assert router.resolve('/api/legal/a/b', 'GET')[0] is None
+
+    def test_context_not_shared_between_calls(self):
+        router = Router()
+        router.get('/api/masters', 'handler', context={'resource': 'masters'})
+        _, params, _ = router.resolve('/api/masters', 'GET')
+        params['resource'] = 'changed'
+        assert router.resolve('/api/masters', 'GET')[1] == {'resource': 'masters'}
+
+    def test_partial_param_segment_rejected(self):
+        with pytest.raises(ValueError):
+            Router().get('/api/file-{id}.json', 'handler')
+
+    def test_allowed_methods(self):
+        router = Router()
+        router.get('/api/masters', 'handler')
+        router.post('/api/masters', 'handler')
+        router.delete('/api/upload/{filename}', 'handler')
+        assert router.allowed_methods('/api/masters') == ['GET', 'POST']
+        assert router.allowed_methods('/api/upload/a.jpg') == ['DELETE']
+        assert router.allowed_methods('/css/style.css') == []
+
+    def test_bind(self):
+        class Handler:
+            def handle_masters(self):
+                return 'masters'
+
+        router = Router()
+        router.get('/api/masters', 'handle_masters')
+        router.bind(Handler)
+        route, params = router.lookup('/api/masters', 'GET')
+        assert route.target(Handler(), **params) == 'masters'
+
+    def test_bind_missing_method(self):
+        router = Router()
+        router.get('/api/masters', 'handle_missing')
+        with pytest.raises(AttributeError):
+            router.bind(object)
+
 
 # =============================================================================
 # create_api_router
@@ -214,6 +266,149 @@ class TestCreateApiRouter:
         handler, _, _ = api_router.resolve('/api/stats/visit', 'POST')
         assert handler == 'handle_record_visit'
 
+    def test_metrics_endpoint(self, api_router):
+        handler, _, auth = api_router.resolve('/api/metrics', 'GET')
+        assert handler == 'handle_get_metrics'
+        assert auth is True
+
+    def test_changes_endpoint(self, api_router):
+        handler, _, auth = api_router.resolve('/api/changes', 'GET')
+        assert handler == 'handle_get_changes'
+        assert auth is True
+
+    def test_patch_generic_resource(self, api_router):
+        handler, _, auth = api_router.resolve('/api/services', 'PATCH')
+        assert handler == 'handle_generic_patch'
+        assert auth is True
+
+    def test_reorder_generic_resource(self, api_router):
+        handler, params, auth = api_router.resolve('/api/masters/reorder', 'POST')
+        assert handler == 'handle_generic_reorder'
+        assert params == {'resource': 'masters'}
+        assert auth is True
+
+    def test_reorder_products(self, api_router):
+        handler, params, _ = api_router.resolve('/api/shop/products/reorder', 'POST')
+        assert handler == 'handle_generic_reorder'
+        assert params == {'resource': 'shop-products'}
+
+    def test_no_reorder_for_services(self, api_router):
+        handler, _, _ = api_router.resolve('/api/services/reorder', 'POST')
+        assert handler is None
+
+    def test_backups_endpoints(self, api_router):
+        assert api_router.resolve('/api/backups', 'GET')[0] == 'handle_get_backups'
+        handler, _, auth = api_router.resolve('/api/backups', 'POST')
+        assert handler == 'handle_create_backup'
+        assert auth is True
+
+    def test_export_import_endpoints(self, api_router):
+        handler, params, auth = api_router.resolve('/api/export/shop-products', 'GET')
+        assert handler == 'handle_export'
+        assert params == {'resource': 'shop-products'}
+        assert auth is True
+        handler, params, auth = api_router.resolve('/api/import/faq', 'POST')
+        assert handler == 'handle_import'
+        assert params == {'resource': 'faq'}
+        assert auth is True
+
+    def test_products_csv_import_endpoint(self, api_router):
+        handler, _, auth = api_router.resolve('/api/shop/products/import', 'POST')
+        assert handler == 'handle_import_products_csv'
+        assert auth is True
+
+        handler, _, auth = api_router.resolve('/api/shop/products/import', 'GET')
+        assert handler == 'handle_get_products_import'
+        assert auth is True
+
+    def test_batch_endpoint(self, api_router):
+        handler, _, auth = api_router.resolve('/api/batch', 'POST')
+        assert handler == 'handle_batch'
+        assert auth is True
+
+    def test_events_endpoint(self, api_router):
+        handler, _, auth = api_router.resolve('/api/events', 'GET')
+        assert handler == 'handle_events'
+        # Билет проверяет сам handler (EventSource не передаёт заголовки)
+        assert auth is False
+
+    def test_events_ticket_endpoint(self, api_router):
+        handler, _, auth = api_router.resolve('/api/events/ticket', 'POST')
+        assert handler == 'handle_events_ticket'
+        assert auth is True
+
+    def test_article_by_id(self, api_router):
+        handler, params, auth = api_router.resolve('/api/articles/article_1', 'GET')
+        assert handler == 'handle_get_article'
+        assert params == {'id': 'article_1'}
+        assert auth is False
+
+    def test_facets_endpoint(self, api_router):
+        handler, _, auth = api_router.resolve('/api/shop/facets', 'GET')
+        assert handler == 'handle_get_facets'
+        assert auth is False
+
+    def test_post_only_path_not_static(self, api_router):
+        """Should report POST for GET on a POST-only path, so the handler answers 405."""
+        assert api_router.resolve('/api/auth/login', 'GET') == (None, None, None)
+        assert api_router.allowed_methods('/api/auth/login') == ['POST']
+
     def test_unknown_endpoint_returns_none(self, api_router):
         handler, _, _ = api_router.resolve('/api/nonexistent', 'GET')
         assert handler is None
+
+    def test_handlers_bound(self):
+        """Should bind every route to an AdminAPIHandler method."""
+        from server.handler import AdminAPIHandler, router
+        for route in router._routes:
+            assert route.target is getattr(AdminAPIHandler, route.handler)
+
+
+def linear_resolve(router, path, method):
+    """Reference: the former first-match regex scan over all routes."""
+    for route in router._routes:
+        if method not in route.methods:
+            continue
+        match = re.fullmatch(re.sub(r'\{(\w+)\}', r'(?P<\1>[^/]+)', route.pattern), path)
+        if match:
+            return route.handler, {**match.groupdict(), **route.context}, route.auth_required
+    return None, None, None
+
+
+REQUESTS = [
+    ('/api/masters', 'GET'),
+    ('/api/shop/products', 'POST'),
+    ('/api/shop/products/product_1', 'GET'),
+    ('/api/upload/photo.jpg', 'DELETE'),
+    ('/api/legal/privacy', 'GET'),
+    ('/api/shop/products/reorder', 'POST'),
+    ('/api/shop/products/reorder', 'GET'),
+    ('/api/services/reorder', 'POST'),
+    ('/css/style.css', 'GET'),
+    ('/', 'GET'),
+    ('/api/nonexistent', 'GET'),
+]
+
+
+def test_matches_linear_scan():
+    """Should resolve every request exactly like the linear scan."""
+    api_router = create_api_router()
+    for path, method in REQUESTS:
+        assert api_router.resolve(path, method) == linear_resolve(api_router, path, method)
+
+
+@pytest.mark.benchmark
+def test_resolve_speed():
+    """Lookups per second: linear regex scan vs indexed router."""
+    api_router = create_api_router()
+    rounds = 20000
+    for path, method in REQUESTS:
+        timings = []
+        for resolve in (lambda: linear_resolve(api_router, path, method),
+                        lambda: api_router.resolve(path, method)):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                resolve()
+            timings.append((time.perf_counter() - start) / rounds * 1e6)
+        print('\n%-6s %-32s linear %5.2f us, indexed %5.2f us (%.1fx)' % (
+            method, path, timings[0], timings[1], timings[0] / timings[1]), end='')
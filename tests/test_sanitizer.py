@@ -0,0 +1,110 @@
+"""
+Tests for server/sanitizer.py — allowlist HTML sanitizer
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from server.sanitizer import is_safe_url, sanitize_html
+
+
+class TestSanitizeHtml:
+
+    def test_keeps_allowed_markup(self):
+        html = ('<h2>Уход</h2><p class="lead">Текст <a href="https://x.ru/a" target="_blank">'
+                'ссылка</a><br><img src="/uploads/a.jpg" alt="Фото"></p>')
+        assert sanitize_html(html) == html
+
+    def test_plain_text_unchanged(self):
+        text = 'Шампунь для бороды, 250 мл'
+        assert sanitize_html(text) is text
+
+    def test_drops_unknown_tags_keeps_text(self):
+        assert sanitize_html('<section><button onclick="x()">Купить</button></section>') == 'Купить'
+
+    def test_drops_dangerous_containers_with_content(self):
+        html = ('<p>a</p><script>alert(1)</script><style>p{}</style><svg><svg></svg>'
+                '<p>in</p></svg><iframe src="x"></iframe><p>b</p>')
+        assert sanitize_html(html) == '<p>a</p><p>b</p>'
+
+    def test_raw_text_is_not_markup(self):
+        """Should not end a script at a tag inside its body."""
+        assert sanitize_html('<script>"</p><p>"</script>ok') == 'ok'
+        assert sanitize_html('<SCRIPT>x</script >ok') == 'ok'
+
+    def test_drops_event_handlers_and_unknown_attributes(self):
+        html = '<img src=x onerror=alert(1) data-x="1"><p ONCLICK="a" id=intro>t</p>'
+        assert sanitize_html(html) == '<img src="x"><p id="intro">t</p>'
+
+    def test_drops_unsafe_urls(self):
+        for url in ('javascript:alert(1)', 'JaVaScRiPt:x', 'java&#x09;script:x',
+                    ' javascript:x', 'data:text/html,x', 'vbscript:x'):
+            assert sanitize_html('<a href="%s">t</a>' % url) == '<a>t</a>', url
+
+    def test_drops_unsafe_style(self):
+        assert sanitize_html('<p style="color:red">a</p>') == '<p style="color:red">a</p>'
+        assert sanitize_html('<p style="background:url(javascript:x)">a</p>') == '<p>a</p>'
+        assert sanitize_html('<p style="width:expression(alert(1))">a</p>') == '<p>a</p>'
+
+    def test_escapes_text_and_attributes(self):
+        assert sanitize_html('1 < 2 & 3 > 2') == '1 &lt; 2 &amp; 3 &gt; 2'
+        assert sanitize_html('<a title=\'a"b>c\'>t</a>') == '<a title="a&quot;b&gt;c">t</a>'
+        assert sanitize_html('&lt;b&gt;') == '&lt;b&gt;'
+
+    def test_drops_comments_and_declarations(self):
+        assert sanitize_html('<!DOCTYPE html><!-- <script> -->a<?xml x?><![CDATA[b]]>') == 'a'
+
+    def test_unterminated_constructs(self):
+        """Should drop an unfinished tag or comment at the end of the text."""
+        assert sanitize_html('<p>a <b') == '<p>a '
+        assert sanitize_html('a<!-- b') == 'a'
+        assert sanitize_html('a<script>b') == 'a'
+        assert sanitize_html('a<p title="b>c') == 'a'
+
+    def test_is_safe_url(self):
+        assert is_safe_url('/uploads/a.jpg')
+        assert is_safe_url('#top')
+        assert is_safe_url('mailto:a@b.ru')
+        assert not is_safe_url('javascript:x')
+
+
+PATHOLOGICAL = {
+    'script opens': lambda n: '<script>' * (n // 8),
+    'unterminated tags': lambda n: '<svg ' * (n // 5),
+    'whitespace before on': lambda n: ' ' * n + 'on',
+    'bare lt': lambda n: '<' * n,
+    'attributes without end': lambda n: '<a ' + 'x=1 ' * (n // 4),
+    'comment opens': lambda n: '<!--' * (n // 4),
+    'href repeats': lambda n: 'href=' * (n // 5),
+}
+
+
+@pytest.mark.parametrize('name', sorted(PATHOLOGICAL))
+def test_pathological_inputs_safe(name):
+    """Should return markup-free output for adversarial inputs."""
+    result = sanitize_html(PATHOLOGICAL[name](4000))
+    assert not re.search(r'<(?!/?(a|p)\b)', result)
+
+
+@pytest.mark.benchmark
+def test_sanitizer_scaling():
+    """Time vs input size: linear growth on pathological and ordinary inputs."""
+    article = '<h2>Заголовок</h2><p>Текст <strong>жирный</strong> <a href="/a">ссылка</a>.</p>\n'
+    cases = dict(PATHOLOGICAL, article=lambda n: (article * (n // len(article) + 1))[:n])
+    for name in sorted(cases):
+        timings = []
+        for size in (25000, 50000, 100000):
+            text = cases[name](size)
+            start = time.perf_counter()
+            sanitize_html(text)
+            timings.append(time.perf_counter() - start)
+        print('\n%-24s 25k %.1fms, 50k %.1fms, 100k %.1fms' % (
+            name, *(t * 1000 for t in timings)))
+        # Линейный рост: вчетверо больше текста — не в десятки раз дольше
+        assert timings[2] < max(timings[0], 0.001) * 12
@@ -0,0 +1,66 @@
+"""
+Tests for server/search.py — query building and highlighting
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from server.search import (
+    normalize_text, build_match_query, trigrams, trigram_share,
+    render_highlight, HL_START, HL_END,
+)
+
+
+class TestNormalize:
+
+    def test_strips_html(self):
+        """Should drop tags and decode entities."""
+        assert normalize_text('<p>Мыло &amp; <b>воск</b></p>') == 'Мыло & воск'
+
+    def test_folds_yo(self):
+        """Should replace ё with е."""
+        assert normalize_text('Ёлка, ёж') == 'Елка, еж'
+
+    def test_empty(self):
+        """Should return empty string for missing text."""
+        assert normalize_text(None) == ''
+
+
+class TestMatchQuery:
+
+    def test_last_term_prefix(self):
+        """Should quote terms and make the last one a prefix."""
+        assert build_match_query('Масло Бор') == '"масло" "бор"*'
+
+    def test_operators_quoted(self):
+        """Should not pass FTS5 syntax through."""
+        assert build_match_query('a" OR b*') == '"a" "or" "b"*'
+
+    def test_no_terms(self):
+        """Should return None when the query has no words."""
+        assert build_match_query(' ** ') is None
+
+
+class TestTrigrams:
+
+    def test_unique_grams(self):
+        """Should split words into unique trigrams."""
+        assert trigrams('ааааб') == ['ааа', 'ааб']
+
+    def test_short_words_skipped(self):
+        """Should ignore words shorter than three letters."""
+        assert trigrams('я и ты') == []
+
+    def test_share(self):
+        """Should count the share of query trigrams found in text."""
+        assert trigram_share(trigrams('шампнь'), 'Шампунь') == 0.5
+
+
+class TestHighlight:
+
+    def test_marks_and_escapes(self):
+        """Should escape text and turn markers into <mark>."""
+        snippet = HL_START + 'Воск' + HL_END + ' <b>'
+        assert render_highlight(snippet) == '<mark>Воск</mark> &lt;b&gt;'
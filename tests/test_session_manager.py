@@ -237,3 +237,43 @@ class TestSessionManagerRemainingTime:
     def test_nonexistent(self):
         sm = SessionManager(timeout_hours=1)
         assert sm.get_remaining_time('nonexistent') == 0
+
+
+# =============================================================================
+# SessionManager — event stream tickets
+# =============================================================================
+
+class TestSessionManagerTickets:
+
+    def test_redeem_once(self):
+        sm = SessionManager(timeout_hours=1)
+        token = sm.create()
+        ticket = sm.issue_ticket(token)
+        assert ticket and ticket != token
+        assert sm.redeem_ticket(ticket) == token
+        assert sm.redeem_ticket(ticket) is None
+
+    def test_invalid_token_gets_no_ticket(self):
+        sm = SessionManager(timeout_hours=1)
+        assert sm.issue_ticket('nonexistent') is None
+        assert sm.issue_ticket(None) is None
+
+    def test_expired_ticket(self):
+        sm = SessionManager(timeout_hours=1, ticket_ttl_seconds=0)
+        ticket = sm.issue_ticket(sm.create())
+        sm._tickets[ticket] = (sm._tickets[ticket][0], datetime.now() - timedelta(seconds=1))
+        assert sm.redeem_ticket(ticket) is None
+
+    def test_ticket_of_ended_session(self):
+        sm = SessionManager(timeout_hours=1)
+        token = sm.create()
+        ticket = sm.issue_ticket(token)
+        sm.delete(token)
+        assert sm.redeem_ticket(ticket) is None
+
+    def test_cleanup_removes_expired_tickets(self):
+        sm = SessionManager(timeout_hours=1)
+        ticket = sm.issue_ticket(sm.create())
+        sm._tickets[ticket] = (sm._tickets[ticket][0], datetime.now() - timedelta(seconds=1))
+        sm.cleanup_expired()
+        assert ticket not in sm._tickets